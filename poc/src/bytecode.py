@@ -0,0 +1,303 @@
+import struct
+from enum import IntEnum
+from typing import Any, Dict, List, Tuple
+
+
+# The on-disk bytecode format shared with compiler/ (`iqaloxc`) and vm/
+# (`iqaloxvm`) -- format v2, byte for byte. compiler/src/Bytecode.fs holds the
+# authoritative layout; in short, all little-endian:
+#
+#   'IQBC' magic, u8 version, then the top-level script's chunk.
+#   chunk:    u32 constant count, the constants, u32 code length, the code
+#             bytes, then one u16 source line per code *byte*.
+#   constant: u8 tag -- 0x00 f64 number, 0x01 u32-length-prefixed UTF-8
+#             string, 0x02 function (u32-length-prefixed name, u8 arity,
+#             u16 local count, u16 upvalue count, that many (u8
+#             from_enclosing_local, u16 index) pairs, then its own chunk).
+#
+# In memory a Chunk's `code` is a flat list of (opcode, operand) pairs, one
+# per instruction, with jump operands stored as *instruction* indices; only
+# the on-disk form addresses bytes. `lines` runs parallel to `code`.
+MAGIC = b'IQBC'
+FORMAT_VERSION = 2
+
+NUMBER_TAG = 0x00
+STRING_TAG = 0x01
+FUNCTION_TAG = 0x02
+
+
+class OpCode(IntEnum):
+    CONSTANT = 0x01
+    NIL = 0x02
+    TRUE = 0x03
+    FALSE = 0x04
+    UNDEF = 0x05
+    POP = 0x06
+    POP_N = 0x07
+    GET_LOCAL = 0x08
+    SET_LOCAL = 0x09
+    GET_UPVALUE = 0x0A
+    SET_UPVALUE = 0x0B
+    GET_GLOBAL = 0x0C
+    SET_GLOBAL = 0x0D
+    DEFINE_GLOBAL = 0x0E
+    ADD = 0x0F
+    SUBTRACT = 0x10
+    MULTIPLY = 0x11
+    DIVIDE = 0x12
+    MODULO = 0x13
+    POWER = 0x14
+    NEGATE = 0x15
+    NOT = 0x16
+    EQUAL = 0x17
+    NOT_EQUAL = 0x18
+    GREATER = 0x19
+    GREATER_EQUAL = 0x1A
+    LESS = 0x1B
+    LESS_EQUAL = 0x1C
+    JUMP = 0x1D
+    JUMP_IF_FALSE = 0x1E
+    JUMP_IF_NOT_NIL = 0x1F
+    BUILD_VECTOR = 0x20
+    CALL = 0x21
+    CLOSURE = 0x22
+    RETURN = 0x23
+    CLASS = 0x24
+    METHOD = 0x25
+    INHERIT = 0x26
+    GET_PROPERTY = 0x27
+    SET_PROPERTY = 0x28
+    GET_SUPER = 0x29
+    GET_INDEX = 0x2A
+    SET_INDEX = 0x2B
+    VECTOR_LENGTH = 0x2C
+    VECTOR_APPEND = 0x2D
+    VECTOR_EXTEND = 0x2E
+    METHOD_PUB = 0x2F
+    GET_PROPERTY_SELF = 0x30
+    SET_PROPERTY_SELF = 0x31
+    PROPERTY_PRIVATE = 0x32
+    PROPERTY_PRIVATE_MUT = 0x33
+    PROPERTY_PUB = 0x34
+    PROPERTY_PUB_MUT = 0x35
+    MIXIN = 0x36
+    GET_SLICE = 0x37
+
+
+NO_OPERAND = frozenset({
+    OpCode.NIL, OpCode.TRUE, OpCode.FALSE, OpCode.UNDEF, OpCode.POP, OpCode.ADD, OpCode.SUBTRACT,
+    OpCode.MULTIPLY, OpCode.DIVIDE, OpCode.MODULO, OpCode.POWER, OpCode.NEGATE, OpCode.NOT, OpCode.EQUAL,
+    OpCode.NOT_EQUAL, OpCode.GREATER, OpCode.GREATER_EQUAL, OpCode.LESS, OpCode.LESS_EQUAL, OpCode.RETURN,
+    OpCode.INHERIT, OpCode.MIXIN, OpCode.GET_INDEX, OpCode.SET_INDEX, OpCode.VECTOR_LENGTH, OpCode.VECTOR_APPEND,
+    OpCode.VECTOR_EXTEND, OpCode.GET_SLICE,
+})
+JUMPS = frozenset({OpCode.JUMP, OpCode.JUMP_IF_FALSE, OpCode.JUMP_IF_NOT_NIL})
+
+
+class BytecodeError(Exception):
+    pass
+
+
+class Chunk:
+    def __init__(self) -> None:
+        self.constants: List[Any] = []
+        # (opcode, operand) per instruction: None for no-operand opcodes, an
+        # int for u16 ones, and (function index, upvalues) for CLOSURE.
+        self.code: List[Tuple[OpCode, Any]] = []
+        self.lines: List[int] = []
+
+
+class FunctionProto:
+    def __init__(self, name: str, arity: int, local_count: int, upvalues: List[Tuple[bool, int]],
+                 chunk: Chunk) -> None:
+        self.name = name
+        self.arity = arity
+        self.local_count = local_count
+        # (from_enclosing_local, index) per captured variable -- see
+        # compiler/src/Bound.fs's UpvalueDescriptor.
+        self.upvalues = upvalues
+        self.chunk = chunk
+
+    def __str__(self) -> str:
+        return f'<fun {self.name}>'
+
+
+def instruction_size(opcode: OpCode, operand: Any) -> int:
+    if opcode in NO_OPERAND:
+        return 1
+    if opcode == OpCode.CLOSURE:
+        return 5 + 3 * len(operand[1])
+    return 3
+
+
+def dumps(script: Chunk) -> bytes:
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _write_chunk(out, script)
+    return bytes(out)
+
+
+def write(script: Chunk, path: str) -> None:
+    with open(path, 'wb') as f:
+        f.write(dumps(script))
+
+
+def _write_chunk(out: bytearray, chunk: Chunk) -> None:
+    out += struct.pack('<I', len(chunk.constants))
+    for constant in chunk.constants:
+        if isinstance(constant, FunctionProto):
+            name = constant.name.encode('utf-8')
+            out += struct.pack('<BI', FUNCTION_TAG, len(name)) + name
+            out += struct.pack('<BHH', constant.arity, constant.local_count, len(constant.upvalues))
+            for from_enclosing_local, index in constant.upvalues:
+                out += struct.pack('<BH', 1 if from_enclosing_local else 0, index)
+            _write_chunk(out, constant.chunk)
+        elif isinstance(constant, str):
+            encoded = constant.encode('utf-8')
+            out += struct.pack('<BI', STRING_TAG, len(encoded)) + encoded
+        else:
+            out += struct.pack('<Bd', NUMBER_TAG, constant)
+
+    offsets = []
+    offset = 0
+    for opcode, operand in chunk.code:
+        offsets.append(offset)
+        offset += instruction_size(opcode, operand)
+    # A jump to one past the last instruction lands on the code length.
+    offsets.append(offset)
+
+    code = bytearray()
+    lines = bytearray()
+    for (opcode, operand), line in zip(chunk.code, chunk.lines):
+        start = len(code)
+        code.append(opcode)
+        if opcode in JUMPS:
+            code += struct.pack('<H', offsets[operand])
+        elif opcode == OpCode.CLOSURE:
+            function_index, upvalues = operand
+            code += struct.pack('<HH', function_index, len(upvalues))
+            for from_enclosing_local, index in upvalues:
+                code += struct.pack('<BH', 1 if from_enclosing_local else 0, index)
+        elif opcode not in NO_OPERAND:
+            code += struct.pack('<H', operand)
+        lines += struct.pack('<H', line) * (len(code) - start)
+
+    out += struct.pack('<I', len(code))
+    out += code
+    out += lines
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.position = 0
+
+    def read(self, fmt: str) -> Tuple:
+        size = struct.calcsize(fmt)
+        if self.position + size > len(self.data):
+            raise BytecodeError('iqalox bytecode: unexpected end of file')
+        values = struct.unpack_from(fmt, self.data, self.position)
+        self.position += size
+        return values
+
+    def read_bytes(self, count: int) -> bytes:
+        if self.position + count > len(self.data):
+            raise BytecodeError('iqalox bytecode: unexpected end of file')
+        value = self.data[self.position:self.position + count]
+        self.position += count
+        return value
+
+
+def loads(data: bytes, source: str = '<bytes>') -> FunctionProto:
+    reader = _Reader(data)
+    if reader.read_bytes(len(MAGIC)) != MAGIC:
+        raise BytecodeError(f"iqalox bytecode: bad magic number in '{source}'")
+    version, = reader.read('<B')
+    if version != FORMAT_VERSION:
+        raise BytecodeError(f'iqalox bytecode: unsupported format version {version}')
+    return FunctionProto('script', 0, 0, [], _read_chunk(reader))
+
+
+def load(path: str) -> FunctionProto:
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        raise BytecodeError(f"iqalox bytecode: cannot open '{path}'") from None
+    return loads(data, path)
+
+
+def _read_chunk(reader: _Reader) -> Chunk:
+    chunk = Chunk()
+    constant_count, = reader.read('<I')
+    for _ in range(constant_count):
+        tag, = reader.read('<B')
+        if tag == NUMBER_TAG:
+            chunk.constants.append(reader.read('<d')[0])
+        elif tag == STRING_TAG:
+            length, = reader.read('<I')
+            chunk.constants.append(reader.read_bytes(length).decode('utf-8'))
+        elif tag == FUNCTION_TAG:
+            name_length, = reader.read('<I')
+            name = reader.read_bytes(name_length).decode('utf-8')
+            arity, local_count, upvalue_count = reader.read('<BHH')
+            upvalues = []
+            for _ in range(upvalue_count):
+                from_enclosing_local, index = reader.read('<BH')
+                upvalues.append((from_enclosing_local != 0, index))
+            chunk.constants.append(FunctionProto(name, arity, local_count, upvalues, _read_chunk(reader)))
+        else:
+            raise BytecodeError(f'iqalox bytecode: unknown constant tag {tag}')
+
+    code_length, = reader.read('<I')
+    code = reader.read_bytes(code_length)
+    lines = reader.read(f'<{code_length}H')
+    _decode(chunk, code, lines)
+    return chunk
+
+
+def _decode(chunk: Chunk, code: bytes, lines: Tuple[int, ...]) -> None:
+    # Flattens the byte stream into one (opcode, operand) entry per
+    # instruction, then rewrites every jump's byte-offset target into an
+    # instruction index so the VM never has to deal with byte offsets.
+    index_of_offset: Dict[int, int] = {}
+    offset = 0
+    while offset < len(code):
+        index_of_offset[offset] = len(chunk.code)
+        try:
+            opcode = OpCode(code[offset])
+        except ValueError:
+            raise BytecodeError(f'iqalox bytecode: unknown opcode {code[offset]}') from None
+        if opcode in NO_OPERAND:
+            operand = None
+        elif opcode == OpCode.CLOSURE:
+            function_index, upvalue_count = _unpack('<HH', code, offset + 1)
+            upvalues = tuple(
+                (from_enclosing_local != 0, index)
+                for from_enclosing_local, index in struct.iter_unpack(
+                    '<BH', _slice(code, offset + 5, 3 * upvalue_count)
+                )
+            )
+            operand = (function_index, upvalues)
+        else:
+            operand, = _unpack('<H', code, offset + 1)
+        chunk.code.append((opcode, operand))
+        chunk.lines.append(lines[offset])
+        offset += instruction_size(opcode, operand)
+    index_of_offset[offset] = len(chunk.code)
+
+    for i, (opcode, operand) in enumerate(chunk.code):
+        if opcode in JUMPS:
+            if operand not in index_of_offset:
+                raise BytecodeError(f'iqalox bytecode: jump target {operand} is not an instruction boundary')
+            chunk.code[i] = (opcode, index_of_offset[operand])
+
+
+def _unpack(fmt: str, code: bytes, offset: int) -> Tuple:
+    return struct.unpack(fmt, _slice(code, offset, struct.calcsize(fmt)))
+
+
+def _slice(code: bytes, offset: int, size: int) -> bytes:
+    if offset + size > len(code):
+        raise BytecodeError('iqalox bytecode: unexpected end of file')
+    return code[offset:offset + size]
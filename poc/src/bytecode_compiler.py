@@ -0,0 +1,607 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from expression import Expr, ExprVisitor, Binary, Logical, Unary, Literal, Grouping, Ternary, Vector, Variable, \
+    Assign, Break, Continue, Ignore, Call, Get, Index, Slice, Set, Self, Super, Spread
+from statement import Stmt, StmtVisitor, Expression, Var, Block, For, Function, Return, Class
+from token import Token, TokenType
+from bytecode import Chunk, FunctionProto, OpCode, JUMPS
+
+_BINARY_OPCODES = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.PERCENT: OpCode.MODULO,
+    TokenType.POWER: OpCode.POWER,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+}
+
+# Net stack effect of every opcode with a fixed one; POP_N, BUILD_VECTOR and
+# CALL depend on their operand and are handled in _FunctionState.emit().
+_STACK_EFFECT = {
+    OpCode.CONSTANT: 1, OpCode.NIL: 1, OpCode.TRUE: 1, OpCode.FALSE: 1, OpCode.UNDEF: 1, OpCode.POP: -1,
+    OpCode.GET_LOCAL: 1, OpCode.GET_UPVALUE: 1, OpCode.GET_GLOBAL: 1, OpCode.SET_LOCAL: 0, OpCode.SET_UPVALUE: 0,
+    OpCode.SET_GLOBAL: 0, OpCode.DEFINE_GLOBAL: -1, OpCode.ADD: -1, OpCode.SUBTRACT: -1, OpCode.MULTIPLY: -1,
+    OpCode.DIVIDE: -1, OpCode.MODULO: -1, OpCode.POWER: -1, OpCode.NEGATE: 0, OpCode.NOT: 0, OpCode.EQUAL: -1,
+    OpCode.NOT_EQUAL: -1, OpCode.GREATER: -1, OpCode.GREATER_EQUAL: -1, OpCode.LESS: -1, OpCode.LESS_EQUAL: -1,
+    OpCode.JUMP: 0, OpCode.JUMP_IF_FALSE: 0, OpCode.JUMP_IF_NOT_NIL: 0, OpCode.CLOSURE: 1, OpCode.RETURN: -1,
+    OpCode.CLASS: 1, OpCode.METHOD_PUB: -1, OpCode.INHERIT: 0, OpCode.GET_PROPERTY: 0,
+    OpCode.GET_PROPERTY_SELF: 0, OpCode.SET_PROPERTY: -1, OpCode.SET_PROPERTY_SELF: -1, OpCode.GET_SUPER: -1,
+    OpCode.GET_INDEX: -1, OpCode.GET_SLICE: -2, OpCode.VECTOR_EXTEND: -1, OpCode.PROPERTY_PUB_MUT: 0,
+}
+
+# The natives the PoC itself defines (see Interpreter.__init__): immutable
+# globals from the very first statement.
+_NATIVE_GLOBALS = ('print', 'concat')
+
+
+class _Local:
+    def __init__(self, name: str, slot: int, is_mutable: bool, scope_depth: int, declared: bool = True) -> None:
+        self.name = name
+        self.slot = slot
+        self.is_mutable = is_mutable
+        self.scope_depth = scope_depth
+        # False for a hoisted local function whose `fun` statement hasn't
+        # been reached yet -- see BytecodeCompiler.hoist_functions().
+        self.declared = declared
+
+
+class _Loop:
+    def __init__(self, break_depth: int, continue_depth: int) -> None:
+        self.break_depth = break_depth
+        self.continue_depth = continue_depth
+        self.break_jumps: List[int] = []
+        self.continue_jumps: List[int] = []
+
+
+class _FunctionState:
+    # One function's (or the top-level script's) chunk in progress.
+    # `stack_depth` counts every value currently pushed in this frame, so a
+    # new local's slot is simply where its initializer's value landed, and
+    # block exits/`break`/`continue` know how many values to pop.
+    def __init__(self, enclosing: Optional['_FunctionState'], locals_: List[_Local], line: int) -> None:
+        self.enclosing = enclosing
+        self.chunk = Chunk()
+        self.locals = locals_
+        self.upvalues: List[Tuple[bool, int]] = []
+        self.upvalue_mutability: List[bool] = []
+        self.stack_depth = len(locals_)
+        self.max_locals = len(locals_)
+        self.scope_depth = 0
+        self.loop: Optional[_Loop] = None
+        self.line = line
+
+    def emit(self, opcode: OpCode, operand: Any = None) -> int:
+        self.chunk.code.append((opcode, operand))
+        self.chunk.lines.append(self.line)
+        if opcode == OpCode.POP_N:
+            self.stack_depth -= operand
+        elif opcode == OpCode.BUILD_VECTOR:
+            self.stack_depth += 1 - operand
+        elif opcode == OpCode.CALL:
+            self.stack_depth -= operand
+        else:
+            self.stack_depth += _STACK_EFFECT[opcode]
+        return len(self.chunk.code) - 1
+
+    def patch_jump(self, index: int) -> None:
+        opcode, _ = self.chunk.code[index]
+        assert opcode in JUMPS
+        self.chunk.code[index] = (opcode, len(self.chunk.code))
+
+    def add_constant(self, value: Any) -> int:
+        constants = self.chunk.constants
+        if not isinstance(value, FunctionProto):
+            for index, existing in enumerate(constants):
+                if type(existing) is type(value) and existing == value:
+                    return index
+        constants.append(value)
+        return len(constants) - 1
+
+
+def _self_fields(methods: List[Function]) -> List[str]:
+    # The fields assigned as `self.name = ...` anywhere in the methods --
+    # functions nested in them included, but not a class's own methods --
+    # in the order they first appear.
+    fields: Dict[str, None] = {}
+    pending: List[Any] = [statement for method in reversed(methods) for statement in reversed(method.body)]
+    while pending:
+        node = pending.pop()
+        if type(node) is Class:
+            continue
+        if type(node) is Set and type(node.object) is Self:
+            fields[node.name.lexeme] = None
+        children = []
+        for field in vars(node).values():
+            if isinstance(field, (Expr, Stmt)):
+                children.append(field)
+            elif type(field) is list:
+                children.extend(item for item in field if isinstance(item, (Expr, Stmt)))
+        pending.extend(reversed(children))
+    return list(fields)
+
+# Compiles a parsed program to the same stack bytecode compiler/src/Codegen.fs
+# emits for vm/, following its conventions instruction for instruction: a
+# local's initializer leaves its value in the local's own stack slot, block
+# exits pop with POP_N, `break`/`continue` unwind inline at the jump site,
+# and a subclass keeps its superclass on the stack as a synthetic `super`
+# local. Unlike the tree-walker's Resolver (which mirrors Environments),
+# scoping here is done clox-style against stack slots and upvalues, so it
+# runs on the statements straight from the Parser.
+#
+# PoC semantics that only surface at runtime in the tree-walker become
+# compile errors here, as they are in compiler/: assigning an immutable
+# variable, redeclaring a global, and `break`/`continue`/`return` outside a
+# loop/function. Every method is emitted with METHOD_PUB, since nothing in
+# 0.1 is private. 0.1 has no property declarations either, but vm/ only
+# lets an instance have the fields its class declares: each field a
+# class's methods assign through `self` is declared PROPERTY_PUB_MUT, so
+# setting any other from outside the class is a runtime error.
+class BytecodeCompiler(ExprVisitor, StmtVisitor):
+    def __init__(self) -> None:
+        # Known top-level names -> is_mutable, kept across compile() calls
+        # so the REPL sees its earlier lines' globals.
+        self.globals: Dict[str, bool] = {name: False for name in _NATIVE_GLOBALS}
+        self.state = _FunctionState(None, [], 0)
+        self.hoisted: Dict[int, _Local] = {}
+
+    def compile(self, statements: List[Stmt]) -> Chunk:
+        self.state = _FunctionState(None, [], 0)
+        self.hoisted = {}
+        for statement in statements:
+            self.compile_stmt(statement)
+        self.state.emit(OpCode.NIL)
+        self.state.emit(OpCode.RETURN)
+        return self.state.chunk
+
+    def compile_stmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def compile_expr(self, expr: Expr) -> None:
+        expr.accept(self)
+
+    def error(self, token: Token, message: str) -> None:
+        import iqalox
+        iqalox.Iqalox.error(token, message)
+
+    def at(self, token: Token) -> None:
+        self.state.line = token.line
+
+    def is_global_scope(self) -> bool:
+        return self.state.enclosing is None and self.state.scope_depth == 0
+
+    def begin_scope(self) -> Tuple[int, int]:
+        self.state.scope_depth += 1
+        return len(self.state.locals), self.state.stack_depth
+
+    def end_scope(self, scope: Tuple[int, int]) -> None:
+        local_count, stack_depth = scope
+        del self.state.locals[local_count:]
+        self.state.scope_depth -= 1
+        if self.state.stack_depth > stack_depth:
+            self.state.emit(OpCode.POP_N, self.state.stack_depth - stack_depth)
+
+    def add_local(self, name: Token, is_mutable: bool, declared: bool = True) -> _Local:
+        state = self.state
+        for local in reversed(state.locals):
+            if local.scope_depth < state.scope_depth:
+                break
+            if local.name == name.lexeme:
+                self.error(name, f"Variable '{name.lexeme}' already declared.")
+                break
+        # The value it names was the last thing pushed.
+        local = _Local(name.lexeme, state.stack_depth - 1, is_mutable, state.scope_depth, declared)
+        state.locals.append(local)
+        state.max_locals = max(state.max_locals, len(state.locals))
+        return local
+
+    def declare(self, name: Token, is_mutable: bool) -> None:
+        # The declared value has just been pushed: globals pop it into the
+        # global table, locals simply keep it where it is.
+        if self.is_global_scope():
+            if name.lexeme in self.globals:
+                self.error(name, f"Variable '{name.lexeme}' already declared.")
+            self.globals[name.lexeme] = is_mutable
+            self.state.emit(OpCode.DEFINE_GLOBAL, self.string_constant(name.lexeme))
+        else:
+            self.add_local(name, is_mutable)
+
+    def hoist_functions(self, statements: List[Stmt]) -> None:
+        # A PoC function body can call a local function declared after it in
+        # the same scope (see Resolver.defer()). Each local `fun` therefore
+        # gets its slot up front, holding UNDEF until its statement runs and
+        # visible only to nested function bodies until then.
+        if self.is_global_scope():
+            return
+        for statement in statements:
+            if isinstance(statement, Function):
+                self.at(statement.name)
+                self.state.emit(OpCode.UNDEF)
+                self.hoisted[id(statement)] = self.add_local(statement.name, is_mutable=False, declared=False)
+
+    def string_constant(self, value: str) -> int:
+        return self.state.add_constant(value)
+
+    def resolve_local(self, state: _FunctionState, name: str, include_hoisted: bool) -> Optional[_Local]:
+        for local in reversed(state.locals):
+            if local.name == name and (local.declared or include_hoisted):
+                return local
+        return None
+
+    def resolve_upvalue(self, state: _FunctionState, name: str) -> Optional[int]:
+        enclosing = state.enclosing
+        if enclosing is None:
+            return None
+        local = self.resolve_local(enclosing, name, include_hoisted=True)
+        if local is not None:
+            return self.add_upvalue(state, True, local.slot, local.is_mutable)
+        index = self.resolve_upvalue(enclosing, name)
+        if index is not None:
+            return self.add_upvalue(state, False, index, enclosing.upvalue_mutability[index])
+        return None
+
+    def add_upvalue(self, state: _FunctionState, from_enclosing_local: bool, index: int, is_mutable: bool) -> int:
+        descriptor = (from_enclosing_local, index)
+        if descriptor in state.upvalues:
+            return state.upvalues.index(descriptor)
+        state.upvalues.append(descriptor)
+        state.upvalue_mutability.append(is_mutable)
+        return len(state.upvalues) - 1
+
+    def emit_get(self, name: str) -> None:
+        local = self.resolve_local(self.state, name, include_hoisted=False)
+        if local is not None:
+            self.state.emit(OpCode.GET_LOCAL, local.slot)
+            return
+        index = self.resolve_upvalue(self.state, name)
+        if index is not None:
+            self.state.emit(OpCode.GET_UPVALUE, index)
+            return
+        self.state.emit(OpCode.GET_GLOBAL, self.string_constant(name))
+
+    def emit_set(self, name: Token) -> None:
+        local = self.resolve_local(self.state, name.lexeme, include_hoisted=False)
+        if local is not None:
+            opcode, operand, is_mutable = OpCode.SET_LOCAL, local.slot, local.is_mutable
+        else:
+            index = self.resolve_upvalue(self.state, name.lexeme)
+            if index is not None:
+                opcode, operand, is_mutable = OpCode.SET_UPVALUE, index, self.state.upvalue_mutability[index]
+            else:
+                # A global not declared yet stays assignable here; SET_GLOBAL
+                # reports it at runtime if it never gets declared at all.
+                opcode, operand = OpCode.SET_GLOBAL, self.string_constant(name.lexeme)
+                is_mutable = self.globals.get(name.lexeme, True)
+        if not is_mutable:
+            self.error(name, f"Assigning to immutable variable '{name.lexeme}' not allowed.")
+        self.state.emit(opcode, operand)
+
+    def emit_jump_out(self, keyword: Token, target_depth: Optional[int], jumps: Optional[List[int]]) -> None:
+        state = self.state
+        self.at(keyword)
+        if state.loop is None:
+            self.error(keyword, f"Can't use '{keyword.lexeme}' outside of a loop.")
+            state.emit(OpCode.NIL)
+            return
+        depth = state.stack_depth
+        if depth > target_depth:
+            state.emit(OpCode.POP_N, depth - target_depth)
+        jumps.append(state.emit(OpCode.JUMP, None))
+        # Nothing after an unconditional jump runs, but the rest of the
+        # expression is still compiled as if it did -- a placeholder value
+        # at the pre-jump depth keeps that code's stack bookkeeping right.
+        state.stack_depth = depth
+        state.emit(OpCode.NIL)
+
+    def compile_function(self, function: Function, is_method: bool) -> None:
+        self.at(function.name)
+        # Parameters (after `self`, for a method) are the frame's first
+        # slots, in the function's own outermost scope.
+        names = (['self'] if is_method else []) + [param.lexeme for param in function.params]
+        locals_ = [_Local(name, slot, is_mutable=False, scope_depth=1) for slot, name in enumerate(names)]
+
+        enclosing = self.state
+        self.state = _FunctionState(enclosing, locals_, function.name.line)
+        self.state.scope_depth = 1
+        self.hoist_functions(function.body)
+        for statement in function.body:
+            self.compile_stmt(statement)
+        self.state.emit(OpCode.NIL)
+        self.state.emit(OpCode.RETURN)
+        compiled = self.state
+        self.state = enclosing
+
+        proto = FunctionProto(
+            function.name.lexeme, len(function.params), compiled.max_locals, compiled.upvalues, compiled.chunk
+        )
+        self.state.emit(OpCode.CLOSURE, (self.state.add_constant(proto), tuple(compiled.upvalues)))
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        scope = self.begin_scope()
+        self.hoist_functions(stmt.statements)
+        for statement in stmt.statements:
+            self.compile_stmt(statement)
+        self.end_scope(scope)
+
+    def visit_expression_stmt(self, stmt: Expression) -> None:
+        self.compile_expr(stmt.expression)
+        self.state.emit(OpCode.POP)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        self.at(stmt.name)
+        if stmt.initializer is not None:
+            self.compile_expr(stmt.initializer)
+        else:
+            self.state.emit(OpCode.NIL)
+        self.at(stmt.name)
+        self.declare(stmt.name, stmt.is_mutable)
+
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self.compile_function(stmt, is_method=False)
+        hoisted = self.hoisted.pop(id(stmt), None)
+        if hoisted is None:
+            self.declare(stmt.name, is_mutable=False)
+            return
+        self.state.emit(OpCode.SET_LOCAL, hoisted.slot)
+        self.state.emit(OpCode.POP)
+        hoisted.declared = True
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        self.at(stmt.keyword)
+        if self.state.enclosing is None:
+            self.error(stmt.keyword, "Can't return from top-level code.")
+        if stmt.value is not None:
+            self.compile_expr(stmt.value)
+        else:
+            self.state.emit(OpCode.NIL)
+        self.state.emit(OpCode.RETURN)
+
+    def visit_class_stmt(self, stmt: Class) -> None:
+        state = self.state
+        self.at(stmt.name)
+        name = self.string_constant(stmt.name.lexeme)
+        state.emit(OpCode.CLASS, name)
+        self.declare(stmt.name, is_mutable=False)
+
+        scope = None
+        if stmt.superclass is not None:
+            scope = self.begin_scope()
+            self.compile_expr(stmt.superclass)
+            self.add_local(Token(TokenType.SUPER, 'super', None, stmt.name.line), is_mutable=False)
+
+        # Re-fetch the class so METHOD_PUB/INHERIT find it right on top.
+        self.at(stmt.name)
+        self.emit_get(stmt.name.lexeme)
+        if stmt.superclass is not None:
+            state.emit(OpCode.INHERIT)
+
+        for field in _self_fields(stmt.methods):
+            state.emit(OpCode.PROPERTY_PUB_MUT, self.string_constant(field))
+        for method in stmt.methods:
+            self.compile_function(method, is_method=True)
+            state.emit(OpCode.METHOD_PUB, self.string_constant(method.name.lexeme))
+        state.emit(OpCode.POP)
+
+        if scope is not None:
+            self.end_scope(scope)
+
+    def visit_for_stmt(self, stmt: For) -> None:
+        state = self.state
+        scope = self.begin_scope()
+        break_depth = state.stack_depth
+        if stmt.initializer is not None:
+            self.compile_stmt(stmt.initializer)
+        continue_depth = state.stack_depth
+
+        loop_start = len(state.chunk.code)
+        exit_jump = None
+        if stmt.condition is not None:
+            self.compile_expr(stmt.condition)
+            exit_jump = state.emit(OpCode.JUMP_IF_FALSE, None)
+            state.emit(OpCode.POP)
+
+        enclosing_loop = state.loop
+        loop = state.loop = _Loop(break_depth, continue_depth)
+        self.compile_stmt(stmt.body)
+        state.loop = enclosing_loop
+
+        for jump in loop.continue_jumps:
+            state.patch_jump(jump)
+        if stmt.increment is not None:
+            self.compile_expr(stmt.increment)
+            state.emit(OpCode.POP)
+        state.emit(OpCode.JUMP, loop_start)
+
+        if exit_jump is not None:
+            state.patch_jump(exit_jump)
+            # JUMP_IF_FALSE only peeks: the falsy condition is still here.
+            state.stack_depth = continue_depth + 1
+            state.emit(OpCode.POP)
+        self.end_scope(scope)
+        for jump in loop.break_jumps:
+            state.patch_jump(jump)
+        state.stack_depth = break_depth
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        self.compile_expr(expr.value)
+        self.at(expr.name)
+        self.emit_set(expr.name)
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        state = self.state
+        token_type = expr.operator.type
+        if token_type == TokenType.COMMA:
+            self.compile_expr(expr.left)
+            state.emit(OpCode.POP)
+            self.compile_expr(expr.right)
+        elif token_type == TokenType.DOUBLE_QUESTION_MARK:
+            self.compile_expr(expr.left)
+            self.at(expr.operator)
+            jump = state.emit(OpCode.JUMP_IF_NOT_NIL, None)
+            state.emit(OpCode.POP)
+            self.compile_expr(expr.right)
+            state.patch_jump(jump)
+        else:
+            self.compile_expr(expr.left)
+            self.compile_expr(expr.right)
+            self.at(expr.operator)
+            state.emit(_BINARY_OPCODES[token_type])
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        state = self.state
+        self.compile_expr(expr.left)
+        self.at(expr.operator)
+        if expr.operator.type == TokenType.OR:
+            else_jump = state.emit(OpCode.JUMP_IF_FALSE, None)
+            end_jump = state.emit(OpCode.JUMP, None)
+            state.patch_jump(else_jump)
+            state.emit(OpCode.POP)
+            self.compile_expr(expr.right)
+            state.patch_jump(end_jump)
+        else:
+            end_jump = state.emit(OpCode.JUMP_IF_FALSE, None)
+            state.emit(OpCode.POP)
+            self.compile_expr(expr.right)
+            state.patch_jump(end_jump)
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        self.compile_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        value = expr.value
+        if value is None:
+            self.state.emit(OpCode.NIL)
+        elif value is True:
+            self.state.emit(OpCode.TRUE)
+        elif value is False:
+            self.state.emit(OpCode.FALSE)
+        else:
+            self.state.emit(OpCode.CONSTANT, self.state.add_constant(value))
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        state = self.state
+        token_type = expr.operator.type
+        if token_type in (TokenType.PLUS_PLUS, TokenType.MINUS_MINUS):
+            self.at(expr.operator)
+            self.emit_get(expr.right.name.lexeme)
+            state.emit(OpCode.CONSTANT, state.add_constant(1.0))
+            state.emit(OpCode.ADD if token_type == TokenType.PLUS_PLUS else OpCode.SUBTRACT)
+            self.emit_set(expr.right.name)
+            return
+
+        self.compile_expr(expr.right)
+        self.at(expr.operator)
+        if token_type == TokenType.BANG:
+            state.emit(OpCode.NOT)
+        elif token_type == TokenType.MINUS:
+            state.emit(OpCode.NEGATE)
+
+    def visit_ternary_expr(self, expr: Ternary) -> None:
+        state = self.state
+        self.compile_expr(expr.left)
+        self.at(expr.left_operator)
+        if expr.middle is expr.left:
+            # Elvis: the condition's own (truthy) value is the result.
+            else_jump = state.emit(OpCode.JUMP_IF_FALSE, None)
+            end_jump = state.emit(OpCode.JUMP, None)
+            state.patch_jump(else_jump)
+            state.emit(OpCode.POP)
+            self.compile_expr(expr.right)
+            state.patch_jump(end_jump)
+            return
+
+        else_jump = state.emit(OpCode.JUMP_IF_FALSE, None)
+        state.emit(OpCode.POP)
+        self.compile_expr(expr.middle)
+        end_jump = state.emit(OpCode.JUMP, None)
+        state.patch_jump(else_jump)
+        state.emit(OpCode.POP)
+        self.compile_expr(expr.right)
+        state.patch_jump(end_jump)
+
+    def visit_vector_expr(self, expr: Vector) -> None:
+        if not any(type(value) is Spread for value in expr.values):
+            for value in expr.values:
+                self.compile_expr(value)
+            self.state.emit(OpCode.BUILD_VECTOR, len(expr.values))
+            return
+        # An empty vector, extended by each spread vector in turn (see
+        # visit_spread_expr()) and by each other element as a vector of one.
+        self.state.emit(OpCode.BUILD_VECTOR, 0)
+        for value in expr.values:
+            self.compile_expr(value)
+            if type(value) is not Spread:
+                self.state.emit(OpCode.BUILD_VECTOR, 1)
+                self.state.emit(OpCode.VECTOR_EXTEND)
+
+    def visit_spread_expr(self, expr: Spread) -> None:
+        self.compile_expr(expr.expression)
+        self.at(expr.operator)
+        self.state.emit(OpCode.VECTOR_EXTEND)
+
+    def visit_variable_expr(self, expr: Variable) -> None:
+        self.at(expr.name)
+        self.emit_get(expr.name.lexeme)
+
+    def visit_break_expr(self, expr: Break) -> None:
+        loop = self.state.loop
+        self.emit_jump_out(expr.keyword, loop and loop.break_depth, loop and loop.break_jumps)
+
+    def visit_continue_expr(self, expr: Continue) -> None:
+        loop = self.state.loop
+        self.emit_jump_out(expr.keyword, loop and loop.continue_depth, loop and loop.continue_jumps)
+
+    def visit_ignore_expr(self, expr: Ignore) -> None:
+        self.state.emit(OpCode.NIL)
+
+    def visit_call_expr(self, expr: Call) -> None:
+        self.compile_expr(expr.callee)
+        for argument in expr.arguments:
+            self.compile_expr(argument)
+        self.at(expr.callee.method if isinstance(expr.callee, Super) else expr.callee.name)
+        self.state.emit(OpCode.CALL, len(expr.arguments))
+
+    def visit_get_expr(self, expr: Get) -> None:
+        self.compile_expr(expr.object)
+        self.at(expr.name)
+        opcode = OpCode.GET_PROPERTY_SELF if isinstance(expr.object, Self) else OpCode.GET_PROPERTY
+        self.state.emit(opcode, self.string_constant(expr.name.lexeme))
+
+    def visit_index_expr(self, expr: Index) -> None:
+        self.compile_expr(expr.object)
+        self.compile_expr(expr.index)
+        self.at(expr.bracket)
+        self.state.emit(OpCode.GET_INDEX)
+
+    def visit_slice_expr(self, expr: Slice) -> None:
+        # A bound left out is nil, to the VM's _get_slice().
+        self.compile_expr(expr.object)
+        for bound in (expr.start, expr.stop):
+            if bound is None:
+                self.state.emit(OpCode.NIL)
+            else:
+                self.compile_expr(bound)
+        self.at(expr.bracket)
+        self.state.emit(OpCode.GET_SLICE)
+
+    def visit_set_expr(self, expr: Set) -> None:
+        self.compile_expr(expr.object)
+        self.compile_expr(expr.value)
+        self.at(expr.name)
+        opcode = OpCode.SET_PROPERTY_SELF if isinstance(expr.object, Self) else OpCode.SET_PROPERTY
+        self.state.emit(opcode, self.string_constant(expr.name.lexeme))
+
+    def visit_self_expr(self, expr: Self) -> None:
+        self.at(expr.keyword)
+        self.emit_get('self')
+
+    def visit_super_expr(self, expr: Super) -> None:
+        self.at(expr.keyword)
+        self.emit_get('self')
+        self.emit_get('super')
+        self.state.emit(OpCode.GET_SUPER, self.string_constant(expr.method.lexeme))
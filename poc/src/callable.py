@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from environment import Environment, VariableData
+from environment import Environment
+from completion import CompletionType
 from error import IqaloxRuntimeError
 from statement import Function
 from token import Token
@@ -18,10 +19,14 @@ class IqaloxCallable(ABC):
 
 
 class NativeFunction(IqaloxCallable):
-    def __init__(self, name: str, arity: int, implementation: Callable) -> None:
+    # `pure` when the native's result depends on nothing but its arguments,
+    # and it does nothing else: a pure Iqalox function may call it (see
+    # purity.py).
+    def __init__(self, name: str, arity: int, implementation: Callable, pure: bool = False) -> None:
         self.name = name
         self._arity = arity
         self.implementation = implementation
+        self.pure = pure
 
     def arity(self) -> int:
         return self._arity
@@ -37,27 +42,54 @@ class IqaloxFunction(IqaloxCallable):
     def __init__(self, declaration: Function, closure: Environment) -> None:
         self.declaration = declaration
         self.closure = closure
+        # Its calls' results, once it has had any and is pure (see
+        # memoization.py).
+        self.memo = None
 
     def arity(self) -> int:
         return len(self.declaration.params)
 
     def call(self, interpreter: Any, arguments: List[Any]) -> Any:
-        from interpreter import ReturnSignal
-
-        environment = Environment(self.closure)
-        for param, argument in zip(self.declaration.params, arguments):
-            environment.define(param.lexeme, VariableData(argument, is_mutable=False))
-
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except ReturnSignal as signal:
-            return signal.value
-
-        return None
+        return self.run(interpreter, None, arguments)
+
+    def call_method(self, interpreter: Any, instance: 'IqaloxInstance', arguments: List[Any]) -> Any:
+        # bind(instance).call(...) without materializing the bound method:
+        # the same `self` scope, but no throwaway IqaloxFunction per call.
+        return self.run(interpreter, instance, arguments)
+
+    def run(self, interpreter: Any, instance: Optional['IqaloxInstance'], arguments: List[Any]) -> Any:
+        # Runs the body; a call the body returns in tail position runs next
+        # in this same loop, so tail recursion doesn't grow the stack.
+        if self.declaration.pure and interpreter.memoization.enabled:
+            return interpreter.memoization.run(self, interpreter, arguments)
+        completion = self.enter(interpreter, instance, arguments)
+        while completion is not None and completion.type is CompletionType.TAIL_CALL:
+            function, instance, arguments = completion.value
+            completion = function.enter(interpreter, instance, arguments)
+        return None if completion is None else completion.call_result()
+
+    def enter(self, interpreter: Any, instance: Optional['IqaloxInstance'], arguments: List[Any]) -> Any:
+        # One run of the body, returning how it completed -- by way of the
+        # compiled body if this call is the one that makes it hot (see
+        # tiering.py), after which this is a CompiledFunction.
+        if interpreter.tiering.count_call(self):
+            return self.enter(interpreter, instance, arguments)
+        return interpreter.execute_block(self.declaration.body, self.frame(instance, arguments))
+
+    def frame(self, instance: Optional['IqaloxInstance'], arguments: List[Any]) -> Environment:
+        closure = self.closure
+        if instance is not None:
+            closure = Environment(closure)
+            closure.slots.append(instance)
+        environment = Environment(closure)
+        # Parameters are the first slots of the call's frame, in order (see
+        # Resolver.resolve_function).
+        environment.slots.extend(arguments)
+        return environment
 
     def bind(self, instance: 'IqaloxInstance') -> 'IqaloxFunction':
         environment = Environment(self.closure)
-        environment.define('self', VariableData(instance, is_mutable=False))
+        environment.slots.append(instance)
         return IqaloxFunction(self.declaration, environment)
 
     def __str__(self) -> str:
@@ -69,13 +101,14 @@ class IqaloxClass(IqaloxCallable):
         self.name = name
         self.superclass = superclass
         self.methods = methods
+        # Every method the class responds to, inherited ones included,
+        # flattened once here: a class binding is immutable, and so is its
+        # superclass's table, so a lookup never has to walk the chain.
+        self.method_table = methods if superclass is None else {**superclass.method_table, **methods}
+        self.root_shape = Shape(self, {})
 
     def find_method(self, name: str) -> Optional[IqaloxFunction]:
-        if name in self.methods:
-            return self.methods[name]
-        if self.superclass is not None:
-            return self.superclass.find_method(name)
-        return None
+        return self.method_table.get(name)
 
     def arity(self) -> int:
         initializer = self.find_method('init')
@@ -85,30 +118,135 @@ class IqaloxClass(IqaloxCallable):
         instance = IqaloxInstance(self)
         initializer = self.find_method('init')
         if initializer is not None:
-            initializer.bind(instance).call(interpreter, arguments)
+            initializer.call_method(interpreter, instance, arguments)
         return instance
 
     def __str__(self) -> str:
         return f'<class {self.name}>'
 
 
-class IqaloxInstance:
-    def __init__(self, klass: IqaloxClass) -> None:
+class Shape:
+    # A hidden class: where each field of an instance lives in its `values`
+    # list. Instances of a class start out sharing the class's root shape
+    # and move along `transitions` as fields are added, so instances that
+    # add the same fields in the same order end up sharing one shape (and
+    # one `slots` dict) instead of each carrying a dict of its own. Shapes
+    # never change once made, and a shape belongs to exactly one class, so
+    # a shape alone tells an inline cache both where a field is and which
+    # methods apply.
+    __slots__ = ('klass', 'slots', 'transitions')
+
+    def __init__(self, klass: IqaloxClass, slots: Dict[str, int]) -> None:
         self.klass = klass
-        self.fields: Dict[str, Any] = {}
+        self.slots = slots
+        self.transitions: Dict[str, 'Shape'] = {}
+
+    def find_property(self, name: str) -> Tuple[Optional[int], Optional[IqaloxFunction]]:
+        # (slot, None) for a field, (None, method) for a method -- fields
+        # shadow methods -- and (None, None) for neither.
+        slot = self.slots.get(name)
+        if slot is not None:
+            return slot, None
+        return None, self.klass.find_method(name)
+
+    def find_store(self, name: str) -> Tuple[int, 'Shape']:
+        # The slot storing `name` writes to and the shape the instance has
+        # after it: this shape for an existing field, else the next one
+        # along, whose new slot is appended to the values.
+        slot = self.slots.get(name)
+        if slot is not None:
+            return slot, self
+        shape = self.transitions.get(name)
+        if shape is None:
+            shape = self.transitions[name] = Shape(self.klass, {**self.slots, name: len(self.slots)})
+        return len(self.slots), shape
 
-    def get(self, name: Token) -> Any:
-        if name.lexeme in self.fields:
-            return self.fields[name.lexeme]
 
-        method = self.klass.find_method(name.lexeme)
+class IqaloxInstance:
+    __slots__ = ('klass', 'shape', 'values')
+
+    def __init__(self, klass: IqaloxClass) -> None:
+        self.klass = klass
+        self.shape = klass.root_shape
+        self.values: List[Any] = []
+
+    def get(self, name: Token, cache: Optional['PropertyCache'] = None) -> Any:
+        if cache is None:
+            slot, method = self.shape.find_property(name.lexeme)
+        else:
+            slot, method = cache.lookup(self.shape, name.lexeme)
+        if slot is not None:
+            return self.values[slot]
         if method is not None:
             return method.bind(self)
 
         raise IqaloxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
 
-    def set(self, name: Token, value: Any) -> None:
-        self.fields[name.lexeme] = value
+    def set(self, name: Token, value: Any, cache: Optional['StoreCache'] = None) -> None:
+        if cache is None:
+            slot, shape = self.shape.find_store(name.lexeme)
+        else:
+            slot, shape = cache.lookup(self.shape, name.lexeme)
+        # A shape's slots are always exactly the instance's values, so a
+        # new field's slot is the next one along.
+        if shape is self.shape:
+            self.values[slot] = value
+        else:
+            self.values.append(value)
+            self.shape = shape
 
     def __str__(self) -> str:
         return f'<{self.klass.name} instance>'
+
+
+class ShapeCache(ABC):
+    # The inline cache of one property access site: what its name resolved
+    # to for the shape last seen there, as `entry`, a (slot, target) pair
+    # also unpacked into `slot` and `target` for inline checks, plus -- once
+    # the site has seen more than one -- a few more shapes' in `others`.
+    # Past POLYMORPHIC_LIMIT shapes the site is megamorphic and new shapes
+    # are just resolved each time. Shapes never change, so an entry never
+    # goes stale. Subclasses say how a name resolves, with `resolve`.
+    POLYMORPHIC_LIMIT = 4
+
+    __slots__ = ('shape', 'entry', 'slot', 'target', 'others')
+
+    def __init__(self) -> None:
+        self.shape: Optional[Shape] = None
+        self.entry: Tuple[Optional[int], Any] = (None, None)
+        self.slot: Optional[int] = None
+        self.target: Any = None
+        self.others: Optional[Dict[Shape, Tuple[Optional[int], Any]]] = None
+
+    @staticmethod
+    @abstractmethod
+    def resolve(shape: Shape, name: str) -> Tuple[Optional[int], Any]:
+        pass
+
+    def lookup(self, shape: Shape, name: str) -> Tuple[Optional[int], Any]:
+        if shape is self.shape:
+            return self.entry
+
+        others = self.others
+        if others is not None and shape in others:
+            return others[shape]
+
+        entry = self.resolve(shape, name)
+        if self.shape is None:
+            self.shape, self.entry = shape, entry
+            self.slot, self.target = entry
+        elif others is None:
+            self.others = {shape: entry}
+        elif len(others) < self.POLYMORPHIC_LIMIT:
+            others[shape] = entry
+        return entry
+
+
+class PropertyCache(ShapeCache):
+    # A Get site's: Shape.find_property()'s (slot, method).
+    resolve = staticmethod(Shape.find_property)
+
+
+class StoreCache(ShapeCache):
+    # A Set site's: Shape.find_store()'s (slot, shape after).
+    resolve = staticmethod(Shape.find_store)
@@ -0,0 +1,803 @@
+import operator
+from typing import Any, Callable, List, Optional, Tuple
+
+from expression import Expr, ExprVisitor, Binary, Logical, Unary, Literal, Grouping, Ternary, Vector, Variable, \
+    Assign, Break, Continue, Ignore, Call, Get, Index, Slice, Set, Self, Super, Spread
+from statement import Stmt, StmtVisitor, Expression, Var, Block, For, Function, Return, Class
+from token import Token, TokenType
+from error import IqaloxRuntimeError
+from environment import Environment, VariableData
+from callable import IqaloxCallable, IqaloxFunction, IqaloxClass, IqaloxInstance, PropertyCache, \
+    StoreCache
+from interpreter import Interpreter
+from specialization import FloatBinary
+from vectors import EMPTY_VECTOR, make_vector, is_elementwise, elementwise
+from completion import Completion, CompletionType, BREAK, CONTINUE, BreakSignal, ContinueSignal
+
+# A compiled node: takes the Environment it runs in and returns the node's
+# value. A statement returns its Completion when it doesn't complete
+# normally, and anything else -- None, or an expression statement's discarded
+# value -- when it does.
+Compiled = Callable[[Environment], Any]
+
+# A counted loop's iterations (see compile_counted_loop()): given the loop's
+# Environment and the counts to run, returns how the loop completed.
+CountedLoop = Callable[[Environment, range], Optional[Completion]]
+
+_NUMERIC_OPERATORS = {
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.MINUS: operator.sub,
+    TokenType.PLUS: operator.add,
+    TokenType.STAR: operator.mul,
+    TokenType.PERCENT: operator.mod,
+    TokenType.POWER: operator.pow,
+}
+
+
+def _undefined(name: Token) -> IqaloxRuntimeError:
+    return IqaloxRuntimeError(name, f'Undefined variable \'{name.lexeme}\'.')
+
+
+class CompiledFunction(IqaloxFunction):
+    # An IqaloxFunction whose body has already been compiled to a closure --
+    # calling it runs that closure directly instead of handing the body's
+    # statements back to Interpreter.execute_block().
+    def __init__(self, declaration: Function, closure: Environment, body: Compiled) -> None:
+        super().__init__(declaration, closure)
+        self.body = body
+
+    def enter(self, interpreter: Any, instance: Optional[IqaloxInstance], arguments: List[Any]) -> Any:
+        return self.body(self.frame(instance, arguments))
+
+    def bind(self, instance: IqaloxInstance) -> 'CompiledFunction':
+        environment = Environment(self.closure)
+        environment.slots.append(instance)
+        return CompiledFunction(self.declaration, environment, self.body)
+
+
+# Turns a resolved AST (see resolver.py) into nested Python closures, once,
+# so running it is just calling those closures: no accept()/visit_*()
+# double dispatch, and no per-evaluation branching on an operator's token
+# type -- each Binary node compiles to a closure for its one operator, each
+# variable access to one specialized for its resolved depth. Every closure
+# mirrors its Interpreter.visit_*() counterpart step for step (evaluation
+# order, error tokens and messages), so both engines print identical output.
+class ClosureCompiler(ExprVisitor, StmtVisitor):
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.interpreter = interpreter
+
+    def compile_expr(self, expr: Expr) -> Compiled:
+        # A Binary the tree-walker has specialized (see specialization.py)
+        # compiles as the Binary it is.
+        if isinstance(expr, FloatBinary):
+            return self.visit_binary_expr(expr)
+        return expr.accept(self)
+
+    def compile_stmt(self, stmt: Stmt) -> Compiled:
+        return stmt.accept(self)
+
+    def compile_body(self, statements: List[Stmt]) -> Compiled:
+        compiled = tuple(self.compile_stmt(statement) for statement in statements)
+
+        def run(environment: Environment) -> Optional[Completion]:
+            for statement in compiled:
+                completion = statement(environment)
+                if completion.__class__ is Completion:
+                    return completion
+            return None
+        return run
+
+    def compile_lookup(self, name: Token, depth: Optional[int], slot: Optional[int]) -> Compiled:
+        if depth is None:
+            globals_ = self.interpreter.globals
+            return lambda environment: globals_.get(name)
+
+        if depth == 0:
+            def lookup(environment: Environment) -> Any:
+                try:
+                    return environment.slots[slot]
+                except IndexError:
+                    raise _undefined(name) from None
+        elif depth == 1:
+            def lookup(environment: Environment) -> Any:
+                try:
+                    return environment.enclosing.slots[slot]
+                except IndexError:
+                    raise _undefined(name) from None
+        else:
+            def lookup(environment: Environment) -> Any:
+                return environment.get_at(depth, slot, name)
+        return lookup
+
+    def compile_assignment(self, target: Any) -> Callable[[Environment, Any], None]:
+        # `target` is the Assign or Variable node carrying the resolved address.
+        name = target.name
+        if target.depth is None:
+            globals_ = self.interpreter.globals
+            return lambda environment, value: globals_.assign(name, value)
+
+        depth, slot, is_mutable = target.depth, target.slot, target.is_mutable
+        return lambda environment, value: environment.assign_at(depth, slot, name, value, is_mutable)
+
+    @staticmethod
+    def compile_define(name: Token, slot: Optional[int], is_mutable: bool) -> Callable[[Environment, Any], None]:
+        if slot is None:
+            lexeme = name.lexeme
+            return lambda environment, value: environment.define(lexeme, VariableData(value, is_mutable))
+        return lambda environment, value: environment.slots.append(value)
+
+    def visit_block_stmt(self, stmt: Block) -> Compiled:
+        body = self.compile_body(stmt.statements)
+        if not stmt.scoped:
+            return body
+
+        def run(environment: Environment) -> Optional[Completion]:
+            return body(Environment(environment))
+        return run
+
+    def visit_expression_stmt(self, stmt: Expression) -> Compiled:
+        return self.compile_effect(stmt.expression)
+
+    def compile_effect(self, expr: Expr) -> Compiled:
+        # An expression run as a whole statement: the closure counterpart of
+        # Interpreter.execute_expression(), completing with BREAK/CONTINUE
+        # for a `break`/`continue` in one of its result positions. Forms
+        # that can't contain one compile as plain expressions.
+        expr_type = type(expr)
+        if expr_type is Break:
+            return lambda environment: BREAK
+        if expr_type is Continue:
+            return lambda environment: CONTINUE
+        if expr_type is Grouping:
+            return self.compile_effect(expr.expression)
+        is_truthy = Interpreter.is_truthy
+
+        if expr_type is Ternary:
+            left = self.compile_expr(expr.left)
+            right = self.compile_effect(expr.right)
+            if expr.middle is expr.left:
+                def elvis(environment: Environment) -> Any:
+                    return None if is_truthy(left(environment)) else right(environment)
+                return elvis
+
+            middle = self.compile_effect(expr.middle)
+
+            def ternary(environment: Environment) -> Any:
+                return middle(environment) if is_truthy(left(environment)) else right(environment)
+            return ternary
+
+        if expr_type is Logical:
+            left = self.compile_expr(expr.left)
+            right = self.compile_effect(expr.right)
+            short_circuits_on = expr.operator.type == TokenType.OR
+
+            def logical(environment: Environment) -> Any:
+                return None if is_truthy(left(environment)) == short_circuits_on else right(environment)
+            return logical
+
+        if expr_type is Binary and expr.operator.type == TokenType.DOUBLE_QUESTION_MARK:
+            left = self.compile_expr(expr.left)
+            right = self.compile_effect(expr.right)
+            return lambda environment: None if left(environment) is not None else right(environment)
+
+        if expr_type is Binary and expr.operator.type == TokenType.COMMA:
+            left = self.compile_expr(expr.left)
+            right = self.compile_effect(expr.right)
+
+            def comma(environment: Environment) -> Any:
+                left(environment)
+                return right(environment)
+            return comma
+
+        return self.compile_expr(expr)
+
+    def visit_function_stmt(self, stmt: Function) -> Compiled:
+        body = self.compile_body(stmt.body)
+        define = self.compile_define(stmt.name, stmt.slot, is_mutable=False)
+
+        def run(environment: Environment) -> None:
+            define(environment, CompiledFunction(stmt, environment, body))
+        return run
+
+    def visit_class_stmt(self, stmt: Class) -> Compiled:
+        superclass_expr = stmt.superclass
+        superclass_of = None if superclass_expr is None else self.compile_expr(superclass_expr)
+        methods = [(method, self.compile_body(method.body)) for method in stmt.methods]
+        define = self.compile_define(stmt.name, stmt.slot, is_mutable=False)
+        name = stmt.name.lexeme
+
+        def run(environment: Environment) -> None:
+            superclass = None
+            if superclass_of is not None:
+                superclass = superclass_of(environment)
+                if not isinstance(superclass, IqaloxClass):
+                    raise IqaloxRuntimeError(superclass_expr.name, 'Superclass must be a class.')
+
+            closure = environment
+            if superclass is not None:
+                closure = Environment(environment)
+                closure.slots.append(superclass)
+
+            table = {method.name.lexeme: CompiledFunction(method, closure, body) for method, body in methods}
+            define(environment, IqaloxClass(name, superclass, table))
+        return run
+
+    def visit_return_stmt(self, stmt: Return) -> Compiled:
+        if stmt.value is None:
+            returns_nil = Completion(CompletionType.RETURN)
+            return lambda environment: returns_nil
+
+        return self.compile_return(stmt.value)
+
+    def compile_return(self, expr: Expr) -> Compiled:
+        # A returned value: the closure counterpart of
+        # Interpreter.tail_completion(), compiling a call in one of its
+        # result positions as a tail call.
+        expr_type = type(expr)
+        if expr_type is Call:
+            return self.compile_call(expr, tail=True)
+        if expr_type is Grouping:
+            return self.compile_return(expr.expression)
+        is_truthy = Interpreter.is_truthy
+        return_type = CompletionType.RETURN
+
+        if expr_type is Ternary:
+            left = self.compile_expr(expr.left)
+            right = self.compile_return(expr.right)
+            if expr.middle is expr.left:
+                def elvis(environment: Environment) -> Completion:
+                    value = left(environment)
+                    return Completion(return_type, value) if is_truthy(value) else right(environment)
+                return elvis
+
+            middle = self.compile_return(expr.middle)
+
+            def ternary(environment: Environment) -> Completion:
+                return middle(environment) if is_truthy(left(environment)) else right(environment)
+            return ternary
+
+        if expr_type is Logical:
+            left = self.compile_expr(expr.left)
+            right = self.compile_return(expr.right)
+            short_circuits_on = expr.operator.type == TokenType.OR
+
+            def logical(environment: Environment) -> Completion:
+                value = left(environment)
+                if is_truthy(value) == short_circuits_on:
+                    return Completion(return_type, value)
+                return right(environment)
+            return logical
+
+        if expr_type is Binary and expr.operator.type == TokenType.DOUBLE_QUESTION_MARK:
+            left = self.compile_expr(expr.left)
+            right = self.compile_return(expr.right)
+
+            def null_coalescing(environment: Environment) -> Completion:
+                value = left(environment)
+                return right(environment) if value is None else Completion(return_type, value)
+            return null_coalescing
+
+        if expr_type is Binary and expr.operator.type == TokenType.COMMA:
+            left = self.compile_expr(expr.left)
+            right = self.compile_return(expr.right)
+
+            def comma(environment: Environment) -> Completion:
+                left(environment)
+                return right(environment)
+            return comma
+
+        value = self.compile_expr(expr)
+        return lambda environment: Completion(return_type, value(environment))
+
+    def visit_var_stmt(self, stmt: Var) -> Compiled:
+        initializer = None if stmt.initializer is None else self.compile_expr(stmt.initializer)
+        define = self.compile_define(stmt.name, stmt.slot, stmt.is_mutable)
+
+        def run(environment: Environment) -> None:
+            define(environment, None if initializer is None else initializer(environment))
+        return run
+
+    def visit_for_stmt(self, stmt: For) -> Compiled:
+        return self.compile_loop(stmt)[0]
+
+    def compile_loop(self, stmt: For) -> Tuple[Compiled, Compiled, Optional[CountedLoop]]:
+        # The whole statement, plus the entry points tiering.py moves a loop
+        # that's already running onto: `repeat`, the loop minus its
+        # initializer, run in an Environment where that has already run,
+        # and for a counted loop, compile_counted_loop()'s `count`.
+        initializer = None if stmt.initializer is None else self.compile_stmt(stmt.initializer)
+        condition = None if stmt.condition is None else self.compile_expr(stmt.condition)
+        increment = None if stmt.increment is None else self.compile_expr(stmt.increment)
+        is_truthy = Interpreter.is_truthy
+        # See Resolver.visit_for_stmt().
+        reusable = type(stmt.body) is Block and stmt.body.reusable
+        body = self.compile_body(stmt.body.statements) if reusable else self.compile_stmt(stmt.body)
+
+        if reusable:
+            def iterate(loop_environment: Environment) -> Optional[Completion]:
+                frame = Environment(loop_environment)
+                slots = frame.slots
+                while condition is None or is_truthy(condition(loop_environment)):
+                    slots.clear()
+                    completion = body(frame)
+                    if completion.__class__ is Completion:
+                        if completion is BREAK:
+                            return None
+                        if completion is not CONTINUE:
+                            return completion
+
+                    if increment is not None:
+                        increment(loop_environment)
+                return None
+        else:
+            def iterate(loop_environment: Environment) -> Optional[Completion]:
+                while condition is None or is_truthy(condition(loop_environment)):
+                    completion = body(loop_environment)
+                    if completion.__class__ is Completion:
+                        if completion is BREAK:
+                            return None
+                        if completion is not CONTINUE:
+                            return completion
+
+                    if increment is not None:
+                        increment(loop_environment)
+                return None
+
+        def repeat(loop_environment: Environment) -> Optional[Completion]:
+            while True:
+                try:
+                    return iterate(loop_environment)
+                except BreakSignal:
+                    return None
+                except ContinueSignal:
+                    if increment is not None:
+                        increment(loop_environment)
+
+        if stmt.counted:
+            run, count = self.compile_counted_loop(stmt, initializer, body, reusable, repeat)
+            return run, repeat, count
+
+        # Same shape as Interpreter.visit_for_stmt()/run_loop().
+        def run(environment: Environment) -> Optional[Completion]:
+            loop_environment = Environment(environment)
+            if initializer is not None:
+                completion = initializer(loop_environment)
+                if completion.__class__ is Completion:
+                    return completion
+            return repeat(loop_environment)
+        return run, repeat, None
+
+    def compile_counted_loop(self, stmt: For, initializer: Compiled, body: Compiled, reusable: bool,
+                             repeat: Compiled) -> Tuple[Compiled, CountedLoop]:
+        # Interpreter.visit_for_stmt() and run_counted_loop(), falling back
+        # on `repeat` -- the ordinary loop, minus its initializer -- when
+        # the bound turns out not to count with. `body` runs in a frame of
+        # its own when `reusable`. Also returns the counting on its own, as
+        # `count`, for the loop's Environment and the counts left to go.
+        bound = stmt.condition.right
+        if type(bound) is Variable and bound.depth is None:
+            lexeme = bound.name.lexeme
+            globals_ = self.interpreter.globals
+
+            def bound_of(environment: Environment) -> Any:
+                variable = globals_.values.get(lexeme)
+                return None if variable is None or variable.is_mutable else variable.value
+        else:
+            bound_of = self.compile_expr(bound)
+        start = stmt.initializer.initializer.value
+        inclusive = stmt.condition.operator.type == TokenType.LESS_EQUAL
+        counted_range = Interpreter.counted_range
+        slot = stmt.initializer.slot
+        read = stmt.counter_read
+
+        def run(environment: Environment) -> Optional[Completion]:
+            loop_environment = Environment(environment)
+            initializer(loop_environment)
+            counters = counted_range(start, bound_of(loop_environment), inclusive)
+            if counters is None:
+                return repeat(loop_environment)
+            return count(loop_environment, counters)
+
+        def count(loop_environment: Environment, counters: range) -> Optional[Completion]:
+            slots = loop_environment.slots
+            frame = Environment(loop_environment) if reusable else loop_environment
+            frame_slots = frame.slots
+            for counter in counters:
+                if read:
+                    slots[slot] = float(counter)
+                if reusable:
+                    frame_slots.clear()
+                try:
+                    completion = body(frame)
+                except BreakSignal:
+                    return None
+                except ContinueSignal:
+                    continue
+                if completion.__class__ is Completion:
+                    if completion is BREAK:
+                        return None
+                    if completion is not CONTINUE:
+                        return completion
+            if read:
+                slots[slot] = float(max(counters.start, counters.stop))
+            return None
+        return run, count
+
+    def visit_assign_expr(self, expr: Assign) -> Compiled:
+        value_of = self.compile_expr(expr.value)
+        assign = self.compile_assignment(expr)
+
+        def run(environment: Environment) -> Any:
+            value = value_of(environment)
+            assign(environment, value)
+            return value
+        return run
+
+    def visit_literal_expr(self, expr: Literal) -> Compiled:
+        value = expr.value
+        return lambda environment: value
+
+    def visit_grouping_expr(self, expr: Grouping) -> Compiled:
+        return self.compile_expr(expr.expression)
+
+    def visit_vector_expr(self, expr: Vector) -> Compiled:
+        values = tuple(self.compile_expr(value) for value in expr.values)
+        if not any(type(value) is Spread for value in expr.values):
+            return lambda environment: make_vector([value(environment) for value in values])
+        # See Interpreter.visit_vector_expr().
+        spreads = tuple(type(value) is Spread for value in expr.values)
+
+        def vector(environment: Environment) -> Any:
+            result = EMPTY_VECTOR
+            for value, spread in zip(values, spreads):
+                result = result.concat(value(environment)) if spread else result.append(value(environment))
+            return result
+        return vector
+
+    def visit_spread_expr(self, expr: Spread) -> Compiled:
+        operator_token = expr.operator
+        operand = self.compile_expr(expr.expression)
+        spread_operand = Interpreter.spread_operand
+        return lambda environment: spread_operand(operator_token, operand(environment))
+
+    def visit_index_expr(self, expr: Index) -> Compiled:
+        bracket = expr.bracket
+        object_of = self.compile_expr(expr.object)
+        index_of = self.compile_expr(expr.index)
+        index_vector = Interpreter.index_vector
+        return lambda environment: index_vector(bracket, object_of(environment), index_of(environment))
+
+    def visit_slice_expr(self, expr: Slice) -> Compiled:
+        bracket = expr.bracket
+        object_of = self.compile_expr(expr.object)
+        # A bound left out is nil, to Interpreter.slice_vector().
+        start_of = self.visit_ignore_expr(expr) if expr.start is None else self.compile_expr(expr.start)
+        stop_of = self.visit_ignore_expr(expr) if expr.stop is None else self.compile_expr(expr.stop)
+        slice_vector = Interpreter.slice_vector
+
+        def slice_(environment: Environment) -> Any:
+            vector = object_of(environment)
+            return slice_vector(bracket, vector, start_of(environment), stop_of(environment))
+        return slice_
+
+    def visit_unary_expr(self, expr: Unary) -> Compiled:
+        operator_token = expr.operator
+
+        if operator_token.type in (TokenType.PLUS_PLUS, TokenType.MINUS_MINUS):
+            current_of = self.compile_lookup(expr.right.name, expr.right.depth, expr.right.slot)
+            assign = self.compile_assignment(expr.right)
+            step = 1 if operator_token.type == TokenType.PLUS_PLUS else -1
+
+            def increment(environment: Environment) -> Any:
+                current = current_of(environment)
+                if not isinstance(current, (int, float)):
+                    raise IqaloxRuntimeError(operator_token, 'Operand must be a number.')
+                new_value = float(current) + step
+                assign(environment, new_value)
+                return new_value
+            return increment
+
+        right = self.compile_expr(expr.right)
+
+        if operator_token.type == TokenType.BANG:
+            is_truthy = Interpreter.is_truthy
+            return lambda environment: not is_truthy(right(environment))
+
+        if operator_token.type == TokenType.MINUS:
+            def negate(environment: Environment) -> Any:
+                value = right(environment)
+                if not isinstance(value, (int, float)):
+                    raise IqaloxRuntimeError(operator_token, 'Operand must be a number.')
+                return -float(value)
+            return negate
+
+        def other(environment: Environment) -> Any:
+            right(environment)
+            return None
+        return other
+
+    def visit_logical_expr(self, expr: Logical) -> Compiled:
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        is_truthy = Interpreter.is_truthy
+
+        if expr.operator.type == TokenType.OR:
+            def logical_or(environment: Environment) -> Any:
+                value = left(environment)
+                if is_truthy(value):
+                    return value
+                return right(environment)
+            return logical_or
+
+        def logical_and(environment: Environment) -> Any:
+            value = left(environment)
+            if not is_truthy(value):
+                return value
+            return right(environment)
+        return logical_and
+
+    def visit_break_expr(self, expr: Break) -> Compiled:
+        def run(environment: Environment) -> Any:
+            raise BreakSignal()
+        return run
+
+    def visit_continue_expr(self, expr: Continue) -> Compiled:
+        def run(environment: Environment) -> Any:
+            raise ContinueSignal()
+        return run
+
+    def visit_ignore_expr(self, expr: Ignore) -> Compiled:
+        return lambda environment: None
+
+    def visit_call_expr(self, expr: Call) -> Compiled:
+        return self.compile_call(expr, tail=False)
+
+    def compile_call(self, expr: Call, tail: bool) -> Compiled:
+        # With `tail`, the call is a returned value and its closure returns
+        # that return's Completion: a TAIL_CALL for an IqaloxFunction callee,
+        # as Interpreter.tail_completion() would.
+        if type(expr.callee) is Get:
+            return self.compile_method_call(expr, tail)
+
+        callee_of = self.compile_expr(expr.callee)
+        arguments_of = tuple(self.compile_expr(argument) for argument in expr.arguments)
+        name_token = expr.callee.method if isinstance(expr.callee, Super) else expr.callee.name
+        interpreter = self.interpreter
+        tail_call, return_type = CompletionType.TAIL_CALL, CompletionType.RETURN
+
+        def call(environment: Environment) -> Any:
+            callee = callee_of(environment)
+            arguments = [argument(environment) for argument in arguments_of]
+
+            if not isinstance(callee, IqaloxCallable):
+                raise IqaloxRuntimeError(name_token, f"'{name_token.lexeme}' is not callable.")
+
+            if len(arguments) != callee.arity():
+                raise IqaloxRuntimeError(
+                    name_token, f'Expected {callee.arity()} argument(s) but got {len(arguments)}.'
+                )
+
+            if tail:
+                if isinstance(callee, IqaloxFunction):
+                    return Completion(tail_call, (callee, None, arguments))
+                return Completion(return_type, interpreter.invoke(callee, None, arguments, name_token))
+
+            previous_call_token = interpreter.native_call_token
+            interpreter.native_call_token = name_token
+            try:
+                return callee.call(interpreter, arguments)
+            except RecursionError:
+                raise IqaloxRuntimeError(name_token, 'Stack overflow.') from None
+            finally:
+                interpreter.native_call_token = previous_call_token
+        return call
+
+    def compile_method_call(self, expr: Call, tail: bool) -> Compiled:
+        # Interpreter.visit_call_expr()'s `instance.method args` path: the
+        # method comes from this call site's own PropertyCache and is
+        # called on the instance without being bound first.
+        object_of = self.compile_expr(expr.callee.object)
+        arguments_of = tuple(self.compile_expr(argument) for argument in expr.arguments)
+        name_token = expr.callee.name
+        lexeme = name_token.lexeme
+        cache = PropertyCache()
+        interpreter = self.interpreter
+        tail_call, return_type = CompletionType.TAIL_CALL, CompletionType.RETURN
+
+        def call(environment: Environment) -> Any:
+            obj = object_of(environment)
+            if not isinstance(obj, IqaloxInstance):
+                raise IqaloxRuntimeError(name_token, 'Only instances have properties.')
+            slot, method = cache.lookup(obj.shape, lexeme)
+            if slot is not None:
+                callee = obj.values[slot]
+            elif method is not None:
+                callee = method
+            else:
+                raise IqaloxRuntimeError(name_token, f"Undefined property '{lexeme}'.")
+            arguments = [argument(environment) for argument in arguments_of]
+
+            if not isinstance(callee, IqaloxCallable):
+                raise IqaloxRuntimeError(name_token, f"'{lexeme}' is not callable.")
+
+            if len(arguments) != callee.arity():
+                raise IqaloxRuntimeError(
+                    name_token, f'Expected {callee.arity()} argument(s) but got {len(arguments)}.'
+                )
+
+            instance = None if method is None else obj
+            if tail:
+                if isinstance(callee, IqaloxFunction):
+                    return Completion(tail_call, (callee, instance, arguments))
+                return Completion(return_type, interpreter.invoke(callee, instance, arguments, name_token))
+
+            previous_call_token = interpreter.native_call_token
+            interpreter.native_call_token = name_token
+            try:
+                if method is not None:
+                    return method.call_method(interpreter, obj, arguments)
+                return callee.call(interpreter, arguments)
+            except RecursionError:
+                raise IqaloxRuntimeError(name_token, 'Stack overflow.') from None
+            finally:
+                interpreter.native_call_token = previous_call_token
+        return call
+
+    def visit_get_expr(self, expr: Get) -> Compiled:
+        object_of = self.compile_expr(expr.object)
+        name = expr.name
+        cache = PropertyCache()
+
+        def get(environment: Environment) -> Any:
+            obj = object_of(environment)
+            # The monomorphic hit inline; everything else via obj.get().
+            if obj.__class__ is IqaloxInstance and obj.shape is cache.shape and cache.slot is not None:
+                return obj.values[cache.slot]
+            if isinstance(obj, IqaloxInstance):
+                return obj.get(name, cache)
+            raise IqaloxRuntimeError(name, 'Only instances have properties.')
+        return get
+
+    def visit_set_expr(self, expr: Set) -> Compiled:
+        object_of = self.compile_expr(expr.object)
+        value_of = self.compile_expr(expr.value)
+        name = expr.name
+        cache = StoreCache()
+
+        def set_(environment: Environment) -> Any:
+            obj = object_of(environment)
+            if not isinstance(obj, IqaloxInstance):
+                raise IqaloxRuntimeError(name, 'Only instances have fields.')
+            value = value_of(environment)
+            # The monomorphic hit inline, as in IqaloxInstance.set().
+            if obj.shape is cache.shape:
+                if cache.target is obj.shape:
+                    obj.values[cache.slot] = value
+                else:
+                    obj.values.append(value)
+                    obj.shape = cache.target
+            else:
+                obj.set(name, value, cache)
+            return value
+        return set_
+
+    def visit_self_expr(self, expr: Self) -> Compiled:
+        return self.compile_lookup(expr.keyword, expr.depth, expr.slot)
+
+    def visit_super_expr(self, expr: Super) -> Compiled:
+        if expr.depth is None:
+            return self.compile_lookup(expr.keyword, None, None)
+
+        superclass_of = self.compile_lookup(expr.keyword, expr.depth, expr.slot)
+        instance_of = self.compile_lookup(
+            Token(TokenType.SELF, 'self', None, expr.keyword.line, expr.keyword.column), expr.depth - 1, 0
+        )
+        method_name = expr.method
+
+        def super_(environment: Environment) -> Any:
+            superclass = superclass_of(environment)
+            instance = instance_of(environment)
+            method = superclass.find_method(method_name.lexeme)
+            if method is None:
+                raise IqaloxRuntimeError(method_name, f"Undefined property '{method_name.lexeme}'.")
+            return method.bind(instance)
+        return super_
+
+    def visit_variable_expr(self, expr: Variable) -> Compiled:
+        return self.compile_lookup(expr.name, expr.depth, expr.slot)
+
+    def visit_binary_expr(self, expr: Binary) -> Compiled:
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        operator_token = expr.operator
+        token_type = operator_token.type
+
+        if token_type == TokenType.DOUBLE_QUESTION_MARK:
+            def null_coalescing(environment: Environment) -> Any:
+                value = left(environment)
+                return value if value is not None else right(environment)
+            return null_coalescing
+
+        if token_type == TokenType.COMMA:
+            def comma(environment: Environment) -> Any:
+                left(environment)
+                return right(environment)
+            return comma
+
+        if token_type == TokenType.EQUAL_EQUAL:
+            return lambda environment: left(environment) == right(environment)
+
+        if token_type == TokenType.BANG_EQUAL:
+            return lambda environment: not left(environment) == right(environment)
+
+        if token_type == TokenType.SLASH:
+            def divide(environment: Environment) -> Any:
+                a = left(environment)
+                b = right(environment)
+                if not (isinstance(a, (int, float)) and isinstance(b, (int, float))):
+                    if is_elementwise(token_type, a, b):
+                        return elementwise(operator_token, a, b)
+                    raise IqaloxRuntimeError(operator_token, 'Operands must be numbers.')
+                if b == 0:
+                    raise IqaloxRuntimeError(operator_token, 'Division by zero.')
+                return a / b
+            return divide
+
+        numeric = _NUMERIC_OPERATORS.get(token_type)
+        if numeric is not None:
+            def arithmetic(environment: Environment) -> Any:
+                a = left(environment)
+                b = right(environment)
+                if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+                    return numeric(a, b)
+                if is_elementwise(token_type, a, b):
+                    return elementwise(operator_token, a, b)
+                raise IqaloxRuntimeError(operator_token, 'Operands must be numbers.')
+            return arithmetic
+
+        def other(environment: Environment) -> Any:
+            left(environment)
+            right(environment)
+            return None
+        return other
+
+    def visit_ternary_expr(self, expr: Ternary) -> Compiled:
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        is_truthy = Interpreter.is_truthy
+
+        # Elvis (`a ?: b`): the condition's own value is the result when
+        # truthy -- evaluated once, same as Interpreter.visit_ternary_expr.
+        if expr.middle is expr.left:
+            def elvis(environment: Environment) -> Any:
+                value = left(environment)
+                return value if is_truthy(value) else right(environment)
+            return elvis
+
+        middle = self.compile_expr(expr.middle)
+
+        def ternary(environment: Environment) -> Any:
+            return middle(environment) if is_truthy(left(environment)) else right(environment)
+        return ternary
+
+
+# The closure engine (`iqalox.py --engine=closure`): an Interpreter whose
+# execute()/evaluate() compile each node with ClosureCompiler and run the
+# result, keeping Interpreter's globals, natives and interpret()'s error
+# reporting as-is.
+class ClosureInterpreter(Interpreter):
+    tiered = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.compiler = ClosureCompiler(self)
+
+    def execute(self, stmt: Stmt) -> Optional[Completion]:
+        completion = self.compiler.compile_stmt(stmt)(self.environment)
+        return completion if completion.__class__ is Completion else None
+
+    def evaluate(self, expr: Expr) -> Any:
+        return self.compiler.compile_expr(expr)(self.environment)
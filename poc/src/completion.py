@@ -0,0 +1,50 @@
+from enum import Enum
+from typing import Any
+
+
+class CompletionType(Enum):
+    BREAK = 'break'
+    CONTINUE = 'continue'
+    RETURN = 'return'
+    # A `return` whose value is a call in tail position (see
+    # Interpreter.tail_completion()): its value is the (function, instance,
+    # arguments) still to be called, which IqaloxFunction.run() calls in
+    # place of the function that returned it rather than nesting the call.
+    TAIL_CALL = 'tail call'
+
+
+class Completion:
+    # How a statement ended when it didn't just fall through to the next
+    # one: executing a statement returns None for that normal case, or one
+    # of these, which every enclosing block hands straight back up until the
+    # loop (break/continue) or function call (return) it belongs to.
+    __slots__ = ('type', 'value')
+
+    def __init__(self, completion_type: CompletionType, value: Any = None) -> None:
+        self.type = completion_type
+        self.value = value
+
+    def call_result(self) -> Any:
+        # What a call whose body ended with this completion returns. A
+        # `break`/`continue` outside any loop of its own escapes the call, as
+        # a signal, to whatever loop the caller is in.
+        if self.type == CompletionType.RETURN:
+            return self.value
+        if self.type == CompletionType.BREAK:
+            raise BreakSignal()
+        raise ContinueSignal()
+
+
+BREAK = Completion(CompletionType.BREAK)
+CONTINUE = Completion(CompletionType.CONTINUE)
+
+
+# Only for a `break`/`continue` that can't complete a statement: one used as
+# an operand or argument rather than (a branch of) a whole expression
+# statement, or one escaping the function it's in into the caller's loop.
+class BreakSignal(Exception):
+    pass
+
+
+class ContinueSignal(Exception):
+    pass
@@ -1,4 +1,4 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple
 
 from error import IqaloxRuntimeError
 from token import Token
@@ -14,6 +14,11 @@ class Environment:
     def __init__(self, enclosing: 'Environment' = None) -> None:
         self.enclosing = enclosing
         self.values: Dict[str, VariableData] = {}
+        # Locals the Resolver gave a slot index, in declaration order --
+        # each `var`/`fun`/`class`/parameter in a scope executes exactly once
+        # per Environment, in source order, so appending keeps every value at
+        # the index the Resolver predicted. `values` only holds globals.
+        self.slots: List[Any] = []
 
     def get(self, name: Token) -> Any:
         if name.lexeme in self.values:
@@ -43,3 +48,26 @@ class Environment:
             self.values[name] = value
         else:
             raise IqaloxRuntimeError(value.value, f'Variable \'{name}\' already declared.')
+
+    def ancestor(self, depth: int) -> 'Environment':
+        environment = self
+        for _ in range(depth):
+            environment = environment.enclosing
+        return environment
+
+    def get_at(self, depth: int, slot: int, name: Token) -> Any:
+        try:
+            return self.ancestor(depth).slots[slot]
+        except IndexError:
+            # A nested function body can call a local function declared
+            # after it (see Resolver.defer()), so may run before that
+            # function's statement has.
+            raise IqaloxRuntimeError(name, f'Undefined variable \'{name.lexeme}\'.') from None
+
+    def assign_at(self, depth: int, slot: int, name: Token, value: Any, is_mutable: bool) -> None:
+        slots = self.ancestor(depth).slots
+        if slot >= len(slots):
+            raise IqaloxRuntimeError(name, f'Undefined variable \'{name.lexeme}\'.')
+        if not is_mutable:
+            raise IqaloxRuntimeError(name, f'Assigning to immutable variable \'{name.lexeme}\' not allowed.')
+        slots[slot] = value
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, List
+from typing import Any, List, Optional
 from token import Token
 
 
@@ -36,6 +36,10 @@ class ExprVisitor(ABC):
     def visit_vector_expr(self, expr: 'Expr') -> Any:
         pass
 
+    @abstractmethod
+    def visit_spread_expr(self, expr: 'Expr') -> Any:
+        pass
+
     @abstractmethod
     def visit_variable_expr(self, expr: 'Expr') -> Any:
         pass
@@ -60,6 +64,14 @@ class ExprVisitor(ABC):
     def visit_get_expr(self, expr: 'Expr') -> Any:
         pass
 
+    @abstractmethod
+    def visit_index_expr(self, expr: 'Expr') -> Any:
+        pass
+
+    @abstractmethod
+    def visit_slice_expr(self, expr: 'Expr') -> Any:
+        pass
+
     @abstractmethod
     def visit_set_expr(self, expr: 'Expr') -> Any:
         pass
@@ -80,19 +92,23 @@ class Expr(ABC):
 
 
 class Assign(Expr):
-    def __init__(self, name: Token, value: Expr) -> None:
+    def __init__(self, name: Token, value: Expr, depth: Optional[int] = None, slot: Optional[int] = None, is_mutable: bool = True) -> None:
         self.name = name
         self.value = value
+        self.depth = depth
+        self.slot = slot
+        self.is_mutable = is_mutable
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_assign_expr(self)
 
 
 class Binary(Expr):
-    def __init__(self, left: Expr, operator: Token, right: Expr) -> None:
+    def __init__(self, left: Expr, operator: Token, right: Expr, deoptimized: bool = False) -> None:
         self.left = left
         self.operator = operator
         self.right = right
+        self.deoptimized = deoptimized
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_binary_expr(self)
@@ -153,25 +169,37 @@ class Vector(Expr):
         return visitor.visit_vector_expr(self)
 
 
+class Spread(Expr):
+    def __init__(self, operator: Token, expression: Expr) -> None:
+        self.operator = operator
+        self.expression = expression
+
+    def accept(self, visitor: ExprVisitor) -> None:
+        return visitor.visit_spread_expr(self)
+
+
 class Variable(Expr):
-    def __init__(self, name: Token) -> None:
+    def __init__(self, name: Token, depth: Optional[int] = None, slot: Optional[int] = None, is_mutable: bool = True) -> None:
         self.name = name
+        self.depth = depth
+        self.slot = slot
+        self.is_mutable = is_mutable
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_variable_expr(self)
 
 
 class Break(Expr):
-    def __init__(self) -> None:
-        pass
+    def __init__(self, keyword: Token) -> None:
+        self.keyword = keyword
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_break_expr(self)
 
 
 class Continue(Expr):
-    def __init__(self) -> None:
-        pass
+    def __init__(self, keyword: Token) -> None:
+        self.keyword = keyword
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_continue_expr(self)
@@ -195,36 +223,63 @@ class Call(Expr):
 
 
 class Get(Expr):
-    def __init__(self, object: Expr, name: Token) -> None:
+    def __init__(self, object: Expr, name: Token, cache: Any = None) -> None:
         self.object = object
         self.name = name
+        self.cache = cache
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_get_expr(self)
 
 
+class Index(Expr):
+    def __init__(self, object: Expr, bracket: Token, index: Expr) -> None:
+        self.object = object
+        self.bracket = bracket
+        self.index = index
+
+    def accept(self, visitor: ExprVisitor) -> None:
+        return visitor.visit_index_expr(self)
+
+
+class Slice(Expr):
+    def __init__(self, object: Expr, bracket: Token, start: Optional[Expr], stop: Optional[Expr]) -> None:
+        self.object = object
+        self.bracket = bracket
+        self.start = start
+        self.stop = stop
+
+    def accept(self, visitor: ExprVisitor) -> None:
+        return visitor.visit_slice_expr(self)
+
+
 class Set(Expr):
-    def __init__(self, object: Expr, name: Token, value: Expr) -> None:
+    def __init__(self, object: Expr, name: Token, value: Expr, cache: Any = None) -> None:
         self.object = object
         self.name = name
         self.value = value
+        self.cache = cache
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_set_expr(self)
 
 
 class Self(Expr):
-    def __init__(self, keyword: Token) -> None:
+    def __init__(self, keyword: Token, depth: Optional[int] = None, slot: Optional[int] = None) -> None:
         self.keyword = keyword
+        self.depth = depth
+        self.slot = slot
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_self_expr(self)
 
 
 class Super(Expr):
-    def __init__(self, keyword: Token, method: Token) -> None:
+    def __init__(self, keyword: Token, method: Token, depth: Optional[int] = None, slot: Optional[int] = None) -> None:
         self.keyword = keyword
         self.method = method
+        self.depth = depth
+        self.slot = slot
 
     def accept(self, visitor: ExprVisitor) -> None:
         return visitor.visit_super_expr(self)
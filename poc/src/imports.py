@@ -0,0 +1,29 @@
+import importlib
+import importlib.util
+import os
+import sys
+from typing import Any
+
+
+# Imports a module of the standard library, or one installed beside it, that
+# ends up importing the standard library's own `token` module -- which
+# token.py here shadows, breaking the import (as concurrent.futures does,
+# by way of logging, traceback and tokenize). The standard library's module
+# stands in for ours while it runs; either way ours is back in place once
+# it's done. Raises ImportError as importlib.import_module() does.
+def import_past_token(name: str) -> Any:
+    if name in sys.modules:
+        return sys.modules[name]
+    ours = sys.modules.get('token')
+    path = os.path.join(os.path.dirname(os.__file__), 'token.py')
+    spec = importlib.util.spec_from_file_location('token', path)
+    standard = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(standard)
+    sys.modules['token'] = standard
+    try:
+        return importlib.import_module(name)
+    finally:
+        if ours is None:
+            del sys.modules['token']
+        else:
+            sys.modules['token'] = ours
@@ -1,25 +1,34 @@
-from typing import Any, List, Optional
+import math
+from functools import cmp_to_key
+from typing import Any, List, Optional, Tuple, Union
 
 from expression import Expr, ExprVisitor, Binary, Logical, Unary, Literal, Grouping, Ternary, Vector, Variable, \
-    Assign, Break, Continue, Ignore, Call, Get, Set, Self, Super
+    Assign, Break, Continue, Ignore, Call, Get, Index, Slice, Set, Self, Super, Spread
 from statement import Stmt, StmtVisitor, Expression, Var, Block, For, Function, Return, Class
 from token import Token, TokenType
 from error import IqaloxRuntimeError
 from environment import Environment, VariableData
-from callable import IqaloxCallable, NativeFunction, IqaloxFunction, IqaloxClass, IqaloxInstance
+from callable import IqaloxCallable, NativeFunction, IqaloxFunction, IqaloxClass, IqaloxInstance, PropertyCache, \
+    StoreCache
+from completion import Completion, CompletionType, BREAK, CONTINUE, BreakSignal, ContinueSignal
+from specialization import SpecializationStats, FloatBinary, SPECIALIZED
+from tiering import Tiering
+from memoization import Memoization
+from matrices import NATIVES as MATRIX_NATIVES
+from parallel import Parallel
+from vectors import VECTOR_TYPES, EMPTY_VECTOR, PersistentVector, make_vector, persistent, is_elementwise, elementwise
 
 
-class BreakSignal(Exception):
-    pass
+# The expression types execute_expression() has to walk itself; any other
+# expression statement can't complete with a break/continue.
+_COMPLETING_EXPRESSIONS = frozenset({Break, Continue, Grouping, Ternary, Logical, Binary})
 
+# Likewise for tail_completion(): the ones that can have a call as their
+# result.
+_TAIL_EXPRESSIONS = frozenset({Call, Grouping, Ternary, Logical, Binary})
 
-class ContinueSignal(Exception):
-    pass
-
-
-class ReturnSignal(Exception):
-    def __init__(self, value: Any) -> None:
-        self.value = value
+# Every integer up to this size is exactly a float.
+_EXACT_INTEGERS = 2.0 ** 53
 
 
 def _type_name(value: Any) -> str:
@@ -31,7 +40,7 @@ def _type_name(value: Any) -> str:
         return 'number'
     if isinstance(value, str):
         return 'string'
-    if isinstance(value, list):
+    if isinstance(value, VECTOR_TYPES):
         return 'vector'
     if isinstance(value, IqaloxClass):
         return 'class'
@@ -42,55 +51,163 @@ def _type_name(value: Any) -> str:
     return 'value'
 
 
+def _slice_bound(bracket: Token, bound: Any, label: str, length: int) -> int:
+    # One of a slice's bounds as an index into the vector, which may be out
+    # of its range.
+    if bound.__class__ is not float:
+        raise IqaloxRuntimeError(bracket, f'Slice {label} bound must be a number, got {_type_name(bound)}.')
+    if not bound.is_integer():
+        raise IqaloxRuntimeError(
+            bracket, f'Slice {label} bound must be an integer, got {Interpreter.stringify(bound)}.'
+        )
+    return int(bound + length if bound < 0 else bound)
+
+
 def _native_print(interpreter: 'Interpreter', arguments: List[Any]) -> None:
     print(interpreter.stringify(arguments[0]))
     return None
 
 
 def _native_concat(interpreter: 'Interpreter', arguments: List[Any]) -> str:
-    if not isinstance(arguments[0], list):
+    if not isinstance(arguments[0], VECTOR_TYPES):
         raise IqaloxRuntimeError(
             interpreter.native_call_token, f"Argument to 'concat' must be a vector, got {_type_name(arguments[0])}."
         )
     return ''.join(interpreter.stringify(value) for value in arguments[0])
 
 
+# map/filter/reduce/sort: the 0.2 array stdlib's higher-order functions,
+# `map fn, vector` and so on, as natives. None mutates its vector. map and
+# filter fan a big vector out to worker processes when `fn` is a pure
+# top-level function (see parallel.py); reduce and sort always run here.
+
+def _callback_arguments(interpreter: 'Interpreter', name: str, arguments: List[Any],
+                        arity: int) -> Tuple[IqaloxCallable, List[Any]]:
+    callback, vector = arguments[0], arguments[1]
+    token = interpreter.native_call_token
+    if not isinstance(callback, IqaloxCallable):
+        raise IqaloxRuntimeError(token, f"First argument to '{name}' must be a function, got {_type_name(callback)}.")
+    if callback.arity() != arity:
+        raise IqaloxRuntimeError(
+            token, f"Function passed to '{name}' must take {arity} argument(s), but it takes {callback.arity()}."
+        )
+    if not isinstance(vector, VECTOR_TYPES):
+        raise IqaloxRuntimeError(token, f"Second argument to '{name}' must be a vector, got {_type_name(vector)}.")
+    return callback, vector
+
+
+def _native_map(interpreter: 'Interpreter', arguments: List[Any]) -> List[Any]:
+    callback, vector = _callback_arguments(interpreter, 'map', arguments, 1)
+    results = interpreter.parallel.map(callback, vector)
+    if results is None:
+        results = [callback.call(interpreter, [value]) for value in vector]
+    return make_vector(results)
+
+
+def _native_filter(interpreter: 'Interpreter', arguments: List[Any]) -> List[Any]:
+    callback, vector = _callback_arguments(interpreter, 'filter', arguments, 1)
+    results = interpreter.parallel.filter(callback, vector)
+    if results is None:
+        is_truthy = interpreter.is_truthy
+        results = [value for value in vector if is_truthy(callback.call(interpreter, [value]))]
+    return make_vector(results)
+
+
+def _native_reduce(interpreter: 'Interpreter', arguments: List[Any]) -> Any:
+    callback, vector = _callback_arguments(interpreter, 'reduce', arguments, 2)
+    accumulator = arguments[2]
+    for value in vector:
+        accumulator = callback.call(interpreter, [accumulator, value])
+    return accumulator
+
+
+def _native_sort(interpreter: 'Interpreter', arguments: List[Any]) -> List[Any]:
+    # `fn(a, b)` is truthy when `a` belongs before `b`: exactly the `<`
+    # Python's (stable) sort asks its keys, and the only thing it asks.
+    callback, vector = _callback_arguments(interpreter, 'sort', arguments, 2)
+    is_truthy = interpreter.is_truthy
+
+    def compare(a: Any, b: Any) -> int:
+        return -1 if is_truthy(callback.call(interpreter, [a, b])) else 0
+    return make_vector(sorted(vector, key=cmp_to_key(compare)))
+
+
 class Interpreter(ExprVisitor, StmtVisitor):
+    # Whether hot functions and loops move on to compiled code (see
+    # tiering.py); off for the engines that already compile, and for the
+    # stack engine, which mustn't nest Python calls.
+    tiered = True
+
     def __init__(self) -> None:
-        self.environment = Environment()
-        self.environment.define('print', VariableData(NativeFunction('print', 1, _native_print), is_mutable=False))
-        self.environment.define('concat', VariableData(NativeFunction('concat', 1, _native_concat), is_mutable=False))
+        self.globals = Environment()
+        self.environment = self.globals
+        self.globals.define('print', VariableData(NativeFunction('print', 1, _native_print), is_mutable=False))
+        self.globals.define(
+            'concat', VariableData(NativeFunction('concat', 1, _native_concat, pure=True), is_mutable=False)
+        )
+        for native in (NativeFunction('map', 2, _native_map), NativeFunction('filter', 2, _native_filter),
+                       NativeFunction('reduce', 3, _native_reduce), NativeFunction('sort', 2, _native_sort),
+                       *MATRIX_NATIVES):
+            self.globals.define(native.name, VariableData(native, is_mutable=False))
         # The call-site token for whichever call is currently executing --
         # lets a native (which otherwise only sees its arguments) raise an
         # IqaloxRuntimeError with a real source location, e.g. `concat`'s
         # non-vector-argument check below.
         self.native_call_token: Optional[Token] = None
-
-    def execute(self, stmt: Stmt) -> None:
-        stmt.accept(self)
-
-    def execute_block(self, statements: List[Stmt], environment: Environment) -> None:
+        # Counts the Binary nodes rewritten by visit_binary_expr() and
+        # deoptimize(); see specialization.py.
+        self.specializations = SpecializationStats()
+        self.tiering = Tiering(self, self.tiered)
+        # Calls of pure functions, remembered (see memoization.py).
+        self.memoization = Memoization()
+        # Where map/filter send big vectors (see parallel.py).
+        self.parallel = Parallel(self)
+
+    def execute(self, stmt: Stmt) -> Optional[Completion]:
+        return stmt.accept(self)
+
+    def execute_block(self, statements: List[Stmt], environment: Environment) -> Optional[Completion]:
         previous = self.environment
         try:
             self.environment = environment
             for statement in statements:
-                self.execute(statement)
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
+            return None
         finally:
             self.environment = previous
 
-    def interpret(self, statements: List[Stmt]) -> None:
+    def interpret(self, statements: List[Stmt]) -> bool:
+        # Whether the statements all ran, rather than the program ending at
+        # an error or a stray completion.
         import iqalox
         try:
             for statement in statements:
-                self.execute(statement)
+                completion = self.execute(statement)
+                if completion is not None:
+                    if completion.type is CompletionType.TAIL_CALL:
+                        # Still make the call, as a plain `return` evaluates
+                        # its value before being reported.
+                        function, instance, arguments = completion.value
+                        function.run(self, instance, arguments)
+                    self.report_stray_completion(completion.type)
+                    return False
+            return True
         except IqaloxRuntimeError as error:
             iqalox.Iqalox.runtime_error(error)
         except BreakSignal:
-            print("Runtime error: 'break' used outside of a loop.")
+            self.report_stray_completion(CompletionType.BREAK)
         except ContinueSignal:
-            print("Runtime error: 'continue' used outside of a loop.")
-        except ReturnSignal:
-            print("Runtime error: 'return' used outside of a function.")
+            self.report_stray_completion(CompletionType.CONTINUE)
+        return False
+
+    @staticmethod
+    def report_stray_completion(completion_type: CompletionType) -> None:
+        if completion_type is CompletionType.TAIL_CALL:
+            completion_type = CompletionType.RETURN
+        where = 'function' if completion_type == CompletionType.RETURN else 'loop'
+        print(f"Runtime error: '{completion_type.value}' used outside of a {where}.")
 
     @staticmethod
     def stringify(obj: Any) -> str:
@@ -130,21 +247,118 @@ class Interpreter(ExprVisitor, StmtVisitor):
             return
         raise IqaloxRuntimeError(operator, 'Operands must be numbers.')
 
+    @staticmethod
+    def spread_operand(operator: Token, value: Any) -> PersistentVector:
+        # What a spread or cons splices in: a vector, as a PersistentVector.
+        if not isinstance(value, VECTOR_TYPES):
+            raise IqaloxRuntimeError(operator, f'Can only spread a vector, got {_type_name(value)}.')
+        return persistent(value)
+
+    @staticmethod
+    def index_vector(bracket: Token, vector: Any, index: Any) -> Any:
+        # `vector[index]`, a negative index counting back from the end.
+        if not isinstance(vector, VECTOR_TYPES):
+            raise IqaloxRuntimeError(bracket, f'Only vectors can be indexed, got {_type_name(vector)}.')
+        if index.__class__ is not float:
+            raise IqaloxRuntimeError(bracket, f'Vector index must be a number, got {_type_name(index)}.')
+        if not index.is_integer():
+            raise IqaloxRuntimeError(
+                bracket, f'Vector index must be an integer, got {Interpreter.stringify(index)}.'
+            )
+        length = len(vector)
+        position = index + length if index < 0 else index
+        if position < 0 or position >= length:
+            raise IqaloxRuntimeError(
+                bracket,
+                f'Vector index {Interpreter.stringify(index)} out of range for vector of length {length}.'
+            )
+        return vector[int(position)]
+
+    @staticmethod
+    def slice_vector(bracket: Token, vector: Any, start: Any, stop: Any) -> Any:
+        # `vector[start:stop]`: the elements from `start` through `stop`,
+        # both included. Either bound may be negative, counting back from
+        # the end, or nil (left out), for the vector's own end; one past
+        # either end clamps to it, so a start after the stop is just empty.
+        # A numeric or persistent vector's slice shares its elements (see
+        # NumericVector.slice() and PersistentVector.slice()); a list's is
+        # a copy.
+        if not isinstance(vector, VECTOR_TYPES):
+            raise IqaloxRuntimeError(bracket, f'Only vectors can be sliced, got {_type_name(vector)}.')
+        length = len(vector)
+        first = 0 if start is None else min(max(_slice_bound(bracket, start, 'start', length), 0), length)
+        last = length - 1 if stop is None else _slice_bound(bracket, stop, 'stop', length)
+        end = max(min(last + 1, length), first)
+        if isinstance(vector, list):
+            return make_vector(vector[first:end])
+        return vector.slice(first, end)
+
     @staticmethod
     def is_equal(a: Any, b: Any) -> bool:
         return a == b
 
-    def visit_block_stmt(self, stmt: Block) -> None:
-        self.execute_block(stmt.statements, Environment(self.environment))
-        return None
+    def visit_block_stmt(self, stmt: Block) -> Optional[Completion]:
+        if not stmt.scoped:
+            return self.execute_block(stmt.statements, self.environment)
+        return self.execute_block(stmt.statements, Environment(self.environment))
+
+    def visit_expression_stmt(self, stmt: Expression) -> Optional[Completion]:
+        return self.execute_expression(stmt.expression)
+
+    def execute_expression(self, expr: Expr) -> Optional[Completion]:
+        # An expression run as a whole statement. `break`/`continue` are
+        # expressions, so they usually end up here as a branch of a ternary
+        # or logical operator -- walk those forms the same way their
+        # visit_*() does, but let a `break`/`continue` in one of their result
+        # positions complete the statement instead of raising a signal.
+        expr_type = type(expr)
+        if expr_type not in _COMPLETING_EXPRESSIONS:
+            self.evaluate(expr)
+            return None
+        if expr_type is Break:
+            return BREAK
+        if expr_type is Continue:
+            return CONTINUE
+        if expr_type is Grouping:
+            return self.execute_expression(expr.expression)
+
+        if expr_type is Ternary:
+            left = self.evaluate(expr.left)
+            if self.is_truthy(left):
+                # Elvis: the condition itself was the result.
+                if expr.middle is expr.left:
+                    return None
+                return self.execute_expression(expr.middle)
+            return self.execute_expression(expr.right)
+
+        if expr_type is Logical:
+            left = self.evaluate(expr.left)
+            if self.is_truthy(left) == (expr.operator.type == TokenType.OR):
+                return None
+            return self.execute_expression(expr.right)
 
-    def visit_expression_stmt(self, stmt: Expression) -> None:
-        self.evaluate(stmt.expression)
+        token_type = expr.operator.type
+        if token_type == TokenType.DOUBLE_QUESTION_MARK:
+            if self.evaluate(expr.left) is not None:
+                return None
+            return self.execute_expression(expr.right)
+        if token_type == TokenType.COMMA:
+            self.evaluate(expr.left)
+            return self.execute_expression(expr.right)
+        self.evaluate(expr)
         return None
 
+    def define(self, name: Token, slot: Optional[int], value: Any, is_mutable: bool) -> None:
+        # Resolved locals go into the current frame's next slot (see
+        # Environment.slots); only globals keep a name-keyed entry.
+        if slot is None:
+            self.environment.define(name.lexeme, VariableData(value, is_mutable))
+        else:
+            self.environment.slots.append(value)
+
     def visit_function_stmt(self, stmt: Function) -> None:
         function = IqaloxFunction(stmt, self.environment)
-        self.environment.define(stmt.name.lexeme, VariableData(function, is_mutable=False))
+        self.define(stmt.name, stmt.slot, function, is_mutable=False)
         return None
 
     def visit_class_stmt(self, stmt: Class) -> None:
@@ -157,54 +371,215 @@ class Interpreter(ExprVisitor, StmtVisitor):
         environment = self.environment
         if superclass is not None:
             environment = Environment(self.environment)
-            environment.define('super', VariableData(superclass, is_mutable=False))
+            environment.slots.append(superclass)
 
         methods = {method.name.lexeme: IqaloxFunction(method, environment) for method in stmt.methods}
 
         klass = IqaloxClass(stmt.name.lexeme, superclass, methods)
-        self.environment.define(stmt.name.lexeme, VariableData(klass, is_mutable=False))
+        self.define(stmt.name, stmt.slot, klass, is_mutable=False)
         return None
 
-    def visit_return_stmt(self, stmt: Return) -> None:
-        value = None
-        if stmt.value is not None:
-            value = self.evaluate(stmt.value)
-        raise ReturnSignal(value)
+    def visit_return_stmt(self, stmt: Return) -> Completion:
+        if stmt.value is None:
+            return Completion(CompletionType.RETURN, None)
+        return self.tail_completion(stmt.value)
+
+    def tail_completion(self, expr: Expr) -> Completion:
+        # A returned value, walking down to whichever of its subexpressions
+        # is the result: a call found there is a tail call, handed back to
+        # IqaloxFunction.run() uncalled instead of nesting inside this one.
+        expr_type = type(expr)
+        if expr_type not in _TAIL_EXPRESSIONS:
+            return Completion(CompletionType.RETURN, self.evaluate(expr))
+        if expr_type is Call:
+            callee, instance, arguments, name_token = self.prepare_call(expr)
+            if isinstance(callee, IqaloxFunction):
+                return Completion(CompletionType.TAIL_CALL, (callee, instance, arguments))
+            return Completion(CompletionType.RETURN, self.invoke(callee, instance, arguments, name_token))
+        if expr_type is Grouping:
+            return self.tail_completion(expr.expression)
+
+        if expr_type is Ternary:
+            left = self.evaluate(expr.left)
+            if self.is_truthy(left):
+                if expr.middle is expr.left:
+                    return Completion(CompletionType.RETURN, left)
+                return self.tail_completion(expr.middle)
+            return self.tail_completion(expr.right)
+
+        if expr_type is Logical:
+            left = self.evaluate(expr.left)
+            if self.is_truthy(left) == (expr.operator.type == TokenType.OR):
+                return Completion(CompletionType.RETURN, left)
+            return self.tail_completion(expr.right)
+
+        token_type = expr.operator.type
+        if token_type == TokenType.DOUBLE_QUESTION_MARK:
+            left = self.evaluate(expr.left)
+            if left is not None:
+                return Completion(CompletionType.RETURN, left)
+            return self.tail_completion(expr.right)
+        if token_type == TokenType.COMMA:
+            self.evaluate(expr.left)
+            return self.tail_completion(expr.right)
+        return Completion(CompletionType.RETURN, self.evaluate(expr))
 
     def visit_var_stmt(self, stmt: Var) -> None:
         value = None
         if stmt.initializer is not None:
             value = self.evaluate(stmt.initializer)
 
-        self.environment.define(stmt.name.lexeme, VariableData(value, stmt.is_mutable))
+        self.define(stmt.name, stmt.slot, value, stmt.is_mutable)
         return None
 
-    def visit_for_stmt(self, stmt: For) -> None:
+    def visit_for_stmt(self, stmt: For) -> Optional[Completion]:
+        compiled = self.tiering.loops.get(stmt)
+        if compiled is not None:
+            completion = compiled(self.environment)
+            return completion if completion.__class__ is Completion else None
+
         previous = self.environment
         try:
             self.environment = Environment(previous)
             if stmt.initializer is not None:
-                self.execute(stmt.initializer)
-
-            while stmt.condition is None or self.is_truthy(self.evaluate(stmt.condition)):
+                completion = self.execute(stmt.initializer)
+                if completion is not None:
+                    return completion
+
+            if stmt.counted:
+                counters = self.loop_counters(stmt)
+                if counters is not None:
+                    return self.run_counted_loop(stmt, counters)
+
+            # Signals are only caught around the loop as a whole: a
+            # `continue` one re-enters it after running the increment.
+            while True:
                 try:
-                    self.execute(stmt.body)
+                    return self.run_loop(stmt)
                 except BreakSignal:
-                    break
+                    return None
                 except ContinueSignal:
-                    pass
+                    if stmt.increment is not None:
+                        self.evaluate(stmt.increment)
+        finally:
+            self.environment = previous
+
+    def run_loop(self, stmt: For) -> Optional[Completion]:
+        body = stmt.body
+        # See Resolver.visit_for_stmt().
+        frame = Environment(self.environment) if type(body) is Block and body.reusable else None
+        # Iterations left until the loop is hot (see tiering.py).
+        budget = self.tiering.loop_budget(stmt)
+        try:
+            while stmt.condition is None or self.is_truthy(self.evaluate(stmt.condition)):
+                if frame is None:
+                    completion = self.execute(body)
+                else:
+                    frame.slots.clear()
+                    completion = self.execute_block(body.statements, frame)
+                if completion is not None:
+                    if completion is BREAK:
+                        return None
+                    if completion is not CONTINUE:
+                        return completion
 
                 if stmt.increment is not None:
                     self.evaluate(stmt.increment)
+                budget -= 1
+                if budget == 0:
+                    repeat, _ = self.tiering.promote_loop(stmt)
+                    return repeat(self.environment)
+            return None
         finally:
-            self.environment = previous
+            self.tiering.spend(stmt, budget)
+
+    def loop_counters(self, stmt: For) -> Optional[range]:
+        # The values a counted loop's counter takes (see
+        # Optimizer.count_loop()), evaluated in the loop's Environment once
+        # its counter is declared -- or None to run it as any other loop.
+        bound = stmt.condition.right
+        if type(bound) is Variable and bound.depth is None:
+            # A global is only known not to change if it's immutable.
+            variable = self.globals.values.get(bound.name.lexeme)
+            if variable is None or variable.is_mutable:
+                return None
+            value = variable.value
+        else:
+            value = self.evaluate(bound)
+        return self.counted_range(
+            stmt.initializer.initializer.value, value, stmt.condition.operator.type == TokenType.LESS_EQUAL
+        )
+
+    @staticmethod
+    def counted_range(start: Any, bound: Any, inclusive: bool) -> Optional[range]:
+        # What `++` would count from `start` while below (or, `inclusive`,
+        # not above) `bound`, as integers -- as long as both are numbers and
+        # every count is exactly a float, so the two can't disagree.
+        if type(start) is not float or type(bound) is not float or not start.is_integer() \
+                or not abs(start) <= _EXACT_INTEGERS or not abs(bound) <= _EXACT_INTEGERS:
+            return None
+        if start == 0 and math.copysign(1.0, start) < 0:
+            # -0 counts on to 1 all the same, but reads as "-0" until then.
+            return None
+        return range(int(start), math.floor(bound) + 1 if inclusive else math.ceil(bound))
+
+    def run_counted_loop(self, stmt: For, counters: range) -> Optional[Completion]:
+        # run_loop() with the counter taken from `counters`, and only
+        # written to its slot -- as a float, like any number -- when the
+        # body has a use for it. A `break`/`continue` signal is handled
+        # here rather than by re-entering, as there's no increment to run.
+        slots = self.environment.slots
+        slot = stmt.initializer.slot
+        read = stmt.counter_read
+        body = stmt.body
+        frame = Environment(self.environment) if type(body) is Block and body.reusable else None
+        budget = self.tiering.loop_budget(stmt)
+        try:
+            for counter in counters:
+                if read:
+                    slots[slot] = float(counter)
+                try:
+                    if frame is None:
+                        completion = self.execute(body)
+                    else:
+                        frame.slots.clear()
+                        completion = self.execute_block(body.statements, frame)
+                except BreakSignal:
+                    return None
+                except ContinueSignal:
+                    continue
+                if completion is not None:
+                    if completion is BREAK:
+                        return None
+                    if completion is not CONTINUE:
+                        return completion
+                budget -= 1
+                if budget == 0:
+                    _, count = self.tiering.promote_loop(stmt)
+                    return count(self.environment, range(counter + 1, counters.stop))
+        finally:
+            self.tiering.spend(stmt, budget)
+        if read:
+            # Where `++` would have left it, for a closure that kept it.
+            slots[slot] = float(max(counters.start, counters.stop))
         return None
 
     def visit_assign_expr(self, expr: Assign) -> Any:
         value = self.evaluate(expr.value)
-        self.environment.assign(expr.name, value)
+        self.assign_variable(expr, value)
         return value
 
+    def lookup_variable(self, expr: Variable) -> Any:
+        if expr.depth is None:
+            return self.globals.get(expr.name)
+        return self.environment.get_at(expr.depth, expr.slot, expr.name)
+
+    def assign_variable(self, expr: Union[Variable, Assign], value: Any) -> None:
+        if expr.depth is None:
+            self.globals.assign(expr.name, value)
+        else:
+            self.environment.assign_at(expr.depth, expr.slot, expr.name, value, expr.is_mutable)
+
     def visit_literal_expr(self, expr: Literal) -> Any:
         return expr.value
 
@@ -212,23 +587,47 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return self.evaluate(expr.expression)
 
     def visit_vector_expr(self, expr: Vector) -> Any:
-        return [self.evaluate(value) for value in expr.values]
+        values = expr.values
+        if any(type(value) is Spread for value in values):
+            # Built up as a PersistentVector, sharing each spread vector's
+            # tree rather than copying it.
+            vector = EMPTY_VECTOR
+            for value in values:
+                if type(value) is Spread:
+                    vector = vector.concat(self.evaluate(value))
+                else:
+                    vector = vector.append(self.evaluate(value))
+            return vector
+        return make_vector([self.evaluate(value) for value in values])
+
+    def visit_spread_expr(self, expr: Spread) -> PersistentVector:
+        return self.spread_operand(expr.operator, self.evaluate(expr.expression))
+
+    def visit_index_expr(self, expr: Index) -> Any:
+        return self.index_vector(expr.bracket, self.evaluate(expr.object), self.evaluate(expr.index))
+
+    def visit_slice_expr(self, expr: Slice) -> Any:
+        vector = self.evaluate(expr.object)
+        start = None if expr.start is None else self.evaluate(expr.start)
+        stop = None if expr.stop is None else self.evaluate(expr.stop)
+        return self.slice_vector(expr.bracket, vector, start, stop)
 
     def visit_unary_expr(self, expr: Unary) -> Any:
         if expr.operator.type in (TokenType.PLUS_PLUS, TokenType.MINUS_MINUS):
-            current = self.environment.get(expr.right.name)
+            current = self.lookup_variable(expr.right)
             self.check_number_operand(expr.operator, current)
             step = 1 if expr.operator.type == TokenType.PLUS_PLUS else -1
             new_value = float(current) + step
-            self.environment.assign(expr.right.name, new_value)
+            self.assign_variable(expr.right, new_value)
             return new_value
 
-        right = self.evaluate(expr.right)
+        return self.apply_unary(expr.operator, self.evaluate(expr.right))
 
-        if expr.operator.type == TokenType.BANG:
+    def apply_unary(self, operator: Token, right: Any) -> Any:
+        if operator.type == TokenType.BANG:
             return not self.is_truthy(right)
-        elif expr.operator.type == TokenType.MINUS:
-            self.check_number_operand(expr.operator, right)
+        elif operator.type == TokenType.MINUS:
+            self.check_number_operand(operator, right)
             return -float(right)
 
         return None
@@ -254,8 +653,13 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return None
 
     def visit_call_expr(self, expr: Call) -> Any:
-        callee = self.evaluate(expr.callee)
-        arguments = [self.evaluate(argument) for argument in expr.arguments]
+        return self.invoke(*self.prepare_call(expr))
+
+    def prepare_call(self, expr: Call) -> Tuple[IqaloxCallable, Optional[IqaloxInstance], List[Any], Token]:
+        # Everything about a call short of making it: the callee, the
+        # instance to call it on (for a method, which then never gets bound),
+        # the arguments, and the call's error token -- checked.
+        #
         # The parser only ever builds a Call with a Variable, Get, or Super
         # callee (see Parser.call_head()/finish_property_access()); pick
         # whichever token that callee carries as this call's error location.
@@ -264,6 +668,25 @@ class Interpreter(ExprVisitor, StmtVisitor):
         else:
             name_token = expr.callee.name
 
+        if type(expr.callee) is Get:
+            callee, instance = self.method_callee(self.evaluate(expr.callee.object), expr.callee)
+        else:
+            callee, instance = self.evaluate(expr.callee), None
+        arguments = [self.evaluate(argument) for argument in expr.arguments]
+        self.check_call(callee, arguments, name_token)
+        return callee, instance, arguments, name_token
+
+    def method_callee(self, obj: Any, expr: Get) -> Tuple[Any, Optional[IqaloxInstance]]:
+        # `instance.method args`: the method found through the Get's cache,
+        # called on the instance directly.
+        if isinstance(obj, IqaloxInstance):
+            slot, method = self.property_cache(expr).lookup(obj.shape, expr.name.lexeme)
+            if method is not None:
+                return method, obj
+        return self.get_property(obj, expr), None
+
+    @staticmethod
+    def check_call(callee: Any, arguments: List[Any], name_token: Token) -> None:
         if not isinstance(callee, IqaloxCallable):
             raise IqaloxRuntimeError(name_token, f"'{name_token.lexeme}' is not callable.")
 
@@ -272,40 +695,71 @@ class Interpreter(ExprVisitor, StmtVisitor):
                 name_token, f'Expected {callee.arity()} argument(s) but got {len(arguments)}.'
             )
 
+    def invoke(self, callee: IqaloxCallable, instance: Optional[IqaloxInstance], arguments: List[Any],
+               name_token: Token) -> Any:
         previous_call_token = self.native_call_token
         self.native_call_token = name_token
         try:
-            return callee.call(self, arguments)
+            if instance is None:
+                return callee.call(self, arguments)
+            return callee.call_method(self, instance, arguments)
+        except RecursionError:
+            # Python's own stack ran out under this call (raising again from
+            # here just lets the next call out try): report it at the call.
+            raise IqaloxRuntimeError(name_token, 'Stack overflow.') from None
         finally:
             self.native_call_token = previous_call_token
 
     def visit_get_expr(self, expr: Get) -> Any:
-        obj = self.evaluate(expr.object)
+        return self.get_property(self.evaluate(expr.object), expr)
+
+    def get_property(self, obj: Any, expr: Get) -> Any:
         if isinstance(obj, IqaloxInstance):
-            return obj.get(expr.name)
+            return obj.get(expr.name, self.property_cache(expr))
         raise IqaloxRuntimeError(expr.name, 'Only instances have properties.')
 
+    @staticmethod
+    def property_cache(expr: Get) -> PropertyCache:
+        cache = expr.cache
+        if cache is None:
+            cache = expr.cache = PropertyCache()
+        return cache
+
     def visit_set_expr(self, expr: Set) -> Any:
         obj = self.evaluate(expr.object)
         if not isinstance(obj, IqaloxInstance):
             raise IqaloxRuntimeError(expr.name, 'Only instances have fields.')
-        value = self.evaluate(expr.value)
-        obj.set(expr.name, value)
+        return self.store_property(obj, expr, self.evaluate(expr.value))
+
+    @staticmethod
+    def store_property(obj: IqaloxInstance, expr: Set, value: Any) -> Any:
+        cache = expr.cache
+        if cache is None:
+            cache = expr.cache = StoreCache()
+        obj.set(expr.name, value, cache)
         return value
 
     def visit_self_expr(self, expr: Self) -> Any:
-        return self.environment.get(expr.keyword)
+        if expr.depth is None:
+            return self.globals.get(expr.keyword)
+        return self.environment.get_at(expr.depth, expr.slot, expr.keyword)
 
     def visit_super_expr(self, expr: Super) -> Any:
-        superclass = self.environment.get(expr.keyword)
-        instance = self.environment.get(Token(TokenType.SELF, 'self', None, expr.keyword.line, expr.keyword.column))
+        if expr.depth is None:
+            return self.globals.get(expr.keyword)
+        superclass = self.environment.get_at(expr.depth, expr.slot, expr.keyword)
+        # `self` is always bound one scope inside `super` (see
+        # visit_class_stmt and IqaloxFunction.bind), in that scope's only slot.
+        instance = self.environment.get_at(
+            expr.depth - 1, 0, Token(TokenType.SELF, 'self', None, expr.keyword.line, expr.keyword.column)
+        )
         method = superclass.find_method(expr.method.lexeme)
         if method is None:
             raise IqaloxRuntimeError(expr.method, f"Undefined property '{expr.method.lexeme}'.")
         return method.bind(instance)
 
     def visit_variable_expr(self, expr: Variable) -> Any:
-        return self.environment.get(expr.name)
+        return self.lookup_variable(expr)
 
     def visit_binary_expr(self, expr: Binary) -> Any:
         left = self.evaluate(expr.left)
@@ -323,42 +777,65 @@ class Interpreter(ExprVisitor, StmtVisitor):
             return self.evaluate(expr.right)
 
         right = self.evaluate(expr.right)
-
+        # (A recursive call made by an operand may have run, and so
+        # rewritten, this same node already.)
+        if left.__class__ is float and right.__class__ is float and expr.__class__ is Binary \
+                and not expr.deoptimized:
+            specialized = SPECIALIZED.get(token_type)
+            if specialized is not None:
+                expr.__class__ = specialized
+                self.specializations.specialized += 1
+        return self.apply_binary(expr.operator, left, right)
+
+    def deoptimize(self, expr: FloatBinary, left: Any, right: Any) -> Any:
+        # A specialized Binary's operands weren't both floats after all: it
+        # goes back to being generic for good, starting with these operands.
+        if expr.__class__ is not Binary:
+            expr.__class__ = Binary
+            expr.deoptimized = True
+            self.specializations.deoptimized += 1
+        return self.apply_binary(expr.operator, left, right)
+
+    def apply_binary(self, operator: Token, left: Any, right: Any) -> Any:
+        # Every Binary operator that evaluates both of its operands.
+        token_type = operator.type
         if token_type == TokenType.BANG_EQUAL:
             return not self.is_equal(left, right)
         elif token_type == TokenType.EQUAL_EQUAL:
             return self.is_equal(left, right)
+        elif is_elementwise(token_type, left, right):
+            return elementwise(operator, left, right)
         elif token_type == TokenType.GREATER:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left > right
         elif token_type == TokenType.GREATER_EQUAL:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left >= right
         elif token_type == TokenType.LESS:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left < right
         elif token_type == TokenType.LESS_EQUAL:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left <= right
         elif token_type == TokenType.MINUS:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left - right
         elif token_type == TokenType.PLUS:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left + right
         elif token_type == TokenType.SLASH:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             if right == 0:
-                raise IqaloxRuntimeError(expr.operator, 'Division by zero.')
+                raise IqaloxRuntimeError(operator, 'Division by zero.')
             return left / right
         elif token_type == TokenType.STAR:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left * right
         elif token_type == TokenType.PERCENT:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left % right
         elif token_type == TokenType.POWER:
-            self.check_number_operands(expr.operator, left, right)
+            self.check_number_operands(operator, left, right)
             return left ** right
 
         return None
@@ -1,12 +1,25 @@
+import re
 import sys
+import time
+from mmap import mmap, ACCESS_READ
 from sys import argv
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 
-from scanner import Scanner
-from parser import Parser
-from token import Token, TokenType
+from scanner import Scanner, stream_tokens
+from pratt_parser import PrattParser
+from resolver import Resolver
+from optimizer import Optimizer
+from token import Token, TokenType, Source
 from interpreter import Interpreter
+from statement import Function, For
+from tiering import describe
+from closure_compiler import ClosureInterpreter
+from python_compiler import PythonInterpreter
+from stack_interpreter import StackInterpreter
+from vm import VM
 from error import IqaloxRuntimeError
+from parse_cache import ParseCache
+import bytecode
 
 # scanner.py/parser.py/interpreter.py each do a lazy `import iqalox` to call
 # back into Iqalox.error()/runtime_error() (avoiding a circular top-level
@@ -18,15 +31,59 @@ from error import IqaloxRuntimeError
 # this module under both names keeps it a single, shared module either way.
 sys.modules.setdefault('iqalox', sys.modules[__name__])
 
+USAGE = "Usage: iqalox [--engine=tree|closure|python|stack|vm] [--compile=out.iqbc] [--no-cache] [--cache-stats] " \
+        "[--specialization-stats] [--tier-threshold=N] [--tier-stats] [--no-memo] [--memo-stats] " \
+        "[--workers=N] [--stream] [script]"
+
+# Selectable with `--engine=`: `tree` is the visitor-based tree-walker,
+# `closure` compiles the AST into nested Python closures first (see
+# closure_compiler.py), `python` lowers it to CPython code objects (see
+# python_compiler.py), `stack` runs the tree-walker on an explicit stack of
+# its own instead of Python's (see stack_interpreter.py), and `vm` compiles
+# it to vm/'s bytecode and runs that on vm.py's dispatch loop. A script that
+# is itself a `.iqbc` bytecode file always runs on the `vm` engine.
+ENGINES: Dict[str, Callable[[], Any]] = {
+    'tree': Interpreter,
+    'closure': ClosureInterpreter,
+    'python': PythonInterpreter,
+    'stack': StackInterpreter,
+    'vm': VM,
+}
+
 
 class Iqalox:
     interpreter = Interpreter()
     had_error = False
     had_runtime_error = False
-    # The source of the program/line currently being run, split into lines,
-    # so error reporting can show the offending line itself rather than just
-    # a line number. Reset at the top of every run() call.
-    source_lines: List[str] = []
+    # The program/line currently being run, so error reporting can show the
+    # offending line itself rather than just a line number, and the offset
+    # each of its lines starts at -- only worked out once an error needs
+    # them. Reset at the top of every run() call; None while streaming a
+    # script, whose lines are read back from `source_path`.
+    source: Optional[Source] = ''
+    line_starts: Optional[List[int]] = None
+    source_path: Optional[str] = None
+    # run_file()'s parse cache (see parse_cache.py): `--no-cache` turns it
+    # off, `--cache-stats` reports what it saved.
+    use_cache = True
+    cache_stats = False
+    # `--specialization-stats`: report how many Binary nodes the tree-walker
+    # specialized and deoptimized (see specialization.py).
+    specialization_stats = False
+    # `--tier-threshold=N` and `--tier-stats`: when the tree-walker compiles
+    # a hot function or loop, and printing each one as it does (see
+    # tiering.py).
+    tier_threshold: Optional[int] = None
+    tier_stats = False
+    # `--no-memo` and `--memo-stats`: turning off memoized calls of pure
+    # functions, and reporting their hits and misses (see memoization.py).
+    memoize = True
+    memo_stats = False
+    # `--workers=N`: how many processes map/filter may share a big vector's
+    # work out to (see parallel.py); 1 keeps it all in this one.
+    workers = 1
+    # `--stream`: see run_stream().
+    stream = False
 
     @staticmethod
     def error(token: Token, message: str) -> None:
@@ -56,33 +113,160 @@ class Iqalox:
         # Best-effort: silently skip whenever there's nothing sensible to
         # show (no column info, or a line number outside the source we have
         # -- e.g. an EOF token on a blank final line).
-        if column is None or line < 1 or line > len(Iqalox.source_lines):
+        source_line = None if column is None else Iqalox.source_line(line)
+        if source_line is None:
             return
-        source_line = Iqalox.source_lines[line - 1]
         print(f"    {source_line}")
         underline_width = max(len(lexeme), 1)
         print(f"    {' ' * (column - 1)}{'^' * underline_width}")
 
-    def run(self, source: str) -> None:
-        Iqalox.source_lines = source.splitlines()
-        scanner = Scanner(source)
-        tokens = scanner.scan_tokens()
-        parser = Parser(tokens)
-        statements = parser.parse()
+    @staticmethod
+    def source_line(line: int) -> Optional[str]:
+        source = Iqalox.source
+        if source is None:
+            # Streaming: found by reading the script again up to that line,
+            # rather than keeping every line in memory on the chance of an
+            # error.
+            with open(Iqalox.source_path, encoding='utf-8', newline='\n') as f:
+                for number, source_line in enumerate(f, 1):
+                    if number == line:
+                        return source_line.rstrip('\r\n')
+            return None
+
+        encoded = not isinstance(source, str)
+        if Iqalox.line_starts is None:
+            newline = re.compile(b'\n' if encoded else '\n')
+            Iqalox.line_starts = [0] + [match.end() for match in newline.finditer(source)]
+        line_starts = Iqalox.line_starts
+        # (Nothing follows a final line break, not even an empty line.)
+        if not 1 <= line <= len(line_starts) or line_starts[line - 1] == len(source):
+            return None
+        end = line_starts[line] - 1 if line < len(line_starts) else len(source)
+        source_line = source[line_starts[line - 1]:end]
+        return (source_line.decode(errors='replace') if encoded else source_line).rstrip('\r')
+
+    def run(self, source: Source, cache: Optional[ParseCache] = None) -> None:
+        Iqalox.source = source
+        Iqalox.line_starts = None
+        statements = None if cache is None else cache.load()
+        if statements is None:
+            start = time.perf_counter()
+            scanner = Scanner(source)
+            tokens = scanner.scan_tokens()
+            parser = PrattParser(tokens)
+            statements = parser.parse()
+
+            if self.had_error:
+                return
+            if cache is not None:
+                cache.store(statements, time.perf_counter() - start)
+
+        Resolver().resolve(statements)
 
         if self.had_error:
             return
 
+        Optimizer().optimize(statements)
         Iqalox.interpreter.interpret(statements)
 
     def run_file(self, path: str) -> None:
-        with open(path) as f:
-            self.run(f.read())
+        if Iqalox.stream and not self.is_bytecode(path):
+            self.run_stream(path)
+        else:
+            data = self.read_source(path)
+            try:
+                if data[:len(bytecode.MAGIC)] == bytecode.MAGIC:
+                    self.run_bytecode(data[:], path)
+                else:
+                    cache = ParseCache(path, data) if Iqalox.use_cache else None
+                    self.run(data, cache)
+                    if cache is not None and Iqalox.cache_stats:
+                        cache.report()
+            finally:
+                if isinstance(data, mmap):
+                    Iqalox.source = ''
+                    data.close()
+        if Iqalox.specialization_stats and isinstance(Iqalox.interpreter, Interpreter):
+            Iqalox.interpreter.specializations.report()
+        if Iqalox.memo_stats and isinstance(Iqalox.interpreter, Interpreter):
+            Iqalox.interpreter.memoization.report()
         if self.had_error:
             exit(65)
         if self.had_runtime_error:
             exit(70)
 
+    @staticmethod
+    def read_source(path: str) -> Source:
+        # The file's bytes, memory-mapped rather than read in: the scanner
+        # works on them as they are, and nothing but the lexemes the parser
+        # keeps is ever decoded or copied. (An empty file can't be mapped,
+        # and neither can something like a pipe.)
+        with open(path, 'rb') as f:
+            try:
+                return mmap(f.fileno(), 0, access=ACCESS_READ)
+            except (ValueError, OSError):
+                return f.read()
+
+    @staticmethod
+    def is_bytecode(path: str) -> bool:
+        with open(path, 'rb') as f:
+            return f.read(len(bytecode.MAGIC)) == bytecode.MAGIC
+
+    def run_stream(self, path: str) -> None:
+        # Scans, parses and runs the script a top-level declaration at a
+        # time (see scanner.stream_tokens()), so output starts as soon as
+        # the first one is read and memory only ever holds about one of
+        # them (plus whatever the program itself keeps). Unlike run(), what
+        # comes before a parse error has already run by the time it's
+        # found; after one, the rest is still parsed for errors but no
+        # longer run. Bypasses the parse cache.
+        Iqalox.source = None
+        Iqalox.source_path = path
+        resolver = Resolver()
+        optimizer = Optimizer()
+        with open(path, encoding='utf-8', newline='') as f:
+            for tokens in stream_tokens(f):
+                for statement in PrattParser(tokens).declarations():
+                    if self.had_error:
+                        continue
+                    resolver.resolve([statement])
+                    if self.had_error:
+                        continue
+                    optimizer.optimize([statement])
+                    if not Iqalox.interpreter.interpret([statement]):
+                        return
+
+    def run_bytecode(self, data: bytes, path: str) -> None:
+        try:
+            script = bytecode.loads(data, path)
+        except bytecode.BytecodeError as error:
+            print(error)
+            Iqalox.had_error = True
+            return
+        if not isinstance(Iqalox.interpreter, VM):
+            Iqalox.interpreter = VM()
+        try:
+            Iqalox.interpreter.run_script(script)
+        except IqaloxRuntimeError as error:
+            Iqalox.runtime_error(error)
+
+    def compile_file(self, path: str, output: str) -> None:
+        # iqaloxc's job, for the PoC: compile once, run the .iqbc later (on
+        # this VM or vm/'s iqaloxvm) without re-parsing.
+        source = Iqalox.source = self.read_source(path)
+        Iqalox.line_starts = None
+        statements = PrattParser(Scanner(source).scan_tokens()).parse()
+        if not self.had_error:
+            # Resolved only for its errors, the same ones run() reports
+            # before the optimizer drops any dead code they're in.
+            Resolver().resolve(statements)
+        if not self.had_error:
+            Optimizer().optimize(statements)
+            chunk = VM().compiler.compile(statements)
+        if self.had_error:
+            exit(65)
+        bytecode.write(chunk, output)
+
     def run_prompt(self) -> None:
         while True:
             try:
@@ -94,12 +278,72 @@ class Iqalox:
             self.had_error = False
 
 
+def usage() -> None:
+    print(USAGE)
+    exit(64)
+
+
+def report_promotion(node: Union[Function, For], count: int) -> None:
+    # `--tier-stats`: one line on stderr per function or loop compiled.
+    unit = 'calls' if isinstance(node, Function) else 'iterations'
+    print(f'tiering: compiled {describe(node)} after {count} {unit}', file=sys.stderr)
+
+
 def main(args) -> None:
-    if len(args) > 1:
-        print("Usage: iqalox [script]")
-        exit(64)
-    elif len(args) == 1:
-        Iqalox().run_file(args[0])
+    paths = []
+    output = None
+    for arg in args:
+        if arg.startswith('--engine='):
+            engine = arg[len('--engine='):]
+            if engine not in ENGINES:
+                usage()
+            Iqalox.interpreter = ENGINES[engine]()
+        elif arg.startswith('--compile='):
+            output = arg[len('--compile='):]
+        elif arg == '--no-cache':
+            Iqalox.use_cache = False
+        elif arg == '--cache-stats':
+            Iqalox.cache_stats = True
+        elif arg == '--specialization-stats':
+            Iqalox.specialization_stats = True
+        elif arg.startswith('--tier-threshold='):
+            threshold = arg[len('--tier-threshold='):]
+            if not threshold.isdigit():
+                usage()
+            Iqalox.tier_threshold = int(threshold)
+        elif arg == '--tier-stats':
+            Iqalox.tier_stats = True
+        elif arg == '--no-memo':
+            Iqalox.memoize = False
+        elif arg == '--memo-stats':
+            Iqalox.memo_stats = True
+        elif arg.startswith('--workers='):
+            workers = arg[len('--workers='):]
+            if not workers.isdigit() or int(workers) < 1:
+                usage()
+            Iqalox.workers = int(workers)
+        elif arg == '--stream':
+            Iqalox.stream = True
+        elif arg.startswith('--'):
+            usage()
+        else:
+            paths.append(arg)
+
+    if isinstance(Iqalox.interpreter, Interpreter):
+        tiering = Iqalox.interpreter.tiering
+        if Iqalox.tier_threshold is not None:
+            tiering.threshold = Iqalox.tier_threshold
+        if Iqalox.tier_stats:
+            tiering.on_promote = report_promotion
+        Iqalox.interpreter.memoization.enabled = Iqalox.memoize
+        Iqalox.interpreter.parallel.workers = Iqalox.workers
+
+    if len(paths) > 1 or output is not None and len(paths) != 1:
+        usage()
+    elif output is not None:
+        Iqalox().compile_file(paths[0], output)
+    elif len(paths) == 1:
+        Iqalox().run_file(paths[0])
     else:
         Iqalox().run_prompt()
 
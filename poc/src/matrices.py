@@ -0,0 +1,160 @@
+import operator
+from typing import Any, List, Optional, Tuple
+
+from callable import NativeFunction
+from error import IqaloxRuntimeError
+from vectors import VECTOR_TYPES, Matrix, NumericVector, as_numeric, make_matrix, make_vector, numpy
+
+# transpose/matmul/solve/inverse/det: the 0.2 matrix stdlib's natives, over
+# matrices as 0.2 has them -- vectors of equal-length vectors of numbers,
+# `[[1, 2], [3, 4]]`. Each packs its matrices into one buffer of doubles
+# and works on that whole (in NumPy when it's installed, in plain Python
+# otherwise), rather than an element at a time in Iqalox. A matrix it
+# returns is a Matrix (see vectors.py), which keeps that buffer, so
+# chaining them -- `det (matmul a, transpose a)` -- packs only `a`.
+
+
+def _pack(interpreter: Any, name: str, which: str, value: Any) -> Any:
+    # The matrix's buffer, in the shape make_matrix() takes.
+    if value.__class__ is Matrix:
+        return value.packed
+    rows = [as_numeric(row) for row in value] if isinstance(value, VECTOR_TYPES) else None
+    if (not rows or any(row.__class__ is not NumericVector for row in rows)
+            or not len(rows[0]) or any(len(row) != len(rows[0]) for row in rows)):
+        raise IqaloxRuntimeError(
+            interpreter.native_call_token,
+            f"{which} to '{name}' must be a matrix: a vector of equal-length, non-empty vectors of numbers."
+        )
+    if numpy is not None:
+        return numpy.array([row.data for row in rows], dtype=float)
+    return [row.tolist() for row in rows]
+
+
+def _shape(packed: Any) -> Tuple[int, int]:
+    return len(packed), len(packed[0])
+
+
+def _square(interpreter: Any, name: str, packed: Any) -> int:
+    rows, columns = _shape(packed)
+    if rows != columns:
+        raise IqaloxRuntimeError(
+            interpreter.native_call_token, f"Matrix passed to '{name}' must be square, got {rows}x{columns}."
+        )
+    return rows
+
+
+def _singular(interpreter: Any) -> IqaloxRuntimeError:
+    return IqaloxRuntimeError(interpreter.native_call_token, 'Matrix is singular.')
+
+
+def _native_transpose(interpreter: Any, arguments: List[Any]) -> Matrix:
+    packed = _pack(interpreter, 'transpose', 'Argument', arguments[0])
+    if numpy is not None:
+        return make_matrix(packed.T)
+    return make_matrix([list(column) for column in zip(*packed)])
+
+
+def _native_matmul(interpreter: Any, arguments: List[Any]) -> Matrix:
+    left = _pack(interpreter, 'matmul', 'First argument', arguments[0])
+    right = _pack(interpreter, 'matmul', 'Second argument', arguments[1])
+    (rows, inner), (right_rows, columns) = _shape(left), _shape(right)
+    if inner != right_rows:
+        raise IqaloxRuntimeError(
+            interpreter.native_call_token, f"Can't multiply a {rows}x{inner} matrix by a {right_rows}x{columns} one."
+        )
+    if numpy is not None:
+        return make_matrix(left @ right)
+    right_columns = list(zip(*right))
+    return make_matrix([
+        [sum(map(operator.mul, row, column)) for column in right_columns] for row in left
+    ])
+
+
+def _native_det(interpreter: Any, arguments: List[Any]) -> float:
+    packed = _pack(interpreter, 'det', 'Argument', arguments[0])
+    size = _square(interpreter, 'det', packed)
+    if numpy is not None:
+        return float(numpy.linalg.det(packed))
+    determinant, _ = _eliminate(packed, [[] for _ in range(size)])
+    return determinant
+
+
+def _native_inverse(interpreter: Any, arguments: List[Any]) -> Matrix:
+    packed = _pack(interpreter, 'inverse', 'Argument', arguments[0])
+    size = _square(interpreter, 'inverse', packed)
+    if numpy is not None:
+        try:
+            return make_matrix(numpy.linalg.inv(packed))
+        except numpy.linalg.LinAlgError:
+            raise _singular(interpreter)
+    identity = [[1.0 if row == column else 0.0 for column in range(size)] for row in range(size)]
+    _, inverse = _eliminate(packed, identity)
+    if inverse is None:
+        raise _singular(interpreter)
+    return make_matrix(inverse)
+
+
+def _native_solve(interpreter: Any, arguments: List[Any]) -> Any:
+    # `solve a, b`: the x for which `matmul a, x` is b -- a vector of
+    # numbers for a vector, a matrix (one solution per column) for a
+    # matrix.
+    packed = _pack(interpreter, 'solve', 'First argument', arguments[0])
+    size = _square(interpreter, 'solve', packed)
+    right = as_numeric(arguments[1])
+    is_vector = right.__class__ is NumericVector
+    if is_vector:
+        # (Without NumPy, as the one-column matrix it is to _eliminate().)
+        right_packed = right.data if numpy is not None else [[value] for value in right]
+    else:
+        right_packed = _pack(interpreter, 'solve', 'Second argument', right)
+    if len(right_packed) != size:
+        raise IqaloxRuntimeError(
+            interpreter.native_call_token,
+            f"Can't solve a {size}x{size} system for {len(right_packed)} right-hand side row(s)."
+        )
+    if numpy is not None:
+        try:
+            solution = numpy.linalg.solve(packed, right_packed)
+        except numpy.linalg.LinAlgError:
+            raise _singular(interpreter)
+        return NumericVector(solution) if is_vector else make_matrix(solution)
+    _, solution = _eliminate(packed, right_packed)
+    if solution is None:
+        raise _singular(interpreter)
+    if is_vector:
+        return make_vector([row[0] for row in solution])
+    return make_matrix(solution)
+
+
+def _eliminate(matrix: List[List[float]], right: List[List[float]]) -> Tuple[float, Optional[List[List[float]]]]:
+    # Gauss-Jordan elimination with partial pivoting on [matrix | right]:
+    # the matrix's determinant, and what right becomes once the matrix is
+    # the identity -- None, with a determinant of 0, if it's singular.
+    size = len(matrix)
+    rows = [list(row) + list(extra) for row, extra in zip(matrix, right)]
+    determinant = 1.0
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda index: abs(rows[index][column]))
+        if rows[pivot][column] == 0:
+            return 0.0, None
+        if pivot != column:
+            rows[column], rows[pivot] = rows[pivot], rows[column]
+            determinant = -determinant
+        pivot_row = rows[column]
+        value = pivot_row[column]
+        determinant *= value
+        for index in range(size):
+            factor = rows[index][column] / value
+            if index != column and factor:
+                rows[index] = [element - factor * pivot for element, pivot in zip(rows[index], pivot_row)]
+    # Only the diagonal is left of the matrix, to divide right through by.
+    return determinant, [[element / row[index] for element in row[size:]] for index, row in enumerate(rows)]
+
+
+NATIVES = (
+    NativeFunction('transpose', 1, _native_transpose, pure=True),
+    NativeFunction('matmul', 2, _native_matmul, pure=True),
+    NativeFunction('solve', 2, _native_solve, pure=True),
+    NativeFunction('inverse', 1, _native_inverse, pure=True),
+    NativeFunction('det', 1, _native_det, pure=True),
+)
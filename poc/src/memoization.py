@@ -0,0 +1,118 @@
+import math
+import sys
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from completion import CompletionType
+from vectors import Matrix, NumericVector, PersistentVector
+
+# How many results each pure function remembers, the least recently used
+# making way for the next.
+MEMO_SIZE = 4096
+
+# The longest vector a memo key is made of. A key copies every element, so
+# a call with a longer one -- a big vector, or a slice of one being halved
+# down (see NumericVector.slice()) -- would pay for that copy, and the table
+# keep it alive, for a hit it's unlikely to ever get.
+MEMO_VECTOR_LENGTH = 256
+
+# What Memoization.lookup() finds for a call it hasn't seen.
+MISSING = object()
+
+# A call's arguments as a memo key: each value as it is if it can only equal
+# values of its own type, tagged otherwise -- True is 1.0 as a dict key,
+# and 0.0 is -0.0 (which 1 / x tells apart).
+_NEGATIVE_ZERO = (float, '-0')
+
+
+# Memoized calls of pure functions (see purity.py) for the engines that run
+# IqaloxFunctions themselves: IqaloxFunction.run() and the stack engine's
+# StackInterpreter.function_frame() look a pure function's call up in the
+# function's own LRU table, `function.memo`, before running it, and
+# remember what it returned after. A chain of tail calls is remembered
+# whole: each call along it returned the same value. A call with an
+# argument that isn't a number, string, bool, nil or vector of those (of
+# up to MEMO_VECTOR_LENGTH elements) -- that a key can't be made of -- just
+# runs, and so does one that raises.
+#
+# The table is per function object, not per declaration: a nested function
+# made again is a new closure, over values its last one might not have had.
+class Memoization:
+    __slots__ = ('enabled', 'size', 'hits', 'misses')
+
+    def __init__(self, enabled: bool = True, size: int = MEMO_SIZE) -> None:
+        self.enabled = enabled
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, function: Any, arguments: List[Any]) -> Tuple[Optional[OrderedDict], Any, Any]:
+        # (table, key, value): the value MISSING unless the call is a hit,
+        # and the table None if the call can't be remembered.
+        key = memo_key(arguments, MEMO_VECTOR_LENGTH)
+        if key is None:
+            return None, None, MISSING
+        table = function.memo
+        if table is None:
+            table = function.memo = OrderedDict()
+        value = table.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            table.move_to_end(key)
+        return table, key, value
+
+    def remember(self, pending: List[Tuple[OrderedDict, Any]], value: Any) -> None:
+        for table, key in pending:
+            table[key] = value
+            if len(table) > self.size:
+                table.popitem(last=False)
+
+    def run(self, function: Any, interpreter: Any, arguments: List[Any]) -> Any:
+        # IqaloxFunction.run() for a pure function, and any pure function
+        # it calls in tail position.
+        pending = []
+        while True:
+            table, key, value = self.lookup(function, arguments)
+            if value is not MISSING:
+                break
+            if table is not None:
+                pending.append((table, key))
+            completion = function.enter(interpreter, None, arguments)
+            if completion is None or completion.type is not CompletionType.TAIL_CALL:
+                value = None if completion is None else completion.call_result()
+                break
+            function, _, arguments = completion.value
+        self.remember(pending, value)
+        return value
+
+    def report(self) -> None:
+        # One line on stderr, out of the way of the program's own output.
+        print(f'memoization: {self.hits} hits, {self.misses} misses', file=sys.stderr)
+
+
+def memo_key(arguments: List[Any], longest: float = math.inf) -> Optional[Tuple]:
+    # None if there's a value among the arguments a key can't be made of, or
+    # a vector longer than `longest`.
+    try:
+        return tuple([_value_key(value, longest) for value in arguments])
+    except TypeError:
+        return None
+
+
+def _value_key(value: Any, longest: float) -> Any:
+    kind = value.__class__
+    if kind is float:
+        return _NEGATIVE_ZERO if value == 0 and math.copysign(1.0, value) < 0 else value
+    if kind is str or value is None:
+        return value
+    if kind is bool:
+        return bool, value
+    if kind is list or kind is NumericVector or kind is Matrix or kind is PersistentVector:
+        # A numeric vector equals the list vector of its numbers, and a
+        # matrix the list vector of its rows.
+        if len(value) > longest:
+            raise TypeError(value)
+        return list, tuple([_value_key(item, longest) for item in value])
+    raise TypeError(value)
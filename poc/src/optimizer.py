@@ -0,0 +1,384 @@
+import math
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from expression import Expr, ExprVisitor, Binary, Logical, Unary, Literal, Grouping, Ternary, Vector, Variable, \
+    Assign, Break, Continue, Ignore, Call, Get, Index, Slice, Set, Self, Super, Spread
+from statement import Stmt, StmtVisitor, Expression, Var, Block, For, Function, Return, Class
+from token import TokenType
+from error import IqaloxRuntimeError
+from interpreter import Interpreter
+from purity import Purity
+
+# The operators a Binary of two number literals folds through, as
+# Interpreter.apply_binary() would apply them. Folding stops at numbers:
+# every engine agrees on what `2 * 3` is, not on what `true * 3` is.
+_NUMERIC_OPERATORS = frozenset({
+    TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL, TokenType.MINUS,
+    TokenType.PLUS, TokenType.SLASH, TokenType.STAR, TokenType.PERCENT, TokenType.POWER,
+})
+
+# What a folded result may be: something a Literal can stand for.
+_FOLDABLE_RESULTS = (bool, float, str, type(None))
+
+# A name in one of the Optimizer's scopes: the order it was declared in
+# within that scope, and the value it always holds -- or None if it isn't a
+# constant.
+_Binding = Tuple[int, Optional[Literal]]
+
+
+# Static pass run after the Resolver, before the program is run (or
+# compiled): rewrites the AST in place so work that would be the same on
+# every run is done once, here.
+#
+# - Constant folding: an operator, ternary, `??` or grouping whose operands
+#   are all literals is replaced by the literal it evaluates to.
+# - Constant propagation: a read of an immutable `var` whose initializer
+#   folded to a literal becomes that literal, which can fold in turn.
+# - Dead code elimination: statements after a `break`, `continue` or
+#   `return` in the same block or function body are dropped.
+# - Counted loops: a `for` that just counts an integer up to a fixed bound
+#   is marked for the engines to run as one (see count_loop()).
+# - Pure functions: a function whose calls can be memoized is marked as
+#   such, once the rest of the top-level statements it was given are
+#   optimized (see purity.py).
+#
+# Anything that would raise when run (`1 / 0`, `-"text"`) is left as it is,
+# so the error is still raised at run time, at its own token. Scopes are
+# tracked like the Resolver's, down to resolving function bodies only once
+# their scope ends -- but such a body never sees a constant declared after
+# its function, which isn't the variable it reads (see Resolver.defer()).
+class Optimizer(ExprVisitor, StmtVisitor):
+    def __init__(self) -> None:
+        # Innermost last, like Resolver.scopes; `globals` is the top level,
+        # and stays across optimize() calls (see Iqalox.run_stream()).
+        self.scopes: List[Dict[str, _Binding]] = []
+        self.globals: Dict[str, _Binding] = {}
+        # How many of each scope's names, in declaration order, the code
+        # being optimized can rely on having been declared; None for all of
+        # them.
+        self.visible: List[Optional[int]] = []
+        self.deferred: List[List[Callable[[], None]]] = []
+        # Folding goes through the tree-walker's own operators.
+        self.interpreter = Interpreter()
+        self.purity = Purity(self.interpreter.globals)
+
+    def optimize(self, statements: List[Stmt]) -> None:
+        for statement in statements:
+            self.optimize_stmt(statement)
+        if not self.scopes:
+            # Every function body in them is optimized by now.
+            self.purity.analyze(statements)
+
+    def optimize_body(self, statements: List[Stmt]) -> None:
+        # A block's or function's statements. (At the top level whatever
+        # follows a stray `break` never runs either, but it's left for the
+        # vm engine's compile errors to cover.)
+        self.optimize(statements)
+        del statements[_reachable(statements):]
+
+    def optimize_stmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def optimize_expr(self, expr: Optional[Expr]) -> Optional[Expr]:
+        return None if expr is None else expr.accept(self)
+
+    def begin_scope(self) -> None:
+        self.scopes.append({})
+        self.visible.append(None)
+        self.deferred.append([])
+
+    def end_scope(self) -> None:
+        pending = self.deferred[-1]
+        while pending:
+            pending.pop(0)()
+        self.deferred.pop()
+        self.visible.pop()
+        self.scopes.pop()
+
+    def declare(self, name: str, constant: Optional[Literal] = None) -> None:
+        scope = self.scopes[-1] if self.scopes else self.globals
+        # A second global of the same name is a runtime error that leaves
+        # the first one in place.
+        if scope is self.globals and name in scope:
+            return
+        scope[name] = (len(scope), constant)
+
+    def constant(self, name: str) -> Optional[Literal]:
+        for scope, visible in zip(reversed(self.scopes), reversed(self.visible)):
+            if name in scope:
+                order, constant = scope[name]
+                return constant if visible is None or order < visible else None
+        binding = self.globals.get(name)
+        return None if binding is None else binding[1]
+
+    def defer(self, optimization: Callable[[], None]) -> None:
+        if not self.scopes:
+            optimization()
+            return
+        # What's been declared so far is all the body can count on.
+        visible = [len(scope) if count is None else count for scope, count in zip(self.scopes, self.visible)]
+
+        def run() -> None:
+            outer = self.visible
+            self.visible = visible + [None] * (len(self.scopes) - len(visible))
+            try:
+                optimization()
+            finally:
+                self.visible = outer
+        self.deferred[-1].append(run)
+
+    def optimize_function(self, function: Function) -> None:
+        self.begin_scope()
+        for param in function.params:
+            self.declare(param.lexeme)
+        self.optimize_body(function.body)
+        self.end_scope()
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self.begin_scope()
+        self.optimize_body(stmt.statements)
+        self.end_scope()
+
+    def visit_expression_stmt(self, stmt: Expression) -> None:
+        stmt.expression = self.optimize_expr(stmt.expression)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        stmt.initializer = self.optimize_expr(stmt.initializer)
+        constant = None
+        if not stmt.is_mutable and isinstance(stmt.initializer, Literal):
+            constant = stmt.initializer
+        self.declare(stmt.name.lexeme, constant)
+
+    def visit_for_stmt(self, stmt: For) -> None:
+        self.begin_scope()
+        if stmt.initializer is not None:
+            self.optimize_stmt(stmt.initializer)
+        stmt.condition = self.optimize_expr(stmt.condition)
+        stmt.increment = self.optimize_expr(stmt.increment)
+        self.optimize_stmt(stmt.body)
+        self.end_scope()
+        self.count_loop(stmt)
+
+    @staticmethod
+    def count_loop(stmt: For) -> None:
+        # Marks a counted loop, `for (var i mut = <number>; i < <bound>;
+        # ++i)` (or `<=`), whose body never assigns `i` and whose bound is
+        # a literal or an immutable variable: one the engines can run over
+        # a range of integers rather than evaluating the condition and
+        # increment each time round. The start and bound still have to turn
+        # out to be integers they can count with exactly (see
+        # Interpreter.counted_range()); when they don't, or when a global
+        # bound turns out to be mutable, the loop runs as any other does.
+        initializer, condition, increment = stmt.initializer, stmt.condition, stmt.increment
+        if type(initializer) is not Var or not initializer.is_mutable or type(initializer.initializer) is not Literal:
+            return
+        name = initializer.name.lexeme
+        if type(condition) is not Binary or condition.operator.type not in (TokenType.LESS, TokenType.LESS_EQUAL):
+            return
+        bound = condition.right
+        if not (type(bound) is Literal or type(bound) is Variable and (bound.depth is None or not bound.is_mutable)):
+            return
+        if not _is_counter(condition.left, name) or type(increment) is not Unary \
+                or increment.operator.type != TokenType.PLUS_PLUS or not _is_counter(increment.right, name):
+            return
+        reads, writes = _uses(stmt.body, name)
+        if not writes:
+            stmt.counted = True
+            stmt.counter_read = reads
+
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self.declare(stmt.name.lexeme)
+        self.defer(lambda: self.optimize_function(stmt))
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        stmt.value = self.optimize_expr(stmt.value)
+
+    def visit_class_stmt(self, stmt: Class) -> None:
+        # The superclass stays a Variable: it's the token a "Superclass must
+        # be a class." error is reported at.
+        self.declare(stmt.name.lexeme)
+        self.defer(lambda: self.optimize_methods(stmt))
+
+    def optimize_methods(self, stmt: Class) -> None:
+        for method in stmt.methods:
+            self.optimize_function(method)
+
+    def visit_assign_expr(self, expr: Assign) -> Expr:
+        expr.value = self.optimize_expr(expr.value)
+        return expr
+
+    def visit_variable_expr(self, expr: Variable) -> Expr:
+        constant = self.constant(expr.name.lexeme)
+        return expr if constant is None else Literal(constant.value)
+
+    def visit_self_expr(self, expr: Self) -> Expr:
+        return expr
+
+    def visit_super_expr(self, expr: Super) -> Expr:
+        return expr
+
+    def visit_binary_expr(self, expr: Binary) -> Expr:
+        expr.left = left = self.optimize_expr(expr.left)
+        expr.right = right = self.optimize_expr(expr.right)
+        if type(left) is not Literal:
+            return expr
+
+        token_type = expr.operator.type
+        if token_type == TokenType.DOUBLE_QUESTION_MARK:
+            return left if left.value is not None else right
+        if token_type == TokenType.COMMA:
+            return right
+        if type(right) is not Literal:
+            return expr
+        if token_type in _NUMERIC_OPERATORS and not (type(left.value) is float and type(right.value) is float):
+            return expr
+        return self.fold(lambda: self.interpreter.apply_binary(expr.operator, left.value, right.value), expr)
+
+    def visit_logical_expr(self, expr: Logical) -> Expr:
+        expr.left = left = self.optimize_expr(expr.left)
+        expr.right = self.optimize_expr(expr.right)
+        if type(left) is not Literal:
+            return expr
+        if self.interpreter.is_truthy(left.value) == (expr.operator.type == TokenType.OR):
+            return left
+        return expr.right
+
+    def visit_grouping_expr(self, expr: Grouping) -> Expr:
+        expr.expression = self.optimize_expr(expr.expression)
+        return expr.expression if type(expr.expression) is Literal else expr
+
+    def visit_literal_expr(self, expr: Literal) -> Expr:
+        return expr
+
+    def visit_unary_expr(self, expr: Unary) -> Expr:
+        # `++`/`--` assign to their operand, which has to stay a Variable.
+        if expr.operator.type in (TokenType.PLUS_PLUS, TokenType.MINUS_MINUS):
+            return expr
+        expr.right = right = self.optimize_expr(expr.right)
+        if type(right) is not Literal:
+            return expr
+        if expr.operator.type == TokenType.MINUS and type(right.value) is not float:
+            return expr
+        return self.fold(lambda: self.interpreter.apply_unary(expr.operator, right.value), expr)
+
+    def visit_ternary_expr(self, expr: Ternary) -> Expr:
+        elvis = expr.middle is expr.left
+        expr.left = condition = self.optimize_expr(expr.left)
+        # Elvis (`a ?: b`) shares one node between `left` and `middle`, and
+        # has to keep sharing it.
+        expr.middle = condition if elvis else self.optimize_expr(expr.middle)
+        expr.right = self.optimize_expr(expr.right)
+        if type(condition) is not Literal:
+            return expr
+        return expr.middle if self.interpreter.is_truthy(condition.value) else expr.right
+
+    def visit_vector_expr(self, expr: Vector) -> Expr:
+        # Never a Literal itself: each evaluation builds a new vector.
+        expr.values = [self.optimize_expr(value) for value in expr.values]
+        return expr
+
+    def visit_spread_expr(self, expr: Spread) -> Expr:
+        expr.expression = self.optimize_expr(expr.expression)
+        return expr
+
+    def visit_break_expr(self, expr: Break) -> Expr:
+        return expr
+
+    def visit_continue_expr(self, expr: Continue) -> Expr:
+        return expr
+
+    def visit_ignore_expr(self, expr: Ignore) -> Expr:
+        return expr
+
+    def visit_call_expr(self, expr: Call) -> Expr:
+        # A Variable callee stays one: it's the token a "not callable" error
+        # is reported at.
+        if type(expr.callee) is Get:
+            self.optimize_expr(expr.callee)
+        expr.arguments = [self.optimize_expr(argument) for argument in expr.arguments]
+        return expr
+
+    def visit_get_expr(self, expr: Get) -> Expr:
+        expr.object = self.optimize_expr(expr.object)
+        return expr
+
+    def visit_index_expr(self, expr: Index) -> Expr:
+        expr.object = self.optimize_expr(expr.object)
+        expr.index = self.optimize_expr(expr.index)
+        return expr
+
+    def visit_slice_expr(self, expr: Slice) -> Expr:
+        expr.object = self.optimize_expr(expr.object)
+        expr.start = self.optimize_expr(expr.start)
+        expr.stop = self.optimize_expr(expr.stop)
+        return expr
+
+    def visit_set_expr(self, expr: Set) -> Expr:
+        expr.value = self.optimize_expr(expr.value)
+        expr.object = self.optimize_expr(expr.object)
+        return expr
+
+    @staticmethod
+    def fold(evaluate: Callable[[], object], expr: Expr) -> Expr:
+        # The literal `expr` always evaluates to, or `expr` itself when
+        # evaluating it raises (or makes something no Literal stands for,
+        # like the complex number `(-8) ^ 0.5` is in Python). -0 is left
+        # unfolded too: the vm engine's constant table, keyed by value,
+        # would take it for 0.
+        try:
+            value = evaluate()
+        except (IqaloxRuntimeError, ArithmeticError):
+            return expr
+        if not isinstance(value, _FOLDABLE_RESULTS) or value == 0 and math.copysign(1.0, value) < 0:
+            return expr
+        return Literal(value)
+
+
+def _reachable(statements: List[Stmt]) -> int:
+    # How many of a block's statements can run: up to and including the
+    # first that always completes it.
+    for index, statement in enumerate(statements):
+        if _completes(statement):
+            return index + 1
+    return len(statements)
+
+
+def _completes(stmt: Stmt) -> bool:
+    if type(stmt) is Return:
+        return True
+    if type(stmt) is Block:
+        return any(_completes(statement) for statement in stmt.statements)
+    if type(stmt) is Expression:
+        expr = stmt.expression
+        while type(expr) is Grouping:
+            expr = expr.expression
+        return type(expr) is Break or type(expr) is Continue
+    return False
+
+
+def _is_counter(expr: Expr, name: str) -> bool:
+    # A read of the loop's own counter: the only name in the loop's scope.
+    return type(expr) is Variable and expr.name.lexeme == name and expr.depth == 0
+
+
+def _uses(node: Union[Expr, Stmt], name: str) -> Tuple[bool, bool]:
+    # Whether anything under `node`, nested functions and methods included,
+    # reads or assigns a variable called `name` -- whichever one it
+    # resolves to.
+    reads = writes = False
+    pending: List = [node]
+    while pending:
+        node = pending.pop()
+        node_type = type(node)
+        if node_type is Variable:
+            reads = reads or node.name.lexeme == name
+        elif node_type is Assign:
+            writes = writes or node.name.lexeme == name
+        elif node_type is Unary and node.operator.type in (TokenType.PLUS_PLUS, TokenType.MINUS_MINUS):
+            writes = writes or node.right.name.lexeme == name
+        for field in vars(node).values():
+            if isinstance(field, (Expr, Stmt)):
+                pending.append(field)
+            elif type(field) is list:
+                pending.extend(item for item in field if isinstance(item, (Expr, Stmt)))
+    return reads, writes
@@ -0,0 +1,204 @@
+import multiprocessing
+import pickle
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from callable import IqaloxFunction, NativeFunction
+from environment import VariableData
+from imports import import_past_token
+from expression import Expr, Variable
+from memoization import memo_key
+from statement import Stmt, Function
+
+# How long a vector has to be before map/filter send it to worker processes:
+# below it, starting on the work costs more than sharing it saves.
+PARALLEL_THRESHOLD = 5000
+
+# How many pieces each worker's share of a vector is cut into, so one that
+# finishes early can take on more.
+CHUNKS_PER_WORKER = 4
+
+# What Parallel.package() finds for a callback that reads a global that
+# isn't defined yet.
+_UNDEFINED = object()
+
+
+# map and filter over a big vector, in parallel (`--workers=N`). It only
+# ever happens when the callback is a pure top-level function (see
+# purity.py): then nothing it does can be told apart from running it here,
+# in order, except by the time it takes. Each worker gets the declarations
+# it needs, already parsed and resolved -- the callback's, and those of the
+# top-level functions it calls, in turn -- along with the values of the
+# immutable globals they read and the engine to run them on, and keeps them
+# for every later chunk of the same work. The chunks' results are put back
+# together in order.
+#
+# Whatever can't go to a worker runs here instead, as map/filter always
+# do with one worker: an impure, nested or native callback, a vector below
+# `threshold`, or a global that's a class or instance rather than a plain
+# value. So does the whole call if a worker fails at all -- including with
+# an Iqalox runtime error, which running it again here reports at the right
+# element, and before which a pure callback can't have done anything else.
+class Parallel:
+    def __init__(self, interpreter: Any, workers: int = 1, threshold: int = PARALLEL_THRESHOLD) -> None:
+        self.interpreter = interpreter
+        self.workers = workers
+        self.threshold = threshold
+        self.executor: Any = None
+        # Each callback declaration's work package; None for one that can't
+        # be sent.
+        self.packages: Dict[Function, Optional[bytes]] = {}
+        # How many calls were shared out.
+        self.runs = 0
+
+    def map(self, callback: Any, vector: List[Any]) -> Optional[List[Any]]:
+        # The results, or None if the call has to run here.
+        return self.run('map', callback, vector)
+
+    def filter(self, callback: Any, vector: List[Any]) -> Optional[List[Any]]:
+        return self.run('filter', callback, vector)
+
+    def run(self, operation: str, callback: Any, vector: List[Any]) -> Optional[List[Any]]:
+        if self.workers < 2 or len(vector) < self.threshold or not isinstance(callback, IqaloxFunction):
+            return None
+        declaration = callback.declaration
+        if not declaration.pure or declaration.slot is not None:
+            return None
+        if declaration in self.packages:
+            package = self.packages[declaration]
+        else:
+            package = self.package(declaration)
+            if package is _UNDEFINED:
+                # Not kept: the global may just not be defined yet.
+                return None
+            self.packages[declaration] = package
+        if package is None:
+            return None
+
+        if not isinstance(vector, list):
+            vector = list(vector)
+        size = -(-len(vector) // (self.workers * CHUNKS_PER_WORKER))
+        chunks = [vector[start:start + size] for start in range(0, len(vector), size)]
+        # A worker forked with output still buffered would print it again.
+        sys.stdout.flush()
+        results = []
+        executor = self.start()
+        futures = [executor.submit(_run_chunk, package, operation, chunk) for chunk in chunks]
+        try:
+            for future in futures:
+                chunk = future.result()
+                if chunk is None:
+                    return None
+                results.extend(chunk)
+        except _futures().BrokenProcessPool:
+            self.executor = None
+            return None
+        finally:
+            # Whatever's left of work that's given up on would otherwise
+            # still run, ahead of every later call's.
+            for future in futures:
+                future.cancel()
+        self.runs += 1
+        return results
+
+    def package(self, callback: Function) -> Any:
+        # The callback's declaration and those it calls, and the values of
+        # the globals they read, pickled once for every worker. None if it
+        # can never be sent -- it calls an impure or nested function, or
+        # reads a global that isn't a plain value or won't pickle, none of
+        # which can change, as everything a pure function reads is
+        # immutable -- and _UNDEFINED if a global it reads isn't defined
+        # (yet).
+        globals_ = self.interpreter.globals.values
+        declarations = [callback]
+        values: Dict[str, Any] = {}
+        pending = [callback]
+        while pending:
+            for name in _global_names(pending.pop()):
+                if name in values or any(declaration.name.lexeme == name for declaration in declarations):
+                    continue
+                data = globals_.get(name)
+                if data is None:
+                    return _UNDEFINED
+                value = data.value
+                if isinstance(value, NativeFunction):
+                    continue
+                if isinstance(value, IqaloxFunction):
+                    if not value.declaration.pure or value.declaration.slot is not None:
+                        return None
+                    declarations.append(value.declaration)
+                    pending.append(value.declaration)
+                elif memo_key([value]) is not None:
+                    values[name] = value
+                else:
+                    return None
+        try:
+            return pickle.dumps((type(self.interpreter), declarations, values), pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+            return None
+
+    def start(self) -> Any:
+        # The pool, a ProcessPoolExecutor, started the first time it's
+        # needed. Forked workers start out with every module already
+        # imported -- this token.py included, rather than the standard
+        # library's.
+        if self.executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            self.executor = _futures().ProcessPoolExecutor(self.workers, mp_context=context)
+        return self.executor
+
+
+def _futures() -> Any:
+    # concurrent.futures, imported only once a pool is wanted.
+    return import_past_token('concurrent.futures.process')
+
+
+def _global_names(function: Function) -> List[str]:
+    # The globals anything in the function's body reads.
+    names = []
+    pending: List[Any] = list(function.body)
+    while pending:
+        node = pending.pop()
+        if type(node) is Variable and node.depth is None:
+            names.append(node.name.lexeme)
+        for field in vars(node).values():
+            if isinstance(field, (Expr, Stmt)):
+                pending.append(field)
+            elif type(field) is list:
+                pending.extend(item for item in field if isinstance(item, (Expr, Stmt)))
+    return names
+
+
+# In a worker: each package's interpreter and callback, set up the first
+# time one of its chunks comes in.
+_programs: Dict[bytes, Tuple[Any, IqaloxFunction]] = {}
+
+
+def _run_chunk(package: bytes, operation: str, chunk: List[Any]) -> Optional[List[Any]]:
+    # The chunk's results, or None if anything went wrong -- an exception
+    # (an IqaloxRuntimeError can't even be pickled back) or a result that
+    # isn't a plain value, like a function the callback returns.
+    try:
+        program = _programs.get(package)
+        if program is None:
+            program = _programs[package] = _load(package)
+        interpreter, callback = program
+        if operation == 'filter':
+            is_truthy = interpreter.is_truthy
+            return [value for value in chunk if is_truthy(callback.call(interpreter, [value]))]
+        results = [callback.call(interpreter, [value]) for value in chunk]
+    except Exception:
+        return None
+    return None if memo_key(results) is None else results
+
+
+def _load(package: bytes) -> Tuple[Any, IqaloxFunction]:
+    # The work runs on the same engine as the program sending it.
+    engine, declarations, values = pickle.loads(package)
+    interpreter = engine()
+    for name, value in values.items():
+        interpreter.globals.define(name, VariableData(value, is_mutable=False))
+    for declaration in declarations:
+        interpreter.execute(declaration)
+    return interpreter, interpreter.globals.values[declarations[0].name.lexeme].value
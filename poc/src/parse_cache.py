@@ -0,0 +1,177 @@
+import hashlib
+import io
+import os
+import pickle
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import expression
+import statement
+from expression import Expr
+from statement import Stmt
+from token import Source, Token, TokenType
+
+# The parsed form of a script, kept next to it the way CPython keeps
+# `__pycache__`: `__iqcache__/<script name>.<key>.iqc`, where the key hashes
+# the script's source together with the scanner/parser (see
+# parser_fingerprint()), so editing either one just misses. A file is
+#
+#   'IQC' magic, u8 version, f64 seconds the scan+parse took, then the
+#   pickled List[Stmt] exactly as Parser.parse() returned it -- before the
+#   Resolver annotates it, which still runs on every load.
+#
+# Unlike a .pyc, a cache file isn't trusted: it can come along with a
+# script from anywhere -- a checked-out repository, an unpacked archive --
+# and its key is no secret, but an Iqalox script can't run arbitrary Python
+# while a pickle can. So only the syntax tree's own classes are unpickled
+# (see _NodeUnpickler), and a file that names anything else is a miss.
+MAGIC = b'IQC'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<3sBd')
+CACHE_DIR = '__iqcache__'
+
+# Every directory's cache is kept under this many bytes, evicting the files
+# least recently written or loaded first.
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+
+_PARSER_MODULES = ('token.py', 'scanner.py', 'parser.py', 'pratt_parser.py', 'expression.py', 'statement.py')
+_fingerprint: Optional[bytes] = None
+
+
+def parser_fingerprint() -> bytes:
+    # Stands in for the interpreter's version: a digest of every module that
+    # decides what Parser.parse() returns for a given source.
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256()
+        src = Path(__file__).resolve().parent
+        for module in _PARSER_MODULES:
+            digest.update((src / module).read_bytes())
+        _fingerprint = digest.digest()
+    return _fingerprint
+
+
+# Everything a pickled List[Stmt] refers to by name: the node classes and
+# its tokens'. Literal values are all numbers, strings, booleans or None,
+# which pickle stores without naming a class.
+_NODE_CLASSES: Dict[Tuple[str, str], Any] = {
+    (cls.__module__, cls.__name__): cls
+    for module, base in ((expression, Expr), (statement, Stmt))
+    for cls in vars(module).values()
+    if isinstance(cls, type) and issubclass(cls, base) and cls is not base
+}
+_NODE_CLASSES[(Token.__module__, 'Token')] = Token
+_NODE_CLASSES[(TokenType.__module__, 'TokenType')] = TokenType
+
+
+class _NodeUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        cls = _NODE_CLASSES.get((module, name))
+        if cls is None:
+            raise pickle.UnpicklingError(f'{module}.{name} is not a syntax tree class')
+        return cls
+
+
+class ParseCache:
+    def __init__(self, path: str, source: Source) -> None:
+        script = Path(path)
+        self.directory = script.parent / CACHE_DIR
+        self.prefix = f'{script.name}.'
+        digest = hashlib.sha256(parser_fingerprint())
+        # (Hashed in place: `source` may be a memory-mapped file.)
+        digest.update(source)
+        key = digest.hexdigest()[:32]
+        self.file = self.directory / f'{self.prefix}{key}.iqc'
+        # For report(): whether load() hit, the scan+parse time the entry
+        # records, and how long loading it took instead.
+        self.hit = False
+        self.parse_seconds = 0.0
+        self.load_seconds = 0.0
+
+    def load(self) -> Optional[List[Stmt]]:
+        # The cached statements, or None on a miss -- including a file that
+        # isn't a readable cache entry at all, which store() then replaces.
+        start = time.perf_counter()
+        try:
+            data = self.file.read_bytes()
+        except OSError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, parse_seconds = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            return None
+        try:
+            statements = _NodeUnpickler(io.BytesIO(data[_HEADER.size:])).load()
+        except Exception:
+            return None
+        if type(statements) is not list:
+            return None
+        # Loading counts as a use for eviction.
+        try:
+            os.utime(self.file)
+        except OSError:
+            pass
+        self.hit = True
+        self.parse_seconds = parse_seconds
+        self.load_seconds = time.perf_counter() - start
+        return statements
+
+    def store(self, statements: List[Stmt], parse_seconds: float) -> None:
+        # Best-effort, like the rest of the cache: an AST too deep to pickle
+        # or a directory that can't be written just goes uncached.
+        self.parse_seconds = parse_seconds
+        try:
+            data = pickle.dumps(statements, pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            return
+        try:
+            self.directory.mkdir(exist_ok=True)
+            # Written under a temporary name and renamed into place, so a
+            # concurrent run never loads half a file.
+            temporary = self.file.with_suffix(f'.{os.getpid()}.tmp')
+            temporary.write_bytes(_HEADER.pack(MAGIC, FORMAT_VERSION, parse_seconds) + data)
+            os.replace(temporary, self.file)
+            self.evict()
+        except OSError:
+            return
+
+    def evict(self) -> None:
+        # Drops this script's entries for any other source first -- they
+        # can only ever hit again if it's reverted -- then the least
+        # recently used files until the directory fits MAX_CACHE_BYTES.
+        entries = []
+        for entry in self.directory.glob('*.iqc'):
+            # (Keys are all one length, so a longer name with the same
+            # prefix is some other script's: `a.iqx.b.iqx` vs `a.iqx`.)
+            if entry.name.startswith(self.prefix) and len(entry.name) == len(self.file.name) \
+                    and entry != self.file:
+                entry.unlink(missing_ok=True)
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= MAX_CACHE_BYTES:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def report(self) -> None:
+        # One line on stderr, out of the way of the program's own output.
+        if self.hit:
+            saved = self.parse_seconds - self.load_seconds
+            print(
+                f'parse cache: hit {self.file.name}, saved {saved * 1000:.1f} ms '
+                f'(scan+parse {self.parse_seconds * 1000:.1f} ms, load {self.load_seconds * 1000:.1f} ms)',
+                file=sys.stderr
+            )
+        else:
+            print(
+                f'parse cache: miss {self.file.name}, scan+parse {self.parse_seconds * 1000:.1f} ms',
+                file=sys.stderr
+            )
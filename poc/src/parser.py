@@ -1,46 +1,51 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from expression import Expr, Binary, Logical, Unary, Literal, Grouping, Ternary, Vector, Variable, Assign, Break, \
-    Continue, Call, Ignore, Get, Set, Self, Super
+    Continue, Call, Ignore, Get, Index, Slice, Set, Self, Super, Spread
 from statement import Stmt, Expression, Var, Block, For, Function, Return, Class
-from token import Token, TokenType
+from token import Token, TokenKind, TokenBuffer
 from error import ParseError
 
 # Deliberately excludes operator tokens like MINUS: `f - 1` is subtraction,
 # never a call to `f` with argument `-1` (that needs `f (-1)`) -- this is
 # what keeps `x - 1` and `f 1` unambiguous without lookahead past one token.
-ARGUMENT_START_TOKENS = (
-    TokenType.LEFT_PAREN, TokenType.LEFT_BRACKET, TokenType.FALSE, TokenType.TRUE, TokenType.NIL,
-    TokenType.NUMBER, TokenType.STRING, TokenType.IDENTIFIER, TokenType.BREAK, TokenType.CONTINUE,
-    TokenType.UNDERSCORE, TokenType.SELF, TokenType.SUPER,
-)
+ARGUMENT_START_TOKENS = frozenset((
+    TokenKind.LEFT_PAREN, TokenKind.LEFT_BRACKET, TokenKind.FALSE, TokenKind.TRUE, TokenKind.NIL,
+    TokenKind.NUMBER, TokenKind.STRING, TokenKind.IDENTIFIER, TokenKind.BREAK, TokenKind.CONTINUE,
+    TokenKind.UNDERSCORE, TokenKind.SELF, TokenKind.SUPER,
+))
 
 
 class Parser:
-    def __init__(self, tokens: List[Token]) -> None:
+    def __init__(self, tokens: TokenBuffer) -> None:
         self.tokens = tokens
+        self.kinds = tokens.kinds
+        # The index of the EOF token, which is always last.
+        self.end = len(tokens) - 1
         self.current = 0
         self.comma_as_operator = True
 
     def parse(self) -> List[Stmt]:
-        statements: List[Stmt] = []
+        return list(self.declarations())
 
+    def declarations(self) -> Iterator[Stmt]:
+        # The top-level declarations one at a time, each as soon as it's
+        # parsed.
         while not self.is_at_end():
             stmt = self.declaration()
             if stmt is not None:
-                statements.append(stmt)
-        return statements
+                yield stmt
 
     def expression(self) -> Optional[Expr]:
         return self.assignment()
 
     def declaration(self) -> Optional[Stmt]:
         try:
-            if self.match(TokenType.CLASS):
+            if self.match(TokenKind.CLASS):
                 return self.class_declaration()
-            if self.match(TokenType.FUN):
+            if self.match(TokenKind.FUN):
                 return self.function_declaration('function')
-            if self.match(TokenType.VAR):
+            if self.match(TokenKind.VAR):
                 return self.var_declaration()
             return self.statement()
         except ParseError:
@@ -48,49 +53,49 @@ class Parser:
             return None
 
     def class_declaration(self) -> Stmt:
-        name = self.consume(TokenType.IDENTIFIER, "Expect class name.")
+        name = self.consume(TokenKind.IDENTIFIER, "Expect class name.")
 
         superclass = None
-        if self.match(TokenType.EXTENDS):
-            self.consume(TokenType.IDENTIFIER, "Expect superclass name.")
+        if self.match(TokenKind.EXTENDS):
+            self.consume(TokenKind.IDENTIFIER, "Expect superclass name.")
             superclass = Variable(self.previous())
 
-        self.consume(TokenType.LEFT_BRACE, "Expect '{' before class body.")
+        self.consume(TokenKind.LEFT_BRACE, "Expect '{' before class body.")
 
         methods: List[Function] = []
-        while not self.check(TokenType.RIGHT_BRACE) and not self.is_at_end():
-            if self.match(TokenType.SEMICOLON):
+        while not self.check(TokenKind.RIGHT_BRACE) and not self.is_at_end():
+            if self.match(TokenKind.SEMICOLON):
                 continue
             methods.append(self.function_declaration('method'))
 
-        self.consume(TokenType.RIGHT_BRACE, "Expect '}' after class body.")
+        self.consume(TokenKind.RIGHT_BRACE, "Expect '}' after class body.")
         return Class(name, superclass, methods)
 
     def function_declaration(self, kind: str) -> Function:
-        name = self.consume(TokenType.IDENTIFIER, f"Expect {kind} name.")
-        self.consume(TokenType.LEFT_PAREN, f"Expect '(' after {kind} name.")
+        name = self.consume(TokenKind.IDENTIFIER, f"Expect {kind} name.")
+        self.consume(TokenKind.LEFT_PAREN, f"Expect '(' after {kind} name.")
 
         parameters: List[Token] = []
-        if not self.check(TokenType.RIGHT_PAREN):
+        if not self.check(TokenKind.RIGHT_PAREN):
             while True:
-                parameters.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name."))
-                if not self.match(TokenType.COMMA):
+                parameters.append(self.consume(TokenKind.IDENTIFIER, "Expect parameter name."))
+                if not self.match(TokenKind.COMMA):
                     break
 
-        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after parameters.")
-        self.consume(TokenType.LEFT_BRACE, f"Expect '{{' before {kind} body.")
+        self.consume(TokenKind.RIGHT_PAREN, "Expect ')' after parameters.")
+        self.consume(TokenKind.LEFT_BRACE, f"Expect '{{' before {kind} body.")
         body = self.block()
 
         return Function(name, parameters, body)
 
     def statement(self) -> Optional[Stmt]:
-        if self.match(TokenType.SEMICOLON):
+        if self.match(TokenKind.SEMICOLON):
             return None
-        if self.match(TokenType.FOR):
+        if self.match(TokenKind.FOR):
             return self.for_statement()
-        if self.match(TokenType.RETURN):
+        if self.match(TokenKind.RETURN):
             return self.return_statement()
-        if self.match(TokenType.LEFT_BRACE):
+        if self.match(TokenKind.LEFT_BRACE):
             return Block(self.block())
         return self.expression_statement()
 
@@ -98,31 +103,31 @@ class Parser:
         keyword = self.previous()
 
         value = None
-        if not self.check(TokenType.SEMICOLON):
+        if not self.check(TokenKind.SEMICOLON):
             value = self.expression()
 
-        self.consume(TokenType.SEMICOLON, "Expect line break or ';' after return value.")
+        self.consume(TokenKind.SEMICOLON, "Expect line break or ';' after return value.")
         return Return(keyword, value)
 
     def for_statement(self) -> Optional[Stmt]:
-        self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
+        self.consume(TokenKind.LEFT_PAREN, "Expect '(' after 'for'.")
 
-        if self.match(TokenType.SEMICOLON):
+        if self.match(TokenKind.SEMICOLON):
             initializer = None
-        elif self.match(TokenType.VAR):
+        elif self.match(TokenKind.VAR):
             initializer = self.var_declaration()
         else:
             initializer = self.expression_statement()
 
         condition = None
-        if not self.check(TokenType.SEMICOLON):
+        if not self.check(TokenKind.SEMICOLON):
             condition = self.expression()
-        self.consume(TokenType.SEMICOLON, "Expect ';' after loop condition.")
+        self.consume(TokenKind.SEMICOLON, "Expect ';' after loop condition.")
 
         increment = None
-        if not self.check(TokenType.RIGHT_PAREN):
+        if not self.check(TokenKind.RIGHT_PAREN):
             increment = self.expression()
-        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
+        self.consume(TokenKind.RIGHT_PAREN, "Expect ')' after for clauses.")
 
         body = self.statement()
         if body is None:
@@ -131,39 +136,39 @@ class Parser:
         return For(initializer, condition, increment, body)
 
     def var_declaration(self) -> Optional[Stmt]:
-        name = self.consume(TokenType.IDENTIFIER, "Expect variable name.")
+        name = self.consume(TokenKind.IDENTIFIER, "Expect variable name.")
 
-        is_mutable = self.match(TokenType.MUTABLE)
+        is_mutable = self.match(TokenKind.MUTABLE)
 
         initializer = None
-        if self.match(TokenType.EQUAL):
+        if self.match(TokenKind.EQUAL):
             initializer = self.expression()
         elif not is_mutable:
             raise self.error(self.peek(), "Expect '=' after 'var'. Immutable variables must be initialized.")
 
-        self.consume(TokenType.SEMICOLON, "Expect line break or ';' after variable declaration.")
+        self.consume(TokenKind.SEMICOLON, "Expect line break or ';' after variable declaration.")
         return Var(name, initializer, is_mutable)
 
     def expression_statement(self) -> Optional[Stmt]:
         expr = self.expression()
-        self.consume(TokenType.SEMICOLON, "Expect line break or ';' after expression.")
+        self.consume(TokenKind.SEMICOLON, "Expect line break or ';' after expression.")
         return Expression(expr)
 
     def block(self) -> List[Stmt]:
         statements: List[Stmt] = []
 
-        while not self.check(TokenType.RIGHT_BRACE) and not self.is_at_end():
+        while not self.check(TokenKind.RIGHT_BRACE) and not self.is_at_end():
             stmt = self.declaration()
             if stmt is not None:
                 statements.append(stmt)
 
-        self.consume(TokenType.RIGHT_BRACE, "Expect '}' after block.")
+        self.consume(TokenKind.RIGHT_BRACE, "Expect '}' after block.")
         return statements
 
     def assignment(self) -> Optional[Expr]:
         expr = self.pipe()
 
-        if self.match(TokenType.EQUAL):
+        if self.match(TokenKind.EQUAL):
             equals = self.previous()
             value = self.assignment()
 
@@ -182,7 +187,7 @@ class Parser:
         # Chains left-associatively: `a |> f |> g` is `g(f(a))`.
         expr = self.comma()
 
-        while self.match(TokenType.PIPE):
+        while self.match(TokenKind.PIPE):
             operator = self.previous()
             right = self.comma()
             if not isinstance(right, Variable):
@@ -201,7 +206,7 @@ class Parser:
 
         expr = self.ternary()
 
-        while self.match(TokenType.COMMA):
+        while self.match(TokenKind.COMMA):
             operator = self.previous()
             right = self.ternary()
             expr = Binary(expr, operator, right)
@@ -211,13 +216,13 @@ class Parser:
     def ternary(self) -> Optional[Expr]:
         expr = self.null_coalescing()
 
-        if self.match(TokenType.QUESTION_MARK):
+        if self.match(TokenKind.QUESTION_MARK):
             left_operator = self.previous()
             middle = self.expression()
-            right_operator = self.consume(TokenType.COLON, "Expect ':' in ternary operator.")
+            right_operator = self.consume(TokenKind.COLON, "Expect ':' in ternary operator.")
             right = self.expression()
             expr = Ternary(expr, left_operator, middle, right_operator, right)
-        elif self.match(TokenType.QUESTION_MARK_COLON):
+        elif self.match(TokenKind.QUESTION_MARK_COLON):
             left_operator = self.previous()
             right_operator = self.previous()
             right = self.expression()
@@ -228,7 +233,7 @@ class Parser:
     def null_coalescing(self) -> Optional[Expr]:
         expr = self.logic_or()
 
-        while self.match(TokenType.DOUBLE_QUESTION_MARK):
+        while self.match(TokenKind.DOUBLE_QUESTION_MARK):
             operator = self.previous()
             right = self.logic_or()
             expr = Binary(expr, operator, right)
@@ -238,7 +243,7 @@ class Parser:
     def logic_or(self) -> Optional[Expr]:
         expr = self.logic_and()
 
-        while self.match(TokenType.OR):
+        while self.match(TokenKind.OR):
             operator = self.previous()
             right = self.logic_and()
             expr = Logical(expr, operator, right)
@@ -248,7 +253,7 @@ class Parser:
     def logic_and(self) -> Optional[Expr]:
         expr = self.equality()
 
-        while self.match(TokenType.AND):
+        while self.match(TokenKind.AND):
             operator = self.previous()
             right = self.equality()
             expr = Logical(expr, operator, right)
@@ -258,7 +263,7 @@ class Parser:
     def equality(self) -> Optional[Expr]:
         expr = self.comparison()
 
-        while self.match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
+        while self.match(TokenKind.BANG_EQUAL, TokenKind.EQUAL_EQUAL):
             operator = self.previous()
             right = self.comparison()
             expr = Binary(expr, operator, right)
@@ -268,7 +273,7 @@ class Parser:
     def comparison(self) -> Optional[Expr]:
         expr = self.addition()
 
-        while self.match(TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL):
+        while self.match(TokenKind.GREATER, TokenKind.GREATER_EQUAL, TokenKind.LESS, TokenKind.LESS_EQUAL):
             operator = self.previous()
             right = self.addition()
             expr = Binary(expr, operator, right)
@@ -278,7 +283,7 @@ class Parser:
     def addition(self) -> Optional[Expr]:
         expr = self.multiplication()
 
-        while self.match(TokenType.MINUS, TokenType.PLUS):
+        while self.match(TokenKind.MINUS, TokenKind.PLUS):
             operator = self.previous()
             right = self.multiplication()
             expr = Binary(expr, operator, right)
@@ -289,10 +294,10 @@ class Parser:
         expr = self.increment()
 
         while self.match(
-                TokenType.SLASH,
-                TokenType.STAR,
-                TokenType.PERCENT,
-                TokenType.POWER,
+                TokenKind.SLASH,
+                TokenKind.STAR,
+                TokenKind.PERCENT,
+                TokenKind.POWER,
         ):
             operator = self.previous()
             right = self.increment()
@@ -301,7 +306,7 @@ class Parser:
         return expr
 
     def increment(self) -> Optional[Expr]:
-        if self.match(TokenType.PLUS_PLUS, TokenType.MINUS_MINUS):
+        if self.match(TokenKind.PLUS_PLUS, TokenKind.MINUS_MINUS):
             operator = self.previous()
             right = self.unary()
             if not isinstance(right, Variable):
@@ -311,7 +316,7 @@ class Parser:
         return self.unary()
 
     def unary(self) -> Optional[Expr]:
-        if self.match(TokenType.BANG, TokenType.MINUS):
+        if self.match(TokenKind.BANG, TokenKind.MINUS):
             operator = self.previous()
             right = self.unary()
             return Unary(operator, right)
@@ -321,28 +326,31 @@ class Parser:
     def call(self) -> Optional[Expr]:
         expr = self.call_head()
 
-        while self.match(TokenType.DOT):
-            name = self.consume(TokenType.IDENTIFIER, "Expect property name after '.'.")
-            expr = self.finish_property_access(Get(expr, name))
-
-        return expr
+        while True:
+            if self.match(TokenKind.DOT):
+                name = self.consume(TokenKind.IDENTIFIER, "Expect property name after '.'.")
+                expr = self.finish_property_access(Get(expr, name))
+            elif self.is_index(0):
+                expr = self.index(expr)
+            else:
+                return expr
 
     def call_head(self) -> Optional[Expr]:
         # No call takes parentheses. `f()` is the explicit zero-arg marker;
         # `f a`, `f a, b` (fixed-arity, comma-separated, no wrapping parens)
         # are calls with arguments; a bare `f` with nothing recognizable as
         # an argument following it is just a value reference, not a call.
-        if self.check(TokenType.IDENTIFIER):
-            if self.check_at(1, TokenType.LEFT_PAREN) and self.check_at(2, TokenType.RIGHT_PAREN):
+        if self.check(TokenKind.IDENTIFIER):
+            if self.check_at(1, TokenKind.LEFT_PAREN) and self.check_at(2, TokenKind.RIGHT_PAREN):
                 name = self.advance()
                 self.advance()
                 self.advance()
                 return Call(Variable(name), [])
 
-            if self.starts_argument(self.peek_at(1)):
+            if self.starts_argument(self.kind_at(1)) and not self.is_index(1):
                 name = self.advance()
                 arguments = [self.argument()]
-                while self.match(TokenType.COMMA):
+                while self.match(TokenKind.COMMA):
                     arguments.append(self.argument())
                 return Call(Variable(name), arguments)
 
@@ -357,19 +365,40 @@ class Parser:
         # expr is a Get or a Super -- same zero-arg/argument-start call
         # detection as call_head(), just anchored on whatever comes right
         # after the property/method name instead of after a bare identifier.
-        if self.check(TokenType.LEFT_PAREN) and self.check_at(1, TokenType.RIGHT_PAREN):
+        if self.check(TokenKind.LEFT_PAREN) and self.check_at(1, TokenKind.RIGHT_PAREN):
             self.advance()
             self.advance()
             return Call(expr, [])
 
-        if self.starts_argument(self.peek()):
+        if self.starts_argument(self.kinds[self.current]) and not self.is_index(0):
             arguments = [self.argument()]
-            while self.match(TokenType.COMMA):
+            while self.match(TokenKind.COMMA):
                 arguments.append(self.argument())
             return Call(expr, arguments)
 
         return expr
 
+    def is_index(self, offset: int) -> bool:
+        # Whether the token at `offset` is a `[` right up against the one
+        # before it: `v[0]` indexes `v`, where `f [0]` calls `f` with a
+        # vector. The one place whitespace means anything to the grammar.
+        index = min(self.current + offset, self.end)
+        starts = self.tokens.starts
+        return (self.kinds[index] == TokenKind.LEFT_BRACKET
+                and starts[index] == starts[index - 1] + self.tokens.lengths[index - 1])
+
+    def index(self, expr: Expr) -> Expr:
+        # `expr[index]`, or a slice, `expr[start:stop]`, either of whose
+        # bounds may be left out.
+        bracket = self.advance()
+        start = None if self.check(TokenKind.COLON) else self.expression()
+        if self.match(TokenKind.COLON):
+            stop = None if self.check(TokenKind.RIGHT_BRACKET) else self.expression()
+            self.consume(TokenKind.RIGHT_BRACKET, "Expect ']' after slice bounds.")
+            return Slice(expr, bracket, start, stop)
+        self.consume(TokenKind.RIGHT_BRACKET, "Expect ']' after index.")
+        return Index(expr, bracket, start)
+
     def argument(self) -> Optional[Expr]:
         # A grouped expression, a nested call, or a bare primary -- `call()`
         # already covers all three, falling through to `primary()`, which
@@ -377,97 +406,115 @@ class Parser:
         return self.call()
 
     @staticmethod
-    def starts_argument(token: Token) -> bool:
-        return token.type in ARGUMENT_START_TOKENS
+    def starts_argument(kind: int) -> bool:
+        return kind in ARGUMENT_START_TOKENS
 
     def primary(self) -> Optional[Expr]:
-        if self.match(TokenType.FALSE):
+        if self.match(TokenKind.FALSE):
             return Literal(False)
-        if self.match(TokenType.TRUE):
+        if self.match(TokenKind.TRUE):
             return Literal(True)
-        if self.match(TokenType.NIL):
+        if self.match(TokenKind.NIL):
             return Literal(None)
-        if self.match(TokenType.BREAK):
-            return Break()
-        if self.match(TokenType.CONTINUE):
-            return Continue()
-        if self.match(TokenType.UNDERSCORE):
+        if self.match(TokenKind.BREAK):
+            return Break(self.previous())
+        if self.match(TokenKind.CONTINUE):
+            return Continue(self.previous())
+        if self.match(TokenKind.UNDERSCORE):
             return Ignore()
-        if self.match(TokenType.SELF):
+        if self.match(TokenKind.SELF):
             return Self(self.previous())
-        if self.match(TokenType.SUPER):
+        if self.match(TokenKind.SUPER):
             keyword = self.previous()
-            self.consume(TokenType.DOT, "Expect '.' after 'super'.")
-            method = self.consume(TokenType.IDENTIFIER, "Expect superclass method name.")
+            self.consume(TokenKind.DOT, "Expect '.' after 'super'.")
+            method = self.consume(TokenKind.IDENTIFIER, "Expect superclass method name.")
             return Super(keyword, method)
 
-        if self.match(TokenType.NUMBER, TokenType.STRING):
-            return Literal(self.previous().literal)
+        if self.match(TokenKind.NUMBER, TokenKind.STRING):
+            return Literal(self.tokens.literal(self.current - 1))
 
-        if self.match(TokenType.IDENTIFIER):
+        if self.match(TokenKind.IDENTIFIER):
             return Variable(self.previous())
 
-        if self.match(TokenType.LEFT_PAREN):
-            expr = self.expression()
-            self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
-            return Grouping(expr)
+        if self.match(TokenKind.LEFT_PAREN):
+            return self.grouping()
 
-        if self.match(TokenType.LEFT_BRACKET):
-            exprs = []
-            self.comma_as_operator = False
+        if self.match(TokenKind.LEFT_BRACKET):
+            return self.vector()
 
-            try:
-                if not self.check(TokenType.RIGHT_BRACKET):
-                    exprs.append(self.expression())
-                    while self.match(TokenType.COMMA):
-                        exprs.append(self.expression())
-            finally:
-                self.comma_as_operator = True
+        raise self.error(self.peek(), "Expect expression.")
 
-            self.consume(TokenType.RIGHT_BRACKET, "Expect ']' after vector elements.")
-            return Vector(exprs)
+    def grouping(self) -> Expr:
+        expr = self.expression()
+        self.consume(TokenKind.RIGHT_PAREN, "Expect ')' after expression.")
+        return Grouping(expr)
 
-        raise self.error(self.peek(), "Expect expression.")
+    def vector(self) -> Expr:
+        # `[a, b]`, with any element a spread (`...v`) of a vector's
+        # elements; or a cons, `[item | v]`, which is `[item, ...v]` -- a
+        # Spread keeps the `|` to report a non-vector `v` at.
+        exprs = []
+        self.comma_as_operator = False
 
-    def match(self, *types: TokenType) -> bool:
-        for _type in types:
-            if self.check(_type):
-                self.advance()
-                return True
+        try:
+            if not self.check(TokenKind.RIGHT_BRACKET):
+                exprs.append(self.element())
+                if type(exprs[0]) is not Spread and self.match(TokenKind.BAR):
+                    exprs.append(Spread(self.previous(), self.expression()))
+                else:
+                    while self.match(TokenKind.COMMA):
+                        exprs.append(self.element())
+        finally:
+            self.comma_as_operator = True
+
+        self.consume(TokenKind.RIGHT_BRACKET, "Expect ']' after vector elements.")
+        return Vector(exprs)
+
+    def element(self) -> Expr:
+        if self.match(TokenKind.ELLIPSIS):
+            return Spread(self.previous(), self.expression())
+        return self.expression()
+
+    def match(self, *kinds: TokenKind) -> bool:
+        if self.kinds[self.current] in kinds:
+            if self.current < self.end:
+                self.current += 1
+            return True
 
         return False
 
-    def consume(self, _type: TokenType, message: str) -> Token:
-        if self.check(_type):
+    def consume(self, kind: TokenKind, message: str) -> Token:
+        if self.kinds[self.current] == kind:
             return self.advance()
 
         raise self.error(self.peek(), message)
 
-    def check(self, _type: TokenType) -> bool:
-        if self.is_at_end():
-            return False
-        return self.peek().type == _type
+    def check(self, kind: TokenKind) -> bool:
+        return self.kinds[self.current] == kind
 
-    def check_at(self, offset: int, _type: TokenType) -> bool:
-        return self.peek_at(offset).type == _type
+    def check_at(self, offset: int, kind: TokenKind) -> bool:
+        return self.kind_at(offset) == kind
+
+    def kind_at(self, offset: int) -> int:
+        return self.kinds[min(self.current + offset, self.end)]
 
     def advance(self) -> Token:
-        if not self.is_at_end():
+        if self.current < self.end:
             self.current += 1
         return self.previous()
 
     def is_at_end(self) -> bool:
-        return self.peek().type == TokenType.EOF
+        return self.current == self.end
 
-    def peek(self) -> Token:
-        return self.tokens[self.current]
+    # These build the Token at an index from the buffer, so are for the
+    # tokens the AST keeps or an error points at; everywhere else the
+    # Parser only looks at kinds.
 
-    def peek_at(self, offset: int) -> Token:
-        index = min(self.current + offset, len(self.tokens) - 1)
-        return self.tokens[index]
+    def peek(self) -> Token:
+        return self.tokens.token(self.current)
 
     def previous(self) -> Optional[Token]:
-        return self.tokens[self.current - 1]
+        return self.tokens.token(self.current - 1)
 
     @staticmethod
     def error(token: Token, message: str) -> ParseError:
@@ -479,15 +526,15 @@ class Parser:
         self.advance()
 
         while not self.is_at_end():
-            if self.previous().type == TokenType.SEMICOLON:
+            if self.kinds[self.current - 1] == TokenKind.SEMICOLON:
                 return
 
-            if self.peek().type in [
-                TokenType.CLASS,
-                TokenType.FUN,
-                TokenType.VAR,
-                TokenType.FOR,
-                TokenType.RETURN
+            if self.kinds[self.current] in [
+                TokenKind.CLASS,
+                TokenKind.FUN,
+                TokenKind.VAR,
+                TokenKind.FOR,
+                TokenKind.RETURN
             ]:
                 return
 
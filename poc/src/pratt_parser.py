@@ -0,0 +1,188 @@
+from typing import Callable, Dict, Optional, Tuple
+
+from expression import Expr, Binary, Logical, Literal, Ternary, Variable, Assign, Break, Continue, Call, Ignore, \
+    Get, Set, Self
+from parser import Parser, ARGUMENT_START_TOKENS
+from token import TokenKind
+
+# Binding powers, loosest first: one per level of Parser's precedence
+# climb from assignment() down to multiplication(). An infix operator only
+# extends an expression being parsed at its own power or looser.
+ASSIGNMENT = 1
+PIPE = 2
+COMMA = 3
+TERNARY = 4
+NULL_COALESCING = 5
+OR = 6
+AND = 7
+EQUALITY = 8
+COMPARISON = 9
+ADDITION = 10
+MULTIPLICATION = 11
+
+# Parses the rest of an infix expression, given its already-parsed left
+# operand and the operator's binding power, with the operator consumed.
+Infix = Callable[[Expr, int], Expr]
+
+
+# The same grammar as Parser, producing the same AST, but with every binary
+# level handled by one loop over a table of binding powers keyed by token
+# kind (precedence climbing) instead of a method per level: an expression
+# that's just a literal is one precedence() call and a table lookup rather
+# than a dozen nested methods each trying its own operators. Primaries are
+# dispatched the same way, on the kind of their first token.
+class PrattParser(Parser):
+    def __init__(self, tokens) -> None:
+        super().__init__(tokens)
+        self.infix: Dict[int, Tuple[int, Infix]] = {
+            TokenKind.EQUAL: (ASSIGNMENT, self.assign),
+            TokenKind.PIPE: (PIPE, self.pipe_call),
+            TokenKind.COMMA: (COMMA, self.binary),
+            TokenKind.QUESTION_MARK: (TERNARY, self.ternary_branches),
+            TokenKind.QUESTION_MARK_COLON: (TERNARY, self.ternary_fallback),
+            TokenKind.DOUBLE_QUESTION_MARK: (NULL_COALESCING, self.binary),
+            TokenKind.OR: (OR, self.logical),
+            TokenKind.AND: (AND, self.logical),
+            TokenKind.BANG_EQUAL: (EQUALITY, self.binary),
+            TokenKind.EQUAL_EQUAL: (EQUALITY, self.binary),
+            TokenKind.GREATER: (COMPARISON, self.binary),
+            TokenKind.GREATER_EQUAL: (COMPARISON, self.binary),
+            TokenKind.LESS: (COMPARISON, self.binary),
+            TokenKind.LESS_EQUAL: (COMPARISON, self.binary),
+            TokenKind.MINUS: (ADDITION, self.binary),
+            TokenKind.PLUS: (ADDITION, self.binary),
+            TokenKind.SLASH: (MULTIPLICATION, self.binary),
+            TokenKind.STAR: (MULTIPLICATION, self.binary),
+            TokenKind.PERCENT: (MULTIPLICATION, self.binary),
+            TokenKind.POWER: (MULTIPLICATION, self.binary),
+        }
+        # Call heads by their first token, already consumed; `super.method`,
+        # the only other kind, goes through Parser.call_head().
+        self.primaries: Dict[int, Callable[[], Expr]] = {
+            TokenKind.NUMBER: self.literal,
+            TokenKind.STRING: self.literal,
+            TokenKind.IDENTIFIER: self.identifier,
+            TokenKind.FALSE: lambda: Literal(False),
+            TokenKind.TRUE: lambda: Literal(True),
+            TokenKind.NIL: lambda: Literal(None),
+            TokenKind.BREAK: lambda: Break(self.previous()),
+            TokenKind.CONTINUE: lambda: Continue(self.previous()),
+            TokenKind.UNDERSCORE: Ignore,
+            TokenKind.SELF: lambda: Self(self.previous()),
+            TokenKind.LEFT_PAREN: self.grouping,
+            TokenKind.LEFT_BRACKET: self.vector,
+        }
+
+    def expression(self) -> Optional[Expr]:
+        return self.precedence(ASSIGNMENT)
+
+    def precedence(self, power: int) -> Expr:
+        # An operand, then every infix operator binding at least as tightly
+        # as `power`, each taking what's been parsed so far as its left
+        # operand.
+        kinds = self.kinds
+        # Read before the operand, as Parser.comma() does on entry: inside a
+        # vector literal a comma separates elements instead.
+        comma_as_operator = self.comma_as_operator
+        kind = kinds[self.current]
+        if kind == TokenKind.PLUS_PLUS or kind == TokenKind.MINUS_MINUS:
+            expr = self.increment()
+        elif kind == TokenKind.BANG or kind == TokenKind.MINUS:
+            expr = self.unary()
+        else:
+            expr = self.call()
+
+        infix = self.infix
+        while True:
+            kind = kinds[self.current]
+            operator = infix.get(kind)
+            if operator is None or operator[0] < power:
+                return expr
+            if kind == TokenKind.COMMA and not comma_as_operator:
+                return expr
+            self.current += 1
+            expr = operator[1](expr, operator[0])
+
+    def binary(self, left: Expr, power: int) -> Expr:
+        # Left-associative: the right operand stops at another operator of
+        # the same power.
+        operator = self.previous()
+        return Binary(left, operator, self.precedence(power + 1))
+
+    def logical(self, left: Expr, power: int) -> Expr:
+        operator = self.previous()
+        return Logical(left, operator, self.precedence(power + 1))
+
+    def assign(self, target: Expr, power: int) -> Expr:
+        # Right-associative: `a = b = c` assigns `b = c` to `a`.
+        equals = self.previous()
+        value = self.precedence(power)
+
+        if isinstance(target, Variable):
+            return Assign(target.name, value)
+        if isinstance(target, Get):
+            return Set(target.object, target.name, value)
+
+        raise self.error(equals, "Invalid assignment target.")
+
+    def pipe_call(self, left: Expr, power: int) -> Expr:
+        # See Parser.pipe().
+        operator = self.previous()
+        right = self.precedence(power + 1)
+        if not isinstance(right, Variable):
+            raise self.error(operator, "Expect a function reference after '|>'.")
+        return Call(right, [left])
+
+    def ternary_branches(self, condition: Expr, power: int) -> Expr:
+        # Both branches are whole expressions, as in Parser.ternary().
+        left_operator = self.previous()
+        middle = self.expression()
+        right_operator = self.consume(TokenKind.COLON, "Expect ':' in ternary operator.")
+        right = self.expression()
+        return Ternary(condition, left_operator, middle, right_operator, right)
+
+    def ternary_fallback(self, condition: Expr, power: int) -> Expr:
+        operator = self.previous()
+        right = self.expression()
+        return Ternary(condition, operator, condition, operator, right)
+
+    def call(self) -> Optional[Expr]:
+        kinds = self.kinds
+        head = self.primaries.get(kinds[self.current])
+        if head is None:
+            expr = self.call_head()
+        else:
+            self.current += 1
+            expr = head()
+
+        while True:
+            if kinds[self.current] == TokenKind.DOT:
+                self.current += 1
+                name = self.consume(TokenKind.IDENTIFIER, "Expect property name after '.'.")
+                expr = self.finish_property_access(Get(expr, name))
+            elif kinds[self.current] == TokenKind.LEFT_BRACKET and self.is_index(0):
+                expr = self.index(expr)
+            else:
+                return expr
+
+    def identifier(self) -> Expr:
+        # Parser.call_head() for a name: a zero-argument call, a call with
+        # arguments, or just the variable.
+        name = self.previous()
+        kinds = self.kinds
+        kind = kinds[self.current]
+        if kind == TokenKind.LEFT_PAREN and kinds[self.current + 1] == TokenKind.RIGHT_PAREN:
+            self.current += 2
+            return Call(Variable(name), [])
+
+        if kind in ARGUMENT_START_TOKENS and not self.is_index(0):
+            arguments = [self.argument()]
+            while kinds[self.current] == TokenKind.COMMA:
+                self.current += 1
+                arguments.append(self.argument())
+            return Call(Variable(name), arguments)
+
+        return Variable(name)
+
+    def literal(self) -> Expr:
+        return Literal(self.tokens.literal(self.current - 1))
@@ -0,0 +1,215 @@
+from typing import Dict, List, Optional, Set as SetType, Union
+
+from environment import Environment
+from callable import NativeFunction
+from expression import Expr, Assign, Unary, Variable, Call, Get, Set, Self, Super, Break, Continue
+from statement import Stmt, Var, Block, For, Function, Class
+from token import TokenType
+
+# What a top-level name was first declared as, as far as a global read or
+# call in a function body needs to know (a second declaration is a runtime
+# error that leaves the first in place): the Function itself for a function
+# -- the runtime keeps that anyway -- and for a `var` or class only whether
+# it's mutable. Never the Var: under `--stream` its initializer would be
+# kept for the rest of the script.
+_Declaration = Union[Function, bool]
+
+
+# Finds the functions whose calls can be memoized (see memoization.py): those
+# that, given the same arguments, always return the same value and do
+# nothing else on the way. A function is pure when its body
+#
+# - reads no variable that can change: outside its own scopes only immutable
+#   `var`s, functions, classes and natives;
+# - assigns nothing outside its own scopes, and no property (no Set) --
+#   nor touches an instance at all (no Get, `self` or `super`);
+# - calls only natives that are pure (NativeFunction.pure: `concat`, but
+#   not `print`), itself, and top-level functions that are pure in turn;
+# - declares no function or class of its own, each call of which would make
+#   a new one, and has no `break` or `continue` outside a loop of its own.
+#
+# Every function declaration in the program is a candidate except methods,
+# which always have a `self` to read. Calls between top-level functions are
+# settled by starting from all the candidates that pass the checks above
+# and dropping, until none are left to drop, any that calls one no longer
+# among them -- so mutually recursive functions are pure together.
+#
+# Run by the Optimizer on each batch of top-level statements it's given
+# (see Iqalox.run_stream()), it keeps what it has learned of the globals
+# from one batch to the next. A global it hasn't seen declared is taken to
+# be mutable.
+class Purity:
+    def __init__(self, natives: Environment) -> None:
+        # Whether each native is pure, by its global name.
+        self.natives: Dict[str, bool] = {
+            name: data.value.pure for name, data in natives.values.items() if isinstance(data.value, NativeFunction)
+        }
+        self.declarations: Dict[str, _Declaration] = {}
+
+    def analyze(self, statements: List[Stmt]) -> None:
+        for statement in statements:
+            statement_type = type(statement)
+            if statement_type is Function:
+                self.declarations.setdefault(statement.name.lexeme, statement)
+            elif statement_type is Var or statement_type is Class:
+                self.declarations.setdefault(
+                    statement.name.lexeme, statement_type is Var and statement.is_mutable
+                )
+
+        # Each candidate, with the top-level functions it calls.
+        candidates: Dict[Function, SetType[str]] = {}
+        for function in _functions(statements):
+            calls = _Checker(self, function).check()
+            if calls is not None:
+                candidates[function] = calls
+
+        changed = True
+        while changed:
+            changed = False
+            for function, calls in list(candidates.items()):
+                if not all(self.is_pure_call(name, candidates) for name in calls):
+                    del candidates[function]
+                    changed = True
+        for function in candidates:
+            function.pure = True
+
+    def is_pure_call(self, name: str, candidates: Dict[Function, SetType[str]]) -> bool:
+        declaration = self.declarations[name]
+        return declaration in candidates or declaration.pure
+
+    def is_immutable(self, name: str) -> bool:
+        if name in self.natives:
+            return True
+        declaration = self.declarations.get(name)
+        return declaration is not None and declaration is not True
+
+    def callee(self, name: str) -> Optional[bool]:
+        # A global callee: True for a pure native, False for a top-level
+        # function (pure only if it turns out to be), None for anything
+        # else.
+        if name in self.natives:
+            return True if self.natives[name] else None
+        return False if type(self.declarations.get(name)) is Function else None
+
+
+def _functions(statements: List[Stmt]) -> List[Function]:
+    # Every Function declared in or under the statements, methods aside.
+    functions = []
+    pending: List[Stmt] = list(statements)
+    while pending:
+        statement = pending.pop()
+        statement_type = type(statement)
+        if statement_type is Function:
+            functions.append(statement)
+            pending.extend(statement.body)
+        elif statement_type is Block:
+            pending.extend(statement.statements)
+        elif statement_type is For:
+            pending.append(statement.body)
+    return functions
+
+
+class _Impure(Exception):
+    pass
+
+
+class _Checker:
+    # One function's body against Purity's rules, scope by scope as the
+    # Resolver saw it: a variable whose depth reaches past `scopes` lives
+    # outside the function.
+    def __init__(self, purity: Purity, function: Function) -> None:
+        self.purity = purity
+        self.function = function
+        self.scopes = 1
+        self.loops = 0
+        self.calls: SetType[str] = set()
+
+    def check(self) -> Optional[SetType[str]]:
+        # The top-level functions the body calls, or None if it's impure
+        # whatever they turn out to be.
+        try:
+            for statement in self.function.body:
+                self.check_stmt(statement)
+        except _Impure:
+            return None
+        return self.calls
+
+    def check_stmt(self, stmt: Optional[Stmt]) -> None:
+        stmt_type = type(stmt)
+        if stmt is None:
+            return
+        if stmt_type is Function or stmt_type is Class:
+            raise _Impure
+        if stmt_type is Block:
+            self.scopes += stmt.scoped
+            for statement in stmt.statements:
+                self.check_stmt(statement)
+            self.scopes -= stmt.scoped
+        elif stmt_type is For:
+            self.scopes += 1
+            self.check_stmt(stmt.initializer)
+            self.check_expr(stmt.condition)
+            self.check_expr(stmt.increment)
+            self.loops += 1
+            self.check_stmt(stmt.body)
+            self.loops -= 1
+            self.scopes -= 1
+        else:
+            # Expression, Var, Return: just their expressions.
+            for field in vars(stmt).values():
+                if isinstance(field, Expr):
+                    self.check_expr(field)
+
+    def check_expr(self, expr: Optional[Expr]) -> None:
+        expr_type = type(expr)
+        if expr is None:
+            return
+        if expr_type is Get or expr_type is Set or expr_type is Self or expr_type is Super:
+            raise _Impure
+        if expr_type is Break or expr_type is Continue:
+            if not self.loops:
+                raise _Impure
+        elif expr_type is Variable:
+            self.check_read(expr)
+        elif expr_type is Assign:
+            self.check_write(expr)
+        elif expr_type is Unary and expr.operator.type in (TokenType.PLUS_PLUS, TokenType.MINUS_MINUS):
+            self.check_write(expr.right)
+        elif expr_type is Call:
+            self.check_call(expr)
+            for argument in expr.arguments:
+                self.check_expr(argument)
+            return
+        for field in vars(expr).values():
+            if isinstance(field, Expr):
+                self.check_expr(field)
+            elif type(field) is list:
+                for item in field:
+                    self.check_expr(item)
+
+    def check_read(self, expr: Variable) -> None:
+        if expr.depth is None:
+            if not self.purity.is_immutable(expr.name.lexeme):
+                raise _Impure
+        elif expr.depth >= self.scopes and expr.is_mutable:
+            raise _Impure
+
+    def check_write(self, expr: Union[Assign, Variable]) -> None:
+        if expr.depth is None or expr.depth >= self.scopes:
+            raise _Impure
+
+    def check_call(self, expr: Call) -> None:
+        callee = expr.callee
+        if type(callee) is not Variable:
+            raise _Impure
+        name = callee.name.lexeme
+        if callee.depth is None:
+            kind = self.purity.callee(name)
+            if kind is None:
+                raise _Impure
+            if kind is False:
+                self.calls.add(name)
+        # A local function can only be relied on if it's this one, calling
+        # itself from the scope it was declared in.
+        elif callee.depth != self.scopes or callee.slot != self.function.slot or name != self.function.name.lexeme:
+            raise _Impure
@@ -0,0 +1,986 @@
+import ast
+import copy
+import operator
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from expression import Expr, ExprVisitor, Binary, Logical, Unary, Literal, Grouping, Ternary, Vector, Variable, \
+    Assign, Break, Continue, Ignore, Call, Get, Index, Slice, Set as SetExpr, Self, Super, Spread
+from statement import Stmt, StmtVisitor, Expression, Var, Block, For, Function, Return, Class
+from token import Token, TokenType
+from error import IqaloxRuntimeError
+from environment import VariableData
+from callable import IqaloxCallable, IqaloxFunction, IqaloxClass, IqaloxInstance, PropertyCache, \
+    StoreCache
+from interpreter import Interpreter
+from completion import Completion, CompletionType, BreakSignal, ContinueSignal
+from vectors import EMPTY_VECTOR, make_vector, is_elementwise, elementwise
+
+_ARITHMETIC = {
+    TokenType.MINUS: ast.Sub,
+    TokenType.PLUS: ast.Add,
+    TokenType.SLASH: ast.Div,
+    TokenType.STAR: ast.Mult,
+    TokenType.PERCENT: ast.Mod,
+    TokenType.POWER: ast.Pow,
+}
+
+_COMPARISONS = {
+    TokenType.GREATER: ast.Gt,
+    TokenType.GREATER_EQUAL: ast.GtE,
+    TokenType.LESS: ast.Lt,
+    TokenType.LESS_EQUAL: ast.LtE,
+}
+
+_NUMERIC_OPERATORS = {
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.MINUS: operator.sub,
+    TokenType.PLUS: operator.add,
+    TokenType.SLASH: operator.truediv,
+    TokenType.STAR: operator.mul,
+    TokenType.PERCENT: operator.mod,
+    TokenType.POWER: operator.pow,
+}
+
+
+class _Undefined:
+    def __repr__(self) -> str:
+        return '<undefined>'
+
+
+# What a local that a nested function refers to ahead of its declaration
+# holds until that declaration runs -- the tree-walker's "slot not appended
+# yet" (see Environment.get_at()).
+UNDEFINED = _Undefined()
+
+
+class Unsupported(Exception):
+    # Raised while lowering a statement that uses something PythonCompiler
+    # can't (yet) express as plain Python; PythonInterpreter then runs that
+    # statement on the tree-walker instead.
+    pass
+
+
+def _undefined(name: Token) -> IqaloxRuntimeError:
+    return IqaloxRuntimeError(name, f'Undefined variable \'{name.lexeme}\'.')
+
+
+def _raise_undefined(name: Token) -> Any:
+    raise _undefined(name)
+
+
+def _check_bound(value: Any, current: Any, name: Token) -> Any:
+    if current is UNDEFINED:
+        raise _undefined(name)
+    return value
+
+
+def _raise_immutable(value: Any, name: Token) -> Any:
+    raise IqaloxRuntimeError(name, f'Assigning to immutable variable \'{name.lexeme}\' not allowed.')
+
+
+def _step(value: Any, operator_token: Token, step: float) -> float:
+    Interpreter.check_number_operand(operator_token, value)
+    return float(value) + step
+
+
+def _negate(value: Any, operator_token: Token) -> float:
+    Interpreter.check_number_operand(operator_token, value)
+    return -float(value)
+
+
+def _binary(operator_token: Token, left: Any, right: Any) -> Any:
+    # The slow path behind every guarded arithmetic/comparison operator:
+    # reached for anything but two floats (or a float zero divisor), it
+    # repeats Interpreter.visit_binary_expr()'s checks exactly.
+    if is_elementwise(operator_token.type, left, right):
+        return elementwise(operator_token, left, right)
+    Interpreter.check_number_operands(operator_token, left, right)
+    if operator_token.type == TokenType.SLASH and right == 0:
+        raise IqaloxRuntimeError(operator_token, 'Division by zero.')
+    return _NUMERIC_OPERATORS[operator_token.type](left, right)
+
+
+def _get_property(obj: Any, name: Token, cache: PropertyCache) -> Any:
+    if isinstance(obj, IqaloxInstance):
+        return obj.get(name, cache)
+    raise IqaloxRuntimeError(name, 'Only instances have properties.')
+
+
+def _set_field(instance: IqaloxInstance, name: Token, value: Any, cache: StoreCache) -> Any:
+    instance.set(name, value, cache)
+    return value
+
+
+def _raise_not_instance(name: Token) -> Any:
+    raise IqaloxRuntimeError(name, 'Only instances have fields.')
+
+
+def _check_superclass(superclass: Any, name: Token) -> IqaloxClass:
+    if not isinstance(superclass, IqaloxClass):
+        raise IqaloxRuntimeError(name, 'Superclass must be a class.')
+    return superclass
+
+
+def _bind_super(superclass: IqaloxClass, instance: IqaloxInstance, method_name: Token) -> IqaloxFunction:
+    method = superclass.find_method(method_name.lexeme)
+    if method is None:
+        raise IqaloxRuntimeError(method_name, f"Undefined property '{method_name.lexeme}'.")
+    return method.bind(instance)
+
+
+class PythonFunction(IqaloxFunction):
+    # An IqaloxFunction lowered to a real Python function: `code` takes the
+    # Iqalox arguments as its positional parameters. A method's `code` is
+    # made per binding by `binder`, which closes it over its `self`.
+    def __init__(self, declaration: Function, code: Optional[Callable], binder: Optional[Callable] = None) -> None:
+        super().__init__(declaration, None)
+        self.code = code
+        self.binder = binder
+        self.parameter_count = len(declaration.params)
+
+    def call(self, interpreter: Any, arguments: List[Any]) -> Any:
+        return self.code(*arguments)
+
+    def call_method(self, interpreter: Any, instance: IqaloxInstance, arguments: List[Any]) -> Any:
+        return self.binder(instance)(*arguments)
+
+    def enter(self, interpreter: Any, instance: Optional[IqaloxInstance], arguments: List[Any]) -> Any:
+        # As the target of a tree-walked function's tail call.
+        if instance is None:
+            return Completion(CompletionType.RETURN, self.code(*arguments))
+        return Completion(CompletionType.RETURN, self.binder(instance)(*arguments))
+
+    def bind(self, instance: IqaloxInstance) -> 'PythonFunction':
+        return PythonFunction(self.declaration, self.binder(instance), self.binder)
+
+
+def _load(name: str) -> ast.expr:
+    return ast.Name(name, ast.Load())
+
+
+def _store(name: str) -> ast.expr:
+    return ast.Name(name, ast.Store())
+
+
+def _walrus(name: str, value: ast.expr) -> ast.expr:
+    return ast.NamedExpr(_store(name), value)
+
+
+def _call(function: ast.expr, *arguments: ast.expr) -> ast.expr:
+    return ast.Call(function, list(arguments), [])
+
+
+def _is(left: ast.expr, right: ast.expr) -> ast.expr:
+    return ast.Compare(left, [ast.Is()], [right])
+
+
+def _is_not(left: ast.expr, right: ast.expr) -> ast.expr:
+    return ast.Compare(left, [ast.IsNot()], [right])
+
+
+def _is_float(value: ast.expr) -> ast.expr:
+    return _is(_call(_load('type'), value), _load('float'))
+
+
+def _function_def(name: str, parameters: List[str], body: List[ast.stmt]) -> ast.FunctionDef:
+    arguments = ast.arguments(
+        posonlyargs=[], args=[ast.arg(parameter) for parameter in parameters], kwonlyargs=[], kw_defaults=[],
+        defaults=[]
+    )
+    return ast.FunctionDef(name, arguments, body or [ast.Pass()], [], None)
+
+
+def _catch_overflow(body: List[ast.stmt]) -> List[ast.stmt]:
+    # A generated function's body, turning a RecursionError that reaches it
+    # into _stack_overflow()'s error. (A `try` costs nothing until something
+    # is raised.)
+    handler = ast.ExceptHandler(
+        _load('RecursionError'), '_error',
+        [ast.Raise(_call(_load('_stack_overflow'), _load('_error'), _load('_call_sites')), ast.Constant(None))]
+    )
+    return [ast.Try(body or [ast.Pass()], [handler], [], [])]
+
+
+def _stack_overflow(error: RecursionError, call_sites: List[Token]) -> Exception:
+    # The error for Python's stack running out under a generated function:
+    # a Stack overflow at the call it was making -- its line number is that
+    # call's (see PythonCompiler.call_site()) -- or, if it wasn't making one,
+    # the RecursionError again, for its caller to place.
+    line = error.__traceback__.tb_lineno
+    if line < 2:
+        return error
+    return IqaloxRuntimeError(call_sites[line - 2], 'Stack overflow.')
+
+
+class _Unit:
+    # One generated Python function: the top-level statement's `_unit`, an
+    # Iqalox function/method body, a method's binder or a class body.
+    def __init__(self, is_function: bool) -> None:
+        self.is_function = is_function
+        # Effect statements of each enclosing `for`'s increment, innermost
+        # last -- copied in front of every `continue`, which would otherwise
+        # skip them.
+        self.loops: List[List[ast.stmt]] = []
+        self.nonlocals: Set[str] = set()
+
+
+class _Scope:
+    # Mirrors one Environment (and thus one Resolver scope). Each local it
+    # holds becomes the Python local `<name>_<scope id>` of `unit`, so names
+    # never clash with the generated code's own (which never end in
+    # `_<digits>`) or with a shadowed local of another scope.
+    def __init__(self, unit: _Unit, scope_id: int, per_iteration: bool) -> None:
+        self.unit = unit
+        self.id = scope_id
+        # Whether a fresh Environment is made for this scope on every
+        # iteration of a loop in the same function -- Python cells are per
+        # call, not per iteration, so nested functions can't capture these.
+        self.per_iteration = per_iteration
+        self.declared: Set[str] = set()
+        # Local functions declared here, name -> (Python def, arity), so a
+        # call to one can go straight to its code.
+        self.functions: Dict[str, Tuple[str, int]] = {}
+        # Locals some nested function refers to before their declaration ran.
+        self.forward: Set[str] = set()
+
+    def name(self, lexeme: str) -> str:
+        return f'{lexeme}_{self.id}'
+
+
+# Lowers one resolved top-level statement (see resolver.py) to a Python
+# ast.Module defining `_unit()`, and compile()s it -- Iqalox locals become
+# real Python locals, functions real Python functions, `for` a `while`.
+# Language semantics survive as guards around the Python operations:
+# arithmetic and comparisons only run natively on two floats and otherwise
+# go through _binary()'s checks, `/` checks its divisor, immutable or
+# not-yet-declared locals raise the same errors as in the tree-walker.
+# Anything it can't lower raises Unsupported instead.
+class PythonCompiler(ExprVisitor, StmtVisitor):
+    def __init__(self, namespace: Dict[str, Any]) -> None:
+        self.namespace = namespace
+        self.scopes: List[_Scope] = []
+        self.unit = _Unit(is_function=False)
+        # The global function whose body is being lowered: (name, Python
+        # def, arity). Its own global binding can't change once its body can
+        # run, so self-recursive calls skip the globals lookup.
+        self.global_function: Optional[Tuple[str, str, int]] = None
+        self.counter = 0
+        # Every call lowered, by its line number in the generated code (see
+        # call_site()).
+        self.call_sites: List[Token] = []
+        namespace['_call_sites'] = self.call_sites
+
+    def compile(self, stmt: Stmt) -> Callable[[], None]:
+        self.scopes = []
+        self.unit = _Unit(is_function=False)
+        self.global_function = None
+        body = self.lower_stmt(stmt)
+        module = ast.Module([_function_def('_unit', [], _catch_overflow(body))], [])
+        ast.fix_missing_locations(module)
+        try:
+            code = compile(module, '<iqalox>', 'exec')
+        except (SyntaxError, RecursionError, ValueError) as error:
+            # E.g. CPython's limit on statically nested blocks.
+            raise Unsupported(str(error)) from None
+        exec(code, self.namespace)
+        return self.namespace['_unit']
+
+    def fresh(self, prefix: str) -> str:
+        self.counter += 1
+        return f'{prefix}{self.counter}'
+
+    def call_site(self, call: ast.expr, name_token: Token) -> ast.expr:
+        # Numbers the call's line in the generated code after its place in
+        # call_sites, line 1 being everything that isn't a call, so
+        # _stack_overflow() can tell which call Python's stack ran out at.
+        self.call_sites.append(name_token)
+        call.lineno = call.end_lineno = len(self.call_sites) + 1
+        call.col_offset = call.end_col_offset = 0
+        return call
+
+    def constant(self, value: Any) -> ast.expr:
+        name = self.fresh('_k')
+        self.namespace[name] = value
+        return _load(name)
+
+    def begin_scope(self, unit: _Unit, per_iteration: Optional[bool] = None) -> _Scope:
+        if per_iteration is None:
+            per_iteration = bool(unit.loops)
+        self.counter += 1
+        scope = _Scope(unit, self.counter, per_iteration)
+        self.scopes.append(scope)
+        return scope
+
+    def end_scope(self, body: List[ast.stmt]) -> List[ast.stmt]:
+        scope = self.scopes.pop()
+        undefined = [
+            ast.Assign([_store(name)], _load('_UNDEFINED')) for name in sorted(scope.forward)
+        ]
+        return undefined + body
+
+    def lower_stmt(self, stmt: Stmt) -> List[ast.stmt]:
+        return stmt.accept(self)
+
+    def lower_statements(self, statements: List[Stmt]) -> List[ast.stmt]:
+        lowered = []
+        for statement in statements:
+            lowered.extend(self.lower_stmt(statement))
+        return lowered
+
+    def lower(self, expr: Expr) -> ast.expr:
+        return expr.accept(self)
+
+    # -- variables ---------------------------------------------------------
+
+    def local_scope(self, depth: int) -> _Scope:
+        scope = self.scopes[-1 - depth]
+        if scope.unit is not self.unit and scope.per_iteration:
+            raise Unsupported('closure over a per-iteration local')
+        return scope
+
+    def read(self, name: Token, depth: Optional[int], lexeme: Optional[str] = None) -> ast.expr:
+        lexeme = lexeme or name.lexeme
+        if depth is None:
+            # globals.values[name].value -- or Environment.get()'s error.
+            return ast.IfExp(
+                ast.Compare(ast.Constant(lexeme), [ast.In()], [_load('_globals')]),
+                ast.Attribute(ast.Subscript(_load('_globals'), ast.Constant(lexeme), ast.Load()), 'value', ast.Load()),
+                _call(_load('_raise_undefined'), self.constant(name)),
+            )
+
+        scope = self.local_scope(depth)
+        python_name = scope.name(lexeme)
+        if lexeme in scope.declared:
+            return _load(python_name)
+
+        scope.forward.add(python_name)
+        temporary = self.fresh('_t')
+        return ast.IfExp(
+            _is_not(_walrus(temporary, _load(python_name)), _load('_UNDEFINED')),
+            _load(temporary),
+            _call(_load('_raise_undefined'), self.constant(name)),
+        )
+
+    def assign(self, target: Any, value: ast.expr) -> ast.expr:
+        # `target` is the Assign or Variable node carrying the resolved
+        # address; returns an expression assigning `value` and yielding it.
+        name = target.name
+        if target.depth is None:
+            return _call(_load('_assign_global'), self.constant(name), value)
+
+        scope = self.local_scope(target.depth)
+        python_name = scope.name(name.lexeme)
+        if name.lexeme not in scope.declared:
+            scope.forward.add(python_name)
+            value = _call(_load('_check_bound'), value, _load(python_name), self.constant(name))
+        if not target.is_mutable:
+            return _call(_load('_raise_immutable'), value, self.constant(name))
+        if scope.unit is not self.unit:
+            self.unit.nonlocals.add(python_name)
+        return _walrus(python_name, value)
+
+    def declare(self, name: Token, slot: Optional[int], value: ast.expr, is_mutable: bool) -> List[ast.stmt]:
+        if slot is None:
+            return [ast.Expr(_call(
+                _load('_define_global'), ast.Constant(name.lexeme), value, ast.Constant(is_mutable)
+            ))]
+        scope = self.scopes[-1]
+        scope.declared.add(name.lexeme)
+        return [ast.Assign([_store(scope.name(name.lexeme))], value)]
+
+    def direct_code(self, callee: Expr, argument_count: int) -> Optional[str]:
+        # The Python def a call can jump straight to: a local function
+        # already declared (function bindings are immutable), or the global
+        # function currently being lowered calling itself.
+        if not isinstance(callee, Variable):
+            return None
+        lexeme = callee.name.lexeme
+        if callee.depth is None:
+            if self.global_function is None or self.global_function[0] != lexeme:
+                return None
+            code, arity = self.global_function[1:]
+        else:
+            scope = self.local_scope(callee.depth)
+            if lexeme not in scope.declared or lexeme not in scope.functions:
+                return None
+            code, arity = scope.functions[lexeme]
+        return code if arity == argument_count else None
+
+    # -- truthiness and effects ---------------------------------------------
+
+    @staticmethod
+    def is_boolean(expr: Expr) -> bool:
+        # Expressions the lowered code always evaluates to a real bool, whose
+        # Python truthiness is thus already Iqalox's.
+        if isinstance(expr, Grouping):
+            return PythonCompiler.is_boolean(expr.expression)
+        if isinstance(expr, Literal):
+            return isinstance(expr.value, bool)
+        if isinstance(expr, Unary):
+            return expr.operator.type == TokenType.BANG
+        if isinstance(expr, Binary):
+            return expr.operator.type in _COMPARISONS or expr.operator.type in (
+                TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL
+            )
+        if isinstance(expr, Logical):
+            return PythonCompiler.is_boolean(expr.left) and PythonCompiler.is_boolean(expr.right)
+        return False
+
+    def truthy(self, expr: Expr) -> Tuple[ast.expr, ast.expr]:
+        # (test, value): `test` is Interpreter.is_truthy() of the lowered
+        # expression, `value` re-reads that same value afterwards.
+        value = self.lower(expr)
+        if isinstance(value, ast.Constant):
+            return ast.Constant(Interpreter.is_truthy(value.value)), value
+        if self.is_boolean(expr):
+            if isinstance(value, ast.Name):
+                return value, value
+            temporary = self.fresh('_t')
+            return _walrus(temporary, value), _load(temporary)
+        if isinstance(value, ast.Name):
+            subject, reread = value, value
+        else:
+            temporary = self.fresh('_t')
+            subject, reread = _walrus(temporary, value), _load(temporary)
+        test = ast.BoolOp(ast.And(), [_is_not(subject, ast.Constant(None)), _is_not(reread, ast.Constant(False))])
+        return test, reread
+
+    def lower_effect(self, expr: Expr) -> List[ast.stmt]:
+        # `expr` as an expression statement: its value is discarded, which
+        # lets `break`/`continue` (expressions in Iqalox, statements in
+        # Python) appear in any branch of a conditional.
+        if isinstance(expr, Grouping):
+            return self.lower_effect(expr.expression)
+        if isinstance(expr, Break):
+            if not self.unit.loops:
+                raise Unsupported("'break' outside of a loop")
+            return [ast.Break()]
+        if isinstance(expr, Continue):
+            if not self.unit.loops:
+                raise Unsupported("'continue' outside of a loop")
+            return copy.deepcopy(self.unit.loops[-1]) + [ast.Continue()]
+        if isinstance(expr, (Literal, Ignore)):
+            return []
+        if isinstance(expr, Ternary):
+            test, _ = self.truthy(expr.left)
+            if expr.middle is expr.left:
+                return [ast.If(test, [ast.Pass()], self.lower_effect(expr.right))]
+            return [ast.If(test, self.lower_effect(expr.middle) or [ast.Pass()], self.lower_effect(expr.right))]
+        if isinstance(expr, Logical):
+            test, _ = self.truthy(expr.left)
+            if expr.operator.type == TokenType.OR:
+                return [ast.If(test, [ast.Pass()], self.lower_effect(expr.right) or [ast.Pass()])]
+            return [ast.If(test, self.lower_effect(expr.right) or [ast.Pass()], [])]
+        if isinstance(expr, Binary) and expr.operator.type == TokenType.DOUBLE_QUESTION_MARK:
+            left = self.lower(expr.left)
+            if isinstance(left, ast.Constant):
+                return [] if left.value is not None else self.lower_effect(expr.right)
+            # Tested by name: CPython folds a constant BinOp left here and
+            # warns about `is` with a literal.
+            if not isinstance(left, ast.Name):
+                left = _walrus(self.fresh('_t'), left)
+            return [ast.If(
+                _is(left, ast.Constant(None)), self.lower_effect(expr.right) or [ast.Pass()], []
+            )]
+        if isinstance(expr, Binary) and expr.operator.type == TokenType.COMMA:
+            return [ast.Expr(self.lower(expr.left))] + self.lower_effect(expr.right)
+        if isinstance(expr, SetExpr):
+            # A shape the site's StoreCache already knows is stored inline,
+            # as in IqaloxInstance.set(); anything else goes through set().
+            temporary, value = self.fresh('_t'), self.fresh('_t')
+            cache = self.constant(StoreCache())
+            shape = ast.Attribute(_load(temporary), 'shape', ast.Load())
+            target = ast.Attribute(cache, 'target', ast.Load())
+            values = ast.Attribute(_load(temporary), 'values', ast.Load())
+            field = ast.Subscript(values, ast.Attribute(cache, 'slot', ast.Load()), ast.Store())
+            store = ast.If(
+                _is(shape, ast.Attribute(cache, 'shape', ast.Load())),
+                [ast.If(
+                    _is(target, shape),
+                    [ast.Assign([field], _load(value))],
+                    [
+                        ast.Expr(_call(ast.Attribute(values, 'append', ast.Load()), _load(value))),
+                        ast.Assign([ast.Attribute(_load(temporary), 'shape', ast.Store())], target),
+                    ],
+                )],
+                [ast.Expr(_call(
+                    ast.Attribute(_load(temporary), 'set', ast.Load()), self.constant(expr.name), _load(value), cache
+                ))],
+            )
+            return [ast.If(
+                _is(_call(_load('type'), _walrus(temporary, self.lower(expr.object))), _load('_Instance')),
+                [ast.Assign([_store(value)], self.lower(expr.value)), store],
+                [ast.Expr(_call(_load('_raise_not_instance'), self.constant(expr.name)))],
+            )]
+
+        value = self.lower(expr)
+        if isinstance(value, ast.NamedExpr):
+            return [ast.Assign([value.target], value.value)]
+        return [ast.Expr(value)]
+
+    # -- statements --------------------------------------------------------
+
+    def visit_block_stmt(self, stmt: Block) -> List[ast.stmt]:
+        # Mirrors the Resolver's scopes, which skip a block that declares
+        # nothing.
+        if not stmt.scoped:
+            return self.lower_statements(stmt.statements)
+        self.begin_scope(self.unit)
+        return self.end_scope(self.lower_statements(stmt.statements))
+
+    def visit_expression_stmt(self, stmt: Expression) -> List[ast.stmt]:
+        return self.lower_effect(stmt.expression)
+
+    def visit_var_stmt(self, stmt: Var) -> List[ast.stmt]:
+        value = ast.Constant(None) if stmt.initializer is None else self.lower(stmt.initializer)
+        return self.declare(stmt.name, stmt.slot, value, stmt.is_mutable)
+
+    def visit_return_stmt(self, stmt: Return) -> List[ast.stmt]:
+        if not self.unit.is_function:
+            raise Unsupported("'return' outside of a function")
+        return [ast.Return(ast.Constant(None) if stmt.value is None else self.lower(stmt.value))]
+
+    def visit_for_stmt(self, stmt: For) -> List[ast.stmt]:
+        self.begin_scope(self.unit)
+        lowered = [] if stmt.initializer is None else self.lower_stmt(stmt.initializer)
+        if stmt.condition is None:
+            test = ast.Constant(True)
+        else:
+            test, _ = self.truthy(stmt.condition)
+        increment = [] if stmt.increment is None else self.lower_effect(stmt.increment)
+
+        self.unit.loops.append(increment)
+        try:
+            body = self.lower_stmt(stmt.body)
+        finally:
+            self.unit.loops.pop()
+
+        # A tree-walked function (one this compiler fell back on) may still
+        # `break`/`continue` the loop it's called from by raising the
+        # tree-walker's signals -- handlers that cost nothing unless raised.
+        guarded_body = ast.Try(body or [ast.Pass()], [
+            ast.ExceptHandler(_load('_BreakSignal'), None, [ast.Break()]),
+            ast.ExceptHandler(_load('_ContinueSignal'), None, [ast.Pass()]),
+        ], [], [])
+        lowered.append(ast.While(test, [guarded_body] + copy.deepcopy(increment), []))
+        return self.end_scope(lowered)
+
+    def lower_function(self, stmt: Function, code: str) -> ast.FunctionDef:
+        # The body runs straight in the parameters' scope, as in
+        # IqaloxFunction.call().
+        enclosing_unit = self.unit
+        self.unit = _Unit(is_function=True)
+        scope = self.begin_scope(self.unit, per_iteration=False)
+        for param in stmt.params:
+            scope.declared.add(param.lexeme)
+        try:
+            body = _catch_overflow(self.end_scope(self.lower_statements(stmt.body)))
+            if self.unit.nonlocals:
+                body.insert(0, ast.Nonlocal(sorted(self.unit.nonlocals)))
+            return _function_def(code, [scope.name(param.lexeme) for param in stmt.params], body)
+        finally:
+            self.unit = enclosing_unit
+
+    def visit_function_stmt(self, stmt: Function) -> List[ast.stmt]:
+        code = self.fresh('_code')
+        arity = len(stmt.params)
+        enclosing_global_function = self.global_function
+        if stmt.slot is None:
+            self.global_function = (stmt.name.lexeme, code, arity)
+        else:
+            # Declared before its body is lowered: a body can only run once
+            # the binding exists, so calls to itself go straight to `code`.
+            scope = self.scopes[-1]
+            scope.declared.add(stmt.name.lexeme)
+            scope.functions[stmt.name.lexeme] = (code, arity)
+        try:
+            definition = self.lower_function(stmt, code)
+        finally:
+            self.global_function = enclosing_global_function
+
+        value = _call(_load('_Function'), self.constant(stmt), _load(code))
+        return [definition] + self.declare(stmt.name, stmt.slot, value, is_mutable=False)
+
+    def visit_class_stmt(self, stmt: Class) -> List[ast.stmt]:
+        # A class becomes a Python function taking the superclass (so every
+        # execution of the class statement gets its own `super` cell)
+        # returning the IqaloxClass; each method a binder taking `self` and
+        # returning the method's code closed over it.
+        superclass = None
+        if stmt.superclass is not None:
+            superclass = _call(
+                _load('_check_superclass'), self.lower(stmt.superclass), self.constant(stmt.superclass.name)
+            )
+        if stmt.slot is not None:
+            self.scopes[-1].declared.add(stmt.name.lexeme)
+
+        maker = self.fresh('_class')
+        enclosing_unit = self.unit
+        self.unit = _Unit(is_function=False)
+        parameters = []
+        if stmt.superclass is not None:
+            super_scope = self.begin_scope(self.unit, per_iteration=False)
+            super_scope.declared.add('super')
+            parameters.append(super_scope.name('super'))
+        try:
+            body = []
+            methods = []
+            for method in stmt.methods:
+                binder_unit = self.unit
+                binder = self.fresh('_bind')
+                self.unit = _Unit(is_function=False)
+                self_scope = self.begin_scope(self.unit, per_iteration=False)
+                self_scope.declared.add('self')
+                code = self.fresh('_code')
+                try:
+                    definition = self.lower_function(method, code)
+                    binder_body = self.end_scope([definition, ast.Return(_load(code))])
+                    if self.unit.nonlocals:
+                        binder_body.insert(0, ast.Nonlocal(sorted(self.unit.nonlocals)))
+                finally:
+                    self.unit = binder_unit
+                body.append(_function_def(binder, [self_scope.name('self')], binder_body))
+                methods.append((method, binder))
+
+            table = ast.Dict(
+                [ast.Constant(method.name.lexeme) for method, _ in methods],
+                [_call(_load('_Function'), self.constant(method), ast.Constant(None), _load(binder))
+                 for method, binder in methods],
+            )
+            superclass_value = _load(parameters[0]) if parameters else ast.Constant(None)
+            body.append(ast.Return(_call(_load('_Class'), ast.Constant(stmt.name.lexeme), superclass_value, table)))
+            if stmt.superclass is not None:
+                body = self.end_scope(body)
+            if self.unit.nonlocals:
+                body.insert(0, ast.Nonlocal(sorted(self.unit.nonlocals)))
+        finally:
+            self.unit = enclosing_unit
+
+        value = _call(_load(maker), superclass) if parameters else _call(_load(maker))
+        definition = _function_def(maker, parameters, body)
+        return [definition] + self.declare(stmt.name, stmt.slot, value, is_mutable=False)
+
+    # -- expressions -------------------------------------------------------
+
+    def visit_assign_expr(self, expr: Assign) -> ast.expr:
+        return self.assign(expr, self.lower(expr.value))
+
+    def visit_literal_expr(self, expr: Literal) -> ast.expr:
+        return ast.Constant(expr.value)
+
+    def visit_grouping_expr(self, expr: Grouping) -> ast.expr:
+        return self.lower(expr.expression)
+
+    def visit_vector_expr(self, expr: Vector) -> ast.expr:
+        if not any(type(value) is Spread for value in expr.values):
+            return _call(_load('_vector'), ast.List([self.lower(value) for value in expr.values], ast.Load()))
+        # `_empty_vector.append(a).concat(<...b>)`, and so on: see
+        # Interpreter.visit_vector_expr().
+        vector = _load('_empty_vector')
+        for value in expr.values:
+            method = 'concat' if type(value) is Spread else 'append'
+            vector = _call(ast.Attribute(vector, method, ast.Load()), self.lower(value))
+        return vector
+
+    def visit_spread_expr(self, expr: Spread) -> ast.expr:
+        return _call(_load('_spread'), self.constant(expr.operator), self.lower(expr.expression))
+
+    def visit_index_expr(self, expr: Index) -> ast.expr:
+        return _call(_load('_index'), self.constant(expr.bracket), self.lower(expr.object), self.lower(expr.index))
+
+    def visit_slice_expr(self, expr: Slice) -> ast.expr:
+        # A bound left out is nil, to Interpreter.slice_vector().
+        bounds = [ast.Constant(None) if bound is None else self.lower(bound) for bound in (expr.start, expr.stop)]
+        return _call(_load('_slice'), self.constant(expr.bracket), self.lower(expr.object), *bounds)
+
+    def number_operand(self, value: ast.expr) -> Tuple[ast.expr, Optional[ast.expr], bool]:
+        # (value, check, binds): `value` re-reads the operand, `check` tests
+        # it is a float (None when it's a float literal), `binds` tells
+        # whether `check` must run for `value` to be bound at all.
+        if isinstance(value, ast.Constant) and type(value.value) is float:
+            return value, None, False
+        if isinstance(value, (ast.Name, ast.Constant)):
+            return value, _is_float(value), False
+        temporary = self.fresh('_t')
+        return _load(temporary), _is_float(_walrus(temporary, value)), True
+
+    def guarded(self, expr: Binary, fast: Callable[[ast.expr, ast.expr], ast.expr]) -> ast.expr:
+        left, left_check, _ = self.number_operand(self.lower(expr.left))
+        right, right_check, right_binds = self.number_operand(self.lower(expr.right))
+        checks = [check for check in (left_check, right_check) if check is not None]
+        if len(checks) == 2:
+            # `&`, not `and`: the right operand must be evaluated (and bound)
+            # even when the left one isn't a float.
+            test = ast.BinOp(left_check, ast.BitAnd(), right_check) if right_binds else \
+                ast.BoolOp(ast.And(), checks)
+        else:
+            test = checks[0] if checks else None
+        if expr.operator.type == TokenType.SLASH:
+            test = right if test is None else ast.BoolOp(ast.And(), [test, right])
+        if test is None:
+            return fast(left, right)
+        return ast.IfExp(test, fast(left, right), _call(_load('_binary'), self.constant(expr.operator), left, right))
+
+    def visit_unary_expr(self, expr: Unary) -> ast.expr:
+        operator_token = expr.operator
+
+        if operator_token.type in (TokenType.PLUS_PLUS, TokenType.MINUS_MINUS):
+            step = 1.0 if operator_token.type == TokenType.PLUS_PLUS else -1.0
+            current, check, _ = self.number_operand(self.read(expr.right.name, expr.right.depth))
+            value = ast.IfExp(
+                check,
+                ast.BinOp(current, ast.Add(), ast.Constant(step)),
+                _call(_load('_step'), current, self.constant(operator_token), ast.Constant(step)),
+            )
+            return self.assign(expr.right, value)
+
+        if operator_token.type == TokenType.BANG:
+            test, _ = self.truthy(expr.right)
+            return ast.UnaryOp(ast.Not(), test)
+
+        right = self.lower(expr.right)
+        if operator_token.type == TokenType.MINUS:
+            if isinstance(right, ast.Constant) and type(right.value) is float:
+                return ast.Constant(-right.value)
+            value, check, _ = self.number_operand(right)
+            return ast.IfExp(
+                check, ast.UnaryOp(ast.USub(), value), _call(_load('_negate'), value, self.constant(operator_token))
+            )
+
+        return ast.Subscript(ast.Tuple([right, ast.Constant(None)], ast.Load()), ast.Constant(1), ast.Load())
+
+    def visit_logical_expr(self, expr: Logical) -> ast.expr:
+        right = self.lower(expr.right)
+        if self.is_boolean(expr.left):
+            operation = ast.Or() if expr.operator.type == TokenType.OR else ast.And()
+            return ast.BoolOp(operation, [self.lower(expr.left), right])
+
+        test, value = self.truthy(expr.left)
+        if expr.operator.type == TokenType.OR:
+            return ast.IfExp(test, value, right)
+        return ast.IfExp(test, right, value)
+
+    def visit_break_expr(self, expr: Break) -> ast.expr:
+        raise Unsupported("'break' used as a value")
+
+    def visit_continue_expr(self, expr: Continue) -> ast.expr:
+        raise Unsupported("'continue' used as a value")
+
+    def visit_ignore_expr(self, expr: Ignore) -> ast.expr:
+        return ast.Constant(None)
+
+    def visit_call_expr(self, expr: Call) -> ast.expr:
+        name_token = expr.callee.method if isinstance(expr.callee, Super) else expr.callee.name
+        code = self.direct_code(expr.callee, len(expr.arguments))
+        if code is not None:
+            function = _load(code)
+        elif isinstance(expr.callee, Get):
+            # `instance.method args`: _method_code() hands back the method's
+            # code bound straight to the instance, without a bound method.
+            function = _call(
+                _load('_method_code'), self.lower(expr.callee.object), self.constant(name_token),
+                self.constant(PropertyCache()), ast.Constant(len(expr.arguments)),
+            )
+        else:
+            # A lowered function (or bound method) of the right arity is
+            # called straight through its code; anything else through
+            # _callable()'s PythonInterpreter.call_value(), which checks it
+            # like the tree-walker does -- after the arguments have been
+            # evaluated.
+            temporary = self.fresh('_t')
+            function = ast.IfExp(
+                ast.BoolOp(ast.And(), [
+                    _is(_call(_load('type'), _walrus(temporary, self.lower(expr.callee))), _load('_Function')),
+                    ast.Compare(
+                        ast.Attribute(_load(temporary), 'parameter_count', ast.Load()), [ast.Eq()],
+                        [ast.Constant(len(expr.arguments))]
+                    ),
+                ]),
+                ast.Attribute(_load(temporary), 'code', ast.Load()),
+                _call(_load('_callable'), _load(temporary), self.constant(name_token)),
+            )
+        return self.call_site(_call(function, *(self.lower(argument) for argument in expr.arguments)), name_token)
+
+    def visit_get_expr(self, expr: Get) -> ast.expr:
+        # The site's PropertyCache, checked inline for a monomorphic field
+        # hit; anything else goes through _get_property().
+        temporary = self.fresh('_t')
+        cache = self.constant(PropertyCache())
+        slot = ast.Attribute(cache, 'slot', ast.Load())
+        return ast.IfExp(
+            ast.BoolOp(ast.And(), [
+                _is(_call(_load('type'), _walrus(temporary, self.lower(expr.object))), _load('_Instance')),
+                _is(ast.Attribute(_load(temporary), 'shape', ast.Load()), ast.Attribute(cache, 'shape', ast.Load())),
+                _is_not(slot, ast.Constant(None)),
+            ]),
+            ast.Subscript(ast.Attribute(_load(temporary), 'values', ast.Load()), slot, ast.Load()),
+            _call(_load('_get_property'), _load(temporary), self.constant(expr.name), cache),
+        )
+
+    def visit_set_expr(self, expr: SetExpr) -> ast.expr:
+        temporary = self.fresh('_t')
+        return ast.IfExp(
+            _is(_call(_load('type'), _walrus(temporary, self.lower(expr.object))), _load('_Instance')),
+            _call(
+                _load('_set_field'), _load(temporary), self.constant(expr.name), self.lower(expr.value),
+                self.constant(StoreCache()),
+            ),
+            _call(_load('_raise_not_instance'), self.constant(expr.name)),
+        )
+
+    def visit_self_expr(self, expr: Self) -> ast.expr:
+        return self.read(expr.keyword, expr.depth, 'self')
+
+    def visit_super_expr(self, expr: Super) -> ast.expr:
+        if expr.depth is None:
+            return self.read(expr.keyword, None, expr.keyword.lexeme)
+        # `self` is always bound one scope inside `super`.
+        return _call(
+            _load('_bind_super'), self.read(expr.keyword, expr.depth, 'super'),
+            self.read(expr.keyword, expr.depth - 1, 'self'), self.constant(expr.method)
+        )
+
+    def visit_variable_expr(self, expr: Variable) -> ast.expr:
+        return self.read(expr.name, expr.depth)
+
+    def visit_binary_expr(self, expr: Binary) -> ast.expr:
+        token_type = expr.operator.type
+
+        if token_type == TokenType.DOUBLE_QUESTION_MARK:
+            left = self.lower(expr.left)
+            if isinstance(left, ast.Constant):
+                return left if left.value is not None else self.lower(expr.right)
+            if isinstance(left, ast.Name):
+                test, value = _is_not(left, ast.Constant(None)), left
+            else:
+                temporary = self.fresh('_t')
+                test, value = _is_not(_walrus(temporary, left), ast.Constant(None)), _load(temporary)
+            return ast.IfExp(test, value, self.lower(expr.right))
+
+        if token_type == TokenType.COMMA:
+            pair = ast.Tuple([self.lower(expr.left), self.lower(expr.right)], ast.Load())
+            return ast.Subscript(pair, ast.Constant(1), ast.Load())
+
+        if token_type == TokenType.EQUAL_EQUAL:
+            return ast.Compare(self.lower(expr.left), [ast.Eq()], [self.lower(expr.right)])
+
+        if token_type == TokenType.BANG_EQUAL:
+            return ast.UnaryOp(ast.Not(), ast.Compare(self.lower(expr.left), [ast.Eq()], [self.lower(expr.right)]))
+
+        if token_type in _COMPARISONS:
+            comparison = _COMPARISONS[token_type]
+            return self.guarded(expr, lambda left, right: ast.Compare(left, [comparison()], [right]))
+
+        if token_type in _ARITHMETIC:
+            arithmetic = _ARITHMETIC[token_type]
+            return self.guarded(expr, lambda left, right: ast.BinOp(left, arithmetic(), right))
+
+        pair = ast.Tuple([self.lower(expr.left), self.lower(expr.right), ast.Constant(None)], ast.Load())
+        return ast.Subscript(pair, ast.Constant(2), ast.Load())
+
+    def visit_ternary_expr(self, expr: Ternary) -> ast.expr:
+        test, value = self.truthy(expr.left)
+        # Elvis (`a ?: b`): the condition's own value is the result when
+        # truthy -- evaluated once, same as Interpreter.visit_ternary_expr.
+        if expr.middle is expr.left:
+            return ast.IfExp(test, value, self.lower(expr.right))
+        return ast.IfExp(test, self.lower(expr.middle), self.lower(expr.right))
+
+
+# The Python-code engine (`iqalox.py --engine=python`): an Interpreter that
+# compiles each top-level statement with PythonCompiler and calls the
+# result, falling back to the tree-walker for a statement it can't lower.
+# Lowered and tree-walked functions, classes and instances are the same
+# IqaloxCallable/IqaloxClass/IqaloxInstance objects, so they freely mix.
+class PythonInterpreter(Interpreter):
+    tiered = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        # The generated code's globals: its runtime helpers, plus one `_k<n>`
+        # entry per token/declaration it needs for error reporting.
+        self.namespace: Dict[str, Any] = {
+            '_globals': self.globals.values,
+            '_UNDEFINED': UNDEFINED,
+            '_Function': PythonFunction,
+            '_Class': IqaloxClass,
+            '_Instance': IqaloxInstance,
+            '_BreakSignal': BreakSignal,
+            '_ContinueSignal': ContinueSignal,
+            '_raise_undefined': _raise_undefined,
+            '_check_bound': _check_bound,
+            '_raise_immutable': _raise_immutable,
+            '_step': _step,
+            '_negate': _negate,
+            '_binary': _binary,
+            '_vector': make_vector,
+            '_empty_vector': EMPTY_VECTOR,
+            '_spread': Interpreter.spread_operand,
+            '_index': Interpreter.index_vector,
+            '_slice': Interpreter.slice_vector,
+            '_get_property': _get_property,
+            '_set_field': _set_field,
+            '_raise_not_instance': _raise_not_instance,
+            '_check_superclass': _check_superclass,
+            '_bind_super': _bind_super,
+            '_define_global': self.define_global,
+            '_assign_global': self.assign_global,
+            '_callable': self.callable,
+            '_method_code': self.method_code,
+            '_stack_overflow': _stack_overflow,
+        }
+        self.compiler = PythonCompiler(self.namespace)
+
+    def execute(self, stmt: Stmt) -> Optional[Completion]:
+        # Only top-level statements are compiled; the tree-walker calls
+        # execute() for the statements inside the ones it falls back on.
+        if self.environment is not self.globals:
+            return stmt.accept(self)
+        try:
+            unit = self.compiler.compile(stmt)
+        except Unsupported:
+            return stmt.accept(self)
+        unit()
+        return None
+
+    def define_global(self, name: str, value: Any, is_mutable: bool) -> None:
+        self.globals.define(name, VariableData(value, is_mutable))
+
+    def assign_global(self, name: Token, value: Any) -> Any:
+        self.globals.assign(name, value)
+        return value
+
+    def callable(self, callee: Any, name_token: Token) -> Callable[..., Any]:
+        return partial(self.call_value, callee, name_token)
+
+    def method_code(self, obj: Any, name_token: Token, cache: PropertyCache,
+                    argument_count: int) -> Callable[..., Any]:
+        # What a lowered `obj.name args` calls: for a lowered method of the
+        # right arity, its code closed over `obj` by its binder -- anything
+        # else goes through the checked callable() path like any call.
+        if isinstance(obj, IqaloxInstance):
+            _, method = cache.lookup(obj.shape, name_token.lexeme)
+            if type(method) is PythonFunction and method.parameter_count == argument_count:
+                return method.binder(obj)
+        callee = _get_property(obj, name_token, cache)
+        if type(callee) is PythonFunction and callee.parameter_count == argument_count:
+            return callee.code
+        return self.callable(callee, name_token)
+
+    def call_value(self, callee: Any, name_token: Token, *arguments: Any) -> Any:
+        if not isinstance(callee, IqaloxCallable):
+            raise IqaloxRuntimeError(name_token, f"'{name_token.lexeme}' is not callable.")
+
+        if len(arguments) != callee.arity():
+            raise IqaloxRuntimeError(name_token, f'Expected {callee.arity()} argument(s) but got {len(arguments)}.')
+
+        previous_call_token = self.native_call_token
+        self.native_call_token = name_token
+        try:
+            return callee.call(self, list(arguments))
+        finally:
+            self.native_call_token = previous_call_token
@@ -0,0 +1,255 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+from expression import Expr, ExprVisitor, Binary, Logical, Unary, Literal, Grouping, Ternary, Vector, Variable, \
+    Assign, Break, Continue, Ignore, Call, Get, Index, Slice, Set, Self, Super, Spread
+from statement import Stmt, StmtVisitor, Expression, Var, Block, For, Function, Return, Class
+from token import Token
+
+# The statements that declare a name in the scope they're in.
+_DECLARATIONS = frozenset({Var, Function, Class})
+
+
+# Static pass run between Parser.parse() and Interpreter.interpret(). Mirrors,
+# scope for scope, every Environment the interpreter creates at runtime
+# (blocks, `for` loops, function calls, a bound method's `self`, a subclass's
+# `super`) and annotates each local variable access with the (depth, slot)
+# pair the interpreter then uses to index straight into the right frame's
+# `slots`, instead of walking the chain doing a dict lookup per level. Names
+# not found in any local scope stay unannotated (`depth is None`) and are
+# looked up in the global environment, exactly like jlox's resolver.
+class Resolver(ExprVisitor, StmtVisitor):
+    def __init__(self) -> None:
+        # One dict per enclosing local scope, innermost last: name -> (slot,
+        # is_mutable, is_function). The global scope is deliberately absent.
+        self.scopes: List[Dict[str, Tuple[int, bool, bool]]] = []
+        # How many of each scope's names, in declaration order, the code
+        # being resolved can see; None for all of them.
+        self.visible: List[Optional[int]] = []
+        # Function/method bodies declared in each scope, resolved only once
+        # that scope ends -- so a local function can call another local one
+        # declared after it (the body only runs once both exist), the same
+        # as it always could with the old name-based lookup. See defer().
+        self.deferred: List[List[Callable[[], None]]] = []
+        # Function and class declarations seen so far: a loop body whose
+        # resolution doesn't add to this has nothing in it that could close
+        # over its Environment.
+        self.closures = 0
+
+    def resolve(self, statements: List[Stmt]) -> None:
+        for statement in statements:
+            self.resolve_stmt(statement)
+
+    def resolve_stmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def resolve_expr(self, expr: Optional[Expr]) -> None:
+        if expr is not None:
+            expr.accept(self)
+
+    def begin_scope(self) -> None:
+        self.scopes.append({})
+        self.visible.append(None)
+        self.deferred.append([])
+
+    def end_scope(self) -> None:
+        pending = self.deferred[-1]
+        while pending:
+            pending.pop(0)()
+        self.deferred.pop()
+        self.visible.pop()
+        self.scopes.pop()
+
+    def declare(self, name: Token, is_mutable: bool, is_function: bool = False) -> Optional[int]:
+        if not self.scopes:
+            return None
+        scope = self.scopes[-1]
+        if name.lexeme in scope:
+            import iqalox
+            iqalox.Iqalox.error(name, f"Variable '{name.lexeme}' already declared.")
+        slot = len(scope)
+        scope[name.lexeme] = (slot, is_mutable, is_function)
+        return slot
+
+    def declare_implicit(self, name: str) -> None:
+        # `self`/`super`: bound by the interpreter itself (IqaloxFunction.bind,
+        # visit_class_stmt) as the only entry of their own one-slot scope.
+        self.scopes[-1][name] = (0, False, False)
+
+    def resolve_local(self, name: str) -> Optional[Tuple[int, int, bool]]:
+        for depth, (scope, visible) in enumerate(zip(reversed(self.scopes), reversed(self.visible))):
+            if name in scope:
+                slot, is_mutable, is_function = scope[name]
+                if visible is None or slot < visible or is_function:
+                    return depth, slot, is_mutable
+        return None
+
+    def defer(self, resolution: Callable[[], None]) -> None:
+        # A deferred body sees the locals declared before it and every local
+        # function of the scopes around it; a name declared after it that
+        # isn't a function is the enclosing (or global) one instead, as
+        # it is to the vm engine's compiler.
+        if not self.scopes:
+            resolution()
+            return
+        visible = [len(scope) if count is None else count for scope, count in zip(self.scopes, self.visible)]
+
+        def run() -> None:
+            outer = self.visible
+            self.visible = visible + [None] * (len(self.scopes) - len(visible))
+            try:
+                resolution()
+            finally:
+                self.visible = outer
+        self.deferred[-1].append(run)
+
+    def resolve_function(self, function: Function) -> None:
+        self.begin_scope()
+        for param in function.params:
+            self.declare(param, is_mutable=False)
+        self.resolve(function.body)
+        self.end_scope()
+
+    def resolve_methods(self, stmt: Class) -> None:
+        if stmt.superclass is not None:
+            self.begin_scope()
+            self.declare_implicit('super')
+
+        for method in stmt.methods:
+            self.begin_scope()
+            self.declare_implicit('self')
+            self.resolve_function(method)
+            self.end_scope()
+
+        if stmt.superclass is not None:
+            self.end_scope()
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        # A block that declares nothing gets no scope here, and so no
+        # Environment at run time: its statements run in the enclosing one.
+        stmt.scoped = any(type(statement) in _DECLARATIONS for statement in stmt.statements)
+        if not stmt.scoped:
+            self.resolve(stmt.statements)
+            return
+        self.begin_scope()
+        self.resolve(stmt.statements)
+        self.end_scope()
+
+    def visit_expression_stmt(self, stmt: Expression) -> None:
+        self.resolve_expr(stmt.expression)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        # Initializer first: `var a = a` inside a block reads the *outer* a,
+        # since the new one isn't defined until the initializer has run.
+        self.resolve_expr(stmt.initializer)
+        stmt.slot = self.declare(stmt.name, stmt.is_mutable)
+
+    def visit_for_stmt(self, stmt: For) -> None:
+        self.begin_scope()
+        if stmt.initializer is not None:
+            self.resolve_stmt(stmt.initializer)
+        self.resolve_expr(stmt.condition)
+        self.resolve_expr(stmt.increment)
+        closures = self.closures
+        self.resolve_stmt(stmt.body)
+        if type(stmt.body) is Block and stmt.body.scoped and self.closures == closures:
+            # Each iteration's Environment is garbage by the next one, so
+            # the loop can empty and reuse the same one instead.
+            stmt.body.reusable = True
+        self.end_scope()
+
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self.closures += 1
+        stmt.slot = self.declare(stmt.name, is_mutable=False, is_function=True)
+        self.defer(lambda: self.resolve_function(stmt))
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        self.resolve_expr(stmt.value)
+
+    def visit_class_stmt(self, stmt: Class) -> None:
+        # The superclass is evaluated before the class's own name is bound.
+        self.resolve_expr(stmt.superclass)
+        self.closures += 1
+        stmt.slot = self.declare(stmt.name, is_mutable=False)
+        self.defer(lambda: self.resolve_methods(stmt))
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        self.resolve_expr(expr.value)
+        resolved = self.resolve_local(expr.name.lexeme)
+        if resolved is not None:
+            expr.depth, expr.slot, expr.is_mutable = resolved
+
+    def visit_variable_expr(self, expr: Variable) -> None:
+        resolved = self.resolve_local(expr.name.lexeme)
+        if resolved is not None:
+            expr.depth, expr.slot, expr.is_mutable = resolved
+
+    def visit_self_expr(self, expr: Self) -> None:
+        resolved = self.resolve_local('self')
+        if resolved is not None:
+            expr.depth, expr.slot, _ = resolved
+
+    def visit_super_expr(self, expr: Super) -> None:
+        resolved = self.resolve_local('super')
+        if resolved is not None:
+            expr.depth, expr.slot, _ = resolved
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        self.resolve_expr(expr.left)
+        self.resolve_expr(expr.right)
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        self.resolve_expr(expr.left)
+        self.resolve_expr(expr.right)
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        self.resolve_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        return None
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        self.resolve_expr(expr.right)
+
+    def visit_ternary_expr(self, expr: Ternary) -> None:
+        self.resolve_expr(expr.left)
+        # Elvis (`a ?: b`) shares one node between `left` and `middle`.
+        if expr.middle is not expr.left:
+            self.resolve_expr(expr.middle)
+        self.resolve_expr(expr.right)
+
+    def visit_vector_expr(self, expr: Vector) -> None:
+        for value in expr.values:
+            self.resolve_expr(value)
+
+    def visit_spread_expr(self, expr: Spread) -> None:
+        self.resolve_expr(expr.expression)
+
+    def visit_break_expr(self, expr: Break) -> None:
+        return None
+
+    def visit_continue_expr(self, expr: Continue) -> None:
+        return None
+
+    def visit_ignore_expr(self, expr: Ignore) -> None:
+        return None
+
+    def visit_call_expr(self, expr: Call) -> None:
+        self.resolve_expr(expr.callee)
+        for argument in expr.arguments:
+            self.resolve_expr(argument)
+
+    def visit_get_expr(self, expr: Get) -> None:
+        self.resolve_expr(expr.object)
+
+    def visit_index_expr(self, expr: Index) -> None:
+        self.resolve_expr(expr.object)
+        self.resolve_expr(expr.index)
+
+    def visit_slice_expr(self, expr: Slice) -> None:
+        self.resolve_expr(expr.object)
+        self.resolve_expr(expr.start)
+        self.resolve_expr(expr.stop)
+
+    def visit_set_expr(self, expr: Set) -> None:
+        self.resolve_expr(expr.value)
+        self.resolve_expr(expr.object)
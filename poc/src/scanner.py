@@ -1,254 +1,259 @@
-from typing import List, Any
+import re
+from typing import Iterator, List, Optional, TextIO, Tuple, Union
 
 from token import (
     Token,
     TokenType,
+    TokenKind,
+    TokenBuffer,
+    Source,
+    KEYWORD_KINDS,
     SINGLE_CHARACTER_TOKENS,
     ONE_OR_MORE_CHARACTER_TOKENS,
     WHITESPACE,
     STRING_STARTERS,
-    KEYWORDS,
     COMMENT_TOKENS
 )
 
+# The operator and punctuation token kinds by lexeme: whatever the master
+# pattern's `operator` group matches.
+_OPERATORS = {
+    lexeme: TokenKind[TokenType(lexeme).name]
+    for lexeme in SINGLE_CHARACTER_TOKENS + ONE_OR_MORE_CHARACTER_TOKENS
+    if lexeme not in COMMENT_TOKENS
+}
+
+# Identifier-like lexemes with a kind of their own: the keywords and `_`.
+_WORDS = {'_': TokenKind.UNDERSCORE, **KEYWORD_KINDS}
+
+# Characters that can start some token; a run of anything else is one
+# "Unexpected characters" error (see the `unrecognized` group).
+_RECOGNIZED = ''.join(SINGLE_CHARACTER_TOKENS + ONE_OR_MORE_CHARACTER_TOKENS + WHITESPACE + STRING_STARTERS) \
+    + '\n0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_'
+
+
+def _alternatives(lexemes) -> str:
+    # Longest first, so the regex's first-match alternation is a longest
+    # match ("..." before ".", "?:" and "??" before "?").
+    return '|'.join(re.escape(lexeme) for lexeme in sorted(lexemes, key=len, reverse=True))
+
+
+# The whole lexical grammar as one compiled pattern, one named group per kind
+# of token, tried in this order at each offset. Between them the groups
+# match any character at all, so finditer() walks the source without gaps.
+#
+# - `_` is only the ignore operator when nothing identifier-like follows
+#   it; otherwise it starts an identifier like `_foo`.
+# - `<#` runs to the first `#>` (so `<#>` doesn't close itself); one with
+#   no `#>` after it runs to end of file and is an error, as is a string
+#   with no closing quote.
+# - `#>` has no meaning outside a block comment: at the top level a `#`
+#   always starts a line comment.
+_TOKEN_PATTERN = re.compile(
+    r'(?P<space>[ \t\r]+)'
+    r'|(?P<newline>\n)'
+    r'|(?P<identifier>[A-Za-z_][A-Za-z0-9_]*)'
+    r'|(?P<number>[0-9]+(?:\.[0-9]+)?)'
+    r'|(?P<string>"[^"]*"?|\'[^\']*\'?)'
+    r'|(?P<block_comment>(?s:<#.*?#>))'
+    r'|(?P<open_block_comment>(?s:<#.*))'
+    r'|(?P<comment>#[^\n]*)'
+    rf'|(?P<operator>{_alternatives(_OPERATORS)})'
+    rf'|(?P<unrecognized>[^{re.escape(_RECOGNIZED)}]+)'
+)
+
+# The same, for scanning an encoded Source's bytes. The grammar is all
+# ASCII, so it matches UTF-8 byte for byte: a multi-byte character only
+# ever turns up inside a string, a comment or an `unrecognized` run, whole.
+_BYTES_TOKEN_PATTERN = re.compile(_TOKEN_PATTERN.pattern.encode())
+_BYTES_OPERATORS = {lexeme.encode(): kind for lexeme, kind in _OPERATORS.items()}
+_BYTES_WORDS = {lexeme.encode(): kind for lexeme, kind in _WORDS.items()}
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+
 
 class Scanner:
-    def __init__(self, source: str) -> None:
+    # Matches the source against _TOKEN_PATTERN once, front to back, and
+    # records each token in a TokenBuffer as just its kind, offset and
+    # length. Every newline -- on its own or inside a string or block
+    # comment -- goes into the buffer's line table as the offset of the
+    # line after it, which is all it takes to turn any offset back into a
+    # line and column later.
+    def __init__(self, source: Source, line: int = 1) -> None:
         self.source = source
-        self.tokens: List[Token] = []
-        self.start = 0
-        self.current = 0
-        self.line = 1
-        # Source offset where the current line began -- lets column_at() turn
-        # an absolute offset into a 1-indexed column within that line.
-        self.line_start = 0
-        # Line/column of the token currently being scanned, captured once at
-        # the top of scan_tokens()'s loop -- used (rather than self.line/
-        # column_at(self.start) at add_token() time) so a token that itself
-        # spans multiple lines (e.g. a multi-line string) is still reported
-        # at the position it *started*, not wherever scanning ended up.
-        self.start_line = 1
-        self.start_column = 1
-
-    @property
-    def current_token(self) -> str:
-        return self.source[self.start:self.current]
-
-    def column_at(self, offset: int) -> int:
-        return offset - self.line_start + 1
-
-    def advance_newline(self) -> None:
-        # Call right after advance() has consumed a '\n', so self.current
-        # already points just past it -- keeps self.line_start/self.line in
-        # sync wherever a newline is consumed outside the main scan_token()
-        # dispatch (inside strings and block comments).
-        self.line += 1
-        self.line_start = self.current
-
-    def is_at_end(self) -> bool:
-        return self.current >= len(self.source)
-
-    def advance(self) -> str:
-        self.current += 1
-        return self.current_token
-
-    def add_token(self, token_type: TokenType, literal: Any = None) -> None:
-        self.tokens.append(Token(token_type, self.current_token, literal, self.start_line, self.start_column))
-
-    def peek(self) -> str:
-        if self.is_at_end():
-            return '\0'
-        return self.source[self.current]
-
-    def peek_next(self) -> str:
-        if self.current + 1 >= len(self.source):
-            return '\0'
-        return self.source[self.current + 1]
-
-    def is_digit(self, c: str = None) -> bool:
-        if c is None:
-            c = self.peek()
-        return '0' <= c <= '9'
-
-    def is_alpha(self, c: str = None) -> bool:
-        if c is None:
-            c = self.peek()
-        return ('a' <= c <= 'z') or ('A' <= c <= 'Z') or c == '_'
-
-    def is_alpha_numeric(self, c: str = None) -> bool:
-        return self.is_alpha(c) or self.is_digit(c)
-
-    def is_recognized(self, c: str) -> bool:
-        # Anything scan_token()'s dispatch would actually know what to do
-        # with -- used to find where a run of otherwise-unrecognized
-        # characters ends (see the fallback branch in scan_token()).
-        return (
-            c in SINGLE_CHARACTER_TOKENS
-            or c in ONE_OR_MORE_CHARACTER_TOKENS
-            or c in WHITESPACE
-            or c in STRING_STARTERS
-            or c == TokenType.NEWLINE
-            or self.is_digit(c)
-            or self.is_alpha(c)
-        )
-
-    def string(self, char: str) -> None:
-        while self.peek() != char and not self.is_at_end():
-            if self.peek() == '\n':
-                self.advance()
-                self.advance_newline()
-            else:
-                self.advance()
-        if self.is_at_end():
-            import iqalox
-            # Reports at the opening quote's own position (not wherever
-            # end-of-file was actually reached), since that's where the user
-            # needs to look to fix it.
-            iqalox.Iqalox.error(
-                Token(TokenType.STRING, char, None, self.start_line, self.start_column), "Unterminated string."
-            )
-            return
-        self.advance()
-        value = self.source[self.start + 1:self.current - 1]
-        self.add_token(TokenType.STRING, value)
-
-    def number(self) -> None:
-        while self.is_digit():
-            self.advance()
-        # Bug fix: this used to be `self.is_digit()` (no argument), which
-        # defaults to checking `self.peek()` -- the *same* '.' character
-        # already being compared on this line, never the one after it.
-        # The fractional branch could therefore never actually fire:
-        # "3.14" scanned as NUMBER("3"), DOT, NUMBER("14"). Must check
-        # `peek_next()` instead, matching jlox's own `isDigit(peekNext())`.
-        if self.peek() == '.' and self.is_digit(self.peek_next()):
-            self.advance()
-            while self.is_digit():
-                self.advance()
-        self.add_token(TokenType.NUMBER, float(self.source[self.start:self.current]))
-
-    def identifier(self) -> None:
-        while self.is_alpha_numeric():
-            self.advance()
-        text = self.current_token
-        token_type = KEYWORDS.get(text, TokenType.IDENTIFIER)
-        self.add_token(token_type)
-
-    def scan_token(self) -> None:
-        c = self.advance()
-        if c == '_' and self.is_alpha_numeric(self.peek()):
-            # Bug fix: `_` is only the standalone ignore operator when
-            # nothing identifier-like follows it -- otherwise it's the
-            # start of an identifier like `_foo`. This check must come
-            # before the plain SINGLE_CHARACTER_TOKENS dispatch below,
-            # which previously always claimed a bare `_` first, making
-            # `_foo` misscan as UNDERSCORE followed by a separate `foo`
-            # IDENTIFIER instead of one `_foo` identifier.
-            self.identifier()
-        elif c in SINGLE_CHARACTER_TOKENS:
-            self.add_token(TokenType(c))
-        elif c in ONE_OR_MORE_CHARACTER_TOKENS:
-            # Bug fix: try the longest possible match first (e.g. "..."
-            # before "."), and actually verify+consume the compound's full
-            # remaining characters -- this previously only ever checked
-            # and consumed exactly one extra character (`compound[1]`),
-            # silently truncating any 3+-character token (the
-            # currently-unused "..." ellipsis) to just its first two
-            # characters. `BLOCK_COMMENT_END` ('#>') is excluded here since
-            # it only has meaning as a terminator searched for from
-            # *inside* a block comment's own scanning loop below -- a bare
-            # '#' followed by '>' at the top level must still always start
-            # a line comment, not silently match '#>' as if it meant
-            # something on its own (it previously did, and then matched
-            # neither branch below, silently consuming both characters
-            # with no token or error at all).
-            compounds = sorted(
-                (
-                    candidate
-                    for candidate in ONE_OR_MORE_CHARACTER_TOKENS
-                    if candidate.startswith(c) and len(candidate) > 1 and candidate != TokenType.BLOCK_COMMENT_END
-                ),
-                key=len,
-                reverse=True,
-            )
-            token = c
-            for compound in compounds:
-                remaining = compound[1:]
-                if self.source[self.current:self.current + len(remaining)] == remaining:
-                    for _ in remaining:
-                        self.advance()
-                    token = compound
-                    break
-            if token in COMMENT_TOKENS:
-                if token == TokenType.COMMENT:
-                    while self.peek() != '\n' and not self.is_at_end():
-                        self.advance()
-                elif token == TokenType.BLOCK_COMMENT_START:
-                    closed = False
-                    while not self.is_at_end():
-                        if self.peek() == '#' and self.peek_next() == '>':
-                            self.advance()
-                            self.advance()
-                            closed = True
-                            break
-                        if self.peek() == '\n':
-                            self.advance()
-                            self.advance_newline()
-                        else:
-                            self.advance()
-                    if not closed:
-                        # Bug fix: an unterminated block comment previously
-                        # produced no error at all -- the loop just exited
-                        # silently at EOF (unlike an unterminated string,
-                        # which already errors correctly). Reports at the
-                        # opening "<#" itself (not the whole, possibly huge,
-                        # comment body), matching how string() reports at
-                        # just the opening quote.
-                        import iqalox
-                        iqalox.Iqalox.error(
-                            Token(TokenType.BLOCK_COMMENT_START, token, None, self.start_line, self.start_column),
-                            "Unterminated block comment.",
-                        )
+        self.tokens = TokenBuffer(source, line)
+        # While a list, errors are collected here as (offset, token, message)
+        # instead of reported -- see stream_tokens().
+        self.errors: Optional[List[Tuple[int, Token, str]]] = None
+
+    def error(self, token_type: TokenType, lexeme: str, offset: int, message: str) -> None:
+        import iqalox
+        line, column = self.tokens.position(offset)
+        token = Token(token_type, lexeme, None, line, column)
+        if self.errors is None:
+            iqalox.Iqalox.error(token, message)
+        else:
+            self.errors.append((offset, token, message))
+
+    def scan_tokens(self) -> TokenBuffer:
+        tokens = self.tokens
+        kinds = tokens.kinds.append
+        starts = tokens.starts.append
+        lengths = tokens.lengths.append
+        line_starts = tokens.line_starts
+        if tokens.encoded:
+            pattern, words, operators = _BYTES_TOKEN_PATTERN, _BYTES_WORDS, _BYTES_OPERATORS
+            tokens.wide = _NON_ASCII.search(self.source) is not None
+        else:
+            pattern, words, operators = _TOKEN_PATTERN, _WORDS, _OPERATORS
+        identifier_kind = TokenKind.IDENTIFIER
+        semicolon_kind = TokenKind.SEMICOLON
+
+        for match in pattern.finditer(self.source):
+            kind = match.lastgroup
+            if kind == 'space':
+                continue
+            start = match.start()
+
+            if kind == 'identifier':
+                lexeme = match.group()
+                kinds(words.get(lexeme, identifier_kind))
+                starts(start)
+                lengths(len(lexeme))
+            elif kind == 'operator':
+                lexeme = match.group()
+                kinds(operators[lexeme])
+                starts(start)
+                lengths(len(lexeme))
+            elif kind == 'newline':
+                kinds(semicolon_kind)
+                starts(start)
+                lengths(1)
+                line_starts.append(start + 1)
+            elif kind == 'number':
+                kinds(TokenKind.NUMBER)
+                starts(start)
+                lengths(match.end() - start)
+            elif kind == 'comment':
+                continue
+            elif kind == 'string':
+                lexeme = match.group()
+                quote = lexeme[:1]
+                if len(lexeme) > 1 and lexeme[-1:] == quote:
+                    kinds(TokenKind.STRING)
+                    starts(start)
+                    lengths(len(lexeme))
+                else:
+                    # Reported at the opening quote's own position (not
+                    # wherever end-of-file was actually reached), since
+                    # that's where the user needs to look to fix it.
+                    self.error(TokenType.STRING, self.text(quote), start, "Unterminated string.")
+                self.add_lines(lexeme, start)
+            elif kind == 'block_comment':
+                self.add_lines(match.group(), start)
+            elif kind == 'open_block_comment':
+                # Reported at just the opening "<#", not the whole, possibly
+                # huge, comment body.
+                self.error(
+                    TokenType.BLOCK_COMMENT_START, TokenType.BLOCK_COMMENT_START.value, start,
+                    "Unterminated block comment."
+                )
+                self.add_lines(match.group(), start)
             else:
-                try:
-                    self.add_token(TokenType(token))
-                except ValueError:
-                    # `token` didn't extend into a longer valid token (e.g. a
-                    # bare '|' not followed by '>') and isn't valid on its own.
-                    import iqalox
-                    iqalox.Iqalox.error(
-                        Token(TokenType.NULL_CHAR, c, None, self.start_line, self.start_column),
-                        f"Unexpected character: {c}",
-                    )
-        elif c in WHITESPACE:
+                # A whole run of garbage characters (e.g. `@@@`) is reported
+                # as one error instead of one per character.
+                lexeme = self.text(match.group())
+                self.error(
+                    TokenType.NULL_CHAR, lexeme, start,
+                    f"Unexpected character{'s' if len(lexeme) > 1 else ''}: {lexeme}"
+                )
+
+        tokens.append(TokenKind.EOF, len(self.source), 0)
+        return tokens
+
+    def add_lines(self, lexeme: Union[str, bytes], start: int) -> None:
+        # Records the lines started by newlines inside a multi-line lexeme
+        # beginning at `start`.
+        line_break = b'\n' if self.tokens.encoded else '\n'
+        newline = lexeme.find(line_break)
+        while newline != -1:
+            self.tokens.line_starts.append(start + newline + 1)
+            newline = lexeme.find(line_break, newline + 1)
+
+    @staticmethod
+    def text(lexeme: Union[str, bytes]) -> str:
+        # An error's lexeme as text, however the source is encoded.
+        return lexeme.decode(errors='replace') if isinstance(lexeme, bytes) else lexeme
+
+
+# How much of a streamed script stream_tokens() reads at a time.
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+_OPENERS = frozenset((TokenKind.LEFT_PAREN, TokenKind.LEFT_BRACKET, TokenKind.LEFT_BRACE))
+_CLOSERS = frozenset((TokenKind.RIGHT_PAREN, TokenKind.RIGHT_BRACKET, TokenKind.RIGHT_BRACE))
+
+
+def stream_tokens(reader: TextIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[TokenBuffer]:
+    # Scans a script as it's read instead of all at once, as a series of
+    # TokenBuffers that each end in an EOF and hold only whole lines of
+    # whole top-level statements: everything up to the last line break
+    # read so far that isn't inside brackets, a string or a comment. That
+    # is always the end of a statement (or a parse error either way), so
+    # parsing the pieces one after another finds the same statements as
+    # parsing the whole script. What's left over starts the next piece.
+    #
+    # A piece is scanned from its start again whenever it turns out not to
+    # end yet, so each retry reads twice as much as the last, and the
+    # pieces never get much bigger than the biggest statement or
+    # `chunk_size`, whichever is larger.
+    import iqalox
+    text = ''
+    line = 1
+    size = chunk_size
+    while True:
+        chunk = reader.read(size)
+        text += chunk
+        scanner = Scanner(text, line)
+        if not chunk:
+            yield scanner.scan_tokens()
             return
-        elif c == TokenType.NEWLINE:
-            self.add_token(TokenType.SEMICOLON)
-            self.advance_newline()
-        elif c in STRING_STARTERS:
-            self.string(c)
-        elif self.is_digit(c):
-            self.number()
-        elif self.is_alpha(c):
-            self.identifier()
-        else:
-            # A character with no recognized meaning on its own. Keep
-            # consuming as long as what follows is *also* unrecognized, so a
-            # whole run of garbage characters (e.g. `@@@`) is reported as one
-            # error instead of one per character.
-            while not self.is_at_end() and not self.is_recognized(self.peek()):
-                self.advance()
-            import iqalox
-            iqalox.Iqalox.error(
-                Token(TokenType.NULL_CHAR, self.current_token, None, self.start_line, self.start_column),
-                f"Unexpected character{'s' if len(self.current_token) > 1 else ''}: {self.current_token}",
-            )
-
-    def scan_tokens(self) -> List[Token]:
-        while not self.is_at_end():
-            self.start = self.current
-            self.start_line = self.line
-            self.start_column = self.column_at(self.start)
-            self.scan_token()
-        self.tokens.append(Token(TokenType.EOF, "", None, self.line, self.column_at(self.current)))
-        return self.tokens
+
+        # Anything at all can still follow the end of `text`, so scanning
+        # errors from there on aren't known to be errors yet.
+        scanner.errors = []
+        tokens = scanner.scan_tokens()
+        last = last_line_break(tokens)
+        if last is None:
+            size *= 2
+            continue
+
+        end = tokens.starts[last] + 1
+        for offset, token, message in scanner.errors:
+            if offset < end:
+                iqalox.Iqalox.error(token, message)
+        tokens.truncate(last + 1, end)
+        yield tokens
+
+        line = tokens.position(end)[0]
+        text = text[end:]
+        size = chunk_size
+
+
+def last_line_break(tokens: TokenBuffer) -> Optional[int]:
+    # The index of the last newline token outside any brackets (not
+    # counting the EOF, which may have been cut off mid-token).
+    source = tokens.source
+    kinds = tokens.kinds
+    starts = tokens.starts
+    semicolon = TokenKind.SEMICOLON
+    depth = 0
+    last = None
+    for index in range(len(kinds) - 1):
+        kind = kinds[index]
+        if kind == semicolon:
+            if depth == 0 and source[starts[index]] == '\n':
+                last = index
+        elif kind in _OPENERS:
+            depth += 1
+        elif kind in _CLOSERS and depth:
+            depth -= 1
+    return last
@@ -0,0 +1,154 @@
+import sys
+from typing import Any, Dict
+
+from error import IqaloxRuntimeError
+from expression import Binary, ExprVisitor
+from token import TokenType
+
+# Self-specializing arithmetic and comparisons for the tree-walkers. A Binary
+# node starts out generic: Interpreter.visit_binary_expr() checks its
+# operands with check_number_operands() and then picks its operator out of
+# apply_binary()'s if/elif chain. Once it has seen two floats, it rewrites
+# itself -- by swapping its class -- into the FloatBinary below for its
+# operator, whose accept() runs the operation directly behind one guard:
+# that both operands are still floats. On the first operands that aren't,
+# the node deoptimizes: it turns back into a plain Binary for good (see
+# Interpreter.deoptimize()) and that operation goes through the generic path,
+# so every error is the one it always was. A node only ever deoptimizes once.
+#
+# The nodes are rewritten in place and only while running, so only the
+# tree-walkers -- Interpreter, and StackInterpreter for expressions with no
+# calls in them -- ever see a FloatBinary; every other visitor has done its
+# work on the AST by then.
+
+
+class SpecializationStats:
+    # How many Binary nodes one Interpreter has specialized and deoptimized.
+    __slots__ = ('specialized', 'deoptimized')
+
+    def __init__(self) -> None:
+        self.specialized = 0
+        self.deoptimized = 0
+
+    def report(self) -> None:
+        # One line on stderr, out of the way of the program's own output.
+        print(
+            f'specialization: {self.specialized} nodes specialized, {self.deoptimized} deoptimized',
+            file=sys.stderr
+        )
+
+
+class FloatBinary(Binary):
+    # A Binary node specialized for two float operands: one of the classes
+    # below, picked by its operator from SPECIALIZED.
+    pass
+
+
+class FloatAdd(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left + right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatSubtract(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left - right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatMultiply(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left * right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatDivide(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            # Not a type miss, so no reason to deoptimize.
+            if right == 0:
+                raise IqaloxRuntimeError(self.operator, 'Division by zero.')
+            return left / right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatModulo(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left % right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatPower(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left ** right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatLess(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left < right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatLessEqual(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left <= right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatGreater(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left > right
+        return visitor.deoptimize(self, left, right)
+
+
+class FloatGreaterEqual(FloatBinary):
+    def accept(self, visitor: ExprVisitor) -> Any:
+        left = visitor.evaluate(self.left)
+        right = visitor.evaluate(self.right)
+        if left.__class__ is float and right.__class__ is float:
+            return left >= right
+        return visitor.deoptimize(self, left, right)
+
+
+# The specialized class for each operator that has one: those that only
+# take numbers (or vectors of them). `==` and `!=` take any two values, and
+# `??` and `,` don't need both operands' types, so they have none.
+SPECIALIZED: Dict[TokenType, type] = {
+    TokenType.PLUS: FloatAdd,
+    TokenType.MINUS: FloatSubtract,
+    TokenType.STAR: FloatMultiply,
+    TokenType.SLASH: FloatDivide,
+    TokenType.PERCENT: FloatModulo,
+    TokenType.POWER: FloatPower,
+    TokenType.LESS: FloatLess,
+    TokenType.LESS_EQUAL: FloatLessEqual,
+    TokenType.GREATER: FloatGreater,
+    TokenType.GREATER_EQUAL: FloatGreaterEqual,
+}
@@ -0,0 +1,442 @@
+from types import GeneratorType
+from typing import Any, Callable, Dict, Generator, List, Optional, Union
+
+from expression import Expr, Binary, Logical, Unary, Grouping, Ternary, Vector, Spread, Assign, Call, Get, Index, \
+    Slice, Set, Super
+from statement import Stmt, Expression, Var, Block, For, Function, Return, Class
+from token import Token, TokenType
+from error import IqaloxRuntimeError
+from environment import Environment
+from callable import IqaloxFunction, IqaloxClass, IqaloxInstance
+from interpreter import Interpreter, _COMPLETING_EXPRESSIONS, _TAIL_EXPRESSIONS
+from completion import Completion, CompletionType, BREAK, CONTINUE, BreakSignal, ContinueSignal
+from memoization import MISSING
+from vectors import EMPTY_VECTOR, make_vector
+
+# One node's evaluation, suspended wherever it needs another node's value:
+# it yields that node (or a Frame of its own making) to StackInterpreter.run()
+# and is sent back the result.
+Frame = Generator[Union[Expr, Stmt, 'Frame'], Any, Any]
+
+# How many Iqalox calls deep a program may go before it's a runtime error
+# rather than the process running out of memory: each level costs a few
+# suspended frames and its Environment, about 2 KB all told, so this caps a
+# runaway recursion at roughly 400 MB.
+MAX_CALL_DEPTH = 200_000
+
+
+# The explicit-stack engine (`iqalox.py --engine=stack`): the tree-walker
+# with every node that makes a call turned into a generator Frame instead of
+# a nest of Python calls. run() keeps those frames on a list, so an Iqalox
+# call pushes a couple of entries there rather than adding a dozen Python
+# frames to the C stack, and recursion is only limited by MAX_CALL_DEPTH.
+# Nodes with no call anywhere inside them still run through the inherited
+# visit_*() methods, which is both faster and can't recurse beyond the
+# nesting of the source itself.
+class StackInterpreter(Interpreter):
+    tiered = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Memoizes has_call() per node.
+        self.calls: Dict[Union[Expr, Stmt], bool] = {}
+        self.call_depth = 0
+        self.frames: Dict[type, Callable[[Any], Frame]] = {
+            Call: self.call_frame,
+            Binary: self.binary_frame,
+            Logical: self.logical_frame,
+            Ternary: self.ternary_frame,
+            Grouping: self.grouping_frame,
+            Unary: self.unary_frame,
+            Vector: self.vector_frame,
+            Spread: self.spread_frame,
+            Assign: self.assign_frame,
+            Get: self.get_frame,
+            Index: self.index_frame,
+            Slice: self.slice_frame,
+            Set: self.set_frame,
+            Block: self.block_frame,
+            Expression: lambda stmt: self.effect_frame(stmt.expression),
+            Var: self.var_frame,
+            For: self.for_frame,
+            Return: lambda stmt: self.tail_frame(stmt.value),
+        }
+
+    def execute(self, stmt: Stmt) -> Optional[Completion]:
+        if self.has_call(stmt):
+            return self.run(self.frames[type(stmt)](stmt))
+        return stmt.accept(self)
+
+    def evaluate(self, expr: Expr) -> Any:
+        if self.has_call(expr):
+            return self.run(self.frames[type(expr)](expr))
+        return expr.accept(self)
+
+    def has_call(self, node: Union[Expr, Stmt]) -> bool:
+        # Whether running the node can make a call. Declaring a function or
+        # class doesn't run anything in its body.
+        calls = self.calls.get(node)
+        if calls is None:
+            if isinstance(node, Call):
+                calls = True
+            elif isinstance(node, (Function, Class)):
+                calls = False
+            else:
+                calls = any(self.has_call(child) for child in self.children(node))
+            self.calls[node] = calls
+        return calls
+
+    @staticmethod
+    def children(node: Union[Expr, Stmt]) -> List[Union[Expr, Stmt]]:
+        children = []
+        for field in vars(node).values():
+            if isinstance(field, (Expr, Stmt)):
+                children.append(field)
+            elif isinstance(field, list):
+                children.extend(item for item in field if isinstance(item, (Expr, Stmt)))
+        return children
+
+    def run(self, frame: Frame) -> Any:
+        # Drives `frame` to completion along with every frame it needs on
+        # the way. A yielded node without a call is run right away;
+        # otherwise its frame goes on top of the stack until it returns, and
+        # its result is sent to the frame below. An exception unwinds the
+        # same way, thrown into each frame below in turn until one handles
+        # it or the stack is empty.
+        stack = [frame]
+        value = None
+        error = None
+        while True:
+            top = stack[-1]
+            try:
+                if error is None:
+                    node = top.send(value)
+                else:
+                    exception, error = error, None
+                    node = top.throw(exception)
+            except StopIteration as stop:
+                stack.pop()
+                if not stack:
+                    return stop.value
+                value = stop.value
+                continue
+            except Exception as exception:
+                stack.pop()
+                if not stack:
+                    raise
+                error = exception
+                continue
+
+            value = None
+            if type(node) is GeneratorType:
+                stack.append(node)
+            elif self.has_call(node):
+                stack.append(self.frames[type(node)](node))
+            else:
+                try:
+                    value = node.accept(self)
+                except Exception as exception:
+                    error = exception
+
+    # Statements
+
+    def block_frame(self, stmt: Block, environment: Optional[Environment] = None) -> Frame:
+        previous = self.environment
+        if environment is not None:
+            self.environment = environment
+        elif stmt.scoped:
+            self.environment = Environment(previous)
+        try:
+            for statement in stmt.statements:
+                completion = yield statement
+                if completion is not None:
+                    return completion
+            return None
+        finally:
+            self.environment = previous
+
+    def effect_frame(self, expr: Expr) -> Frame:
+        # Interpreter.execute_expression(), one frame per level.
+        expr_type = type(expr)
+        if not self.has_call(expr):
+            return self.execute_expression(expr)
+        if expr_type not in _COMPLETING_EXPRESSIONS:
+            yield expr
+            return None
+        if expr_type is Grouping:
+            return (yield self.effect_frame(expr.expression))
+
+        if expr_type is Ternary:
+            left = yield expr.left
+            if self.is_truthy(left):
+                if expr.middle is expr.left:
+                    return None
+                return (yield self.effect_frame(expr.middle))
+            return (yield self.effect_frame(expr.right))
+
+        if expr_type is Logical:
+            left = yield expr.left
+            if self.is_truthy(left) == (expr.operator.type == TokenType.OR):
+                return None
+            return (yield self.effect_frame(expr.right))
+
+        token_type = expr.operator.type
+        if token_type == TokenType.DOUBLE_QUESTION_MARK:
+            if (yield expr.left) is not None:
+                return None
+            return (yield self.effect_frame(expr.right))
+        if token_type == TokenType.COMMA:
+            yield expr.left
+            return (yield self.effect_frame(expr.right))
+        yield expr
+        return None
+
+    def var_frame(self, stmt: Var) -> Frame:
+        value = yield stmt.initializer
+        self.define(stmt.name, stmt.slot, value, stmt.is_mutable)
+        return None
+
+    def for_frame(self, stmt: For) -> Frame:
+        # Interpreter.visit_for_stmt() and run_loop() in one.
+        previous = self.environment
+        self.environment = Environment(previous)
+        try:
+            if stmt.initializer is not None:
+                completion = yield stmt.initializer
+                if completion is not None:
+                    return completion
+
+            body = stmt.body
+            frame = Environment(self.environment) if type(body) is Block and body.reusable else None
+            if stmt.counted:
+                counters = self.loop_counters(stmt)
+                if counters is not None:
+                    return (yield self.counted_loop_frame(stmt, counters, frame))
+
+            while True:
+                try:
+                    while stmt.condition is None or self.is_truthy((yield stmt.condition)):
+                        if frame is None:
+                            completion = yield body
+                        else:
+                            frame.slots.clear()
+                            completion = yield self.block_frame(body, frame)
+                        if completion is not None:
+                            if completion is BREAK:
+                                return None
+                            if completion is not CONTINUE:
+                                return completion
+
+                        if stmt.increment is not None:
+                            yield stmt.increment
+                    return None
+                except BreakSignal:
+                    return None
+                except ContinueSignal:
+                    if stmt.increment is not None:
+                        yield stmt.increment
+        finally:
+            self.environment = previous
+
+    def counted_loop_frame(self, stmt: For, counters: range, frame: Optional[Environment]) -> Frame:
+        # Interpreter.run_counted_loop().
+        slots = self.environment.slots
+        slot = stmt.initializer.slot
+        read = stmt.counter_read
+        body = stmt.body
+        for counter in counters:
+            if read:
+                slots[slot] = float(counter)
+            try:
+                if frame is None:
+                    completion = yield body
+                else:
+                    frame.slots.clear()
+                    completion = yield self.block_frame(body, frame)
+            except BreakSignal:
+                return None
+            except ContinueSignal:
+                continue
+            if completion is not None:
+                if completion is BREAK:
+                    return None
+                if completion is not CONTINUE:
+                    return completion
+        if read:
+            slots[slot] = float(max(counters.start, counters.stop))
+        return None
+
+    def tail_frame(self, expr: Expr) -> Frame:
+        # Interpreter.tail_completion(), one frame per level.
+        expr_type = type(expr)
+        if not self.has_call(expr):
+            return self.tail_completion(expr)
+        if expr_type not in _TAIL_EXPRESSIONS:
+            return Completion(CompletionType.RETURN, (yield expr))
+        if expr_type is Call:
+            return (yield self.call_frame(expr, tail=True))
+        if expr_type is Grouping:
+            return (yield self.tail_frame(expr.expression))
+
+        if expr_type is Ternary:
+            left = yield expr.left
+            if self.is_truthy(left):
+                if expr.middle is expr.left:
+                    return Completion(CompletionType.RETURN, left)
+                return (yield self.tail_frame(expr.middle))
+            return (yield self.tail_frame(expr.right))
+
+        if expr_type is Logical:
+            left = yield expr.left
+            if self.is_truthy(left) == (expr.operator.type == TokenType.OR):
+                return Completion(CompletionType.RETURN, left)
+            return (yield self.tail_frame(expr.right))
+
+        token_type = expr.operator.type
+        if token_type == TokenType.DOUBLE_QUESTION_MARK:
+            left = yield expr.left
+            if left is not None:
+                return Completion(CompletionType.RETURN, left)
+            return (yield self.tail_frame(expr.right))
+        if token_type == TokenType.COMMA:
+            yield expr.left
+            return (yield self.tail_frame(expr.right))
+        return Completion(CompletionType.RETURN, (yield expr))
+
+    # Expressions
+
+    def call_frame(self, expr: Call, tail: bool = False) -> Frame:
+        # Interpreter.prepare_call() then the call itself. With `tail`, the
+        # call is a returned value and this returns that return's
+        # Completion, as tail_completion() would.
+        name_token = expr.callee.method if isinstance(expr.callee, Super) else expr.callee.name
+        if type(expr.callee) is Get:
+            callee, instance = self.method_callee((yield expr.callee.object), expr.callee)
+        else:
+            callee, instance = (yield expr.callee), None
+        arguments = []
+        for argument in expr.arguments:
+            arguments.append((yield argument))
+        self.check_call(callee, arguments, name_token)
+
+        if isinstance(callee, IqaloxFunction):
+            if tail:
+                return Completion(CompletionType.TAIL_CALL, (callee, instance, arguments))
+            value = yield self.function_frame(callee, instance, arguments, name_token)
+        elif isinstance(callee, IqaloxClass):
+            # IqaloxClass.call(), with the initializer run as a frame here.
+            value = IqaloxInstance(callee)
+            initializer = callee.find_method('init')
+            if initializer is not None:
+                yield self.function_frame(initializer, value, arguments, name_token)
+        else:
+            value = self.invoke(callee, instance, arguments, name_token)
+        return Completion(CompletionType.RETURN, value) if tail else value
+
+    def function_frame(self, function: IqaloxFunction, instance: Optional[IqaloxInstance], arguments: List[Any],
+                       name_token: Token) -> Frame:
+        # IqaloxFunction.run(): the body, then any call it returns in tail
+        # position, each in place of the last -- with each pure function's
+        # call looked up and remembered as Memoization.run() does.
+        if self.call_depth == MAX_CALL_DEPTH:
+            raise IqaloxRuntimeError(name_token, 'Stack overflow.')
+        self.call_depth += 1
+        previous = self.environment
+        memoization = self.memoization
+        pending = []
+        try:
+            while True:
+                if function.declaration.pure and memoization.enabled:
+                    table, key, value = memoization.lookup(function, arguments)
+                    if value is not MISSING:
+                        break
+                    if table is not None:
+                        pending.append((table, key))
+                self.environment = function.frame(instance, arguments)
+                completion = None
+                for statement in function.declaration.body:
+                    completion = yield statement
+                    if completion is not None:
+                        break
+                if completion is None or completion.type is not CompletionType.TAIL_CALL:
+                    value = None if completion is None else completion.call_result()
+                    break
+                function, instance, arguments = completion.value
+            memoization.remember(pending, value)
+            return value
+        finally:
+            self.environment = previous
+            self.call_depth -= 1
+
+    def binary_frame(self, expr: Binary) -> Frame:
+        left = yield expr.left
+        token_type = expr.operator.type
+        if token_type == TokenType.DOUBLE_QUESTION_MARK:
+            return left if left is not None else (yield expr.right)
+        right = yield expr.right
+        if token_type == TokenType.COMMA:
+            return right
+        return self.apply_binary(expr.operator, left, right)
+
+    def logical_frame(self, expr: Logical) -> Frame:
+        left = yield expr.left
+        if self.is_truthy(left) == (expr.operator.type == TokenType.OR):
+            return left
+        return (yield expr.right)
+
+    def ternary_frame(self, expr: Ternary) -> Frame:
+        left = yield expr.left
+        if self.is_truthy(left):
+            if expr.middle is expr.left:
+                return left
+            return (yield expr.middle)
+        return (yield expr.right)
+
+    def grouping_frame(self, expr: Grouping) -> Frame:
+        return (yield expr.expression)
+
+    def unary_frame(self, expr: Unary) -> Frame:
+        # `++`/`--` only ever apply to a variable, so never get here.
+        return self.apply_unary(expr.operator, (yield expr.right))
+
+    def vector_frame(self, expr: Vector) -> Frame:
+        if any(type(value) is Spread for value in expr.values):
+            # See Interpreter.visit_vector_expr().
+            vector = EMPTY_VECTOR
+            for value in expr.values:
+                if type(value) is Spread:
+                    vector = vector.concat((yield value))
+                else:
+                    vector = vector.append((yield value))
+            return vector
+        values = []
+        for value in expr.values:
+            values.append((yield value))
+        return make_vector(values)
+
+    def spread_frame(self, expr: Spread) -> Frame:
+        return self.spread_operand(expr.operator, (yield expr.expression))
+
+    def assign_frame(self, expr: Assign) -> Frame:
+        value = yield expr.value
+        self.assign_variable(expr, value)
+        return value
+
+    def get_frame(self, expr: Get) -> Frame:
+        return self.get_property((yield expr.object), expr)
+
+    def index_frame(self, expr: Index) -> Frame:
+        vector = yield expr.object
+        return self.index_vector(expr.bracket, vector, (yield expr.index))
+
+    def slice_frame(self, expr: Slice) -> Frame:
+        vector = yield expr.object
+        start = None if expr.start is None else (yield expr.start)
+        stop = None if expr.stop is None else (yield expr.stop)
+        return self.slice_vector(expr.bracket, vector, start, stop)
+
+    def set_frame(self, expr: Set) -> Frame:
+        obj = yield expr.object
+        if not isinstance(obj, IqaloxInstance):
+            raise IqaloxRuntimeError(expr.name, 'Only instances have fields.')
+        return self.store_property(obj, expr, (yield expr.value))
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, List
+from typing import Any, List, Optional
 from expression import Expr
 from token import Token
 
@@ -41,8 +41,10 @@ class Stmt(ABC):
 
 
 class Block(Stmt):
-    def __init__(self, statements: List[Stmt]) -> None:
+    def __init__(self, statements: List[Stmt], scoped: bool = True, reusable: bool = False) -> None:
         self.statements = statements
+        self.scoped = scoped
+        self.reusable = reusable
 
     def accept(self, visitor: StmtVisitor) -> None:
         return visitor.visit_block_stmt(self)
@@ -57,31 +59,36 @@ class Expression(Stmt):
 
 
 class Var(Stmt):
-    def __init__(self, name: Token, initializer: Expr, is_mutable: bool) -> None:
+    def __init__(self, name: Token, initializer: Expr, is_mutable: bool, slot: Optional[int] = None) -> None:
         self.name = name
         self.initializer = initializer
         self.is_mutable = is_mutable
+        self.slot = slot
 
     def accept(self, visitor: StmtVisitor) -> None:
         return visitor.visit_var_stmt(self)
 
 
 class For(Stmt):
-    def __init__(self, initializer: Stmt, condition: Expr, increment: Expr, body: Stmt) -> None:
+    def __init__(self, initializer: Stmt, condition: Expr, increment: Expr, body: Stmt, counted: bool = False, counter_read: bool = False) -> None:
         self.initializer = initializer
         self.condition = condition
         self.increment = increment
         self.body = body
+        self.counted = counted
+        self.counter_read = counter_read
 
     def accept(self, visitor: StmtVisitor) -> None:
         return visitor.visit_for_stmt(self)
 
 
 class Function(Stmt):
-    def __init__(self, name: Token, params: List[Token], body: List[Stmt]) -> None:
+    def __init__(self, name: Token, params: List[Token], body: List[Stmt], slot: Optional[int] = None, pure: bool = False) -> None:
         self.name = name
         self.params = params
         self.body = body
+        self.slot = slot
+        self.pure = pure
 
     def accept(self, visitor: StmtVisitor) -> None:
         return visitor.visit_function_stmt(self)
@@ -97,10 +104,11 @@ class Return(Stmt):
 
 
 class Class(Stmt):
-    def __init__(self, name: Token, superclass: Expr, methods: List[Function]) -> None:
+    def __init__(self, name: Token, superclass: Expr, methods: List[Function], slot: Optional[int] = None) -> None:
         self.name = name
         self.superclass = superclass
         self.methods = methods
+        self.slot = slot
 
     def accept(self, visitor: StmtVisitor) -> None:
         return visitor.visit_class_stmt(self)
@@ -0,0 +1,125 @@
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from callable import IqaloxFunction
+from environment import Environment
+from expression import Expr
+from statement import Stmt, Function, For
+from token import Token
+
+# A compiled node, as closure_compiler.Compiled.
+Compiled = Callable[[Environment], Any]
+
+# How many calls of a function, or iterations of a loop, the tree-walker
+# runs itself before compiling it (`--tier-threshold=N`; 0 never does).
+HOT_THRESHOLD = 1000
+
+
+# Tiered execution for the tree-walker. Everything starts out in the cold
+# tier, walked node by node as it always was, so a short script pays for
+# nothing it doesn't run. What turns out to be hot moves up to the closure
+# engine's compiled code (see closure_compiler.py), which works on the very
+# same Environments and values, so the switch is invisible to the program:
+#
+# - A function declaration is hot once its functions have been called
+#   `threshold` times in all (see IqaloxFunction.enter()). Its body is then
+#   compiled, once, and each of its functions turns into a CompiledFunction
+#   -- by swapping its class -- on its next call.
+# - A loop is hot once `threshold` iterations have run, over however many
+#   times it's been entered. It's then compiled too: the iteration that
+#   crosses the threshold carries on in the compiled loop, right where the
+#   tree-walker left off (see Interpreter.run_loop() and
+#   run_counted_loop()), and every later run of the statement is compiled
+#   from the start.
+#
+# `on_promote`, when set, is called with each declaration or loop as it's
+# compiled and the count that made it hot (`--tier-stats` prints them).
+class Tiering:
+    def __init__(self, interpreter: Any, enabled: bool = True, threshold: int = HOT_THRESHOLD) -> None:
+        self.interpreter = interpreter
+        self.enabled = enabled
+        self.threshold = threshold
+        self.compiler = None
+        self.calls: Dict[Function, int] = {}
+        self.functions: Dict[Function, Compiled] = {}
+        # Iterations each loop has left before it's hot, and each hot loop
+        # compiled whole.
+        self.budgets: Dict[For, int] = {}
+        self.loops: Dict[For, Compiled] = {}
+        self.functions_compiled = 0
+        self.loops_compiled = 0
+        self.on_promote: Optional[Callable[[Union[Function, For], int], None]] = None
+
+    def closure_compiler(self) -> Any:
+        # (closure_compiler.py is only imported here and in count_call(): it
+        # imports interpreter.py, which imports this module.)
+        if self.compiler is None:
+            from closure_compiler import ClosureCompiler
+            self.compiler = ClosureCompiler(self.interpreter)
+        return self.compiler
+
+    def count_call(self, function: IqaloxFunction) -> bool:
+        # Whether this call made the function compiled, so the call should
+        # go to it again.
+        if not self.enabled or not self.threshold:
+            return False
+        declaration = function.declaration
+        calls = self.calls.get(declaration, 0) + 1
+        self.calls[declaration] = calls
+        if calls < self.threshold:
+            return False
+
+        body = self.functions.get(declaration)
+        if body is None:
+            body = self.functions[declaration] = self.closure_compiler().compile_body(declaration.body)
+            self.functions_compiled += 1
+            self.promoted(declaration, calls)
+        from closure_compiler import CompiledFunction
+        function.__class__ = CompiledFunction
+        function.body = body
+        return True
+
+    def loop_budget(self, stmt: For) -> int:
+        # -1, which never counts down to 0, while tiering is off.
+        if not self.enabled or not self.threshold:
+            return -1
+        return self.budgets.get(stmt, self.threshold)
+
+    def spend(self, stmt: For, budget: int) -> None:
+        # What's left of a loop_budget() once the loop stops.
+        if budget > 0:
+            self.budgets[stmt] = budget
+
+    def promote_loop(self, stmt: For) -> Tuple[Compiled, Any]:
+        # Compiles the loop, keeping the whole statement for its later runs
+        # and returning the entry points to carry on a running one with
+        # (see ClosureCompiler.compile_loop()).
+        run, repeat, count = self.closure_compiler().compile_loop(stmt)
+        self.loops[stmt] = run
+        self.budgets.pop(stmt, None)
+        self.loops_compiled += 1
+        self.promoted(stmt, self.threshold)
+        return repeat, count
+
+    def promoted(self, node: Union[Function, For], count: int) -> None:
+        if self.on_promote is not None:
+            self.on_promote(node, count)
+
+
+def describe(node: Union[Function, For]) -> str:
+    # For --tier-stats: `fun name` or `loop`, and the line it's on (a
+    # loop's first token that has one -- a For keeps no token of its own).
+    if isinstance(node, Function):
+        return f'fun {node.name.lexeme} (line {node.name.line})'
+    token = _first_token(node)
+    return 'loop' if token is None else f'loop (line {token.line})'
+
+
+def _first_token(node: Any) -> Optional[Token]:
+    for field in vars(node).values():
+        if isinstance(field, Token):
+            return field
+        if isinstance(field, (Expr, Stmt)):
+            token = _first_token(field)
+            if token is not None:
+                return token
+    return None
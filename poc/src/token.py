@@ -1,5 +1,9 @@
-from enum import Enum
-from typing import Dict, Any, Tuple
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from enum import Enum, IntEnum
+from mmap import mmap
+from typing import Dict, Any, Tuple, Union
 
 
 class TokenType(str, Enum):
@@ -39,6 +43,7 @@ class TokenType(str, Enum):
     QUESTION_MARK_COLON = '?:'
     DOUBLE_QUESTION_MARK = '??'
     PIPE = '|>'
+    BAR = '|'
 
     # Keywords.
     AND = 'and'
@@ -90,6 +95,20 @@ class TokenType(str, Enum):
     NUMBER = 'NUMBER'
 
 
+# Each TokenType as a small int, in declaration order: what a TokenBuffer
+# stores per token and what the Parser compares against, so checking the
+# current token's kind is an int comparison rather than an Enum lookup.
+TokenKind = IntEnum('TokenKind', [(token_type.name, code) for code, token_type in enumerate(TokenType)])
+
+TOKEN_TYPES: Tuple[TokenType, ...] = tuple(TokenType)
+
+# A script's text: decoded, or its UTF-8 bytes as read or memory-mapped
+# from its file (see Iqalox.run_file()).
+Source = Union[str, bytes, mmap]
+
+_NUMBER = TokenKind.NUMBER.value
+_STRING = TokenKind.STRING.value
+
 _keywords: Tuple = (
     'and', 'class', 'false', 'fun', 'for', 'nil', 'or', 'return', 'super', 'self', 'true', 'var', 'with',
     'module', 'trait', 'extends', 'break', 'continue', 'use', 'mut'
@@ -97,6 +116,8 @@ _keywords: Tuple = (
 
 KEYWORDS: Dict[str, TokenType] = {key: TokenType(key) for key in _keywords}
 
+KEYWORD_KINDS: Dict[str, TokenKind] = {key: TokenKind[token_type.name] for key, token_type in KEYWORDS.items()}
+
 SINGLE_CHARACTER_TOKENS: Tuple = ('(', ')', '{', '}', '[', ']', ',', ';', '/', '\\', '*', '_', '%', '^')
 
 ONE_OR_MORE_CHARACTER_TOKENS: Tuple = (
@@ -128,3 +149,102 @@ class Token:
     def __repr__(self) -> str:
         properties = f"{self.type}, {self.lexeme}, {self.literal}, {self.line}:{self.column}"
         return f'{self.__class__.__name__}({properties})'
+
+
+class TokenBuffer(Sequence):
+    # The Scanner's output, stored as parallel columns instead of one Token
+    # object per token: a kind code, a source offset and a length each,
+    # packed into arrays at a few bytes a token, plus the offset every line
+    # starts at. A token's lexeme, literal, line and column are only worked
+    # out from those when something asks -- the Parser for a token it keeps
+    # in the AST or reports an error at -- and indexing the buffer builds
+    # the same Token the Scanner used to produce, so it still reads as a
+    # list of Tokens.
+    #
+    # Over an encoded Source, offsets and lengths count bytes, and lexemes
+    # are only decoded as they're built.
+    __slots__ = ('source', 'kinds', 'starts', 'lengths', 'line_starts', 'lines_before', 'encoded', 'wide')
+
+    def __init__(self, source: Source, line: int = 1) -> None:
+        # `line` is the number of the line `source` starts at, for a piece
+        # of a longer script (see scanner.stream_tokens()).
+        self.source = source
+        self.encoded = not isinstance(source, str)
+        # Whether some character takes more than one byte, so a column
+        # isn't just a difference of offsets; set by the Scanner.
+        self.wide = False
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.lengths = array('I')
+        # line_starts[n] is the offset line `line` + n starts at.
+        self.line_starts = array('I', [0])
+        self.lines_before = line - 1
+
+    def append(self, kind: int, start: int, length: int) -> None:
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.lengths.append(length)
+
+    def truncate(self, count: int, end: int) -> None:
+        # Keeps just the first `count` tokens, and the lines up to offset
+        # `end`, followed by an EOF there.
+        del self.kinds[count:]
+        del self.starts[count:]
+        del self.lengths[count:]
+        del self.line_starts[bisect_right(self.line_starts, end):]
+        self.append(TokenKind.EOF, end, 0)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError('token index out of range')
+        return self.token(index)
+
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def lexeme(self, index: int) -> str:
+        start = self.starts[index]
+        lexeme = self.source[start:start + self.lengths[index]]
+        return lexeme.decode() if self.encoded else lexeme
+
+    def literal(self, index: int) -> Any:
+        kind = self.kinds[index]
+        if kind == TokenKind.NUMBER:
+            return float(self.lexeme(index))
+        if kind == TokenKind.STRING:
+            return self.lexeme(index)[1:-1]
+        return None
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        # The 1-indexed line and column of a source offset.
+        line = bisect_right(self.line_starts, offset)
+        return line + self.lines_before, self.column(self.line_starts[line - 1], offset)
+
+    def column(self, line_start: int, offset: int) -> int:
+        if self.wide:
+            return len(self.source[line_start:offset].decode(errors='replace')) + 1
+        return offset - line_start + 1
+
+    def token(self, index: int) -> Token:
+        # lexeme(), literal() and position() in one, since the Parser builds
+        # a Token for every name and operator it keeps.
+        start = self.starts[index]
+        lexeme = self.source[start:start + self.lengths[index]]
+        if self.encoded:
+            lexeme = lexeme.decode()
+        kind = self.kinds[index]
+        if kind == _NUMBER:
+            literal = float(lexeme)
+        elif kind == _STRING:
+            literal = lexeme[1:-1]
+        else:
+            literal = None
+        line = bisect_right(self.line_starts, start)
+        line_start = self.line_starts[line - 1]
+        column = start - line_start + 1 if not self.wide else self.column(line_start, start)
+        return Token(TOKEN_TYPES[kind], lexeme, literal, line + self.lines_before, column)
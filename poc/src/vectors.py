@@ -0,0 +1,381 @@
+import operator
+from array import array
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterator, List
+
+from error import IqaloxRuntimeError
+from imports import import_past_token
+from token import Token, TokenType
+
+try:
+    numpy = import_past_token('numpy')
+except ImportError:
+    numpy = None
+
+# The operators that apply element-wise to numeric vectors.
+_ELEMENTWISE: Dict[TokenType, Callable[[Any, Any], Any]] = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: operator.truediv,
+    TokenType.PERCENT: operator.mod,
+    TokenType.POWER: operator.pow,
+}
+
+
+# A vector whose elements are all numbers (not bools), kept as one buffer of
+# doubles rather than a list of float objects: a NumPy array when NumPy can
+# be imported, an array('d') otherwise. make_vector() picks it for any new
+# vector it can hold, so the engines build one from every such vector
+# literal and map/filter/sort result; any other vector stays a list.
+#
+# To a program it's the same vector: it iterates as floats, prints as the
+# list of them does (`[1.0, 2.0]`), and equals whatever the list would --
+# list vectors included. What's new is arithmetic (see elementwise()).
+#
+# A slice of one (`v[a:b]`) is a view rather than a copy: a NumericVector
+# over the same buffer, from a memoryview of the array('d') -- or of the
+# memoryview it already is -- or NumPy's own slice of the array. Nothing in
+# the PoC ever changes a vector once it's made, so no copy is ever needed
+# to keep the two apart; a view does keep all of its parent's buffer alive,
+# though, for as long as it lives.
+class NumericVector:
+    __slots__ = ('data',)
+
+    def __init__(self, data: Any) -> None:
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[float]:
+        # (A NumPy array's own elements aren't floats, but float64s.)
+        return iter(self.data if numpy is None else self.data.tolist())
+
+    def __getitem__(self, index: int) -> float:
+        return float(self.data[index])
+
+    def slice(self, start: int, stop: int) -> 'NumericVector':
+        # The elements from `start` up to, not including, `stop`, with
+        # 0 <= start <= stop <= len(self), in O(1).
+        data = self.data
+        if data.__class__ is array:
+            data = memoryview(data)
+        return NumericVector(data[start:stop])
+
+    def tolist(self) -> List[float]:
+        return self.data.tolist()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, NumericVector):
+            if numpy is None:
+                return self.data == other.data
+            other = other.tolist()
+        if isinstance(other, list):
+            return self.tolist() == other
+        # (A PersistentVector's own __eq__ then has a go.)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.tolist())
+
+    __str__ = __repr__
+
+    def __reduce__(self) -> Any:
+        # Pickled (for a parallel.py worker) as the list it rebuilds from.
+        return make_vector, (self.tolist(),)
+
+
+# A vector of numeric vectors, all the same length, made by one of the
+# matrix natives (see matrices.py) -- which keep, in `packed`, the one
+# buffer its rows are cut from: a 2-D NumPy array, or without NumPy a list
+# of the rows' lists of floats. Another matrix native given it then starts
+# from that rather than packing the rows all over again. To a program it's
+# just the vector of its rows.
+class Matrix(list):
+    __slots__ = ('packed',)
+
+    def __reduce__(self) -> Any:
+        # Pickled as the plain vector of its rows.
+        return list, (list(self),)
+
+
+# How many elements a PersistentVector keeps together in one leaf.
+_CHUNK = 32
+
+
+# A vector built by cons or spread (`[item | vector]`, `[...a, ...b]`), kept
+# as a tree its later versions share rather than copy: a balanced binary
+# tree -- AVL, by height -- whose leaves are tuples of up to _CHUNK elements
+# in order. Putting an element in front or behind, joining two vectors, or
+# cutting a slice out of one makes a new tree out of O(log n) new nodes and
+# the old ones' untouched subtrees, so `[x | xs]` leaves `xs` as it was, and
+# a recursive function consing up a vector one element at a time takes
+# O(n log n) rather than the O(n^2) copying each step would. An element's
+# found the same way, in O(log n).
+#
+# To a program it's the same vector as any other: it iterates, prints and
+# `concat`s like the list of its elements, and equals what that list
+# would. Arithmetic works on it as on a numeric vector while every element
+# is a number (see as_numeric()).
+class PersistentVector:
+    __slots__ = ('tree',)
+
+    def __init__(self, tree: Any) -> None:
+        # A leaf tuple (`()` when empty) or a _Node.
+        self.tree = tree
+
+    def __len__(self) -> int:
+        return _size(self.tree)
+
+    def __iter__(self) -> Iterator[Any]:
+        pending = [self.tree]
+        while pending:
+            tree = pending.pop()
+            if tree.__class__ is tuple:
+                yield from tree
+            else:
+                pending.append(tree.right)
+                pending.append(tree.left)
+
+    def __getitem__(self, index: int) -> Any:
+        # The element at `index`, 0 <= index < len(self).
+        tree = self.tree
+        while tree.__class__ is not tuple:
+            left_size = _size(tree.left)
+            if index < left_size:
+                tree = tree.left
+            else:
+                index -= left_size
+                tree = tree.right
+        return tree[index]
+
+    def prepend(self, value: Any) -> 'PersistentVector':
+        return PersistentVector(_join((value,), self.tree))
+
+    def append(self, value: Any) -> 'PersistentVector':
+        return PersistentVector(_join(self.tree, (value,)))
+
+    def concat(self, other: 'PersistentVector') -> 'PersistentVector':
+        return PersistentVector(_join(self.tree, other.tree))
+
+    def slice(self, start: int, stop: int) -> 'PersistentVector':
+        # The elements from `start` up to, not including, `stop`, with
+        # 0 <= start <= stop <= len(self).
+        return PersistentVector(_take(_drop(self.tree, start), stop - start))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, VECTOR_TYPES):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    __str__ = __repr__
+
+    def __reduce__(self) -> Any:
+        # Pickled (for a parallel.py worker) as the list it rebuilds from.
+        return persistent, (list(self),)
+
+
+# An inner node of a PersistentVector's tree: its two children joined,
+# neither empty, their heights at most one apart. A leaf's height is 0.
+class _Node:
+    __slots__ = ('left', 'right', 'size', 'height')
+
+    def __init__(self, left: Any, right: Any) -> None:
+        self.left = left
+        self.right = right
+        self.size = _size(left) + _size(right)
+        self.height = max(_height(left), _height(right)) + 1
+
+
+def _size(tree: Any) -> int:
+    return len(tree) if tree.__class__ is tuple else tree.size
+
+
+def _height(tree: Any) -> int:
+    return 0 if tree.__class__ is tuple else tree.height
+
+
+def _balanced(left: Any, right: Any) -> _Node:
+    # The node of two balanced trees whose heights differ by at most two,
+    # rotated back into balance if they do differ by two.
+    left_height, right_height = _height(left), _height(right)
+    if left_height > right_height + 1:
+        inner = left.right
+        if _height(left.left) >= _height(inner):
+            return _Node(left.left, _Node(inner, right))
+        return _Node(_Node(left.left, inner.left), _Node(inner.right, right))
+    if right_height > left_height + 1:
+        inner = right.left
+        if _height(right.right) >= _height(inner):
+            return _Node(_Node(left, inner), right.right)
+        return _Node(_Node(left, inner.left), _Node(inner.right, right.right))
+    return _Node(left, right)
+
+
+def _join(left: Any, right: Any) -> Any:
+    # The tree of `left`'s elements followed by `right`'s, in O(log n): the
+    # shorter tree goes down the taller one's facing edge to where the
+    # heights meet, and the path back up is rebuilt, rotating where needed.
+    # A leaf always goes down to the edge leaf, and joins it while they fit
+    # in one, so a vector grown an element at a time keeps full leaves.
+    if not left:
+        return right
+    if not right:
+        return left
+    left_leaf = left.__class__ is tuple
+    right_leaf = right.__class__ is tuple
+    if left_leaf and right_leaf:
+        return left + right if len(left) + len(right) <= _CHUNK else _Node(left, right)
+    left_height, right_height = _height(left), _height(right)
+    if right_leaf or left_height > right_height + 1:
+        return _balanced(left.left, _join(left.right, right))
+    if left_leaf or right_height > left_height + 1:
+        return _balanced(_join(left, right.left), right.right)
+    return _Node(left, right)
+
+
+def _take(tree: Any, count: int) -> Any:
+    # The tree of the first `count` elements.
+    if count >= _size(tree):
+        return tree
+    if count <= 0:
+        return ()
+    if tree.__class__ is tuple:
+        return tree[:count]
+    left_size = _size(tree.left)
+    if count <= left_size:
+        return _take(tree.left, count)
+    return _join(tree.left, _take(tree.right, count - left_size))
+
+
+def _drop(tree: Any, count: int) -> Any:
+    # The tree of all but the first `count` elements.
+    if count <= 0:
+        return tree
+    if count >= _size(tree):
+        return ()
+    if tree.__class__ is tuple:
+        return tree[count:]
+    left_size = _size(tree.left)
+    if count >= left_size:
+        return _drop(tree.right, count - left_size)
+    return _join(_drop(tree.left, count), tree.right)
+
+
+def _tree(leaves: List[tuple], start: int, stop: int) -> Any:
+    # A balanced tree of leaves[start:stop], halving it.
+    if stop - start == 1:
+        return leaves[start]
+    middle = (start + stop) // 2
+    return _Node(_tree(leaves, start, middle), _tree(leaves, middle, stop))
+
+
+# The vector `[]` as a PersistentVector, for cons and spread to start from.
+EMPTY_VECTOR = PersistentVector(())
+
+
+def persistent(values: Any) -> PersistentVector:
+    # Any vector as a PersistentVector: itself if it is one already, and
+    # otherwise built from its elements in one go (in O(n), once; only what
+    # is done to it after is O(log n)).
+    if values.__class__ is PersistentVector:
+        return values
+    values = list(values)
+    if not values:
+        return EMPTY_VECTOR
+    leaves = [tuple(values[start:start + _CHUNK]) for start in range(0, len(values), _CHUNK)]
+    return PersistentVector(_tree(leaves, 0, len(leaves)))
+
+
+# What a vector can be at run time.
+VECTOR_TYPES = (list, NumericVector, PersistentVector)
+
+
+def _buffer(values: List[float]) -> Any:
+    if numpy is not None:
+        return numpy.array(values, dtype=float)
+    return array('d', values)
+
+
+def make_vector(values: List[Any]) -> Any:
+    # A new vector of `values`: numeric if they're all numbers.
+    for value in values:
+        if value.__class__ is not float:
+            return values
+    return NumericVector(_buffer(values))
+
+
+def make_matrix(packed: Any) -> Matrix:
+    # The Matrix of a 2-D NumPy array, or of a list of lists of floats.
+    if numpy is not None:
+        packed = numpy.ascontiguousarray(packed, dtype=float)
+        matrix = Matrix([NumericVector(row) for row in packed])
+    else:
+        matrix = Matrix([NumericVector(array('d', row)) for row in packed])
+    matrix.packed = packed
+    return matrix
+
+
+def as_numeric(value: Any) -> Any:
+    # A PersistentVector as the numeric vector of its elements, if they're
+    # all numbers; anything else as it is.
+    if value.__class__ is PersistentVector:
+        return make_vector(list(value))
+    return value
+
+
+def is_elementwise(token_type: TokenType, left: Any, right: Any) -> bool:
+    # Whether the operation is one elementwise() does, rather than the
+    # operator's usual one on two numbers.
+    return token_type in _ELEMENTWISE and (
+        left.__class__ is NumericVector or right.__class__ is NumericVector
+        or left.__class__ is PersistentVector or right.__class__ is PersistentVector
+    )
+
+
+def elementwise(operator_token: Token, left: Any, right: Any) -> Any:
+    # `+ - * / % ^` on a numeric vector and a numeric vector of the same
+    # length, element by element, or on a numeric vector and a number, which
+    # then goes with every element. Each element's result is what the
+    # operator makes of those two numbers, and a zero divisor anywhere is
+    # the error it would be -- for `%` too. (The result is a list vector
+    # only where an element's isn't a float: a negative number to a
+    # fractional power is complex in Python.)
+    left, right = as_numeric(left), as_numeric(right)
+    for operand in (left, right):
+        if operand.__class__ is not NumericVector and not isinstance(operand, (int, float)):
+            raise IqaloxRuntimeError(operator_token, 'Operands must be numbers.')
+    if left.__class__ is NumericVector and right.__class__ is NumericVector and len(left) != len(right):
+        raise IqaloxRuntimeError(
+            operator_token, f'Vectors must be the same length, got {len(left)} and {len(right)}.'
+        )
+
+    token_type = operator_token.type
+    if token_type in (TokenType.SLASH, TokenType.PERCENT) and _has_zero(right):
+        raise IqaloxRuntimeError(operator_token, 'Division by zero.')
+    function = _ELEMENTWISE[token_type]
+    if numpy is not None and token_type != TokenType.POWER:
+        # Overflow is `inf`, as it is for a float, not a warning.
+        with numpy.errstate(all='ignore'):
+            return NumericVector(function(_operand(left), _operand(right)))
+    left_values = left.tolist() if left.__class__ is NumericVector else repeat(left)
+    right_values = right.tolist() if right.__class__ is NumericVector else repeat(right)
+    return make_vector(list(map(function, left_values, right_values)))
+
+
+def _operand(value: Any) -> Any:
+    return value.data if value.__class__ is NumericVector else float(value)
+
+
+def _has_zero(value: Any) -> bool:
+    if value.__class__ is NumericVector:
+        return 0.0 in value.data
+    return value == 0
@@ -0,0 +1,656 @@
+from typing import Any, Dict, List, Tuple
+
+from bytecode import FunctionProto, OpCode
+from bytecode_compiler import BytecodeCompiler
+from callable import NativeFunction
+from error import IqaloxRuntimeError
+from interpreter import Interpreter
+from statement import Stmt
+from token import Token, TokenType
+
+# vm/src/vm.cpp's kMaxFrames.
+MAX_FRAMES = 1024
+
+
+class _Undef:
+    # The "declared but not yet assigned" marker UNDEF pushes. Reading one
+    # back through a variable or property is a runtime error.
+    def __str__(self) -> str:
+        return 'undef'
+
+    __repr__ = __str__
+
+
+UNDEF_VALUE = _Undef()
+
+
+class Upvalue:
+    # A captured variable, read and written as `cell[index]`: while open,
+    # `cell` is the VM's own stack and `index` the captured slot; closing it
+    # swaps in a private one-element list, so closures never need to know
+    # which of the two they're looking at.
+    __slots__ = ('cell', 'index')
+
+    def __init__(self, cell: List[Any], index: int) -> None:
+        self.cell = cell
+        self.index = index
+
+
+class Closure:
+    __slots__ = ('proto', 'upvalues')
+
+    def __init__(self, proto: FunctionProto, upvalues: List[Upvalue]) -> None:
+        self.proto = proto
+        self.upvalues = upvalues
+
+    def __str__(self) -> str:
+        return f'<fun {self.proto.name}>'
+
+    __repr__ = __str__
+
+
+class BoundMethod:
+    __slots__ = ('receiver', 'method')
+
+    def __init__(self, receiver: 'Instance', method: Closure) -> None:
+        self.receiver = receiver
+        self.method = method
+
+    def __str__(self) -> str:
+        return f'<fun {self.method.proto.name}>'
+
+    __repr__ = __str__
+
+
+class Class:
+    # Method and property tables are flattened: INHERIT/MIXIN copy the
+    # superclass's entries in before the class's own METHOD*/PROPERTY*
+    # opcodes run, so lookups never walk a superclass chain.
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.methods: Dict[str, Closure] = {}
+        self.public_methods = set()
+        # name -> (is_pub, is_mut): the only fields its instances can have.
+        # A 0.1 program has no property declarations, so BytecodeCompiler
+        # declares the ones its methods assign through `self`.
+        self.properties: Dict[str, Tuple[bool, bool]] = {}
+
+    def __str__(self) -> str:
+        return f'<class {self.name}>'
+
+    __repr__ = __str__
+
+
+class Instance:
+    __slots__ = ('klass', 'fields')
+
+    def __init__(self, klass: Class) -> None:
+        self.klass = klass
+        self.fields: Dict[str, Any] = dict.fromkeys(klass.properties, UNDEF_VALUE)
+
+    def __str__(self) -> str:
+        return f'<{self.klass.name} instance>'
+
+    __repr__ = __str__
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return 'nil'
+    if value is UNDEF_VALUE:
+        return 'undef'
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, float):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, list):
+        return 'vector'
+    if isinstance(value, Class):
+        return 'class'
+    if isinstance(value, Instance):
+        return 'instance'
+    if isinstance(value, (Closure, BoundMethod, NativeFunction)):
+        return 'function'
+    return 'value'
+
+
+def _fault(message: str) -> IqaloxRuntimeError:
+    # The VM fills in the token (i.e. the line) of whichever instruction was
+    # running once the error reaches VM.run().
+    return IqaloxRuntimeError(None, message)
+
+
+def _check_vector_index(receiver: Any, index: Any) -> int:
+    if not isinstance(receiver, list):
+        raise _fault(f'Only vectors can be indexed, got {_type_name(receiver)}.')
+    if type(index) is not float:
+        raise _fault(f'Vector index must be a number, got {_type_name(index)}.')
+    if not index.is_integer():
+        raise _fault(f'Vector index must be an integer, got {Interpreter.stringify(index)}.')
+    resolved = index + len(receiver) if index < 0 else index
+    if resolved < 0 or resolved >= len(receiver):
+        raise _fault(
+            f'Vector index {Interpreter.stringify(index)} out of range for vector of length {len(receiver)}.'
+        )
+    return int(resolved)
+
+
+def _get_slice(receiver: Any, start: Any, stop: Any) -> List[Any]:
+    if not isinstance(receiver, list):
+        raise _fault(f'Only vectors can be sliced, got {_type_name(receiver)}.')
+    length = len(receiver)
+
+    def resolve(bound: Any, default: float, label: str) -> float:
+        if bound is None:
+            return default
+        if type(bound) is not float:
+            raise _fault(f'Slice {label} bound must be a number, got {_type_name(bound)}.')
+        if not bound.is_integer():
+            raise _fault(f'Slice {label} bound must be an integer, got {Interpreter.stringify(bound)}.')
+        return bound + length if bound < 0 else bound
+
+    # Both bounds are inclusive; out-of-range ones clamp rather than error.
+    first = min(max(resolve(start, 0.0, 'start'), 0.0), length)
+    last = min(max(resolve(stop, length - 1.0, 'stop'), -1.0), length - 1.0)
+    return receiver[int(first):int(last) + 1] if first <= last else []
+
+
+def _check_matrix(name: str, label: str, matrix: Any) -> Tuple[int, int]:
+    if not isinstance(matrix, list):
+        raise _fault(f"{name}'s {label} argument must be a matrix (a vector of vectors), got {_type_name(matrix)}.")
+    if not matrix:
+        return 0, 0
+    if not isinstance(matrix[0], list):
+        raise _fault(
+            f"{name}'s {label} argument must be a matrix (a vector of vectors), got a vector of "
+            f"{_type_name(matrix[0])}."
+        )
+    columns = len(matrix[0])
+    for row in matrix:
+        if not isinstance(row, list) or len(row) != columns:
+            raise _fault(f"{name}'s {label} argument must be a rectangular matrix (every row the same length).")
+    return len(matrix), columns
+
+
+def _matrix_element(name: str, matrix: List[List[Any]], i: int, j: int) -> float:
+    element = matrix[i][j]
+    if type(element) is not float:
+        raise _fault(f"{name}'s matrix elements must be numbers, got {_type_name(element)}.")
+    return element
+
+
+def _native_print(vm: 'VM', arguments: List[Any]) -> None:
+    print(Interpreter.stringify(arguments[0]))
+    return None
+
+
+def _native_concat(vm: 'VM', arguments: List[Any]) -> str:
+    if not isinstance(arguments[0], list):
+        raise _fault(f"Argument to 'concat' must be a vector, got {_type_name(arguments[0])}.")
+    return ''.join(Interpreter.stringify(value) for value in arguments[0])
+
+
+def _native_push(vm: 'VM', arguments: List[Any]) -> None:
+    if not isinstance(arguments[0], list):
+        raise _fault(f'Only vectors can be pushed onto, got {_type_name(arguments[0])}.')
+    arguments[0].append(arguments[1])
+    return None
+
+
+def _native_pop(vm: 'VM', arguments: List[Any]) -> Any:
+    if not isinstance(arguments[0], list):
+        raise _fault(f'Only vectors can be popped from, got {_type_name(arguments[0])}.')
+    if not arguments[0]:
+        raise _fault('Cannot pop from an empty vector.')
+    return arguments[0].pop()
+
+
+def _native_length(vm: 'VM', arguments: List[Any]) -> float:
+    if not isinstance(arguments[0], list):
+        raise _fault(f'Only vectors have a length, got {_type_name(arguments[0])}.')
+    return float(len(arguments[0]))
+
+
+def _native_reverse(vm: 'VM', arguments: List[Any]) -> List[Any]:
+    if not isinstance(arguments[0], list):
+        raise _fault(f'Only vectors can be reversed, got {_type_name(arguments[0])}.')
+    return arguments[0][::-1]
+
+
+def _native_transpose(vm: 'VM', arguments: List[Any]) -> List[List[float]]:
+    matrix = arguments[0]
+    rows, columns = _check_matrix('transpose', 'only', matrix)
+    return [[_matrix_element('transpose', matrix, j, i) for j in range(rows)] for i in range(columns)]
+
+
+def _native_multiply(vm: 'VM', arguments: List[Any]) -> List[List[float]]:
+    a, b = arguments
+    a_rows, a_columns = _check_matrix('multiply', 'first', a)
+    b_rows, b_columns = _check_matrix('multiply', 'second', b)
+    if a_columns != b_rows:
+        raise _fault(
+            f"multiply: a {a_rows}x{a_columns} matrix can't be multiplied by a {b_rows}x{b_columns} matrix -- "
+            "the first matrix's column count must equal the second's row count."
+        )
+    return [
+        [
+            sum(_matrix_element('multiply', a, i, k) * _matrix_element('multiply', b, k, j) for k in range(a_columns))
+            for j in range(b_columns)
+        ]
+        for i in range(a_rows)
+    ]
+
+
+def _elementwise(name: str, arguments: List[Any], combine) -> List[List[float]]:
+    a, b = arguments
+    a_shape = _check_matrix(name, 'first', a)
+    b_shape = _check_matrix(name, 'second', b)
+    if a_shape != b_shape:
+        raise _fault(
+            f'{name}: matrices must be the same shape, got {a_shape[0]}x{a_shape[1]} and {b_shape[0]}x{b_shape[1]}.'
+        )
+    rows, columns = a_shape
+    return [
+        [combine(_matrix_element(name, a, i, j), _matrix_element(name, b, i, j)) for j in range(columns)]
+        for i in range(rows)
+    ]
+
+
+def _native_add(vm: 'VM', arguments: List[Any]) -> List[List[float]]:
+    return _elementwise('add', arguments, lambda x, y: x + y)
+
+
+def _native_subtract(vm: 'VM', arguments: List[Any]) -> List[List[float]]:
+    return _elementwise('subtract', arguments, lambda x, y: x - y)
+
+
+# vm/src/vm.cpp's defineNatives(): the PoC's own `print`/`concat` plus the
+# vector and matrix natives compiler/-built programs (and the map/filter/
+# reduce/sort prelude iqaloxc prepends to them) call.
+NATIVES = [
+    NativeFunction('print', 1, _native_print),
+    NativeFunction('concat', 1, _native_concat),
+    NativeFunction('push', 2, _native_push),
+    NativeFunction('pop', 1, _native_pop),
+    NativeFunction('length', 1, _native_length),
+    NativeFunction('reverse', 1, _native_reverse),
+    NativeFunction('transpose', 1, _native_transpose),
+    NativeFunction('multiply', 2, _native_multiply),
+    NativeFunction('add', 2, _native_add),
+    NativeFunction('subtract', 2, _native_subtract),
+]
+
+
+# A dispatch-loop VM for the bytecode in bytecode.py, following
+# vm/src/vm.cpp's semantics and calling convention: one value stack shared by
+# every frame, a plain function's arguments starting at its frame's slot 0
+# (its callee sitting just below), a method's receiver in slot 0 instead,
+# and upvalues that stay open (pointing into the stack) until the slot they
+# capture is popped. Locals are plain list slots; only globals are
+# name-keyed.
+class VM:
+    def __init__(self) -> None:
+        self.globals: Dict[str, Any] = {native.name: native for native in NATIVES}
+        self.stack: List[Any] = []
+        # Saved callers: (closure, ip, base, result_index, is_initializer).
+        self.frames: List[Tuple[Closure, int, int, int, bool]] = []
+        # Sorted by stack slot, innermost (highest) last.
+        self.open_upvalues: List[Upvalue] = []
+        self.compiler = BytecodeCompiler()
+
+    def interpret(self, statements: List[Stmt]) -> bool:
+        import iqalox
+        chunk = self.compiler.compile(statements)
+        if iqalox.Iqalox.had_error:
+            return False
+        try:
+            self.run_script(FunctionProto('script', 0, 0, [], chunk))
+        except IqaloxRuntimeError as error:
+            iqalox.Iqalox.runtime_error(error)
+            return False
+        return True
+
+    def run_script(self, script: FunctionProto) -> None:
+        closure = Closure(script, [])
+        del self.stack[:]
+        del self.frames[:]
+        del self.open_upvalues[:]
+        self.stack.append(closure)
+        self.run(closure)
+
+    def capture_upvalue(self, slot: int) -> Upvalue:
+        open_upvalues = self.open_upvalues
+        position = len(open_upvalues)
+        while position > 0 and open_upvalues[position - 1].index >= slot:
+            if open_upvalues[position - 1].index == slot:
+                return open_upvalues[position - 1]
+            position -= 1
+        upvalue = Upvalue(self.stack, slot)
+        open_upvalues.insert(position, upvalue)
+        return upvalue
+
+    def close_upvalues(self, first_slot: int) -> None:
+        stack = self.stack
+        open_upvalues = self.open_upvalues
+        while open_upvalues and open_upvalues[-1].index >= first_slot:
+            upvalue = open_upvalues.pop()
+            upvalue.cell = [stack[upvalue.index]]
+            upvalue.index = 0
+
+    @staticmethod
+    def bind_method(klass: Class, receiver: Instance, name: str, internal: bool) -> BoundMethod:
+        method = klass.methods.get(name)
+        # Outside the class, only `pub` methods (and `init`) are visible.
+        if method is None or not internal and name != 'init' and name not in klass.public_methods:
+            raise _fault(f"Undefined property '{name}'.")
+        return BoundMethod(receiver, method)
+
+    def run(self, closure: Closure) -> None:
+        stack = self.stack
+        frames = self.frames
+        open_upvalues = self.open_upvalues
+        code = closure.proto.chunk.code
+        constants = closure.proto.chunk.constants
+        ip = 0
+        base = len(stack)
+        result_index = base - 1
+        is_initializer = False
+        # Every opcode as a local, compared by identity: decoded instructions
+        # hold the OpCode members themselves, and a local load plus `is` is
+        # much cheaper than an OpCode attribute lookup and `==` per branch.
+        (CONSTANT, NIL, TRUE, FALSE, UNDEF, POP, POP_N, GET_LOCAL, SET_LOCAL, GET_UPVALUE, SET_UPVALUE, GET_GLOBAL,
+         SET_GLOBAL, DEFINE_GLOBAL, ADD, SUBTRACT, MULTIPLY, DIVIDE, MODULO, POWER, NEGATE, NOT, EQUAL, NOT_EQUAL,
+         GREATER, GREATER_EQUAL, LESS, LESS_EQUAL, JUMP, JUMP_IF_FALSE, JUMP_IF_NOT_NIL, BUILD_VECTOR, CALL, CLOSURE,
+         RETURN, CLASS, METHOD, INHERIT, GET_PROPERTY, SET_PROPERTY, GET_SUPER, GET_INDEX, SET_INDEX, VECTOR_LENGTH,
+         VECTOR_APPEND, VECTOR_EXTEND, METHOD_PUB, GET_PROPERTY_SELF, SET_PROPERTY_SELF, PROPERTY_PRIVATE,
+         PROPERTY_PRIVATE_MUT, PROPERTY_PUB, PROPERTY_PUB_MUT, MIXIN, GET_SLICE) = OpCode
+
+        try:
+            while True:
+                op, arg = code[ip]
+                ip += 1
+
+                if op is GET_LOCAL:
+                    value = stack[base + arg]
+                    if value is UNDEF_VALUE:
+                        raise _fault('Variable accessed before being assigned a value.')
+                    stack.append(value)
+                elif op is CONSTANT:
+                    stack.append(constants[arg])
+                elif op is POP:
+                    if open_upvalues and open_upvalues[-1].index >= len(stack) - 1:
+                        self.close_upvalues(len(stack) - 1)
+                    stack.pop()
+                elif op is JUMP_IF_FALSE:
+                    value = stack[-1]
+                    if value is None or value is False or value is UNDEF_VALUE:
+                        ip = arg
+                elif op is JUMP:
+                    ip = arg
+                elif op is GET_GLOBAL:
+                    name = constants[arg]
+                    if name not in self.globals:
+                        raise _fault(f"Undefined variable '{name}'.")
+                    value = self.globals[name]
+                    if value is UNDEF_VALUE:
+                        raise _fault(f"Variable '{name}' accessed before being assigned a value.")
+                    stack.append(value)
+                elif op is GET_UPVALUE:
+                    upvalue = closure.upvalues[arg]
+                    value = upvalue.cell[upvalue.index]
+                    if value is UNDEF_VALUE:
+                        raise _fault('Variable accessed before being assigned a value.')
+                    stack.append(value)
+                elif op is ADD or op is SUBTRACT or op is MULTIPLY or op is LESS or op is LESS_EQUAL \
+                        or op is GREATER or op is GREATER_EQUAL:
+                    b = stack.pop()
+                    a = stack.pop()
+                    if type(a) is not float or type(b) is not float:
+                        raise _fault('Operands must be numbers.')
+                    if op is ADD:
+                        stack.append(a + b)
+                    elif op is SUBTRACT:
+                        stack.append(a - b)
+                    elif op is LESS:
+                        stack.append(a < b)
+                    elif op is MULTIPLY:
+                        stack.append(a * b)
+                    elif op is LESS_EQUAL:
+                        stack.append(a <= b)
+                    elif op is GREATER:
+                        stack.append(a > b)
+                    else:
+                        stack.append(a >= b)
+                elif op is EQUAL:
+                    b = stack.pop()
+                    stack.append(Interpreter.is_equal(stack.pop(), b))
+                elif op is NOT_EQUAL:
+                    b = stack.pop()
+                    stack.append(not Interpreter.is_equal(stack.pop(), b))
+                elif op is DIVIDE or op is MODULO or op is POWER:
+                    b = stack.pop()
+                    a = stack.pop()
+                    if type(a) is not float or type(b) is not float:
+                        raise _fault('Operands must be numbers.')
+                    if op is DIVIDE:
+                        if b == 0:
+                            raise _fault('Division by zero.')
+                        stack.append(a / b)
+                    elif op is MODULO:
+                        stack.append(a % b)
+                    else:
+                        stack.append(a ** b)
+                elif op is CALL:
+                    callee = stack[-arg - 1]
+                    kind = type(callee)
+                    if kind is Closure or kind is BoundMethod or kind is Class:
+                        method_call = kind is not Closure
+                        new_initializer = False
+                        if kind is BoundMethod:
+                            stack[-arg - 1] = callee.receiver
+                            callee = callee.method
+                        elif kind is Class:
+                            instance = Instance(callee)
+                            stack[-arg - 1] = instance
+                            callee = callee.methods.get('init')
+                            if callee is None:
+                                if arg != 0:
+                                    raise _fault(f'Expected 0 argument(s) but got {arg}.')
+                                continue
+                            new_initializer = True
+                        proto = callee.proto
+                        if arg != proto.arity:
+                            raise _fault(f'Expected {proto.arity} argument(s) but got {arg}.')
+                        if len(frames) + 1 >= MAX_FRAMES:
+                            raise _fault('Stack overflow.')
+                        frames.append((closure, ip, base, result_index, is_initializer))
+                        closure = callee
+                        code = proto.chunk.code
+                        constants = proto.chunk.constants
+                        ip = 0
+                        if method_call:
+                            # The receiver is slot 0, where the callee was.
+                            base = result_index = len(stack) - arg - 1
+                        else:
+                            base = len(stack) - arg
+                            result_index = base - 1
+                        is_initializer = new_initializer
+                    elif kind is NativeFunction:
+                        if arg != callee.arity():
+                            raise _fault(f'Expected {callee.arity()} argument(s) but got {arg}.')
+                        result = callee.call(self, stack[len(stack) - arg:])
+                        del stack[len(stack) - arg - 1:]
+                        stack.append(result)
+                    else:
+                        raise _fault(f'{_type_name(callee)} value is not callable.')
+                elif op is RETURN:
+                    result = stack.pop()
+                    if is_initializer:
+                        result = stack[result_index]
+                    if open_upvalues and open_upvalues[-1].index >= result_index:
+                        self.close_upvalues(result_index)
+                    del stack[result_index:]
+                    if not frames:
+                        return
+                    closure, ip, base, result_index, is_initializer = frames.pop()
+                    code = closure.proto.chunk.code
+                    constants = closure.proto.chunk.constants
+                    stack.append(result)
+                elif op is SET_LOCAL:
+                    stack[base + arg] = stack[-1]
+                elif op is SET_UPVALUE:
+                    upvalue = closure.upvalues[arg]
+                    upvalue.cell[upvalue.index] = stack[-1]
+                elif op is SET_GLOBAL:
+                    name = constants[arg]
+                    if name not in self.globals:
+                        raise _fault(f"Undefined variable '{name}'.")
+                    self.globals[name] = stack[-1]
+                elif op is DEFINE_GLOBAL:
+                    self.globals[constants[arg]] = stack.pop()
+                elif op is NIL:
+                    stack.append(None)
+                elif op is TRUE:
+                    stack.append(True)
+                elif op is FALSE:
+                    stack.append(False)
+                elif op is UNDEF:
+                    stack.append(UNDEF_VALUE)
+                elif op is POP_N:
+                    if open_upvalues and open_upvalues[-1].index >= len(stack) - arg:
+                        self.close_upvalues(len(stack) - arg)
+                    del stack[len(stack) - arg:]
+                elif op is NOT:
+                    value = stack.pop()
+                    stack.append(value is None or value is False or value is UNDEF_VALUE)
+                elif op is NEGATE:
+                    value = stack.pop()
+                    if type(value) is not float:
+                        raise _fault('Operand must be a number.')
+                    stack.append(-value)
+                elif op is JUMP_IF_NOT_NIL:
+                    if stack[-1] is not None:
+                        ip = arg
+                elif op is BUILD_VECTOR:
+                    vector = stack[len(stack) - arg:]
+                    del stack[len(stack) - arg:]
+                    stack.append(vector)
+                elif op is CLOSURE:
+                    function_index, descriptors = arg
+                    upvalues = [
+                        self.capture_upvalue(base + index) if from_enclosing_local else closure.upvalues[index]
+                        for from_enclosing_local, index in descriptors
+                    ]
+                    stack.append(Closure(constants[function_index], upvalues))
+                elif op is GET_PROPERTY or op is GET_PROPERTY_SELF:
+                    name = constants[arg]
+                    receiver = stack.pop()
+                    if type(receiver) is not Instance:
+                        raise _fault('Only instances have properties.')
+                    internal = op is GET_PROPERTY_SELF
+                    if name in receiver.fields:
+                        if not internal and not receiver.klass.properties[name][0]:
+                            raise _fault(f"Undefined property '{name}'.")
+                        value = receiver.fields[name]
+                        if value is UNDEF_VALUE:
+                            raise _fault(f"Property '{name}' accessed before being assigned a value.")
+                        stack.append(value)
+                    else:
+                        stack.append(self.bind_method(receiver.klass, receiver, name, internal))
+                elif op is SET_PROPERTY or op is SET_PROPERTY_SELF:
+                    name = constants[arg]
+                    value = stack.pop()
+                    receiver = stack.pop()
+                    if type(receiver) is not Instance:
+                        raise _fault('Only instances have fields.')
+                    meta = receiver.klass.properties.get(name)
+                    if op is SET_PROPERTY:
+                        if meta is None or not meta[0]:
+                            raise _fault(f"Undefined property '{name}'.")
+                        if not meta[1]:
+                            raise _fault(f"Property '{name}' is not externally mutable.")
+                    elif meta is None:
+                        raise _fault(f"Undefined property '{name}'.")
+                    elif not meta[1] and receiver.fields[name] is not UNDEF_VALUE:
+                        raise _fault(
+                            f"Property '{name}' already assigned; immutable properties can only be set once."
+                        )
+                    receiver.fields[name] = value
+                    stack.append(value)
+                elif op is GET_SUPER:
+                    superclass = stack.pop()
+                    receiver = stack.pop()
+                    stack.append(self.bind_method(superclass, receiver, constants[arg], internal=True))
+                elif op is CLASS:
+                    stack.append(Class(constants[arg]))
+                elif op is METHOD or op is METHOD_PUB:
+                    name = constants[arg]
+                    method = stack.pop()
+                    klass = stack[-1]
+                    klass.methods[name] = method
+                    # An override is private unless this declaration says
+                    # otherwise, whatever INHERIT copied in.
+                    if op is METHOD_PUB:
+                        klass.public_methods.add(name)
+                    else:
+                        klass.public_methods.discard(name)
+                elif op is INHERIT:
+                    superclass = stack[-2]
+                    if type(superclass) is not Class:
+                        raise _fault('Superclass must be a class.')
+                    subclass = stack[-1]
+                    subclass.methods = dict(superclass.methods)
+                    subclass.public_methods = set(superclass.public_methods)
+                    subclass.properties = dict(superclass.properties)
+                elif op is MIXIN:
+                    mixin = stack.pop()
+                    if type(mixin) is not Class:
+                        raise _fault('Mixin must be a class.')
+                    klass = stack[-1]
+                    klass.methods.update(mixin.methods)
+                    klass.public_methods.update(mixin.public_methods)
+                    klass.properties.update(mixin.properties)
+                elif PROPERTY_PRIVATE <= op <= PROPERTY_PUB_MUT:
+                    is_pub = op in (PROPERTY_PUB, PROPERTY_PUB_MUT)
+                    is_mut = op in (PROPERTY_PRIVATE_MUT, PROPERTY_PUB_MUT)
+                    stack[-1].properties[constants[arg]] = (is_pub, is_mut)
+                elif op is GET_INDEX:
+                    index = stack.pop()
+                    receiver = stack.pop()
+                    stack.append(receiver[_check_vector_index(receiver, index)])
+                elif op is SET_INDEX:
+                    value = stack.pop()
+                    index = stack.pop()
+                    receiver = stack.pop()
+                    receiver[_check_vector_index(receiver, index)] = value
+                    stack.append(value)
+                elif op is GET_SLICE:
+                    stop = stack.pop()
+                    start = stack.pop()
+                    receiver = stack.pop()
+                    stack.append(_get_slice(receiver, start, stop))
+                elif op is VECTOR_LENGTH:
+                    receiver = stack.pop()
+                    if not isinstance(receiver, list):
+                        raise _fault(f'Only vectors have a length, got {_type_name(receiver)}.')
+                    stack.append(float(len(receiver)))
+                elif op is VECTOR_APPEND:
+                    value = stack.pop()
+                    receiver = stack.pop()
+                    if not isinstance(receiver, list):
+                        raise _fault('Internal error: VectorAppend on a non-vector.')
+                    receiver.append(value)
+                elif op is VECTOR_EXTEND:
+                    source = stack.pop()
+                    if not isinstance(source, list):
+                        raise _fault(f'Can only spread a vector, got {_type_name(source)}.')
+                    stack[-1].extend(source)
+                else:
+                    raise _fault(f'Unknown opcode {op}.')
+        except IqaloxRuntimeError as error:
+            if error.token is None:
+                line = closure.proto.chunk.lines[ip - 1]
+                error.token = Token(TokenType.EOF, '', None, line, None)
+            raise
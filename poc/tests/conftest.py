@@ -10,10 +10,34 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
 sys.modules.pop('token', None)
 
 from scanner import Scanner
-from parser import Parser
+from pratt_parser import PrattParser
+from resolver import Resolver
+from optimizer import Optimizer
 from interpreter import Interpreter
+from closure_compiler import ClosureInterpreter
+from python_compiler import PythonInterpreter
+from stack_interpreter import StackInterpreter
 from statement import Stmt
 
+ENGINES = {
+    'tree': Interpreter,
+    'closure': ClosureInterpreter,
+    'python': PythonInterpreter,
+    'stack': StackInterpreter,
+}
+# Which engine run() builds its Interpreter with -- `pytest --engine=closure`
+# (or `--engine=python`) reruns the whole suite against that engine.
+engine = 'tree'
+
+
+def pytest_addoption(parser) -> None:
+    parser.addoption('--engine', choices=sorted(ENGINES), default='tree', help='Interpreter engine run() uses.')
+
+
+def pytest_configure(config) -> None:
+    global engine
+    engine = config.getoption('--engine')
+
 
 def parse(source: str) -> List[Stmt]:
     # Every statement needs an explicit terminator (a real ';' or an
@@ -22,12 +46,16 @@ def parse(source: str) -> List[Stmt]:
     if not source.endswith('\n'):
         source += '\n'
     tokens = Scanner(source).scan_tokens()
-    return Parser(tokens).parse()
+    statements = PrattParser(tokens).parse()
+    Resolver().resolve(statements)
+    return statements
 
 
 def run(source: str, interpreter: Interpreter = None) -> Interpreter:
-    interpreter = interpreter or Interpreter()
-    for stmt in parse(source):
+    interpreter = interpreter or ENGINES[engine]()
+    statements = parse(source)
+    Optimizer().optimize(statements)
+    for stmt in statements:
         interpreter.execute(stmt)
     return interpreter
 
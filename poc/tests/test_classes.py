@@ -2,7 +2,9 @@ import pytest
 
 from conftest import run, get_var
 
+from callable import IqaloxClass, IqaloxInstance, PropertyCache
 from error import IqaloxRuntimeError
+from token import Token, TokenType
 
 
 def test_instance_construction_and_field_access(capsys):
@@ -99,6 +101,77 @@ def test_self_refers_to_the_actual_instance_across_inheritance(capsys):
     assert capsys.readouterr().out == "Bea\n"
 
 
+def test_a_call_site_dispatches_on_each_instances_class(capsys):
+    # One `s.name()` site seeing more classes than its inline cache keeps.
+    run(
+        "class A { name() { return \"a\"; } }\n"
+        "class B extends A { }\n"
+        "class C extends B { name() { return \"c\"; } }\n"
+        "class D extends C { }\n"
+        "class E { name() { return \"e\"; } }\n"
+        "class F extends E { name() { return concat [\"f\", super.name()]; } }\n"
+        "fun show(s) { print s.name(); }\n"
+        "show A(); show B(); show C(); show D(); show E(); show F(); show A(); show F()\n"
+    )
+    assert capsys.readouterr().out.splitlines() == ["a", "a", "c", "c", "e", "fe", "a", "fe"]
+
+
+def test_a_field_shadows_a_method_at_an_already_cached_site(capsys):
+    run(
+        "class Duck { speak() { return \"quack\"; } }\n"
+        "fun shout() { return \"QUACK\"; }\n"
+        "fun talk(d) { print d.speak(); }\n"
+        "var duck = Duck()\n"
+        "talk duck\n"
+        "duck.speak = shout\n"
+        "talk duck\n"
+    )
+    assert capsys.readouterr().out.splitlines() == ["quack", "QUACK"]
+
+
+def test_method_calls_enforce_arity():
+    with pytest.raises(IqaloxRuntimeError):
+        run("class Math { square(n) { return n * n; } }\nMath().square 1, 2\n")
+
+
+def test_calling_an_undefined_method_raises():
+    with pytest.raises(IqaloxRuntimeError):
+        run("class Duck { }\nDuck().fly()\n")
+
+
+def test_method_tables_are_flattened():
+    base = IqaloxClass('Base', None, {'a': 'base a', 'b': 'base b'})
+    derived = IqaloxClass('Derived', base, {'b': 'derived b'})
+    assert derived.method_table == {'a': 'base a', 'b': 'derived b'}
+
+
+def test_instances_adding_fields_in_the_same_order_share_a_shape():
+    klass = IqaloxClass('Point', None, {})
+    first, second, other = IqaloxInstance(klass), IqaloxInstance(klass), IqaloxInstance(klass)
+    for instance, names in ((first, 'xy'), (second, 'xy'), (other, 'yx')):
+        for value, name in enumerate(names):
+            instance.set(Token(TokenType.IDENTIFIER, name, None, 1, 0), float(value))
+    assert first.shape is second.shape
+    assert first.shape is not other.shape
+    assert first.shape.slots == {'x': 0, 'y': 1}
+    assert (first.values, other.values) == ([0.0, 1.0], [0.0, 1.0])
+
+
+def test_property_caches_key_on_shape():
+    base = IqaloxClass('Base', None, {'b': 'base b'})
+    derived = IqaloxClass('Derived', base, {})
+    field_shape = derived.root_shape.find_store('b')[1]
+
+    cache = PropertyCache()
+    assert cache.lookup(derived.root_shape, 'b') == (None, 'base b')
+    assert cache.lookup(field_shape, 'b') == (0, None)
+    assert (cache.shape, cache.others) == (derived.root_shape, {field_shape: (0, None)})
+    others = [IqaloxClass(str(n), None, {}).root_shape for n in range(PropertyCache.POLYMORPHIC_LIMIT + 1)]
+    for shape in others:
+        assert cache.lookup(shape, 'b') == (None, None)
+    assert len(cache.others) == PropertyCache.POLYMORPHIC_LIMIT
+
+
 def test_construction_enforces_init_arity():
     with pytest.raises(IqaloxRuntimeError):
         run("class Point { init(x, y) { self.x = x; self.y = y; } }\nPoint 1\n")
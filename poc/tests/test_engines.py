@@ -0,0 +1,138 @@
+import subprocess
+import sys
+import tracemalloc
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+import iqalox
+from conftest import run, get_var
+from closure_compiler import ClosureInterpreter, CompiledFunction
+from interpreter import Interpreter
+from scanner import stream_tokens
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+IQALOX = ROOT / 'poc' / 'src' / 'iqalox.py'
+EXAMPLES = sorted((ROOT / 'langspec').glob('versions/0.1/examples/*.iqx')) + sorted(
+    (ROOT / 'langspec' / 'examples').glob('*.iqx')
+)
+
+
+def run_script(path: Path, *options: str) -> subprocess.CompletedProcess:
+    # Without the parse cache, which would write an __iqcache__/ next to
+    # each example (test_parse_cache.py covers it, in tmp_path).
+    return subprocess.run(
+        [sys.executable, str(IQALOX), '--no-cache', *options, str(path)], capture_output=True, text=True, timeout=60
+    )
+
+
+@pytest.mark.parametrize('engine', ['closure', 'python', 'stack'])
+@pytest.mark.parametrize('path', EXAMPLES, ids=lambda path: str(path.relative_to(ROOT)))
+def test_engine_matches_tree_walker_byte_for_byte(path, engine):
+    # Includes the 0.2-only examples the PoC can't run -- the parse/runtime
+    # errors (and exit codes) they produce must match exactly too.
+    tree = run_script(path, '--engine=tree')
+    other = run_script(path, f'--engine={engine}')
+    assert (other.stdout, other.returncode) == (tree.stdout, tree.returncode)
+
+
+def test_closure_engine_runs_closures_and_classes(capsys):
+    run(
+        "class Counter {\n"
+        "    init() { self.count = 0; }\n"
+        "    bump() { self.count = self.count + 1; return self.count; }\n"
+        "}\n"
+        "fun twice(f) { f(); return f(); }\n"
+        "var counter = Counter()\n"
+        "print twice counter.bump\n",
+        ClosureInterpreter(),
+    )
+    assert capsys.readouterr().out == "2\n"
+
+
+@pytest.mark.parametrize('path', EXAMPLES, ids=lambda path: str(path.relative_to(ROOT)))
+def test_tiering_everything_at_once_matches_the_cold_tier(path):
+    cold = run_script(path, '--tier-threshold=0')
+    hot = run_script(path, '--tier-threshold=1')
+    assert (hot.stdout, hot.returncode) == (cold.stdout, cold.returncode)
+
+
+def test_hot_functions_and_loops_move_to_compiled_code_mid_run():
+    interpreter = Interpreter()
+    interpreter.tiering.threshold = 5
+    promoted = []
+    interpreter.tiering.on_promote = lambda node, count: promoted.append((type(node).__name__, count))
+    run(
+        "fun fib(n) { return (n < 2) ? n : fib(n - 1) + fib(n - 2); }\n"
+        "var f = fib 10\n"
+        "var total mut = 0\n"
+        "for (var i mut = 0; ; i = i + 1) {\n"
+        "    (i == 8) ? break : nil\n"
+        "    (i % 2 == 0) ? continue : nil\n"
+        "    total = total + i\n"
+        "}\n"
+        "var sum mut = 0\n"
+        "for (var j mut = 0; j < 10; ++j) { sum = sum + j; }\n",
+        interpreter
+    )
+    assert get_var(interpreter, "f") == 55.0
+    assert get_var(interpreter, "total") == 16.0
+    assert get_var(interpreter, "sum") == 45.0
+    assert promoted == [('Function', 5), ('For', 5), ('For', 5)]
+    assert type(get_var(interpreter, "fib")) is CompiledFunction
+
+
+def test_unknown_engine_prints_usage():
+    result = subprocess.run(
+        [sys.executable, str(IQALOX), '--engine=jit'], capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 64
+    assert result.stdout.startswith('Usage: iqalox')
+
+
+@pytest.mark.parametrize('engine', ['tree', 'closure', 'python', 'stack', 'vm'])
+def test_streaming_runs_each_declaration_as_it_is_parsed(tmp_path, engine):
+    script = tmp_path / 'script.iqx'
+    script.write_text(
+        "fun square(n) { return n * n; }\n"
+        "var total mut = 0\n"
+        "for (var i mut = 0; i < 4; ++i) { total = total + square i; }\n"
+        "print total\n"
+        "print square 5\n"
+    )
+    assert run_script(script, f'--engine={engine}', '--stream').stdout == "14\n25\n"
+
+
+def test_streaming_has_run_what_comes_before_a_parse_error(tmp_path):
+    script = tmp_path / 'script.iqx'
+    script.write_text("print 1\nprint 2\nvar = 3\nprint 4\n")
+    result = run_script(script, '--stream')
+    assert result.stdout.startswith("1\n2\n[line 3] Error at '=': Expect variable name.")
+    assert "4" not in result.stdout
+    assert result.returncode == 65
+
+
+def test_streaming_memory_does_not_grow_with_the_script(tmp_path, monkeypatch):
+    # Each declaration's tree can go once it's run: the most memory a
+    # script four times as long takes at once is nowhere near four times
+    # as much. (Small pieces, so even these scripts are streamed in many.)
+    monkeypatch.setattr(iqalox, 'stream_tokens', partial(stream_tokens, chunk_size=4096))
+    monkeypatch.setattr(iqalox.Iqalox, 'had_error', False)
+    monkeypatch.setattr(iqalox.Iqalox, 'had_runtime_error', False)
+    monkeypatch.setattr(iqalox.Iqalox, 'source', '')
+    monkeypatch.setattr(iqalox.Iqalox, 'source_path', None)
+
+    def peak(declarations: int) -> int:
+        script = tmp_path / f'script{declarations}.iqx'
+        terms = ' + '.join(f'a * {term}' for term in range(150))
+        script.write_text("var a mut = 1\n" + ''.join(f"var v{n} = {terms}\n" for n in range(declarations)))
+        monkeypatch.setattr(iqalox.Iqalox, 'interpreter', Interpreter())
+        tracemalloc.start()
+        try:
+            iqalox.Iqalox().run_stream(str(script))
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak(80) < 2 * peak(20)
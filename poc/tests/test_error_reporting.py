@@ -9,7 +9,7 @@ def setup_function():
     # next test's environment/assertions.
     iqalox.Iqalox.had_error = False
     iqalox.Iqalox.had_runtime_error = False
-    iqalox.Iqalox.source_lines = []
+    iqalox.Iqalox.source = ''
     iqalox.Iqalox.interpreter = iqalox.Interpreter()
 
 
@@ -36,3 +36,13 @@ def test_no_error_produces_no_source_context(capsys):
     out = capsys.readouterr().out
     assert out == ""
     assert iqalox.Iqalox.had_error is False
+
+
+def test_source_context_comes_from_an_encoded_source(capsys):
+    iqalox.Iqalox().run("var s = 'é'\r\nprint s, € x\n".encode())
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[:3] == [
+        "[line 2] Error at '€': Unexpected character: €",
+        "    print s, € x",
+        "             ^",
+    ]
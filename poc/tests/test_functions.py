@@ -1,8 +1,14 @@
+import time
+
 import pytest
 
+import conftest
 from conftest import run, get_var
 
 from error import IqaloxRuntimeError
+from memoization import MEMO_VECTOR_LENGTH, memo_key
+import parallel
+from vectors import Matrix
 
 
 def test_function_call_returns_value():
@@ -29,6 +35,42 @@ def test_recursion():
     assert get_var(interpreter, "result") == 120.0
 
 
+@pytest.mark.parametrize("engine", ["tree", "closure", "stack"])
+def test_tail_calls_run_in_constant_stack(engine):
+    interpreter = run(
+        "fun count(n, total) { return (n == 0) ? total : count (n - 1), (total + 1); }\n"
+        "var result = count 100000, 0\n",
+        conftest.ENGINES[engine](),
+    )
+    assert get_var(interpreter, "result") == 100000.0
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "stack"])
+def test_a_method_can_tail_call_itself(engine):
+    interpreter = run(
+        "class Countdown { from(n) { return (n == 0) ? \"done\" : self.from (n - 1); } }\n"
+        "var result = Countdown().from 5000\n",
+        conftest.ENGINES[engine](),
+    )
+    assert get_var(interpreter, "result") == "done"
+
+
+@pytest.mark.parametrize('engine', sorted(conftest.ENGINES))
+def test_unbounded_recursion_is_a_stack_overflow_error_at_the_call(engine):
+    with pytest.raises(IqaloxRuntimeError, match="Stack overflow.") as error:
+        run("var x = 1\nfun deep(n) { return 1 + deep (n + 1); }\ndeep 0\n", conftest.ENGINES[engine]())
+    assert (error.value.token.lexeme, error.value.token.line) == ('deep', 2)
+
+
+def test_the_stack_engine_recurses_past_pythons_stack():
+    interpreter = run(
+        "fun length(n) { return (n == 0) ? 0 : 1 + length (n - 1); }\n"
+        "var result = length 100000\n",
+        conftest.ENGINES["stack"](),
+    )
+    assert get_var(interpreter, "result") == 100000.0
+
+
 def test_closures_capture_enclosing_scope():
     interpreter = run(
         "fun makeAdder(n) {\n"
@@ -112,3 +154,196 @@ def test_print_can_be_shadowed_in_a_nested_scope():
 def test_parameters_are_immutable_by_default():
     with pytest.raises(IqaloxRuntimeError):
         run("fun f(a) { a = 2; }\nf 1\n")
+
+
+# The python engine runs Iqalox calls as Python calls, which aren't.
+@pytest.mark.parametrize('engine', ['tree', 'closure', 'stack'])
+def test_pure_function_calls_are_memoized(engine):
+    interpreter = run(
+        "fun fib(n) { return n < 2 ? n : fib(n - 1) + fib(n - 2); }\n"
+        "var result = fib 30\n",
+        conftest.ENGINES[engine]()
+    )
+    assert get_var(interpreter, "result") == 832040.0
+    assert (interpreter.memoization.hits, interpreter.memoization.misses) == (28, 31)
+
+
+def test_memoization_can_be_turned_off():
+    interpreter = conftest.ENGINES[conftest.engine]()
+    interpreter.memoization.enabled = False
+    run(
+        "fun fib(n) { return n < 2 ? n : fib(n - 1) + fib(n - 2); }\n"
+        "var result = fib 10\n",
+        interpreter
+    )
+    assert get_var(interpreter, "result") == 55.0
+    assert (interpreter.memoization.hits, interpreter.memoization.misses) == (0, 0)
+
+
+def test_memo_keys_tell_apart_arguments_that_compare_equal():
+    assert memo_key([1.0]) != memo_key([True])
+    assert memo_key([0.0]) != memo_key([-0.0])
+    assert memo_key([[1.0, "a"]]) == memo_key([[1.0, "a"]])
+    assert memo_key([print]) is None
+    # Nor, for a call, is one made of a long vector, every element of which
+    # it would copy.
+    assert memo_key([[0.0] * MEMO_VECTOR_LENGTH], MEMO_VECTOR_LENGTH) is not None
+    assert memo_key([[0.0] * (MEMO_VECTOR_LENGTH + 1)], MEMO_VECTOR_LENGTH) is None
+
+
+def test_map_filter_reduce_and_sort_natives():
+    interpreter = run(
+        "fun double(x) { return x * 2; }\n"
+        "fun odd(x) { return x % 2 == 1; }\n"
+        "fun add(a, b) { return a + b; }\n"
+        "fun after(a, b) { return a > b; }\n"
+        "var v = [3, 1, 4, 1, 5]\n"
+        "var doubled = map double, v\n"
+        "var odds = filter odd, v\n"
+        "var total = reduce add, v, 0\n"
+        "var sorted = sort after, v\n"
+    )
+    assert get_var(interpreter, "doubled") == [6.0, 2.0, 8.0, 2.0, 10.0]
+    assert get_var(interpreter, "odds") == [3.0, 1.0, 1.0, 5.0]
+    assert get_var(interpreter, "total") == 14.0
+    assert get_var(interpreter, "sorted") == [5.0, 4.0, 3.0, 1.0, 1.0]
+    assert get_var(interpreter, "v") == [3.0, 1.0, 4.0, 1.0, 5.0]
+
+
+def test_map_rejects_a_callback_of_the_wrong_arity():
+    with pytest.raises(IqaloxRuntimeError, match="Function passed to 'map' must take 1 argument"):
+        run("fun add(a, b) { return a + b; }\nvar result = map add, [1]\n")
+
+
+def test_map_and_filter_share_big_vectors_out_to_worker_processes(capsys):
+    interpreter = conftest.ENGINES[conftest.engine]()
+    interpreter.parallel.workers = 2
+    interpreter.parallel.threshold = 4
+    run(
+        "var offset = 10\n"
+        "fun shift(x) { return x + offset; }\n"
+        "fun big(x) { return shift(x) > 13; }\n"
+        "fun loud(x) { print x; return x; }\n"
+        "var v = [1, 2, 3, 4, 5, 6]\n"
+        "var shifted = map shift, v\n"
+        "var bigs = filter big, v\n"
+        "var few = map shift, [1, 2]\n"
+        "var echoed = map loud, v\n",
+        interpreter
+    )
+    assert get_var(interpreter, "shifted") == [11.0, 12.0, 13.0, 14.0, 15.0, 16.0]
+    assert get_var(interpreter, "bigs") == [4.0, 5.0, 6.0]
+    assert capsys.readouterr().out == "1\n2\n3\n4\n5\n6\n"
+    # Only the pure callbacks' big vectors went to the workers.
+    assert interpreter.parallel.runs == 2
+
+
+def test_an_error_in_a_worker_is_reported_as_if_run_inline():
+    interpreter = conftest.ENGINES[conftest.engine]()
+    interpreter.parallel.workers = 2
+    interpreter.parallel.threshold = 1
+    with pytest.raises(IqaloxRuntimeError, match="Operands must be numbers.") as error:
+        run('fun half(x) { return x / 2; }\nvar result = map half, [4, "two", 8]\n', interpreter)
+    assert error.value.token.line == 1
+    assert interpreter.parallel.runs == 0
+
+
+def test_a_failed_chunk_cancels_the_rest_of_its_call(monkeypatch):
+    monkeypatch.setattr(parallel, 'CHUNKS_PER_WORKER', 100)
+    interpreter = conftest.ENGINES[conftest.engine]()
+    interpreter.parallel.workers = 2
+    interpreter.parallel.threshold = 1
+    executor = interpreter.parallel.start()
+    submitted = []
+    submit = executor.submit
+
+    def counted_submit(*arguments):
+        submitted.append(submit(*arguments))
+        return submitted[-1]
+    monkeypatch.setattr(executor, 'submit', counted_submit)
+    run(
+        "fun slow(x) {\n"
+        "  var half = x / 2\n"
+        "  var total mut = 0\n"
+        "  for (var i mut = 0; i < 10000; ++i) { total = total + 1; }\n"
+        "  return half + total\n"
+        "}\n"
+        "fun double(x) { return x * 2; }\n",
+        interpreter
+    )
+    numbers = ', '.join(str(number) for number in range(400))
+    with pytest.raises(IqaloxRuntimeError, match="Operands must be numbers."):
+        run(f'var halves = map slow, ["two", {numbers}]\n', interpreter)
+    # Only the chunks already handed to the workers are left to run.
+    assert sum(future.cancelled() for future in submitted) > len(submitted) // 2
+    start = time.perf_counter()
+    run("var doubled = map double, [1, 2, 3, 4]\n", interpreter)
+    assert time.perf_counter() - start < 3
+    assert get_var(interpreter, "doubled") == [2.0, 4.0, 6.0, 8.0]
+    assert interpreter.parallel.runs == 1
+
+
+def test_a_callback_that_cant_be_sent_runs_here_and_is_not_packaged_again(monkeypatch):
+    interpreter = conftest.ENGINES[conftest.engine]()
+    interpreter.parallel.workers = 2
+    interpreter.parallel.threshold = 1
+    packaged = []
+    package = interpreter.parallel.package
+
+    def counted_package(callback):
+        packaged.append(callback)
+        return package(callback)
+    monkeypatch.setattr(interpreter.parallel, 'package', counted_package)
+    run(
+        "class Marker {}\n"
+        "var marker = Marker()\n"
+        "fun same(x) { return x == marker; }\n"
+        "var first = map same, [1, 2]\n"
+        "var second = filter same, [marker, 3]\n",
+        interpreter
+    )
+    assert get_var(interpreter, "first") == [False, False]
+    assert len(get_var(interpreter, "second")) == 1
+    assert interpreter.parallel.runs == 0
+    assert len(packaged) == 1 and list(interpreter.parallel.packages.values()) == [None]
+
+
+def test_matrix_natives():
+    interpreter = run(
+        "var a = [[1, 2], [3, 4]]\n"
+        "var b = [[5, 6], [7, 8]]\n"
+        "var t = transpose a\n"
+        "var product = matmul a, b\n"
+        "var d = det a\n"
+        "var x = solve [[2, 0], [0, 4]], [2, 2]\n"
+        "var back = matmul (inverse [[2, 0], [0, 4]]), [[2], [4]]\n"
+        "var row = transpose [[1, 2, 3]]\n"
+    )
+    assert get_var(interpreter, "t") == [[1.0, 3.0], [2.0, 4.0]]
+    assert get_var(interpreter, "product") == [[19.0, 22.0], [43.0, 50.0]]
+    assert get_var(interpreter, "d") == pytest.approx(-2.0)
+    assert get_var(interpreter, "x") == [1.0, 0.5]
+    assert get_var(interpreter, "back") == [[1.0], [1.0]]
+    assert get_var(interpreter, "row") == [[1.0], [2.0], [3.0]]
+
+
+def test_matrix_results_keep_their_packed_buffer():
+    interpreter = run("var a = [[1, 2], [3, 4]]\nvar t = transpose a\nvar tt = transpose t\n")
+    t = get_var(interpreter, "t")
+    assert type(t) is Matrix
+    assert get_var(interpreter, "tt") == get_var(interpreter, "a")
+    # A matrix still prints as the vector of its rows.
+    assert interpreter.stringify(t) == "[[1.0, 3.0], [2.0, 4.0]]"
+
+
+def test_matrix_natives_report_bad_shapes():
+    with pytest.raises(IqaloxRuntimeError, match="Argument to 'det' must be a matrix"):
+        run("var x = det [1, 2]\n")
+    with pytest.raises(IqaloxRuntimeError, match="Second argument to 'matmul' must be a matrix"):
+        run("var x = matmul [[1]], [[1, 2], [3]]\n")
+    with pytest.raises(IqaloxRuntimeError, match="Can't multiply a 1x2 matrix by a 1x2 one."):
+        run("var x = matmul [[1, 2]], [[1, 2]]\n")
+    with pytest.raises(IqaloxRuntimeError, match="Matrix passed to 'inverse' must be square, got 1x2."):
+        run("var x = inverse [[1, 2]]\n")
+    with pytest.raises(IqaloxRuntimeError, match="Matrix is singular."):
+        run("var x = solve [[1, 2], [2, 4]], [1, 1]\n")
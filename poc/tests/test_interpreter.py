@@ -1,9 +1,11 @@
 import pytest
 
+import conftest
 from conftest import parse, run, get_var
 
 from error import IqaloxRuntimeError
 from interpreter import Interpreter
+from vectors import EMPTY_VECTOR, NumericVector, numpy, persistent
 
 
 def test_for_loop_runs_body_and_increments(capsys):
@@ -42,6 +44,62 @@ def test_break_stops_the_loop_immediately():
     assert get_var(interpreter, "total") == 0.0 + 1.0 + 2.0
 
 
+def test_break_only_leaves_the_innermost_loop():
+    interpreter = run(
+        "var total mut = 0\n"
+        "for (var i mut = 0; i < 3; ++i) {\n"
+        "    for (var j mut = 0; ; ++j) { { (j == i) ? break : nil; } total = total + 1; }\n"
+        "}\n"
+    )
+    assert get_var(interpreter, "total") == 0.0 + 1.0 + 2.0
+
+
+def test_return_from_inside_nested_loops():
+    interpreter = run(
+        "fun find(target) {\n"
+        "    for (var i mut = 0; ; ++i) {\n"
+        "        for (var j mut = 0; j < 10; ++j) { (i * 10 + j == target) ? nil : continue; return i; }\n"
+        "    }\n"
+        "}\n"
+        "var result = find 42\n"
+    )
+    assert get_var(interpreter, "result") == 4.0
+
+
+def test_break_in_a_called_function_breaks_the_callers_loop():
+    interpreter = run(
+        "fun stop(n) { (n == 2) ? break : nil; }\n"
+        "var total mut = 0\n"
+        "for (var i mut = 0; i < 5; ++i) { stop i; total = total + 1; }\n"
+    )
+    assert get_var(interpreter, "total") == 2.0
+
+
+def test_break_used_as_an_operand_still_breaks(capsys):
+    interpreter = run(
+        "var i mut = 0\n"
+        "for (;; ++i) { print ((i == 2) ? break : i); }\n"
+    )
+    assert get_var(interpreter, "i") == 2.0
+    assert capsys.readouterr().out.splitlines() == ["0", "1"]
+
+
+@pytest.mark.parametrize("source, message", [
+    ("break\n", "'break' used outside of a loop."),
+    ("{ continue; }\n", "'continue' used outside of a loop."),
+    ("fun f() { break; }\nf()\n", "'break' used outside of a loop."),
+    ("return 1\n", "'return' used outside of a function."),
+])
+def test_stray_control_flow_is_a_runtime_error(capsys, source, message):
+    conftest.ENGINES[conftest.engine]().interpret(parse(source))
+    assert capsys.readouterr().out == f"Runtime error: {message}\n"
+
+
+def test_a_stray_return_still_makes_its_tail_call(capsys):
+    conftest.ENGINES[conftest.engine]().interpret(parse("fun f() { print 1; }\nreturn f()\n"))
+    assert capsys.readouterr().out == "1\nRuntime error: 'return' used outside of a function.\n"
+
+
 def test_prefix_increment_mutates_and_returns_new_value(capsys):
     # `++x` isn't a primary, so it needs grouping parens as a call argument.
     run("var x mut = 1\nprint (++x)\nprint x")
@@ -86,3 +144,102 @@ def test_false_and_nil_are_falsy(capsys):
 def test_blank_lines_do_not_abort_interpretation(capsys):
     run("print 1\n\n\nprint 2")
     assert capsys.readouterr().out.splitlines() == ["1", "2"]
+
+
+def test_numeric_vectors_look_like_list_vectors(capsys):
+    interpreter = run(
+        'var numbers = [1, 2.5]\n'
+        'var mixed = [1, "a"]\n'
+        'print numbers\n'
+        'print [numbers, []]\n'
+        'var equal = numbers == [1, 2.5]\n'
+    )
+    assert isinstance(get_var(interpreter, "numbers"), NumericVector)
+    assert get_var(interpreter, "mixed") == [1.0, "a"]
+    assert capsys.readouterr().out.splitlines() == ["[1.0, 2.5]", "[[1.0, 2.5], []]"]
+    assert get_var(interpreter, "equal") is True
+
+
+def test_cons_and_spread_build_vectors_sharing_their_parts():
+    interpreter = run(
+        'var xs = [2, 3]\n'
+        'var ys = [1 | xs]\n'
+        'var zs = [...ys, "four", ...[]]\n'
+        'fun down(n) { return (n == 0) ? [] : [n | down(n - 1)]; }\n'
+        'var d = down 40\n'
+        'var joined = concat [0 | down 3]\n'
+        'var doubled = [...xs] * 2\n'
+    )
+    assert get_var(interpreter, "xs") == [2.0, 3.0]
+    assert get_var(interpreter, "ys") == [1.0, 2.0, 3.0]
+    assert get_var(interpreter, "zs") == [1.0, 2.0, 3.0, "four"]
+    assert list(get_var(interpreter, "d")) == [float(n) for n in range(40, 0, -1)]
+    assert get_var(interpreter, "joined") == "0321"
+    assert get_var(interpreter, "doubled") == [4.0, 6.0]
+    with pytest.raises(IqaloxRuntimeError, match="Can only spread a vector, got number."):
+        run("var bad = [1 | 2]\n")
+
+
+def test_persistent_vector_operations_match_list_ones():
+    values = [float(n) for n in range(100)]
+    vector = persistent(values)
+    assert list(vector.prepend(-1.0)) == [-1.0] + values
+    assert list(vector.append(100.0)) == values + [100.0]
+    assert list(vector.concat(vector)) == values + values
+    assert list(vector.slice(10, 75)) == values[10:75]
+    assert [vector[index] for index in (0, 31, 32, 99)] == [0.0, 31.0, 32.0, 99.0]
+    grown = EMPTY_VECTOR
+    for value in values:
+        grown = grown.append(value)
+    assert grown == vector and list(vector) == values
+
+
+def test_indexing_and_inclusive_slices(capsys):
+    interpreter = run(
+        'var v = [10, 20, 30, 40, 50]\n'
+        'var last = v[-1]\n'
+        'print (v[1:3])\n'
+        'print (v[:1])\n'
+        'print (v[3:])\n'
+        'print (v[-2:-1])\n'
+        'print (v[0:100])\n'
+        'print (v[3:1])\n'
+        'var mixed = [1, "a", [2]]\n'
+        'var inner = mixed[-1][0]\n'
+        'var tail = [0 | v][4:]\n'
+    )
+    assert get_var(interpreter, "last") == 50.0
+    assert capsys.readouterr().out.splitlines() == [
+        "[20.0, 30.0, 40.0]", "[10.0, 20.0]", "[40.0, 50.0]", "[40.0, 50.0]",
+        "[10.0, 20.0, 30.0, 40.0, 50.0]", "[]",
+    ]
+    assert get_var(interpreter, "inner") == 2.0
+    assert get_var(interpreter, "tail") == [40.0, 50.0]
+
+
+@pytest.mark.parametrize("source, message", [
+    ("[1, 2][2]", "Vector index 2 out of range for vector of length 2."),
+    ("[1, 2][-3]", "Vector index -3 out of range for vector of length 2."),
+    ("[1, 2][0.5]", "Vector index must be an integer, got 0.5."),
+    ("[1, 2][\"a\"]", "Vector index must be a number, got string."),
+    ("nil[0]", "Only vectors can be indexed, got nil."),
+    ("[1, 2][:true]", "Slice stop bound must be a number, got bool."),
+    ("1[:]", "Only vectors can be sliced, got number."),
+])
+def test_bad_indexes_and_slices_are_runtime_errors(source, message):
+    with pytest.raises(IqaloxRuntimeError, match=message.replace(".", r"\.")):
+        run(f"var bad = {source}\n")
+
+
+def test_numeric_slices_are_views_of_their_vector():
+    interpreter = run(
+        'var v = [1, 2, 3, 4, 5, 6]\nvar middle = v[1:4]\nvar inner = middle[1:-2]\nvar doubled = inner * 2\n'
+    )
+    vector, middle, inner = (get_var(interpreter, name) for name in ("v", "middle", "inner"))
+    assert middle == [2.0, 3.0, 4.0, 5.0] and inner == [3.0, 4.0]
+    assert get_var(interpreter, "doubled") == [6.0, 8.0]
+    # Each slice's buffer is `v`'s own memory, not a copy of it.
+    if numpy is None:
+        assert inner.data.obj is vector.data
+    else:
+        assert numpy.shares_memory(inner.data, vector.data)
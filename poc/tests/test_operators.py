@@ -3,6 +3,7 @@ import pytest
 from conftest import run, get_var
 
 from error import IqaloxRuntimeError
+from interpreter import Interpreter
 
 
 def test_modulo():
@@ -100,3 +101,86 @@ def test_arithmetic_on_non_numbers_raises():
 def test_unary_minus_on_non_number_raises():
     with pytest.raises(IqaloxRuntimeError):
         run('var result = -"a"\n')
+
+
+def test_arithmetic_specializes_on_floats_and_deoptimizes_on_a_miss():
+    # Always the tree-walker, the only engine that rewrites its nodes, and
+    # never moving on to compiled code.
+    interpreter = Interpreter()
+    interpreter.tiering.threshold = 0
+    run(
+        "fun add(a, b) { return a + b; }\n"
+        "var total mut = 0\n"
+        "for (var i mut = 0; i < 3; ++i) { total = add total, i; }\n"
+        "var flag = add true, 1\n"
+        "fun fib(n) { return (n < 2) ? n : fib(n - 1) + fib(n - 2); }\n"
+        "var f = fib 10\n",
+        interpreter
+    )
+    assert get_var(interpreter, "total") == 3.0
+    assert get_var(interpreter, "flag") == 2.0
+    assert get_var(interpreter, "f") == 55.0
+    # `a + b` (which then deoptimizes on `true`) and fib()'s four, each
+    # once however deep the recursion -- but not the counted loop's
+    # condition, which never runs.
+    stats = interpreter.specializations
+    assert (stats.specialized, stats.deoptimized) == (5, 1)
+
+
+def test_equality_takes_any_values_so_never_specializes():
+    interpreter = Interpreter()
+    interpreter.tiering.threshold = 0
+    run(
+        "fun same(a, b) { return a == b or a != b; }\n"
+        "var numbers = same 1, 1\n"
+        'var strings = same "a", "b"\n'
+        "var mixed = same nil, 2\n",
+        interpreter
+    )
+    assert [get_var(interpreter, name) for name in ("numbers", "strings", "mixed")] == [True, True, True]
+    stats = interpreter.specializations
+    assert (stats.specialized, stats.deoptimized) == (0, 0)
+
+def test_a_specialized_node_reports_the_same_errors():
+    interpreter = Interpreter()
+    interpreter.tiering.threshold = 0
+    run("fun divide(a, b) { return a / b; }\nvar half = divide 1, 2\n", interpreter)
+    with pytest.raises(IqaloxRuntimeError, match='Division by zero.'):
+        run("var x = divide 1, 0\n", interpreter)
+    with pytest.raises(IqaloxRuntimeError, match='Operands must be numbers.') as error:
+        run('var y = divide "a", 2\n', interpreter)
+    assert (error.value.token.line, error.value.token.column) == (1, 29)
+    assert interpreter.specializations.deoptimized == 1
+
+
+def test_arithmetic_on_numeric_vectors_is_element_wise(capsys):
+    interpreter = run(
+        "var a = [1, 2, 3]\n"
+        "var b = [4, 5, 6]\n"
+        "print (a + b)\n"
+        "print (a * 2)\n"
+        "print (10 - a)\n"
+        "print (b / [2, 5, 3])\n"
+        "print (b % 4)\n"
+        "print (a ^ 2)\n"
+        "var same = (a + 0) == [1, 2, 3]\n"
+        "var joined = concat (a + a)\n"
+    )
+    assert capsys.readouterr().out.splitlines() == [
+        "[5.0, 7.0, 9.0]", "[2.0, 4.0, 6.0]", "[9.0, 8.0, 7.0]",
+        "[2.0, 1.0, 2.0]", "[0.0, 1.0, 2.0]", "[1.0, 4.0, 9.0]",
+    ]
+    assert get_var(interpreter, "same") is True
+    assert get_var(interpreter, "joined") == "246"
+
+
+def test_element_wise_arithmetic_errors():
+    with pytest.raises(IqaloxRuntimeError, match='Vectors must be the same length, got 2 and 3.'):
+        run("var x = [1, 2] + [1, 2, 3]\n")
+    with pytest.raises(IqaloxRuntimeError, match='Division by zero.'):
+        run("var x = [1, 2] % [1, 0]\n")
+    # A vector that isn't all numbers has no arithmetic, as before.
+    with pytest.raises(IqaloxRuntimeError, match='Operands must be numbers.'):
+        run('var x = [1, "a"] + 1\n')
+    with pytest.raises(IqaloxRuntimeError, match='Operands must be numbers.'):
+        run('var x = [1, 2] + "a"\n')
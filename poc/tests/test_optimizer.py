@@ -0,0 +1,159 @@
+import pytest
+
+from conftest import parse, run, get_var
+
+import iqalox
+from error import IqaloxRuntimeError
+from expression import Binary, Literal, Variable
+from optimizer import Optimizer
+from statement import Return, For, Function
+
+
+def setup_function():
+    iqalox.Iqalox.had_error = False
+
+
+def optimize(source: str):
+    statements = parse(source)
+    Optimizer().optimize(statements)
+    return statements
+
+
+def test_literal_operators_fold_to_one_literal():
+    statements = optimize(
+        "var a = 1 + 2 * 3 - 4\n"
+        "var b = (2 < 3) == !false\n"
+        "var c = nil ?? \"fallback\"\n"
+        "var d = (0 ? \"zero\" : \"never\")\n"
+        "var e = (nil ?: -2)\n"
+    )
+    assert [statement.initializer.value for statement in statements] == [3.0, True, 'fallback', 'zero', -2.0]
+
+
+def test_immutable_constants_propagate_into_later_reads():
+    function = optimize(
+        "var limit = 10\n"
+        "fun f(n) {\n"
+        "    var twice = limit * 2\n"
+        "    var total mut = 1\n"
+        "    return n < twice + total\n"
+        "}\n"
+    )[1]
+    comparison = function.body[-1].value
+    assert isinstance(comparison.left, Variable)
+    assert isinstance(comparison.right, Binary)
+    assert isinstance(comparison.right.left, Literal) and comparison.right.left.value == 20.0
+    assert isinstance(comparison.right.right, Variable)
+
+
+def test_a_shadowing_local_is_not_the_outer_constant():
+    interpreter = run(
+        "var x = 1\n"
+        "fun f(x) { return x + 1; }\n"
+        "var result = f 5\n"
+    )
+    assert get_var(interpreter, "result") == 6.0
+
+
+def test_a_local_declared_after_a_function_is_not_the_one_it_reads():
+    # The global x, to the resolver too (see Resolver.defer()), whenever
+    # read() is called -- so folding it in is right.
+    interpreter = run(
+        "var x = 1\n"
+        "fun outer() {\n"
+        "    fun read() { return x; }\n"
+        "    var before = read()\n"
+        "    var x = 2\n"
+        "    return before + read()\n"
+        "}\n"
+        "var result = outer()\n"
+    )
+    assert get_var(interpreter, "result") == 2.0
+
+
+def test_statements_after_break_continue_and_return_are_dropped():
+    statements = optimize(
+        "fun f() {\n"
+        "    for (var i mut = 0; i < 3; ++i) {\n"
+        "        (i == 1) ? continue : nil\n"
+        "        (true) ? break : nil\n"
+        "        print \"never\"\n"
+        "    }\n"
+        "    return 1\n"
+        "    print \"never\"\n"
+        "}\n"
+    )
+    body = statements[0].body
+    assert [type(statement) for statement in body] == [For, Return]
+    assert len(body[0].body.statements) == 2
+
+
+def test_folding_leaves_failing_operations_to_report_at_run_time():
+    statements = optimize("var zero = 0\nvar x = 1 / zero\nvar y = -\"text\"\n")
+    division = statements[1].initializer
+    assert isinstance(division, Binary) and division.operator.lexeme == '/'
+    with pytest.raises(IqaloxRuntimeError, match='Division by zero.') as error:
+        run("var zero = 0\nvar x = 1 / zero\n")
+    assert (error.value.token.line, error.value.token.column) == (2, 11)
+
+
+def test_counted_loops_are_marked_only_when_nothing_can_change_their_count():
+    counted, reading, assigning, mutable_bound = optimize(
+        "for (var i mut = 0; i < 10; ++i) { print \"tick\"; }\n"
+        "for (var i mut = 0; i <= 10; ++i) { print i; }\n"
+        "for (var i mut = 0; i < 10; ++i) { fun skip() { ++i; } }\n"
+        "{ var n mut = 10; for (var i mut = 0; i < n; ++i) { print i; } }\n"
+    )
+    assert counted.counted and not counted.counter_read
+    assert reading.counted and reading.counter_read
+    assert not assigning.counted
+    assert not mutable_bound.statements[1].counted
+
+
+def test_counted_loops_count_the_same_as_any_other():
+    interpreter = run(
+        "var limit = 4.5\n"
+        "var total mut = 0\n"
+        "var last mut = nil\n"
+        "for (var i mut = 1; i <= limit; ++i) {\n"
+        "    (i == 2) ? continue : nil\n"
+        "    total = total + i\n"
+        "    fun read() { return i; }\n"
+        "    last = read\n"
+        "}\n"
+        "var after = last()\n"
+    )
+    assert get_var(interpreter, "total") == 8.0
+    assert get_var(interpreter, "after") == 5.0
+
+
+def test_a_counted_loop_with_a_mutable_global_bound_checks_it_every_time():
+    interpreter = run(
+        "var limit mut = 10\n"
+        "var count mut = 0\n"
+        "for (var i mut = 0; i < limit; ++i) { limit = 3; count = count + 1; }\n"
+    )
+    assert get_var(interpreter, "count") == 3.0
+
+
+def test_only_functions_without_side_effects_are_marked_pure():
+    statements = optimize(
+        "var limit = 10\n"
+        "var count mut = 0\n"
+        "fun fib(n) { return n < 2 ? n : fib(n - 1) + fib(n - 2); }\n"
+        "fun even(n) { return n == 0 ? true : odd(n - 1); }\n"
+        "fun odd(n) { return n == 0 ? false : even(n - 1); }\n"
+        "fun label(n) { var parts = [n, limit]; return concat parts; }\n"
+        "fun loud(n) { print n; return n; }\n"
+        "fun counted(n) { count = count + 1; return fib n; }\n"
+        "fun reads(n) { return n + count; }\n"
+        "fun callsLoud(n) { return loud n; }\n"
+        "class Box { get() { return 1; } }\n"
+        "fun boxed() { return Box(); }\n"
+    )
+    purity = {statement.name.lexeme: statement.pure for statement in statements if type(statement) is Function}
+    assert purity == {
+        'fib': True, 'even': True, 'odd': True, 'label': True,
+        'loud': False, 'counted': False, 'reads': False, 'callsLoud': False, 'boxed': False,
+    }
+    assert not statements[10].methods[0].pure
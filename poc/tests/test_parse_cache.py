@@ -0,0 +1,103 @@
+import os
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+
+import parse_cache
+from parse_cache import ParseCache, CACHE_DIR
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+IQALOX = ROOT / 'poc' / 'src' / 'iqalox.py'
+
+SOURCE = "fun twice(n) { return n * 2; }\nprint twice 21\n"
+
+
+def run_script(path: Path, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, str(IQALOX), *options, str(path)], capture_output=True, text=True, timeout=60
+    )
+
+
+def write_script(tmp_path: Path, source: str = SOURCE, name: str = 'script.iqx') -> Path:
+    script = tmp_path / name
+    script.write_text(source)
+    return script
+
+
+def test_second_run_loads_the_cached_parse(tmp_path):
+    script = write_script(tmp_path)
+    first = run_script(script, '--cache-stats')
+    second = run_script(script, '--cache-stats')
+    assert first.stdout == second.stdout == "42\n"
+    assert first.stderr.startswith("parse cache: miss")
+    assert second.stderr.startswith("parse cache: hit")
+    assert "saved" in second.stderr
+    assert len(list((tmp_path / CACHE_DIR).glob('script.iqx.*.iqc'))) == 1
+
+
+def test_editing_the_script_replaces_its_entry(tmp_path):
+    script = write_script(tmp_path)
+    run_script(script)
+    script.write_text("print 1\n")
+    result = run_script(script, '--cache-stats')
+    assert result.stdout == "1\n"
+    assert result.stderr.startswith("parse cache: miss")
+    assert len(list((tmp_path / CACHE_DIR).glob('script.iqx.*.iqc'))) == 1
+
+
+def test_no_cache_neither_reads_nor_writes(tmp_path):
+    script = write_script(tmp_path)
+    result = run_script(script, '--no-cache')
+    assert result.stdout == "42\n"
+    assert not (tmp_path / CACHE_DIR).exists()
+
+
+def test_a_corrupt_entry_is_a_miss(tmp_path):
+    script = write_script(tmp_path)
+    cache = ParseCache(str(script), script.read_bytes())
+    cache.directory.mkdir()
+    cache.file.write_bytes(parse_cache.MAGIC + bytes([parse_cache.FORMAT_VERSION]) + b'garbage')
+    assert cache.load() is None
+    assert run_script(script).stdout == "42\n"
+
+
+class _Payload:
+    # Unpickles by calling exec(), to create `marker`.
+    def __init__(self, marker: Path) -> None:
+        self.marker = marker
+
+    def __reduce__(self):
+        return exec, (f'open({str(self.marker)!r}, "w").close()',)
+
+
+def test_an_entry_naming_any_other_global_is_a_miss(tmp_path):
+    script = write_script(tmp_path)
+    cache = ParseCache(str(script), script.read_bytes())
+    cache.directory.mkdir()
+    marker = tmp_path / 'ran'
+    payload = pickle.dumps([_Payload(marker)], pickle.HIGHEST_PROTOCOL)
+    cache.file.write_bytes(parse_cache._HEADER.pack(parse_cache.MAGIC, parse_cache.FORMAT_VERSION, 0.0) + payload)
+    assert cache.load() is None
+    assert not marker.exists()
+    result = run_script(script, '--cache-stats')
+    assert result.stdout == "42\n"
+    assert result.stderr.startswith("parse cache: miss")
+    assert not marker.exists()
+
+
+def test_parse_errors_are_not_cached(tmp_path):
+    script = write_script(tmp_path, "var x = @@@ 2\n")
+    assert run_script(script).returncode == 65
+    assert not list((tmp_path / CACHE_DIR).glob('*.iqc'))
+
+
+def test_eviction_drops_the_least_recently_used(tmp_path, monkeypatch):
+    old = write_script(tmp_path, name='old.iqx')
+    new = write_script(tmp_path, name='new.iqx')
+    ParseCache(str(old), old.read_bytes()).store([], 0.0)
+    entry = next((tmp_path / CACHE_DIR).glob('old.iqx.*.iqc'))
+    os.utime(entry, (0, 0))
+    monkeypatch.setattr(parse_cache, 'MAX_CACHE_BYTES', entry.stat().st_size)
+    ParseCache(str(new), new.read_bytes()).store([], 0.0)
+    assert [path.name.split('.')[0] for path in (tmp_path / CACHE_DIR).glob('*.iqc')] == ['new']
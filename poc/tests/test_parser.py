@@ -1,9 +1,19 @@
+from pathlib import Path
+
+import pytest
+
 from conftest import parse
 
-from expression import Literal, Logical, Binary, Break, Continue, Call, Get, Grouping, Ignore, Self, Set, Super, \
-    Ternary, Variable, Vector
+from expression import Literal, Logical, Binary, Break, Continue, Call, Get, Grouping, Ignore, Index, Self, Set, \
+    Slice, Super, Spread, Ternary, Unary, Variable, Vector
 from statement import Class, For, Function, Return, Expression, Var
-from token import TokenType
+from token import Token, TokenType
+from scanner import Scanner
+from parser import Parser
+from pratt_parser import PrattParser
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+EXAMPLES = sorted((ROOT / 'langspec').rglob('*.iqx'))
 
 
 def single_expr(source: str):
@@ -197,6 +207,43 @@ def test_empty_and_single_element_vector_literals():
     assert [v.value for v in single_expr("[1]").values] == [1.0]
 
 
+def test_spread_and_cons_parse_to_spread_elements():
+    vector = single_expr("[0, ...a, ...[1, 2]]")
+    assert [type(value) for value in vector.values] == [Literal, Spread, Spread]
+    assert vector.values[1].operator.type == TokenType.ELLIPSIS
+    assert isinstance(vector.values[1].expression, Variable)
+    # `[item | v]` is `[item, ...v]`, its Spread at the `|`.
+    cons = single_expr("[x + 1 | xs]")
+    assert [type(value) for value in cons.values] == [Binary, Spread]
+    assert cons.values[1].operator.type == TokenType.BAR
+    # Only a single item conses.
+    assert parse("[1, 2 | xs]") == []
+
+
+def test_adjacent_bracket_indexes_and_spaced_one_calls():
+    index = single_expr("v[i - 1]")
+    assert isinstance(index, Index) and isinstance(index.index, Binary)
+    call = single_expr("f [0]")
+    assert isinstance(call, Call) and isinstance(call.arguments[0], Vector)
+    # Indexing chains, and applies to a call's result or a call's argument.
+    nested = single_expr("f()[0][1]")
+    assert isinstance(nested, Index) and isinstance(nested.object, Index)
+    assert isinstance(nested.object.object, Call)
+    argument = single_expr("f v[0], p.q[1]")
+    assert [type(a) for a in argument.arguments] == [Index, Index]
+
+
+def test_slices_may_leave_out_either_bound():
+    full = single_expr("v[1:-1]")
+    assert isinstance(full, Slice) and full.start.value == 1.0 and isinstance(full.stop, Unary)
+    assert single_expr("v[:2]").start is None
+    assert single_expr("v[2:]").stop is None
+    open_ = single_expr("v[:]")
+    assert (open_.start, open_.stop) == (None, None)
+    # Read-only: a slice or index is no assignment target.
+    assert parse("v[0] = 1") == []
+
+
 def test_vector_literal_parse_error_does_not_leak_comma_operator_disabled():
     # Regression test: comma_as_operator is toggled off before parsing a
     # vector literal's elements and back on after -- but a parse error
@@ -319,3 +366,34 @@ def test_super_method_call():
 
 def test_self_is_an_expression():
     assert isinstance(single_expr("self"), Self)
+
+
+def dump(node):
+    # A node as plain nested data, so two ASTs compare by value.
+    if isinstance(node, Token):
+        return node.type, node.lexeme, node.literal, node.line, node.column
+    if isinstance(node, list):
+        return [dump(item) for item in node]
+    if hasattr(node, '__dict__'):
+        return type(node).__name__, {name: dump(value) for name, value in vars(node).items()}
+    return node
+
+
+@pytest.mark.parametrize('source', [
+    "a = b = c |> f |> g",
+    "x = a, b ? c : d, e ?: f ?? g",
+    "print -a * ++b - !c ^ d % e / f",
+    "[[1, 2], [3, a ? b, c : d], f a, (b, c)]",
+    "p.q.r = f (a + 1), [b] |> g",
+    "a < b == c >= d != e and f or g and !h",
+    "super.m x, y; self.n(); f(); _",
+    "a + = b; (a) = 1; x |> 1; ++-a; [1 : 2]",
+    "v[0][-1] + f [1] - g v[1:], w[:2].x; v[:]; v[]; u[1",
+] + [
+    pytest.param(path.read_text(), id=str(path.relative_to(ROOT))) for path in EXAMPLES
+])
+def test_pratt_parser_builds_the_same_ast_as_recursive_descent(source, capsys):
+    expected = dump(Parser(Scanner(source).scan_tokens()).parse())
+    expected_errors = capsys.readouterr().out
+    assert dump(PrattParser(Scanner(source).scan_tokens()).parse()) == expected
+    assert capsys.readouterr().out == expected_errors
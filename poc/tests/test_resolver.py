@@ -0,0 +1,179 @@
+import pytest
+
+from conftest import parse, run, get_var
+
+import iqalox
+from error import IqaloxRuntimeError
+from optimizer import Optimizer
+from statement import Function, Var, Expression, Return
+
+
+def setup_function():
+    iqalox.Iqalox.had_error = False
+
+
+def test_globals_are_left_unresolved():
+    statements = parse("var x = 1\nx\n")
+    assert statements[0].slot is None
+    assert statements[1].expression.depth is None
+
+
+def test_locals_get_depth_and_slot():
+    function = parse(
+        "fun f(a, b) {\n"
+        "    var c = 1\n"
+        "    return b\n"
+        "}\n"
+    )[0]
+    assert isinstance(function, Function)
+    var, ret = function.body
+    assert isinstance(var, Var) and var.slot == 2
+    assert isinstance(ret, Return)
+    assert (ret.value.depth, ret.value.slot) == (0, 1)
+
+
+def test_closure_access_counts_enclosing_scopes():
+    outer = parse(
+        "fun outer(n) {\n"
+        "    fun inner() { return n; }\n"
+        "    return inner\n"
+        "}\n"
+    )[0]
+    inner = outer.body[0]
+    variable = inner.body[0].value
+    assert (variable.depth, variable.slot) == (1, 0)
+
+
+def test_initializer_reads_the_outer_binding_of_the_same_name():
+    interpreter = run(
+        "var a = 1\n"
+        "fun f() {\n"
+        "    var a = a + 1\n"
+        "    return a\n"
+        "}\n"
+        "var result = f()\n"
+    )
+    assert get_var(interpreter, "result") == 2.0
+
+
+def test_local_functions_can_call_ones_declared_after_them():
+    interpreter = run(
+        "fun outer() {\n"
+        "    fun isEven(n) { return (n == 0) ? true : isOdd (n - 1); }\n"
+        "    fun isOdd(n) { return (n == 0) ? false : isEven (n - 1); }\n"
+        "    return isEven 4\n"
+        "}\n"
+        "var result = outer()\n"
+    )
+    assert get_var(interpreter, "result") is True
+
+
+def test_calling_a_local_function_before_its_dependency_exists_raises():
+    with pytest.raises(IqaloxRuntimeError):
+        run(
+            "fun outer() {\n"
+            "    fun first() { return second(); }\n"
+            "    first()\n"
+            "    fun second() { return 1; }\n"
+            "}\n"
+            "outer()\n"
+        )
+
+
+@pytest.mark.parametrize('engine', sorted(iqalox.ENGINES))
+def test_a_local_function_sees_only_the_variables_declared_before_it(engine, capsys):
+    # ...and the same scope's local functions, wherever they're declared. A
+    # later `var` is the enclosing binding to it, on every engine alike.
+    statements = parse(
+        'var x = "global"\n'
+        "{\n"
+        "    fun f() { return x; }\n"
+        "    print f()\n"
+        '    var x = "local"\n'
+        "    print f()\n"
+        "    fun g() { return h(); }\n"
+        "    fun h() { return x; }\n"
+        "    print g()\n"
+        "}\n"
+    )
+    Optimizer().optimize(statements)
+    assert iqalox.ENGINES[engine]().interpret(statements)
+    assert capsys.readouterr().out == "global\nglobal\nlocal\n"
+
+def test_assigning_an_immutable_local_raises():
+    with pytest.raises(IqaloxRuntimeError):
+        run("fun f() { var x = 1; x = 2; }\nf()\n")
+
+
+def test_incrementing_a_captured_mutable_local():
+    interpreter = run(
+        "fun outer() {\n"
+        "    var c mut = 0\n"
+        "    fun bump() { ++c; }\n"
+        "    bump()\n"
+        "    bump()\n"
+        "    return c\n"
+        "}\n"
+        "var result = outer()\n"
+    )
+    assert get_var(interpreter, "result") == 2.0
+
+
+def test_redeclaring_a_local_in_the_same_scope_is_a_static_error(capsys):
+    statements = parse("fun f() {\n    var x = 1\n    var x = 2\n}\n")
+    assert iqalox.Iqalox.had_error is True
+    assert "Variable 'x' already declared." in capsys.readouterr().out
+    assert isinstance(statements[0], Function)
+
+
+def test_shadowing_in_a_nested_block_is_allowed():
+    interpreter = run(
+        "fun f() {\n"
+        "    var x = 1\n"
+        "    { var x = 2; }\n"
+        "    return x\n"
+        "}\n"
+        "var result = f()\n"
+    )
+    assert get_var(interpreter, "result") == 1.0
+
+
+def test_expression_statements_inside_methods_resolve_self():
+    klass = parse("class A { get() { self; } }\n")[0]
+    statement = klass.methods[0].body[0]
+    assert isinstance(statement, Expression)
+    assert (statement.expression.depth, statement.expression.slot) == (1, 0)
+
+
+def test_only_blocks_that_declare_something_get_a_scope():
+    function = parse(
+        "fun f(n) {\n"
+        "    { print n; }\n"
+        "    { var m = n; print m; }\n"
+        "}\n"
+    )[0]
+    empty, declaring = function.body
+    assert not empty.scoped and declaring.scoped
+    assert empty.statements[0].expression.arguments[0].depth == 0
+
+
+def test_a_loop_body_is_reusable_unless_something_in_it_could_capture_it():
+    plain, capturing = parse(
+        "for (var i mut = 0; i < 3; ++i) { var j = i; print j; }\n"
+        "for (var i mut = 0; i < 3; ++i) { var j = i; { fun f() { return j; } } }\n"
+    )
+    assert plain.body.reusable
+    assert not capturing.body.reusable
+
+
+def test_closures_made_in_a_loop_body_keep_their_own_iteration():
+    interpreter = run(
+        "var first mut = nil\n"
+        "for (var i mut = 0; i < 3; ++i) {\n"
+        "    var j = i\n"
+        "    fun f() { return j; }\n"
+        "    (i == 0) ? first = f : nil\n"
+        "}\n"
+        "var result = first()\n"
+    )
+    assert get_var(interpreter, "result") == 0.0
@@ -1,4 +1,6 @@
-from scanner import Scanner
+import io
+
+from scanner import Scanner, stream_tokens
 from token import TokenType
 
 
@@ -70,12 +72,13 @@ def test_pipe_operator_scans_as_one_token():
     assert tokens[1] == TokenType.PIPE
 
 
-def test_bare_pipe_character_is_a_clean_scan_error_not_a_crash():
-    # '|' not followed by '>' doesn't extend into any valid token; this
-    # must be reported like any other bad character, not raise a raw
-    # ValueError from an unguarded TokenType(token) construction.
+def test_bare_pipe_scans_as_a_bar_token():
+    # '|' not followed by '>' is cons's bar (`[x | xs]`), not a pipe -- and
+    # must never raise a raw ValueError from an unguarded TokenType(token)
+    # construction.
     tokens = token_types("a | b")
     assert TokenType.PIPE not in tokens
+    assert tokens[1] == TokenType.BAR
 
 
 def test_token_tracks_column_within_its_line():
@@ -178,3 +181,44 @@ def test_unterminated_block_comment_is_a_scan_error(capsys):
     out = capsys.readouterr().out
     assert "Unterminated block comment" in out
     assert [t.type for t in tokens] == [TokenType.EOF]
+
+
+def test_columns_after_a_multiline_string_count_from_its_last_line():
+    tokens = Scanner('print "one\ntwo" + x\n<# a\nb #> y').scan_tokens()
+    x_token = next(t for t in tokens if t.lexeme == "x")
+    y_token = next(t for t in tokens if t.lexeme == "y")
+    assert (x_token.line, x_token.column) == (2, 8)
+    assert (y_token.line, y_token.column) == (4, 6)
+    assert (tokens[-1].line, tokens[-1].column) == (4, 7)
+
+
+def test_the_token_buffer_keeps_only_kinds_and_offsets():
+    source = 'var total = 12.5\nprint "hi"'
+    tokens = Scanner(source).scan_tokens()
+    assert list(tokens.starts) == [0, 4, 10, 12, 16, 17, 23, 27]
+    assert list(tokens.lengths) == [3, 5, 1, 4, 1, 5, 4, 0]
+    assert list(tokens.line_starts) == [0, 17]
+    assert tokens.type(3) == TokenType.NUMBER and tokens.literal(3) == 12.5
+    assert tokens.literal(6) == "hi"
+    assert tokens.position(tokens.starts[6]) == (2, 7)
+
+
+def test_streamed_pieces_hold_the_same_tokens_as_one_scan():
+    source = 'var a = [1,\n 2]\nfun f() {\n  return "x\ny"\n}\n<# long\ncomment #> print a; print f()\n'
+    expected = [(t.type, t.lexeme, t.line, t.column) for t in Scanner(source).scan_tokens()]
+    pieces = list(stream_tokens(io.StringIO(source), chunk_size=4))
+    assert len(pieces) > 1
+    streamed = [(t.type, t.lexeme, t.line, t.column) for piece in pieces for t in piece]
+    assert [token for token in streamed if token[0] != TokenType.EOF] == expected[:-1]
+    # Every piece ends after a line break outside brackets.
+    assert all(piece[-2].lexeme == "\n" for piece in pieces[:-1])
+
+
+def test_encoded_sources_scan_to_the_same_tokens():
+    source = 'var s = "héllo"\n<# €€ #> print s, 2.5 @\n'
+    expected = [(t.type, t.lexeme, t.literal, t.line, t.column) for t in Scanner(source).scan_tokens()]
+    tokens = Scanner(source.encode()).scan_tokens()
+    assert tokens.wide
+    # Offsets count bytes, but columns still count characters.
+    assert tokens.starts[-3] == len('var s = "héllo"\n<# €€ #> print s, '.encode())
+    assert [(t.type, t.lexeme, t.literal, t.line, t.column) for t in tokens] == expected
@@ -0,0 +1,225 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from conftest import parse
+
+import bytecode
+import iqalox
+from bytecode import BytecodeError
+from vm import VM
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+IQALOX = ROOT / 'poc' / 'src' / 'iqalox.py'
+EXAMPLES = sorted((ROOT / 'langspec').glob('versions/0.1/examples/*.iqx'))
+
+
+def setup_function():
+    iqalox.Iqalox.had_error = False
+
+
+def run_vm(source: str) -> VM:
+    vm = VM()
+    vm.interpret(parse(source))
+    return vm
+
+
+def run_script(path: Path, *options: str) -> subprocess.CompletedProcess:
+    # Without the parse cache, which would write an __iqcache__/ next to
+    # each example (test_parse_cache.py covers it, in tmp_path).
+    return subprocess.run(
+        [sys.executable, str(IQALOX), '--no-cache', *options, str(path)], capture_output=True, text=True, timeout=60
+    )
+
+
+@pytest.mark.parametrize('path', EXAMPLES, ids=lambda path: str(path.relative_to(ROOT)))
+def test_vm_matches_tree_walker_on_the_examples(path):
+    tree = run_script(path, '--engine=tree')
+    vm = run_script(path, '--engine=vm')
+    assert (vm.stdout, vm.returncode) == (tree.stdout, tree.returncode)
+
+
+def test_vm_runs_closures_and_classes(capsys):
+    run_vm(
+        "class Counter {\n"
+        "    init() { self.count = 0; }\n"
+        "    bump() { self.count = self.count + 1; return self.count; }\n"
+        "}\n"
+        "fun twice(f) { f(); return f(); }\n"
+        "var counter = Counter()\n"
+        "print twice counter.bump\n"
+    )
+    assert capsys.readouterr().out == "2\n"
+
+
+def test_upvalues_outlive_their_frame_and_stay_shared():
+    vm = run_vm(
+        "var peek mut = nil\n"
+        "fun counter() {\n"
+        "    var c mut = 0\n"
+        "    fun bump() { ++c; return c; }\n"
+        "    fun get() { return c; }\n"
+        "    peek = get\n"
+        "    return bump\n"
+        "}\n"
+        "var bump = counter()\n"
+        "bump()\n"
+        "bump()\n"
+        "var result = peek()\n"
+    )
+    assert vm.globals['result'] == 2.0
+
+
+def test_each_loop_iteration_captures_a_fresh_local():
+    vm = run_vm(
+        "var first mut = nil\n"
+        "var last mut = nil\n"
+        "for (var i mut = 0; i < 3; ++i) {\n"
+        "    var j = i\n"
+        "    fun get() { return j; }\n"
+        "    first = first ?? get\n"
+        "    last = get\n"
+        "}\n"
+        "var result = first() + last()\n"
+    )
+    assert vm.globals['result'] == 2.0
+
+
+def test_super_calls_resolve_from_nested_functions(capsys):
+    run_vm(
+        "class A { get() { return 1; } }\n"
+        "class B extends A {\n"
+        "    get() {\n"
+        "        fun inner() { return super.get(); }\n"
+        "        return inner() + 1\n"
+        "    }\n"
+        "}\n"
+        "print B().get()\n"
+    )
+    assert capsys.readouterr().out == "2\n"
+
+
+def test_local_functions_can_call_ones_declared_after_them():
+    vm = run_vm(
+        "fun outer() {\n"
+        "    fun isEven(n) { return (n == 0) ? true : isOdd (n - 1); }\n"
+        "    fun isOdd(n) { return (n == 0) ? false : isEven (n - 1); }\n"
+        "    return isEven 4\n"
+        "}\n"
+        "var result = outer()\n"
+    )
+    assert vm.globals['result'] is True
+
+
+def test_break_and_continue_unwind_block_locals():
+    vm = run_vm(
+        "var total mut = 0\n"
+        "for (var i mut = 0; i < 10; ++i) {\n"
+        "    { var odd = i % 2; (odd == 1) ? continue : nil; }\n"
+        "    (i > 6) ? break : nil\n"
+        "    total = total + i\n"
+        "}\n"
+        "var result = total\n"
+    )
+    assert vm.globals['result'] == 12.0
+
+
+def test_assigning_an_immutable_local_is_a_compile_error(capsys):
+    run_vm("fun f() { var x = 1; x = 2; }\n")
+    assert iqalox.Iqalox.had_error is True
+    assert "immutable" in capsys.readouterr().out
+
+
+def test_break_outside_a_loop_is_a_compile_error(capsys):
+    run_vm("fun f() {\n    print 1\n    break\n}\n")
+    assert iqalox.Iqalox.had_error is True
+    assert capsys.readouterr().out.startswith("[line 3] Error at 'break': Can't use 'break' outside of a loop.")
+
+
+def test_a_class_declares_the_fields_its_methods_assign(capsys):
+    # As vm/ needs them to be, for a .iqbc file to run there too: a field
+    # the class never assigns itself can't be set from outside.
+    vm = run_vm(
+        "class Point {\n"
+        "    init(x) { self.x = x; }\n"
+        "    move() { fun by(d) { self.y = d; } by(2); }\n"
+        "}\n"
+        "var p = Point(1)\n"
+        "p.move()\n"
+        "p.x = p.x + p.y\n"
+        "print p.x\n"
+        "p.z = 3\n"
+    )
+    assert vm.globals['Point'].properties == {'x': (True, True), 'y': (True, True)}
+    out = capsys.readouterr().out
+    assert out.startswith("3\nUndefined property 'z'.\n[line 9]")
+
+
+def test_runtime_errors_report_the_line(capsys):
+    vm = run_vm("var a = 1\nvar b = a + \"x\"\n")
+    assert 'b' not in vm.globals
+    out = capsys.readouterr().out
+    assert "[line 2]" in out
+
+
+def test_indexing_and_slicing(capsys):
+    run_vm("var v = [10, 20, 30, 40]\nprint v[-1]\nprint (v[1:2])\nprint (v[2:])\nprint v[4]\n")
+    assert capsys.readouterr().out.splitlines() == [
+        "40", "[20.0, 30.0]", "[30.0, 40.0]", "Vector index 4 out of range for vector of length 4.", "[line 5]",
+    ]
+
+
+def test_spread_and_cons_extend_a_new_vector(capsys):
+    run_vm("var xs = [2, 3]\nprint [1 | xs]\nprint [...xs, 4, ...xs]\nprint xs\nvar bad = [1 | 2]\n")
+    assert capsys.readouterr().out.splitlines() == [
+        "[1.0, 2.0, 3.0]", "[2.0, 3.0, 4.0, 2.0, 3.0]", "[2.0, 3.0]",
+        "Can only spread a vector, got number.", "[line 5]",
+    ]
+
+
+def test_deep_recursion_overflows_the_frame_stack(capsys):
+    run_vm("fun f(n) { return f(n + 1); }\nf(0)\n")
+    assert "Stack overflow." in capsys.readouterr().out
+
+
+def test_bytecode_round_trips():
+    chunk = VM().compiler.compile(parse(
+        "fun add(a, b) { return a + b; }\n"
+        "class P { init(x) { self.x = x; } }\n"
+        "print add(P(1).x, 2)\n"
+    ))
+    data = bytecode.dumps(chunk)
+    assert data.startswith(b'IQBC\x02')
+    script = bytecode.loads(data)
+    assert bytecode.dumps(script.chunk) == data
+    assert script.chunk.code == chunk.code
+    assert script.chunk.lines == chunk.lines
+
+
+def test_loader_rejects_bad_magic():
+    with pytest.raises(BytecodeError, match='bad magic number'):
+        bytecode.loads(b'NOPE\x02')
+
+
+def test_loader_rejects_other_versions():
+    with pytest.raises(BytecodeError, match='unsupported format version 1'):
+        bytecode.loads(b'IQBC\x01')
+
+
+def test_loader_rejects_truncated_files():
+    data = bytecode.dumps(VM().compiler.compile(parse("print 1\n")))
+    with pytest.raises(BytecodeError, match='unexpected end of file'):
+        bytecode.loads(data[:-1])
+
+
+def test_compile_then_run_the_iqbc_file(tmp_path):
+    source = tmp_path / 'hello.iqx'
+    source.write_text("fun greet(name) { return concat [\"hi \", name]; }\nprint greet \"there\"\n")
+    output = tmp_path / 'hello.iqbc'
+    compiled = run_script(source, f'--compile={output}')
+    assert compiled.returncode == 0
+    assert output.read_bytes().startswith(bytecode.MAGIC)
+    result = run_script(output)
+    assert (result.stdout, result.returncode) == ("hi there\n", 0)
@@ -0,0 +1,141 @@
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+sys.modules.pop('token', None)
+
+from scanner import Scanner
+from pratt_parser import PrattParser
+from resolver import Resolver
+from optimizer import Optimizer
+from interpreter import Interpreter
+from closure_compiler import ClosureInterpreter
+from python_compiler import PythonInterpreter
+from stack_interpreter import StackInterpreter
+from environment import Environment
+
+arg_parser = ArgumentParser(usage='bench_control_flow.py [--engine=tree|closure|python|stack] [--repeat N]')
+arg_parser.add_argument('--engine', choices=('tree', 'closure', 'python', 'stack'), default='tree')
+arg_parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case; the best one is reported.')
+args = arg_parser.parse_args()
+
+ENGINES: Dict[str, Callable[[], Interpreter]] = {
+    'tree': Interpreter,
+    'closure': ClosureInterpreter,
+    'python': PythonInterpreter,
+    'stack': StackInterpreter,
+}
+
+# Each case: (setup source, timed source, operations the timed source
+# performs). `calls` is all function calls and returns; `loop` spins a
+# `for` whose body completes with `continue` on every other iteration and
+# ends on a `break`; `nested` does both, a call per inner-loop iteration;
+# `locals` declares variables in a loop body and in a block nested in it;
+# `counted` is a plain counted loop (see Optimizer.count_loop());
+# `arithmetic` is float arithmetic and comparisons (see specialization.py).
+# `fact` and `odd` are pure, so every interpreter runs with memoization off,
+# as with `--no-memo`: otherwise `calls` and `nested` would mostly measure
+# memo hits rather than calls.
+CASES: Dict[str, Tuple[str, str, int]] = {
+    'calls': (
+        "fun fact(n) { return (n < 2) ? 1 : n * fact (n - 1); }\n",
+        "for (var i mut = 0; i < 2000; ++i) { fact 20; }\n",
+        2000 * 20,
+    ),
+    'loop': (
+        "var total mut = 0\n",
+        "for (var i mut = 0; ; ++i) {\n"
+        "    (i == 100000) ? break : nil\n"
+        "    (i % 2 == 0) ? continue : nil\n"
+        "    total = total + i\n"
+        "}\n",
+        100000,
+    ),
+    'nested': (
+        "fun odd(n) { return n % 2 == 1; }\n",
+        "for (var i mut = 0; i < 200; ++i) {\n"
+        "    for (var j mut = 0; j < 200; ++j) { odd j ? continue : nil; }\n"
+        "}\n",
+        200 * 200,
+    ),
+    'locals': (
+        "var total mut = 0\n",
+        "for (var i mut = 0; i < 50000; ++i) {\n"
+        "    var half = i / 2\n"
+        "    { var square = half * half; total = total + square; }\n"
+        "}\n",
+        50000,
+    ),
+    'counted': (
+        "var total mut = 0\nvar limit = 100000\n",
+        "for (var i mut = 0; i < limit; ++i) { total = total + i; }\n",
+        100000,
+    ),
+    'arithmetic': (
+        "var total mut = 0\n",
+        "for (var i mut = 0; i < 50000; ++i) {\n"
+        "    total = (i * i - total / 2 >= i % 7) ? total + i ^ 2 : total - 1\n"
+        "}\n",
+        50000 * 7,
+    ),
+}
+
+
+def parse(source: str):
+    statements = PrattParser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    Optimizer().optimize(statements)
+    return statements
+
+
+def build() -> Interpreter:
+    interpreter = ENGINES[args.engine]()
+    interpreter.memoization.enabled = False
+    return interpreter
+
+
+def measure(setup: str, timed: str) -> float:
+    best = float('inf')
+    for _ in range(args.repeat):
+        interpreter = build()
+        for statement in parse(setup):
+            interpreter.execute(statement)
+        statements = parse(timed)
+        start = time.perf_counter()
+        for statement in statements:
+            interpreter.execute(statement)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def count_environments(setup: str, timed: str) -> int:
+    # How many Environments one untimed run of the timed source allocates.
+    interpreter = build()
+    for statement in parse(setup):
+        interpreter.execute(statement)
+    statements = parse(timed)
+    count = 0
+    initialize = Environment.__init__
+
+    def counting_initialize(environment: Environment, enclosing: Environment = None) -> None:
+        nonlocal count
+        count += 1
+        initialize(environment, enclosing)
+
+    Environment.__init__ = counting_initialize
+    try:
+        for statement in statements:
+            interpreter.execute(statement)
+    finally:
+        Environment.__init__ = initialize
+    return count
+
+
+for name, (setup, timed, operations) in CASES.items():
+    seconds = measure(setup, timed)
+    environments = count_environments(setup, timed)
+    print(f'{args.engine:8} {name:10} {seconds * 1000:9.1f} ms {operations / seconds:12,.0f} ops/s '
+          f'{environments:10,} environments')
@@ -0,0 +1,81 @@
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+sys.modules.pop('token', None)
+
+from expression import Expr
+from statement import Stmt
+from scanner import Scanner
+from parser import Parser
+from pratt_parser import PrattParser
+
+arg_parser = ArgumentParser(usage='bench_parser.py [--megabytes N] [--repeat N] [script ...]')
+arg_parser.add_argument('--megabytes', type=float, default=1.0, help='Size of the generated source.')
+arg_parser.add_argument('--repeat', type=int, default=5, help='Timed runs per parser; the best one is reported.')
+arg_parser.add_argument('scripts', nargs='*', help='Parse these files instead of a generated source.')
+args = arg_parser.parse_args()
+
+PARSERS: Dict[str, Callable[..., Parser]] = {
+    'recursive descent': Parser,
+    'pratt': PrattParser,
+}
+
+# Expression-heavy Iqalox -- every precedence level, short and long
+# operator chains, calls, properties, vectors -- repeated up to the
+# requested size.
+STANZA = (
+    "var a mut = 1 + 2 * 3 - 4 / 5 % 6 ^ 7\n"
+    "a = (a > 1 and a <= 10 or !done) ? a * 2 : -a\n"
+    "var b = x ?? y ?? 0, z == 1 != false\n"
+    "print total + count * scale - offset / 2 + 1 - 2 + 3 - 4 + 5\n"
+    "var c = [1, 2 + 3, \"four\", nil, true] |> first |> show\n"
+    "point.x = point.y * 2 + origin.distance target, 3\n"
+    "var d = f (a + 1), (b - 1), [c] ?: fallback()\n"
+    "e = ++counter + 1 < limit and flag or other == 'x'\n"
+)
+
+
+def generated_source() -> str:
+    return STANZA * max(1, int(args.megabytes * 1024 * 1024 / len(STANZA)))
+
+
+def count_nodes(statements: List[Stmt]) -> int:
+    nodes = 0
+    pending: List = list(statements)
+    while pending:
+        node = pending.pop()
+        nodes += 1
+        for field in vars(node).values():
+            if isinstance(field, (Expr, Stmt)):
+                pending.append(field)
+            elif isinstance(field, list):
+                pending.extend(item for item in field if isinstance(item, (Expr, Stmt)))
+    return nodes
+
+
+def measure(source: str) -> None:
+    tokens = Scanner(source).scan_tokens()
+    print(f'{len(source) / (1024 * 1024):.2f} MB, {len(tokens):,} tokens')
+    rates = {}
+    for name, parser in PARSERS.items():
+        best = float('inf')
+        nodes = 0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            statements = parser(tokens).parse()
+            best = min(best, time.perf_counter() - start)
+            nodes = count_nodes(statements)
+        rates[name] = nodes / best
+        print(f'  {name:<18} {nodes:10,} nodes {best * 1000:9.1f} ms {rates[name]:12,.0f} nodes/s')
+    print(f'  pratt / recursive descent: {rates["pratt"] / rates["recursive descent"]:.2f}x')
+
+
+if args.scripts:
+    for script in args.scripts:
+        measure(Path(script).read_text())
+else:
+    measure(generated_source())
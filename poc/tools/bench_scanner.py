@@ -0,0 +1,63 @@
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+sys.modules.pop('token', None)
+
+from scanner import Scanner
+
+arg_parser = ArgumentParser(usage='bench_scanner.py [--megabytes N] [--repeat N] [script ...]')
+arg_parser.add_argument('--megabytes', type=float, default=4.0, help='Size of the generated source.')
+arg_parser.add_argument('--repeat', type=int, default=5, help='Timed runs; the best one is reported.')
+arg_parser.add_argument('scripts', nargs='*', help='Scan these files instead of a generated source.')
+args = arg_parser.parse_args()
+
+# One stanza of ordinary-looking Iqalox -- every kind of token, comments,
+# strings and blank lines included -- repeated up to the requested size.
+STANZA = (
+    "# Sums the even squares below a limit.\n"
+    "fun sumEvenSquares(limit) {\n"
+    "    var total mut = 0\n"
+    "    for (var i mut = 0; i < limit; ++i) {\n"
+    "        (i % 2 == 0) ? (total = total + i ^ 2) : continue\n"
+    "    }\n"
+    "    return total ?? 0\n"
+    "}\n"
+    "\n"
+    "<# A class with a method,\n"
+    "   across two lines. #>\n"
+    "class Greeter extends Base {\n"
+    "    greet(name) { return concat [\"Hello, \", name, '!']; }\n"
+    "}\n"
+    "var _unused = sumEvenSquares 1000 |> print\n"
+    "print (3.25 >= 1.5 and !false or nil) ?: \"fallback\"\n"
+)
+
+
+def generated_source() -> str:
+    return STANZA * max(1, int(args.megabytes * 1024 * 1024 / len(STANZA)))
+
+
+def measure(source: str) -> None:
+    best = float('inf')
+    buffer = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        buffer = Scanner(source).scan_tokens()
+        best = min(best, time.perf_counter() - start)
+    tokens = len(buffer)
+    megabytes = len(source) / (1024 * 1024)
+    # What the token buffer's columns and line table take on top of the
+    # source they index into.
+    columns = sum(sys.getsizeof(column) for column in (buffer.kinds, buffer.starts, buffer.lengths, buffer.line_starts))
+    print(f'{megabytes:8.2f} MB {tokens:10,} tokens {best * 1000:9.1f} ms {tokens / best:12,.0f} tokens/s '
+          f'{megabytes / best:7.2f} MB/s {columns / (1024 * 1024):7.2f} MB buffer')
+
+
+if args.scripts:
+    for script in args.scripts:
+        measure(Path(script).read_text())
+else:
+    measure(generated_source())
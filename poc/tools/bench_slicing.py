@@ -0,0 +1,140 @@
+import random
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+sys.modules.pop('token', None)
+
+from scanner import Scanner
+from pratt_parser import PrattParser
+from resolver import Resolver
+from optimizer import Optimizer
+from interpreter import Interpreter
+from closure_compiler import ClosureInterpreter
+from python_compiler import PythonInterpreter
+from stack_interpreter import StackInterpreter
+from environment import VariableData
+from vectors import NumericVector, make_vector, numpy
+
+arg_parser = ArgumentParser(usage='bench_slicing.py [--engine=tree|closure|python|stack] [--repeat N]')
+arg_parser.add_argument('--engine', choices=('tree', 'closure', 'python', 'stack'), default='tree')
+arg_parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the best one is reported.')
+args = arg_parser.parse_args()
+
+ENGINES: Dict[str, Callable[[], Interpreter]] = {
+    'tree': Interpreter,
+    'closure': ClosureInterpreter,
+    'python': PythonInterpreter,
+    'stack': StackInterpreter,
+}
+
+SORT_SIZE = 2000
+SEARCH_SIZE = 100000
+SEARCHES = 1000
+
+# Recursive divide and conquer over a numeric vector, halving it by slices
+# each step: `merge sort` sorts SORT_SIZE numbers in random order (merging
+# into a vector built by spread), `binary search` looks SEARCHES numbers up
+# in SEARCH_SIZE sorted ones, half of them absent. There's no `length` in
+# the PoC, so each function is passed its vector's. Each case: (source
+# declaring the functions, timed source).
+CASES: Dict[str, Tuple[str, str]] = {
+    'merge sort': (
+        "fun merge(left, right, n, m) {\n"
+        "    var merged mut = []\n"
+        "    var i mut = 0\n"
+        "    var j mut = 0\n"
+        "    for (var k mut = 0; k < n + m; ++k) {\n"
+        "        var from_left = j == m or (i < n and left[i] <= right[j])\n"
+        "        merged = from_left ? [...merged, left[i]] : [...merged, right[j]]\n"
+        "        from_left ? ++i : ++j\n"
+        "    }\n"
+        "    return merged\n"
+        "}\n"
+        "fun msort(v, n) {\n"
+        "    var half = (n - n % 2) / 2\n"
+        "    return (n < 2) ? v : merge (msort v[:half - 1], half), (msort v[half:], (n - half)), half, (n - half)\n"
+        "}\n",
+        f"msort shuffled, {SORT_SIZE}\n",
+    ),
+    'binary search': (
+        "fun search(v, n, x) {\n"
+        "    var half = (n - n % 2) / 2\n"
+        "    var below = n > 0 and x < v[half]\n"
+        "    var rest = below ? v[:half - 1] : v[half + 1:]\n"
+        "    return (n == 0) ? false : (v[half] == x) ? true : search rest, (below ? half : n - half - 1), x\n"
+        "}\n",
+        f"for (var i mut = 0; i < {SEARCHES}; ++i) {{ search sorted, {SEARCH_SIZE}, (i * 199 / 2); }}\n",
+    ),
+}
+
+view_slice = NumericVector.slice
+
+# How many elements the slices of the last run copied.
+copied = 0
+
+
+def copying_slice(vector: NumericVector, start: int, stop: int) -> NumericVector:
+    # A slice as a copy of its elements -- what one was before views. (Its
+    # data is always an array('d') or NumPy array here, never a view.)
+    global copied
+    copied += stop - start
+    data = vector.data[start:stop]
+    return NumericVector(data if numpy is None else data.copy())
+
+
+def parse(source: str):
+    statements = PrattParser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    Optimizer().optimize(statements)
+    return statements
+
+
+def run(declarations: str, timed: str, traced: bool = False) -> Tuple[float, int]:
+    # One run's seconds and, if `traced`, the most memory the timed source
+    # had allocated at once (tracing slows it down, so is a run of its own).
+    # Memoization is off: it's the slices being measured, not whether a
+    # call's been made before.
+    global copied
+    copied = 0
+    interpreter = ENGINES[args.engine]()
+    interpreter.memoization.enabled = False
+    numbers = random.Random(0)
+    shuffled = [float(number) for number in range(SORT_SIZE)]
+    numbers.shuffle(shuffled)
+    for name, values in (('shuffled', shuffled), ('sorted', [float(number) for number in range(SEARCH_SIZE)])):
+        interpreter.globals.define(name, VariableData(make_vector(values), is_mutable=False))
+    for statement in parse(declarations):
+        interpreter.execute(statement)
+    statements = parse(timed)
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        for statement in statements:
+            interpreter.execute(statement)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if traced else 0
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def measure(declarations: str, timed: str) -> Tuple[float, int]:
+    best = min(run(declarations, timed)[0] for _ in range(args.repeat))
+    return best, run(declarations, timed, traced=True)[1]
+
+
+for name, (declarations, timed) in CASES.items():
+    for mode, slice_ in (('copy', copying_slice), ('view', view_slice)):
+        NumericVector.slice = slice_
+        try:
+            seconds, peak = measure(declarations, timed)
+        finally:
+            NumericVector.slice = view_slice
+        print(f'{args.engine:8} {name:14} {mode:5} {seconds * 1000:9.1f} ms {peak / 1024:10,.0f} KiB peak '
+              f'{copied * 8 / 1024:12,.0f} KiB copied by slices')
@@ -8,47 +8,76 @@ args = arg_parser.parse_args()
 
 AST_DICT = Dict[str, Tuple]
 
+# Fields with a default (`depth`, `slot`, `is_mutable`) aren't produced by the
+# parser -- they're annotations filled in afterwards by resolver.py, which
+# gives every local variable access its (depth, slot) address. `depth` stays
+# None for anything the resolver leaves to the global environment. A Block's
+# `scoped` is cleared when it declares nothing, so it needs no Environment of
+# its own; `reusable` is set on a loop body with no function or class in it,
+# since nothing can then capture its Environment and one serves every
+# iteration. A For's `counted` and `counter_read` are set by optimizer.py:
+# whether it's a counted loop an engine can run over a range of integers (see
+# Optimizer.count_loop()), and whether its body reads the counter. A
+# Function's `pure` is set by purity.py when its calls can be memoized. `cache`
+# and `deoptimized` are filled in at run time instead: a Get's
+# callable.PropertyCache or a Set's callable.StoreCache, created by the
+# tree-walker the first time the node runs, and whether a Binary has given
+# up on specializing itself (see specialization.py).
+
 DEFAULT_IMPORTS: Tuple = ('from abc import ABC, abstractmethod',)
 
 EXPRESSIONS_IMPORTS: Tuple = DEFAULT_IMPORTS + (
-    'from typing import Any, List',
+    'from typing import Any, List, Optional',
     'from token import Token',
 )
 
 STATEMENT_IMPORTS: Tuple = DEFAULT_IMPORTS + (
-    'from typing import Any, List',
+    'from typing import Any, List, Optional',
     'from expression import Expr',
     'from token import Token',
 )
 
 EXPRESSIONS: AST_DICT = {
-    'Assign': ('name: Token', 'value: Expr'),
-    'Binary': ('left: Expr', 'operator: Token', 'right: Expr'),
+    'Assign': (
+        'name: Token', 'value: Expr', 'depth: Optional[int] = None', 'slot: Optional[int] = None',
+        'is_mutable: bool = True',
+    ),
+    'Binary': ('left: Expr', 'operator: Token', 'right: Expr', 'deoptimized: bool = False'),
     'Logical': ('left: Expr', 'operator: Token', 'right: Expr'),
     'Grouping': ('expression: Expr',),
     'Literal': ('value: Any',),
     'Unary': ('operator: Token', 'right: Expr'),
     'Ternary': ('left: Expr', 'left_operator: Token', 'middle: Expr', 'right_operator: Token', 'right: Expr'),
     'Vector': ('values: List[Expr]',),
-    'Variable': ('name: Token',),
-    'Break': (),
-    'Continue': (),
+    'Spread': ('operator: Token', 'expression: Expr'),
+    'Variable': (
+        'name: Token', 'depth: Optional[int] = None', 'slot: Optional[int] = None', 'is_mutable: bool = True',
+    ),
+    'Break': ('keyword: Token',),
+    'Continue': ('keyword: Token',),
     'Ignore': (),
     'Call': ('callee: Expr', 'arguments: List[Expr]'),
-    'Get': ('object: Expr', 'name: Token'),
-    'Set': ('object: Expr', 'name: Token', 'value: Expr'),
-    'Self': ('keyword: Token',),
-    'Super': ('keyword: Token', 'method: Token'),
+    'Get': ('object: Expr', 'name: Token', 'cache: Any = None'),
+    'Index': ('object: Expr', 'bracket: Token', 'index: Expr'),
+    'Slice': ('object: Expr', 'bracket: Token', 'start: Optional[Expr]', 'stop: Optional[Expr]'),
+    'Set': ('object: Expr', 'name: Token', 'value: Expr', 'cache: Any = None'),
+    'Self': ('keyword: Token', 'depth: Optional[int] = None', 'slot: Optional[int] = None'),
+    'Super': ('keyword: Token', 'method: Token', 'depth: Optional[int] = None', 'slot: Optional[int] = None'),
 }
 
 STATEMENTS: AST_DICT = {
-    'Block': ('statements: List[Stmt]',),
+    'Block': ('statements: List[Stmt]', 'scoped: bool = True', 'reusable: bool = False'),
     'Expression': ('expression: Expr',),
-    'Var': ('name: Token', 'initializer: Expr', 'is_mutable: bool'),
-    'For': ('initializer: Stmt', 'condition: Expr', 'increment: Expr', 'body: Stmt'),
-    'Function': ('name: Token', 'params: List[Token]', 'body: List[Stmt]'),
+    'Var': ('name: Token', 'initializer: Expr', 'is_mutable: bool', 'slot: Optional[int] = None'),
+    'For': (
+        'initializer: Stmt', 'condition: Expr', 'increment: Expr', 'body: Stmt', 'counted: bool = False',
+        'counter_read: bool = False',
+    ),
+    'Function': (
+        'name: Token', 'params: List[Token]', 'body: List[Stmt]', 'slot: Optional[int] = None', 'pure: bool = False'
+    ),
     'Return': ('keyword: Token', 'value: Expr'),
-    'Class': ('name: Token', 'superclass: Expr', 'methods: List[Function]'),
+    'Class': ('name: Token', 'superclass: Expr', 'methods: List[Function]', 'slot: Optional[int] = None'),
 }
 
 INDENTATION = '    '